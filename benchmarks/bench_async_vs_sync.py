@@ -0,0 +1,141 @@
+"""
+Compares the WSGI (gunicorn, 1 worker x 8 threads) and ASGI (uvicorn) modes of
+main_service against local stand-ins.
+
+Both servers are started as subprocesses from main_service/ with secrets given
+as environment overrides, DLP pointed at the in-process fake DLP server and
+Pub/Sub pointed at an emulator address. Redis is whatever --redis-host points
+at; without a reachable Redis the context lookups are skipped in both modes.
+The driver posts the final_transcript/ customer utterances to
+/handle-customer-utterance from many concurrent callers and reports
+throughput and latency percentiles per mode.
+
+Usage (from the project root):
+    python benchmarks/bench_async_vs_sync.py --concurrency 200 --requests 2000 --latency-ms 200
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SERVICE_DIR = os.path.join(ROOT, "main_service")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_dlp_server import FakeDlpServer  # noqa: E402
+
+MODES = {
+    "wsgi": ["gunicorn", "--bind", "127.0.0.1:{port}", "--workers", "1", "--threads", "8", "--timeout", "0", "main:app"],
+    "asgi": ["uvicorn", "asgi_app:app", "--host", "127.0.0.1", "--port", "{port}", "--log-level", "warning"],
+}
+
+
+def load_customer_utterances():
+    utterances = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "final_transcript", "*.json"))):
+        with open(path) as f:
+            utterances.extend(e["text"] for e in json.load(f).get("entries", []) if e.get("role") == "END_USER")
+    return utterances
+
+
+def service_env(dlp_address, redis_host, redis_port):
+    env = dict(os.environ)
+    env.update({
+        "GOOGLE_CLOUD_PROJECT": "benchmark-project",
+        "CONTEXT_MANAGER_REDIS_HOST": redis_host,
+        "CONTEXT_MANAGER_REDIS_PORT": str(redis_port),
+        "CONTEXT_MANAGER_DLP_PROJECT_ID": "benchmark-project",
+        "DLP_EMULATOR_HOST": dlp_address,
+        "PUBSUB_EMULATOR_HOST": env.get("PUBSUB_EMULATOR_HOST", "127.0.0.1:8085"),
+    })
+    return env
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.25)
+    raise RuntimeError(f"Service at {url} did not start within {timeout}s")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def drive(base_url, utterances, total, concurrency):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def one(i):
+        payload = {"conversation_id": f"bench-{i % 50}", "transcript": utterances[i % len(utterances)]}
+        start = time.perf_counter()
+        response = session.post(f"{base_url}/handle-customer-utterance", json=payload, timeout=120)
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = [r[0] * 1000 for r in results]
+    return {
+        "requests": total,
+        "errors": sum(1 for r in results if r[1] != 200),
+        "requests_per_second": round(total / elapsed, 1),
+        "latency_ms": {
+            "p50": round(statistics.median(latencies), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=200, help="Simulated DLP latency")
+    parser.add_argument("--redis-host", default="127.0.0.1")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    utterances = load_customer_utterances()
+    dlp = FakeDlpServer(latency_ms=args.latency_ms, max_workers=max(64, args.concurrency)).start()
+    env = service_env(dlp.address, args.redis_host, args.redis_port)
+    report = {"dlp_latency_ms": args.latency_ms, "concurrency": args.concurrency, "results": {}}
+    try:
+        for mode in args.modes:
+            command = [part.format(port=args.port) for part in MODES[mode]]
+            server = subprocess.Popen(command, cwd=MAIN_SERVICE_DIR, env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                wait_until_up(base_url)
+                dlp.rpcs = 0
+                report["results"][mode] = drive(base_url, utterances, args.requests, args.concurrency)
+                report["results"][mode]["dlp_rpcs"] = dlp.rpcs
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        dlp.stop()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
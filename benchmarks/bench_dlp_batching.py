@@ -0,0 +1,94 @@
+"""
+Compares per-utterance DLP calls with DlpMicroBatcher against the fake DLP server.
+
+Fires the final_transcript/ utterances from a pool of concurrent callers,
+first one deidentify_content RPC per utterance and then through the
+micro-batcher, and reports RPC counts, throughput and whether the redacted
+outputs are identical.
+
+Usage (from the project root):
+    python benchmarks/bench_dlp_batching.py --callers 64 --latency-ms 150 --window-ms 10
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+import yaml
+from google.cloud import dlp_v2
+from google.cloud.dlp_v2.services.dlp_service.transports import DlpServiceGrpcTransport
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "main_service"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dlp_batcher import DlpMicroBatcher  # noqa: E402
+from dlp_requests import DlpRequestTemplates  # noqa: E402
+from fake_dlp_server import FakeDlpServer  # noqa: E402
+
+
+def load_utterances():
+    utterances = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "final_transcript", "*.json"))):
+        with open(path) as f:
+            utterances.extend(e["text"] for e in json.load(f).get("entries", []))
+    return utterances
+
+
+def run(label, redact, utterances, callers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        results = list(pool.map(redact, utterances))
+    elapsed = time.perf_counter() - start
+    return results, {"mode": label, "utterances": len(utterances), "seconds": round(elapsed, 3),
+                     "utterances_per_second": round(len(utterances) / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--window-ms", type=int, default=10)
+    parser.add_argument("--max-items", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10, help="Times to replay the fixture utterances")
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "main_service", "dlp_config.yaml")) as f:
+        dlp_config = yaml.safe_load(f)
+    # No DLP templates exist on the fake server, so send the inline configs.
+    dlp_config = {**dlp_config, "dlp_templates": {}}
+    template = DlpRequestTemplates(dlp_config, "benchmark-project").default
+    utterances = load_utterances() * args.repeat
+
+    server = FakeDlpServer(latency_ms=args.latency_ms).start()
+    client = dlp_v2.DlpServiceClient(transport=DlpServiceGrpcTransport(channel=grpc.insecure_channel(server.address)))
+    try:
+        direct, direct_report = run(
+            "per_utterance",
+            lambda t: client.deidentify_content(request=template.build(t)).item.value,
+            utterances, args.callers)
+        direct_report["rpcs"] = server.rpcs
+
+        server.rpcs = 0
+        batcher = DlpMicroBatcher(client, window_ms=args.window_ms, max_items=args.max_items)
+        batched, batched_report = run("micro_batched", lambda t: batcher.submit(template, t), utterances, args.callers)
+        batcher.shutdown()
+        batched_report["rpcs"] = server.rpcs
+        batched_report["max_batch_size"] = batcher.stats["max_batch_size"]
+    finally:
+        server.stop()
+
+    print(json.dumps({
+        "callers": args.callers,
+        "dlp_latency_ms": args.latency_ms,
+        "results": [direct_report, batched_report],
+        "outputs_identical": direct == batched,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+main_service under more load than the DLP quota allows, with and without the
+DLP rate limiter (main_service/dlp_rate_limiter.py).
+
+Each configuration starts the benchmark suite's local stack (bench_suite.py)
+with the fake DLP server limited to --quota-rps requests per second; past it
+the fake answers RESOURCE_EXHAUSTED like DLP. --concurrency callers replay the
+final_transcript/ utterances through /handle-agent-utterance and
+/handle-customer-utterance for --duration seconds. A caller told to retry (503)
+sleeps retry_after_seconds first, as Pub/Sub redelivery would.
+Configurations:
+  unlimited   DLP_RATE_LIMIT_ENABLED=false: every request goes to DLP
+  limited     token bucket at --quota-rps in the fake Redis, plus AIMD concurrency
+The fake Redis runs the token bucket script through a Python equivalent.
+
+Every response is classified as redacted, passed through (the original text
+behind a DLP error marker), overloaded (503) or failed. The report gives the
+counts, redacted utterances per second, latency of the 200 responses, DLP
+requests accepted and rejected by the fake, the share of the quota used, and
+the limiter's /stats. It is written as JSON (default
+benchmarks/results/bench_dlp_rate_limit-<commit>.json).
+
+Usage (from the project root):
+    python benchmarks/bench_dlp_rate_limit.py
+    python benchmarks/bench_dlp_rate_limit.py --quota-rps 50 --concurrency 32 --duration 20
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import ROOT, LocalStack, git_revision, load_conversations, summarize  # noqa: E402
+
+sys.path.insert(0, os.path.join(ROOT, "main_service"))
+
+from dlp_rate_limiter import TOKEN_BUCKET_SCRIPT  # noqa: E402
+
+# Prefixes main_service puts in front of the original text when DLP fails (main.DLP_ERROR_MARKERS).
+DLP_ERROR_MARKER_PREFIX = "[DLP_"
+
+
+def token_bucket(store, keys, args):
+    """Python equivalent of dlp_rate_limiter.TOKEN_BUCKET_SCRIPT for FakeRedisServer."""
+    rate, burst, cost, max_wait = (float(arg) for arg in args)
+    now = time.time()
+    tokens, refilled = store.data.get(keys[0]) if store.alive(keys[0]) else (burst, now)
+    tokens = min(burst, tokens + max(0.0, now - refilled) * rate)
+    wait = max(0.0, (cost - tokens) / rate)
+    granted = wait <= max_wait
+    if granted:
+        tokens -= cost
+    store.data[keys[0]] = (tokens, now)
+    store.expires[keys[0]] = time.monotonic() + burst / rate + max_wait + 1
+    return [int(granted), repr(wait).encode()]
+
+
+def configurations(args) -> dict:
+    return {
+        "unlimited": {"DLP_RATE_LIMIT_ENABLED": "false"},
+        "limited": {"DLP_RATE_LIMIT_ENABLED": "true", "DLP_RATE_LIMIT_RPS": str(args.quota_rps),
+                    "DLP_RATE_LIMIT_MAX_WAIT_MS": str(args.max_wait_ms),
+                    "DLP_LATENCY_TARGET_MS": str(args.latency_target_ms)},
+    }
+
+
+def drive(urls, utterances, duration, concurrency):
+    """Closed-loop callers for `duration` seconds; returns outcome counts and 200 latencies."""
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=2 * concurrency))
+    outcomes = {"redacted": 0, "passed_through": 0, "overloaded": 0, "failed": 0}
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+    jobs = itertools.count()
+
+    def caller(_):
+        while time.monotonic() < stop_at:
+            conversation_id, role, text = utterances[next(jobs) % len(utterances)]
+            endpoint = "/handle-customer-utterance" if role == "END_USER" else "/handle-agent-utterance"
+            start = time.perf_counter()
+            retry_after = 0
+            try:
+                response = session.post(urls["main_service"] + endpoint, timeout=60,
+                                        json={"conversation_id": conversation_id, "transcript": text})
+                if response.status_code == 200:
+                    redacted = response.json().get("redacted_transcript") or ""
+                    outcome = "passed_through" if redacted.startswith(DLP_ERROR_MARKER_PREFIX) else "redacted"
+                elif response.status_code == 503:
+                    outcome = "overloaded"
+                    retry_after = response.json().get("retry_after_seconds", 1)
+                else:
+                    outcome = "failed"
+            except requests.RequestException:
+                outcome = "failed"
+            elapsed = time.perf_counter() - start
+            with lock:
+                outcomes[outcome] += 1
+                if outcome in ("redacted", "passed_through"):
+                    latencies.append(elapsed)
+            if retry_after:
+                time.sleep(min(retry_after, max(0.0, stop_at - time.monotonic())))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(caller, range(concurrency)))
+    return outcomes, latencies, time.perf_counter() - started
+
+
+def run_configuration(name, env, base_port, args, utterances):
+    stack = LocalStack(base_port, args.dlp_latency_ms, dlp_workers=max(64, 4 * args.concurrency),
+                       env=env, dlp_quota_rps=args.quota_rps)
+    stack.fakes["redis"].register_script(TOKEN_BUCKET_SCRIPT, token_bucket)
+    try:
+        stack.start()
+        dlp = stack.fakes["dlp"]
+        rpcs_before, rejected_before = dlp.rpcs, dlp.rejected
+        outcomes, latencies, elapsed = drive(stack.urls, utterances, args.duration, args.concurrency)
+        accepted, rejected = dlp.rpcs - rpcs_before, dlp.rejected - rejected_before
+        stats = requests.get(stack.urls["main_service"] + "/stats", timeout=10).json()
+    finally:
+        stack.stop()
+
+    return {
+        "env": env,
+        "outcomes": outcomes,
+        "redacted_per_second": round(outcomes["redacted"] / elapsed, 1),
+        "latency_ms": summarize(latencies, 0, elapsed)["latency_ms"] if latencies else None,
+        "dlp": {"accepted": accepted, "rejected_resource_exhausted": rejected,
+                "quota_used": round(accepted / (args.quota_rps * elapsed), 3)},
+        "dlp_rate_limiter": stats.get("dlp_rate_limiter"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quota-rps", type=float, default=40, help="DLP requests per second the fake accepts")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent callers")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds of load per configuration")
+    parser.add_argument("--dlp-latency-ms", type=float, default=50)
+    parser.add_argument("--max-wait-ms", type=float, default=2000, help="DLP_RATE_LIMIT_MAX_WAIT_MS of the limited run")
+    parser.add_argument("--latency-target-ms", type=float, default=1000, help="DLP_LATENCY_TARGET_MS of the limited run")
+    parser.add_argument("--configurations", nargs="+", default=["unlimited", "limited"], choices=["unlimited", "limited"])
+    parser.add_argument("--base-port", type=int, default=18180, help="First port; each configuration uses its own range")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/bench_dlp_rate_limit-<commit>.json)")
+    args = parser.parse_args()
+
+    utterances = [(f"bench-quota-{name}", entry["role"], entry["text"])
+                  for name, entries in load_conversations() for entry in entries]
+    all_configurations = configurations(args)
+    report = {
+        **git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"quota_rps": args.quota_rps, "concurrency": args.concurrency, "duration": args.duration,
+                   "dlp_latency_ms": args.dlp_latency_ms, "max_wait_ms": args.max_wait_ms,
+                   "latency_target_ms": args.latency_target_ms},
+        "configurations": {},
+    }
+    for i, name in enumerate(args.configurations):
+        print(f"Running {name}...", file=sys.stderr)
+        report["configurations"][name] = run_configuration(name, all_configurations[name], args.base_port + 10 * i,
+                                                            args, utterances)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"bench_dlp_rate_limit-{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
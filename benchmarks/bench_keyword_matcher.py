@@ -0,0 +1,86 @@
+"""
+Microbenchmark for main_service context keyword extraction.
+
+Compares the original nested substring loop against the precompiled
+KeywordMatcher, using the agent utterances from final_transcript/ and
+the context_keywords from main_service/dlp_config.yaml. The keyword list is
+then padded with synthetic entries to show how each approach scales.
+
+Usage (from the project root):
+    python benchmarks/bench_keyword_matcher.py
+"""
+import glob
+import json
+import os
+import random
+import string
+import sys
+import timeit
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "main_service"))
+
+from keyword_matcher import KeywordMatcher  # noqa: E402
+
+
+def legacy_extract(transcript, context_keywords):
+    """The pre-KeywordMatcher implementation of extract_expected_pii."""
+    transcript_lower = transcript.lower()
+    for pii_type, keywords in context_keywords.items():
+        for keyword in keywords:
+            if keyword in transcript_lower:
+                return pii_type
+    return None
+
+
+def load_agent_utterances():
+    utterances = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "final_transcript", "*.json"))):
+        with open(path) as f:
+            data = json.load(f)
+        utterances.extend(e["text"] for e in data.get("entries", []) if e.get("role") == "AGENT")
+    return utterances
+
+
+def padded_keywords(context_keywords, total):
+    """Adds random multi-word keywords until the config holds `total` entries."""
+    rng = random.Random(42)
+    padded = {k: list(v) for k, v in context_keywords.items()}
+    count = sum(len(v) for v in padded.values())
+    types = list(padded)
+    while count < total:
+        word = " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(2))
+        padded[rng.choice(types)].append(word)
+        count += 1
+    return padded
+
+
+def run(context_keywords, utterances, number):
+    matcher = KeywordMatcher(context_keywords)
+    legacy = timeit.timeit(lambda: [legacy_extract(u, context_keywords) for u in utterances], number=number)
+    compiled = timeit.timeit(lambda: [matcher.best_match(u) for u in utterances], number=number)
+    calls = number * len(utterances)
+    return {
+        "keywords": len(matcher),
+        "legacy_us_per_call": round(legacy / calls * 1e6, 2),
+        "compiled_us_per_call": round(compiled / calls * 1e6, 2),
+        "speedup": round(legacy / compiled, 2) if compiled else None,
+    }
+
+
+def main():
+    with open(os.path.join(ROOT, "main_service", "dlp_config.yaml")) as f:
+        context_keywords = yaml.safe_load(f).get("context_keywords", {})
+    utterances = load_agent_utterances()
+
+    results = [run(context_keywords, utterances, number=2000)]
+    for total in (250, 500, 1000):
+        results.append(run(padded_keywords(context_keywords, total), utterances, number=500))
+
+    print(json.dumps({"utterances": len(utterances), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
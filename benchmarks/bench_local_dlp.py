@@ -0,0 +1,83 @@
+"""
+Agreement and latency harness for the main_service local DLP engine.
+
+Runs every utterance in final_transcript/ through LocalDlpEngine and compares
+its redaction with a reference redaction. An utterance the engine reports as
+covered (the local result would be used in DLP_ENGINE_MODE=local_first) must
+match the reference exactly, otherwise it is reported as a covered mismatch
+and the script exits non-zero. Uncovered mismatches are expected: they are the
+built-in info types the engine leaves to DLP.
+
+The reference is the fake DLP redactor by default (offline). Pass --project
+to use the real Cloud DLP API with the inline configs from dlp_config.yaml.
+
+Usage (from the project root):
+    python benchmarks/bench_local_dlp.py
+    python benchmarks/bench_local_dlp.py --project my-gcp-project
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "main_service"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_prefilter import load_utterances, percentile, reference_redactor  # noqa: E402
+from local_dlp import LocalDlpEngine  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--project", help="Use the real DLP API in this project as the reference")
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "main_service", "dlp_config.yaml")) as f:
+        dlp_config = yaml.safe_load(f)
+    engine = LocalDlpEngine(dlp_config)
+    if not engine.enabled:
+        print(f"Local DLP engine is disabled for this config: {engine.disabled_reason}")
+        return 1
+    redact = reference_redactor(dlp_config, args.project)
+
+    local_us, reference_us, covered_mismatches = [], [], []
+    uncovered_mismatches = 0
+    for source, index, text in load_utterances():
+        start = time.perf_counter()
+        local = engine.redact(text)
+        covered = engine.covers(text)
+        local_us.append((time.perf_counter() - start) * 1e6)
+
+        start = time.perf_counter()
+        reference = redact(text)
+        reference_us.append((time.perf_counter() - start) * 1e6)
+
+        if local == reference:
+            continue
+        if covered:
+            covered_mismatches.append({"source": source, "original_entry_index": index,
+                                       "local": local, "reference": reference})
+        else:
+            uncovered_mismatches += 1
+
+    checked = engine.stats["covered"] + engine.stats["not_covered"]
+    report = {
+        "reference": "cloud_dlp" if args.project else "fake_dlp",
+        "checked": checked,
+        "covered_ratio": round(engine.stats["covered"] / checked, 3),
+        "uncovered_mismatches": uncovered_mismatches,
+        "covered_mismatches": covered_mismatches,
+        "local_us": {"p50": round(statistics.median(local_us), 2), "p99": round(percentile(local_us, 99), 2)},
+        "reference_us": {"p50": round(statistics.median(reference_us), 2), "p99": round(percentile(reference_us, 99), 2)},
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if covered_mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Throughput harness for batch scanning in the main_service local DLP engine.
+
+Repeats the final_transcript/ utterances up to --utterances texts and redacts
+them on one core twice: once per text (LocalDlpEngine.redact) and once per
+batch of --batch-size texts (LocalDlpEngine.redact_batch). Both results must be
+identical, otherwise the script exits non-zero. Reports utterances per second
+for each path.
+
+Usage (from the project root):
+    python benchmarks/bench_local_dlp_batch.py
+    python benchmarks/bench_local_dlp_batch.py --utterances 100000 --batch-size 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "main_service"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_prefilter import load_utterances  # noqa: E402
+from local_dlp import LocalDlpEngine  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--utterances", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--expected-pii-type", help="Scan with the inspect_config for this expected PII type")
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "main_service", "dlp_config.yaml")) as f:
+        engine = LocalDlpEngine(yaml.safe_load(f))
+    if not engine.enabled:
+        print(f"Local DLP engine is disabled for this config: {engine.disabled_reason}")
+        return 1
+    fixtures = [text for _, _, text in load_utterances()]
+    texts = [fixtures[i % len(fixtures)] for i in range(args.utterances)]
+    context = {"expected_pii_type": args.expected_pii_type} if args.expected_pii_type else None
+    engine.redact(texts[0], context)  # Compile the inspector outside the timings
+
+    start = time.perf_counter()
+    per_text = [engine.redact(text, context) for text in texts]
+    per_text_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = []
+    for offset in range(0, len(texts), args.batch_size):
+        batched.extend(engine.redact_batch(texts[offset:offset + args.batch_size], context))
+    batch_seconds = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(per_text, batched) if a != b)
+    report = {
+        "utterances": len(texts),
+        "batch_size": args.batch_size,
+        "mismatches": mismatches,
+        "per_text_utterances_per_second": round(len(texts) / per_text_seconds),
+        "batch_utterances_per_second": round(len(texts) / batch_seconds),
+        "speedup": round(per_text_seconds / batch_seconds, 2),
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Throughput of the redaction hot paths under different logging configurations.
+
+Each configuration starts the three services with the benchmark suite's local
+stack (bench_suite.py), with service output written to log files as Cloud Run
+would ship it, and replays the final_transcript/ fixtures through:
+  utterances  main_service /handle-agent-utterance and /handle-customer-utterance
+  subscriber  Pub/Sub push envelopes to subscriber_service, whose redacted
+              publishes are pushed on to the aggregator
+Configurations (shared/structured_logging.py):
+  verbose     LOG_FORMAT=text, LOG_PAYLOADS=true, every event logged
+  production  LOG_FORMAT=json, no payloads, info events sampled 1 in --sample-rate
+With --before-rev the services are also run from that git revision with its
+own logging, in a temporary worktree, as the "before" measurement.
+
+The report gives requests per second and p50/p95/p99 latency per endpoint,
+plus log lines and bytes per request per service, and the throughput of every
+configuration relative to the first. It is written as JSON (default
+benchmarks/results/bench_logging-<commit>.json).
+
+Usage (from the project root):
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --before-rev HEAD~1 --repeat 20 --dlp-latency-ms 2
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import (ROOT, LocalStack, Recorder, git_revision, load_conversations,  # noqa: E402
+                         run_subscriber, run_utterances)
+
+CONFIGURATIONS = {
+    "verbose": {"LOG_FORMAT": "text", "LOG_PAYLOADS": "true", "LOG_SAMPLE_RATE": "1"},
+    "production": {"LOG_FORMAT": "json", "LOG_PAYLOADS": "false"},  # LOG_SAMPLE_RATE from --sample-rate
+}
+
+
+def run_configuration(name, env, root, base_port, args, conversations):
+    log_dir = tempfile.mkdtemp(prefix=f"bench-logging-{name}-")
+    stack = LocalStack(base_port, args.dlp_latency_ms, dlp_workers=max(64, 4 * args.concurrency),
+                       push_workers=max(16, 2 * args.concurrency), log_dir=log_dir, env=env, root=root)
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=4 * args.concurrency))
+    try:
+        stack.start()
+        warmup = Recorder(session, enabled=False)
+        run_utterances(warmup, stack.urls, conversations[:1], 1, 1, prefix="warmup")
+        run_subscriber(warmup, stack.urls, conversations[:1], 1, 1)
+        stack.fakes["pubsub"].wait_idle(timeout=60)
+        offsets = log_offsets(log_dir)
+
+        recorder = Recorder(session)
+        run_utterances(recorder, stack.urls, conversations, args.repeat, args.concurrency)
+        run_subscriber(recorder, stack.urls, conversations, args.repeat, args.concurrency)
+        stack.fakes["pubsub"].wait_idle(timeout=120)
+    finally:
+        stack.stop()
+
+    endpoints = recorder.report()
+    requests_per_service = {
+        "main_service": sum(r["requests"] for n, r in endpoints.items() if n.startswith("main_service")),
+        "subscriber_service": endpoints.get("subscriber_service POST /", {}).get("requests", 0),
+        # Every utterance pushed to the subscriber is pushed on to the aggregator.
+        "transcript_aggregator_service": endpoints.get("subscriber_service POST /", {}).get("requests", 0),
+    }
+    logs = {}
+    for service, (lines, size) in log_growth(log_dir, offsets).items():
+        count = requests_per_service.get(service) or 1
+        logs[service] = {"lines": lines, "bytes": size, "lines_per_request": round(lines / count, 2),
+                         "bytes_per_request": round(size / count, 1)}
+    if args.keep_logs:
+        print(f"{name}: service logs kept in {log_dir}", file=sys.stderr)
+    else:
+        shutil.rmtree(log_dir, ignore_errors=True)
+    return {"env": env, "endpoints": endpoints, "logs": logs}
+
+
+def log_offsets(log_dir):
+    return {os.path.splitext(filename)[0]: os.path.getsize(os.path.join(log_dir, filename))
+            for filename in os.listdir(log_dir)}
+
+
+def log_growth(log_dir, offsets):
+    """(lines, bytes) written to each service log since `offsets`."""
+    growth = {}
+    for service, offset in offsets.items():
+        with open(os.path.join(log_dir, f"{service}.log"), "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        growth[service] = (data.count(b"\n"), len(data))
+    return growth
+
+
+def relative_throughput(results: dict) -> dict:
+    names = list(results)
+    reference = results[names[0]]["endpoints"]
+    relative = {}
+    for name in names[1:]:
+        relative[name] = {}
+        for endpoint, summary in results[name]["endpoints"].items():
+            base = reference.get(endpoint, {}).get("requests_per_second")
+            if base and summary["requests_per_second"]:
+                relative[name][endpoint] = round(summary["requests_per_second"] / base, 3)
+    return {"reference": names[0], "requests_per_second_ratio": relative}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="Replays of every fixture per phase")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent conversations per phase")
+    parser.add_argument("--dlp-latency-ms", type=float, default=5,
+                        help="Simulated DLP latency; low values make logging cost visible")
+    parser.add_argument("--sample-rate", type=int, default=100, help="LOG_SAMPLE_RATE of the production configuration")
+    parser.add_argument("--configurations", nargs="+", default=list(CONFIGURATIONS), choices=CONFIGURATIONS)
+    parser.add_argument("--before-rev", help="Also measure the services at this git revision, first")
+    parser.add_argument("--base-port", type=int, default=18080, help="First port; each configuration uses its own range")
+    parser.add_argument("--keep-logs", action="store_true", help="Keep the service logs of every configuration")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/bench_logging-<commit>.json)")
+    args = parser.parse_args()
+
+    conversations = load_conversations()
+    report = {
+        **git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"repeat": args.repeat, "concurrency": args.concurrency, "dlp_latency_ms": args.dlp_latency_ms,
+                   "sample_rate": args.sample_rate, "before_rev": args.before_rev},
+        "configurations": {},
+    }
+    runs = []
+    if args.before_rev:
+        runs.append((f"before ({args.before_rev})", {}, args.before_rev))
+    for name in args.configurations:
+        env = dict(CONFIGURATIONS[name])
+        if name == "production":
+            env["LOG_SAMPLE_RATE"] = str(args.sample_rate)
+        runs.append((name, env, None))
+
+    for i, (name, env, rev) in enumerate(runs):
+        worktree = None
+        if rev:
+            worktree = tempfile.mkdtemp(prefix="bench-logging-worktree-")
+            subprocess.run(["git", "worktree", "add", "--detach", worktree, rev], cwd=ROOT, check=True,
+                           capture_output=True)
+        try:
+            print(f"Running {name}...", file=sys.stderr)
+            report["configurations"][name] = run_configuration(name, env, worktree or ROOT, args.base_port + 10 * i,
+                                                                  args, conversations)
+        finally:
+            if worktree:
+                subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=ROOT, capture_output=True)
+    report["comparison"] = relative_throughput(report["configurations"])
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"bench_logging-{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Accuracy and latency harness for the main_service PII pre-filter.
+
+Runs every utterance in final_transcript/ through PiiPrefilter and compares
+each skip decision with a reference redaction. An utterance the pre-filter
+skips must come back from the reference unchanged, otherwise it is reported
+as a missed finding and the script exits non-zero.
+
+The reference is the fake DLP redactor by default (offline). Pass --project
+to use the real Cloud DLP API with the inline configs from dlp_config.yaml.
+
+Usage (from the project root):
+    python benchmarks/bench_prefilter.py
+    python benchmarks/bench_prefilter.py --project my-gcp-project
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "main_service"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pii_prefilter import PiiPrefilter  # noqa: E402
+
+
+def load_utterances():
+    utterances = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "final_transcript", "*.json"))):
+        with open(path) as f:
+            for entry in json.load(f).get("entries", []):
+                utterances.append((os.path.basename(path), entry.get("original_entry_index"), entry["text"]))
+    return utterances
+
+
+def reference_redactor(dlp_config, project):
+    if not project:
+        from fake_dlp_server import fake_redact
+        return fake_redact
+
+    from google.cloud import dlp_v2
+    from dlp_requests import DlpRequestTemplates
+    client = dlp_v2.DlpServiceClient()
+    template = DlpRequestTemplates({**dlp_config, "dlp_templates": {}}, project).default
+    return lambda text: client.deidentify_content(request=template.build(text)).item.value
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--project", help="Use the real DLP API in this project as the reference")
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "main_service", "dlp_config.yaml")) as f:
+        dlp_config = yaml.safe_load(f)
+    prefilter = PiiPrefilter(dlp_config.get("inspect_config", {}))
+    if not prefilter.enabled:
+        print(f"Pre-filter is disabled for this config: {prefilter.disabled_reason}")
+        return 1
+    redact = reference_redactor(dlp_config, args.project)
+
+    prefilter_us, reference_us, missed = [], [], []
+    for source, index, text in load_utterances():
+        start = time.perf_counter()
+        candidate = prefilter.may_contain_pii(text)
+        prefilter_us.append((time.perf_counter() - start) * 1e6)
+
+        start = time.perf_counter()
+        redacted = redact(text)
+        reference_us.append((time.perf_counter() - start) * 1e6)
+
+        if not candidate and redacted != text:
+            missed.append({"source": source, "original_entry_index": index, "redacted": redacted})
+
+    report = {
+        "reference": "cloud_dlp" if args.project else "fake_dlp",
+        **prefilter.stats,
+        "skip_ratio": round(prefilter.stats["skipped"] / prefilter.stats["checked"], 3),
+        "missed_findings": missed,
+        "prefilter_us": {"p50": round(statistics.median(prefilter_us), 2), "p99": round(percentile(prefilter_us, 99), 2)},
+        "reference_us": {"p50": round(statistics.median(reference_us), 2), "p99": round(percentile(reference_us, 99), 2)},
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
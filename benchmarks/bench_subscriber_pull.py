@@ -0,0 +1,124 @@
+"""
+subscriber_service throughput with push delivery and with the StreamingPull
+worker (SUBSCRIBER_MODE=pull, subscriber_service/pull_worker.py).
+
+Each configuration starts the benchmark suite's local stack (bench_suite.py).
+In push mode the fake Pub/Sub pushes raw-transcripts to subscriber_service
+under gunicorn, as a push subscription would, with --push-workers concurrent
+deliveries. In pull mode subscriber_service consumes the fake's
+raw-transcripts-pull subscription over StreamingPull with
+SUBSCRIBER_PULL_CONCURRENCY set to each --concurrency value. Either way the
+final_transcript/ utterances are published --repeat times to raw-transcripts,
+one message per utterance, and a configuration ends when every message has
+been acknowledged and every redacted utterance pushed to the aggregator.
+
+The report gives utterances per second end to end, the subscriber's delivery
+statuses (push) or StreamingPull counters (pull), and the aggregator's push
+statuses. It is written as JSON (default
+benchmarks/results/bench_subscriber_pull-<commit>.json).
+
+Usage (from the project root):
+    python benchmarks/bench_subscriber_pull.py
+    python benchmarks/bench_subscriber_pull.py --concurrency 4 16 64 --repeat 20 --dlp-latency-ms 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import PROJECT, ROOT, LocalStack, git_revision, load_conversations  # noqa: E402
+
+
+def raw_messages(conversations, repeat):
+    """raw-transcripts payloads as main_service publishes them, one per utterance."""
+    for rep in range(repeat):
+        for name, entries in conversations:
+            for entry in entries:
+                yield {"conversation_id": f"bench-pull-{rep}-{name}",
+                       "original_entry_index": entry["original_entry_index"], "participant_role": entry["role"],
+                       "text": entry["text"], "user_id": entry.get("user_id"),
+                       "start_timestamp_usec": entry["start_timestamp_usec"]}
+
+
+def run_configuration(mode, concurrency, base_port, args, conversations):
+    stack = LocalStack(base_port, args.dlp_latency_ms, push_workers=args.push_workers,
+                       subscriber_mode=mode, subscriber_concurrency=concurrency)
+    try:
+        stack.start()
+        # Imported late: the client reads PUBSUB_EMULATOR_HOST when it is created.
+        os.environ["PUBSUB_EMULATOR_HOST"] = stack.fakes["pubsub"].address
+        from google.cloud import pubsub_v1
+        publisher = pubsub_v1.PublisherClient()
+        topic = f"projects/{PROJECT}/topics/raw-transcripts"
+
+        start = time.perf_counter()
+        futures = [publisher.publish(topic, json.dumps(payload).encode("utf-8"))
+                   for payload in raw_messages(conversations, args.repeat)]
+        for future in futures:
+            future.result(timeout=60)
+        idle = stack.fakes["pubsub"].wait_idle(timeout=args.timeout)
+        elapsed = time.perf_counter() - start
+
+        pubsub = stack.fakes["pubsub"]
+        statuses = {pubsub_label: dict(pubsub.push_statuses[url]) for url, pubsub_label in stack.push_labels.items()}
+        subscriber_stats = requests.get(stack.urls["subscriber_service"] + "/stats", timeout=10).json()
+    finally:
+        stack.stop()
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency if mode == "pull" else None,
+        "utterances": len(futures),
+        "completed": idle,
+        "seconds": round(elapsed, 3),
+        "utterances_per_second": round(len(futures) / elapsed, 1),
+        "push_statuses": statuses,
+        "pull_worker": subscriber_stats.get("pull_worker"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="Replays of every fixture")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32],
+                        help="SUBSCRIBER_PULL_CONCURRENCY values to measure")
+    parser.add_argument("--push-workers", type=int, default=16, help="Concurrent push deliveries of the fake Pub/Sub")
+    parser.add_argument("--dlp-latency-ms", type=float, default=20)
+    parser.add_argument("--no-push", action="store_true", help="Skip the push-mode baseline")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for a configuration to drain")
+    parser.add_argument("--base-port", type=int, default=18280, help="First port; each configuration uses its own range")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/bench_subscriber_pull-<commit>.json)")
+    args = parser.parse_args()
+
+    conversations = load_conversations()
+    runs = ([] if args.no_push else [("push", None)]) + [("pull", c) for c in args.concurrency]
+    report = {
+        **git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"repeat": args.repeat, "push_workers": args.push_workers, "dlp_latency_ms": args.dlp_latency_ms},
+        "configurations": {},
+    }
+    for i, (mode, concurrency) in enumerate(runs):
+        name = mode if concurrency is None else f"{mode}-{concurrency}"
+        print(f"Running {name}...", file=sys.stderr)
+        report["configurations"][name] = run_configuration(mode, concurrency, args.base_port + 10 * i,
+                                                           args, conversations)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"bench_subscriber_pull-{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
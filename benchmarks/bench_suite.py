@@ -0,0 +1,491 @@
+"""
+Offline benchmark suite for main_service, subscriber_service and
+transcript_aggregator_service.
+
+All three services are started as gunicorn subprocesses, configured as in
+their Dockerfiles, against in-process fakes: DLP (fake_dlp_server.py, with
+--dlp-latency-ms), Redis (fake_redis_server.py), Pub/Sub with push delivery
+(fake_pubsub_server.py), Firestore (fake_firestore_server.py) and Cloud
+Storage (fake_gcs_server.py). Secrets are given as environment overrides and
+Firebase ID tokens are unsigned Auth-emulator tokens, so nothing needs gcloud
+or network access.
+
+The final_transcript/ fixtures are replayed --repeat times per phase:
+  utterances  main_service /handle-agent-utterance and /handle-customer-utterance,
+              one conversation per caller in transcript order
+  realtime    main_service /redact-utterance-realtime for the customer turns
+  batch       main_service /redact-batch, one request per transcript
+  subscriber  Pub/Sub push envelopes posted to subscriber_service
+  aggregator  push envelopes posted to /redacted-transcripts, then GET /conversation/<id>
+  pipeline    /initiate-redaction end to end: main_service publishes, the fake
+              pushes to subscriber_service, which redacts and publishes to the
+              aggregator; a job completes when all its utterances are in
+              Firestore. Push delivery latencies are reported per endpoint.
+With --conversation-ended the lifecycle topic is pushed to the aggregator as
+well. That handler waits 10 s before aggregating, so it is off by default.
+
+Every endpoint gets throughput and p50/p95/p99 latency. The report is written
+as JSON (default benchmarks/results/bench_suite-<commit>.json). With
+--baseline, p95 latency and throughput are compared with an earlier report
+and the script exits non-zero on regressions beyond --tolerance.
+
+Usage (from the project root):
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --repeat 20 --concurrency 16 --dlp-latency-ms 100
+    python benchmarks/bench_suite.py --baseline benchmarks/results/bench_suite-abc1234.json
+"""
+import argparse
+import base64
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_dlp_server import FakeDlpServer  # noqa: E402
+from fake_firestore_server import FakeFirestoreServer  # noqa: E402
+from fake_gcs_server import FakeGcsServer  # noqa: E402
+from fake_pubsub_server import FakePubSubServer  # noqa: E402
+from fake_redis_server import FakeRedisServer  # noqa: E402
+
+PROJECT = "benchmark-project"
+BUCKET = "benchmark-aggregated-transcripts"
+REDACTED_TOPIC = "redacted-transcripts"
+RAW_PULL_SUBSCRIPTION = "raw-transcripts-pull"
+LIFECYCLE_TOPIC = "aa-lifecycle-event-notification"
+GUNICORN_THREADED = ["gunicorn", "--bind", "127.0.0.1:{port}", "--workers", "1", "--threads", "8", "--timeout", "0", "main:app"]
+SERVICES = {
+    "main_service": GUNICORN_THREADED,
+    "subscriber_service": ["gunicorn", "--bind", "127.0.0.1:{port}", "main:app"],
+    "transcript_aggregator_service": GUNICORN_THREADED,
+}
+PHASES = ("utterances", "realtime", "batch", "subscriber", "aggregator", "pipeline")
+
+
+# --- Fixtures and helpers ---
+def load_conversations():
+    conversations = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "final_transcript", "*.json"))):
+        with open(path) as f:
+            entries = json.load(f).get("entries", [])
+        conversations.append((os.path.splitext(os.path.basename(path))[0], entries))
+    return conversations
+
+
+def emulator_id_token(project: str, uid: str = "benchmark-user") -> str:
+    """An unsigned ID token, accepted by firebase_admin when FIREBASE_AUTH_EMULATOR_HOST is set."""
+    def encode(part):
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+    now = int(time.time())
+    payload = {"iss": f"https://securetoken.google.com/{project}", "aud": project, "sub": uid, "user_id": uid,
+               "iat": now, "auth_time": now, "exp": now + 3600, "firebase": {"sign_in_provider": "custom"}}
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(payload)}."
+
+
+def push_envelope(payload: dict, message_id: str) -> dict:
+    data = base64.b64encode(json.dumps(payload).encode()).decode()
+    return {"message": {"data": data, "attributes": {}, "messageId": message_id, "message_id": message_id},
+            "subscription": f"projects/{PROJECT}/subscriptions/benchmark-push"}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(latencies_s: list, errors: int, elapsed_s: float) -> dict:
+    latencies = [s * 1000 for s in latencies_s]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed_s, 1) if elapsed_s > 0 else None,
+        "latency_ms": {
+            "p50": round(statistics.median(latencies), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+        },
+    }
+
+
+class Recorder:
+    """Latency, status and the active time window of every endpoint."""
+
+    def __init__(self, session: requests.Session, enabled: bool = True):
+        self.session = session
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._errors = {}
+        self._windows = {}
+
+    def call(self, name: str, method: str, url: str, expected=(200,), **kwargs) -> requests.Response | None:
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=120, **kwargs)
+            ok = response.status_code in expected
+        except requests.RequestException:
+            response, ok = None, False
+        end = time.perf_counter()
+        if self.enabled:
+            with self._lock:
+                self._latencies.setdefault(name, []).append(end - start)
+                self._errors[name] = self._errors.get(name, 0) + (0 if ok else 1)
+                first, last = self._windows.get(name, (start, end))
+                self._windows[name] = (min(first, start), max(last, end))
+        return response
+
+    def report(self) -> dict:
+        return {name: summarize(latencies, self._errors[name], self._windows[name][1] - self._windows[name][0])
+                for name, latencies in self._latencies.items()}
+
+
+# --- Services ---
+def service_envs(urls: dict, fakes: dict) -> dict:
+    base = dict(os.environ)
+    for name in ("GOOGLE_APPLICATION_CREDENTIALS", "SECRETS_SNAPSHOT_PATH"):
+        base.pop(name, None)
+    base.update({"PUBSUB_EMULATOR_HOST": fakes["pubsub"].address, "PYTHONUNBUFFERED": "1"})
+    redis_host, redis_port = fakes["redis"].host, str(fakes["redis"].port)
+    return {
+        "main_service": {
+            **base,
+            "GOOGLE_CLOUD_PROJECT": PROJECT,
+            "CONTEXT_MANAGER_REDIS_HOST": redis_host,
+            "CONTEXT_MANAGER_REDIS_PORT": redis_port,
+            "CONTEXT_MANAGER_DLP_PROJECT_ID": PROJECT,
+            "DLP_EMULATOR_HOST": fakes["dlp"].address,
+            "FIREBASE_AUTH_EMULATOR_HOST": "127.0.0.1:9099",  # Tokens are checked locally, never sent there
+        },
+        "subscriber_service": {
+            **base,
+            "GCP_PROJECT_ID_FOR_SECRETS": PROJECT,
+            "SUBSCRIBER_CONTEXT_MANAGER_URL": urls["main_service"],
+            "SUBSCRIBER_REDACTED_TOPIC_NAME": REDACTED_TOPIC,
+            "SUBSCRIBER_GCP_PROJECT_ID": PROJECT,
+        },
+        "transcript_aggregator_service": {
+            **base,
+            "GOOGLE_CLOUD_PROJECT": PROJECT,
+            "FIRESTORE_EMULATOR_HOST": fakes["firestore"].address,
+            "STORAGE_EMULATOR_HOST": fakes["gcs"].url,
+            "AGGREGATED_TRANSCRIPTS_BUCKET": BUCKET,
+            "REDIS_HOST": redis_host,
+            "REDIS_PORT": redis_port,
+            "MAIN_SERVICE_URL": urls["main_service"],
+        },
+    }
+
+
+class LocalStack:
+    """The three services under gunicorn, wired to in-process fakes of every dependency."""
+
+    def __init__(self, base_port=18080, dlp_latency_ms=50, dlp_workers=64, push_workers=16,
+                 conversation_ended=False, log_dir=None, env=None, root=ROOT, dlp_quota_rps=0,
+                 subscriber_mode="push", subscriber_concurrency=16):
+        self.log_dir = log_dir
+        self.env = env or {}  # Extra variables for every service
+        self.root = root  # Checkout the services are run from
+        self.ports = {name: base_port + i for i, name in enumerate(SERVICES)}
+        self.urls = {name: f"http://127.0.0.1:{port}" for name, port in self.ports.items()}
+        self.fakes = {
+            "dlp": FakeDlpServer(latency_ms=dlp_latency_ms, max_workers=dlp_workers, quota_rps=dlp_quota_rps).start(),
+            "redis": FakeRedisServer().start(),
+            "pubsub": FakePubSubServer(push_workers=push_workers).start(),
+            "firestore": FakeFirestoreServer().start(),
+            "gcs": FakeGcsServer().start(),
+        }
+        # subscriber_service receives raw-transcripts by push, or pulls them (SUBSCRIBER_MODE=pull).
+        push_routes = [(REDACTED_TOPIC, "transcript_aggregator_service", "/redacted-transcripts")]
+        self.subscriber_env = {"SUBSCRIBER_MODE": subscriber_mode}
+        if subscriber_mode == "pull":
+            self.fakes["pubsub"].add_pull_subscription("raw-transcripts", RAW_PULL_SUBSCRIPTION)
+            self.subscriber_env.update({"SUBSCRIBER_PULL_SUBSCRIPTION": RAW_PULL_SUBSCRIPTION,
+                                        "SUBSCRIBER_PULL_CONCURRENCY": str(subscriber_concurrency)})
+        else:
+            push_routes.insert(0, ("raw-transcripts", "subscriber_service", "/"))
+        if conversation_ended:
+            push_routes.append((LIFECYCLE_TOPIC, "transcript_aggregator_service", "/conversation-ended"))
+        self.push_labels = {}
+        for topic, service, path in push_routes:
+            self.fakes["pubsub"].add_push_endpoint(topic, self.urls[service] + path)
+            self.push_labels[self.urls[service] + path] = f"{topic} -> {service} POST {path}"
+        self.processes = []
+
+    def start(self):
+        envs = {name: {**env, **self.env} for name, env in service_envs(self.urls, self.fakes).items()}
+        envs["subscriber_service"].update(self.subscriber_env)
+        for name, command in SERVICES.items():
+            output = subprocess.DEVNULL
+            if self.log_dir:
+                os.makedirs(self.log_dir, exist_ok=True)
+                output = open(os.path.join(self.log_dir, f"{name}.log"), "w")
+            self.processes.append(subprocess.Popen([part.format(port=self.ports[name]) for part in command],
+                                                   cwd=os.path.join(self.root, name), env=envs[name],
+                                                   stdout=output, stderr=subprocess.STDOUT))
+        for url in self.urls.values():
+            wait_until_up(url, self.processes)
+        return self
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for fake in self.fakes.values():
+            fake.stop()
+
+
+def wait_until_up(url, processes, timeout=90):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if any(p.poll() is not None for p in processes):
+            raise RuntimeError("A service exited during startup; rerun with --service-logs to see why")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.25)
+    raise RuntimeError(f"Service at {url} did not start within {timeout}s")
+
+
+# --- Phases ---
+def run_utterances(recorder, urls, conversations, repeat, concurrency, prefix="bench"):
+    def replay(job):
+        rep, (name, entries) = job
+        conversation_id = f"{prefix}-{rep}-{name}"
+        for entry in entries:
+            endpoint = "/handle-customer-utterance" if entry["role"] == "END_USER" else "/handle-agent-utterance"
+            recorder.call(f"main_service POST {endpoint}", "POST", urls["main_service"] + endpoint,
+                          json={"conversation_id": conversation_id, "transcript": entry["text"]})
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(replay, [(rep, c) for rep in range(repeat) for c in conversations]))
+
+
+def run_realtime(recorder, urls, conversations, repeat, concurrency, headers, prefix="bench"):
+    def replay(job):
+        rep, (name, entries) = job
+        for entry in entries:
+            if entry["role"] == "END_USER":
+                recorder.call("main_service POST /redact-utterance-realtime", "POST",
+                              urls["main_service"] + "/redact-utterance-realtime", headers=headers,
+                              json={"conversation_id": f"{prefix}-{rep}-{name}", "utterance": entry["text"]})
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(replay, [(rep, c) for rep in range(repeat) for c in conversations]))
+
+
+def run_batch(recorder, urls, conversations, repeat, concurrency, headers):
+    def replay(job):
+        _, (_, entries) = job
+        recorder.call("main_service POST /redact-batch", "POST", urls["main_service"] + "/redact-batch",
+                      headers=headers, json={"utterances": [entry["text"] for entry in entries]})
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(replay, [(rep, c) for rep in range(repeat) for c in conversations]))
+
+
+def run_subscriber(recorder, urls, conversations, repeat, concurrency):
+    def replay(job):
+        rep, (name, entries) = job
+        for entry in entries:
+            payload = {"conversation_id": f"bench-push-{rep}-{name}", "original_entry_index": entry["original_entry_index"],
+                       "participant_role": entry["role"], "text": entry["text"], "user_id": entry.get("user_id"),
+                       "start_timestamp_usec": entry["start_timestamp_usec"]}
+            recorder.call("subscriber_service POST /", "POST", urls["subscriber_service"] + "/",
+                          json=push_envelope(payload, f"{rep}-{name}-{entry['original_entry_index']}"))
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(replay, [(rep, c) for rep in range(repeat) for c in conversations]))
+
+
+def run_aggregator(recorder, urls, conversations, repeat, concurrency):
+    def replay(job):
+        rep, (name, entries) = job
+        conversation_id = f"bench-agg-{rep}-{name}"
+        for entry in entries:
+            payload = {"conversation_id": conversation_id, "original_entry_index": entry["original_entry_index"],
+                       "text": entry["text"], "original_text": entry["text"], "participant_role": entry["role"],
+                       "user_id": entry.get("user_id"), "start_timestamp_usec": entry["start_timestamp_usec"]}
+            recorder.call("transcript_aggregator_service POST /redacted-transcripts", "POST",
+                          urls["transcript_aggregator_service"] + "/redacted-transcripts",
+                          json=push_envelope(payload, f"{conversation_id}-{entry['original_entry_index']}"))
+        recorder.call("transcript_aggregator_service GET /conversation/<id>", "GET",
+                      f"{urls['transcript_aggregator_service']}/conversation/{conversation_id}")
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(replay, [(rep, c) for rep in range(repeat) for c in conversations]))
+
+
+def run_pipeline(recorder, urls, conversations, repeat, concurrency, headers, fakes, push_labels, timeout,
+                 conversation_ended):
+    jobs = {}  # job_id -> (started_at, utterance_count)
+
+    def initiate(job):
+        _, (_, entries) = job
+        segments = [{"speaker": "customer" if e["role"] == "END_USER" else "agent", "text": e["text"]} for e in entries]
+        started_at = time.time()
+        response = recorder.call("main_service POST /initiate-redaction", "POST", urls["main_service"] + "/initiate-redaction",
+                                 expected=(202,), headers=headers, json={"transcript": {"transcript_segments": segments}})
+        if response is not None and response.status_code == 202:
+            jobs[response.json()["jobId"]] = (started_at, len(entries))
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(initiate, [(rep, c) for rep in range(repeat) for c in conversations]))
+
+    # A job is done when all its utterances are in Firestore (and, optionally, its transcript is in GCS).
+    completed, uploaded, finished = {}, {}, start
+    deadline = time.time() + timeout
+    while time.time() < deadline and (len(completed) < len(jobs) or (conversation_ended and len(uploaded) < len(jobs))):
+        now = time.time()
+        for job_id, (started_at, count) in jobs.items():
+            if job_id not in completed and fakes["firestore"].count(f"{job_id}/utterances") >= count:
+                completed[job_id] = now - started_at
+                finished = now
+            uploaded_at = fakes["gcs"].uploaded_at.get((BUCKET, f"{job_id}_transcript.json"))
+            if conversation_ended and job_id not in uploaded and uploaded_at:
+                uploaded[job_id] = uploaded_at - started_at
+        time.sleep(0.005)
+    elapsed = finished - start
+    fakes["pubsub"].wait_idle(timeout=timeout)
+
+    utterances = sum(count for _, count in jobs.values())
+    report = {
+        "jobs": len(jobs),
+        "incomplete_jobs": len(jobs) - len(completed),
+        "utterances": utterances,
+        "utterances_per_second": round(utterances / elapsed, 1) if completed and elapsed > 0 else None,
+    }
+    if completed:
+        report["job_latency_ms"] = summarize(list(completed.values()), 0, 1)["latency_ms"]
+    if uploaded:
+        report["transcript_upload_latency_ms"] = summarize(list(uploaded.values()), 0, 1)["latency_ms"]
+    report["push"] = {}
+    for url, latencies in fakes["pubsub"].push_latencies.items():
+        if latencies:
+            statuses = fakes["pubsub"].push_statuses[url]
+            errors = sum(n for status, n in statuses.items() if not 200 <= status < 300)
+            report["push"][push_labels[url]] = summarize(latencies, errors, 1) | {"requests_per_second": None}
+    return report
+
+
+# --- Regression check ---
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        if current["latency_ms"]["p95"] > previous["latency_ms"]["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['latency_ms']['p95']} -> {current['latency_ms']['p95']} ms")
+        if (current["requests_per_second"] and previous["requests_per_second"]
+                and current["requests_per_second"] < previous["requests_per_second"] * (1 - tolerance)):
+            regressions.append(f"{name}: {previous['requests_per_second']} -> {current['requests_per_second']} req/s")
+    current_job, previous_job = (report.get("pipeline", {}).get("job_latency_ms"),
+                                 baseline.get("pipeline", {}).get("job_latency_ms"))
+    if current_job and previous_job and current_job["p95"] > previous_job["p95"] * (1 + tolerance):
+        regressions.append(f"pipeline: job p95 {previous_job['p95']} -> {current_job['p95']} ms")
+    return regressions
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "-uno"))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Replays of every fixture per phase")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent conversations per phase")
+    parser.add_argument("--dlp-latency-ms", type=float, default=50, help="Simulated DLP latency")
+    parser.add_argument("--phases", nargs="+", default=list(PHASES), choices=PHASES)
+    parser.add_argument("--conversation-ended", action="store_true",
+                        help="Also push lifecycle events to the aggregator (adds its fixed 10 s delay per job)")
+    parser.add_argument("--pipeline-timeout", type=float, default=120)
+    parser.add_argument("--base-port", type=int, default=18080)
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/bench_suite-<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier report to compare p95 latency and throughput with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression against --baseline")
+    parser.add_argument("--service-logs", help="Directory for the services' stdout/stderr")
+    args = parser.parse_args()
+
+    conversations = load_conversations()
+    stack = LocalStack(args.base_port, args.dlp_latency_ms, dlp_workers=max(64, 4 * args.concurrency),
+                       push_workers=max(16, 2 * args.concurrency), conversation_ended=args.conversation_ended,
+                       log_dir=args.service_logs)
+    urls, fakes = stack.urls, stack.fakes
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4 * args.concurrency)
+    session.mount("http://", adapter)
+    headers = {"Authorization": f"Bearer {emulator_id_token(PROJECT)}"}
+    report = {
+        **git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"repeat": args.repeat, "concurrency": args.concurrency, "dlp_latency_ms": args.dlp_latency_ms,
+                   "phases": args.phases, "conversation_ended": args.conversation_ended,
+                   "fixtures": len(conversations), "utterances_per_replay": sum(len(e) for _, e in conversations)},
+    }
+    try:
+        stack.start()
+        # One unrecorded replay warms connections, clients and caches in every service.
+        warmup = Recorder(session, enabled=False)
+        run_utterances(warmup, urls, conversations[:1], 1, 1, prefix="warmup")
+        run_subscriber(warmup, urls, conversations[:1], 1, 1)
+        fakes["pubsub"].wait_idle(timeout=args.pipeline_timeout)
+
+        recorder = Recorder(session)
+        phase_runners = {
+            "utterances": lambda: run_utterances(recorder, urls, conversations, args.repeat, args.concurrency),
+            "realtime": lambda: run_realtime(recorder, urls, conversations, args.repeat, args.concurrency, headers),
+            "batch": lambda: run_batch(recorder, urls, conversations, args.repeat, args.concurrency, headers),
+            "subscriber": lambda: run_subscriber(recorder, urls, conversations, args.repeat, args.concurrency),
+            "aggregator": lambda: run_aggregator(recorder, urls, conversations, args.repeat, args.concurrency),
+        }
+        for phase in args.phases:
+            if phase in phase_runners:
+                phase_runners[phase]()
+        if "pipeline" in args.phases:
+            fakes["pubsub"].wait_idle(timeout=args.pipeline_timeout)  # Pushes caused by earlier phases
+            fakes["pubsub"].reset_stats()
+            report["pipeline"] = run_pipeline(recorder, urls, conversations, args.repeat, args.concurrency, headers,
+                                              fakes, stack.push_labels, args.pipeline_timeout, args.conversation_ended)
+        report["endpoints"] = recorder.report()
+        report["fakes"] = {
+            "dlp_rpcs": fakes["dlp"].rpcs,
+            "dlp_items": fakes["dlp"].items,
+            "redis_commands": dict(fakes["redis"].commands),
+            "firestore_rpcs": dict(fakes["firestore"].rpcs),
+            "gcs_objects": len(fakes["gcs"].objects),
+        }
+    finally:
+        stack.stop()
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"bench_suite-{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+In-process fake of the Cloud DLP DeidentifyContent RPC.
+
+Serves google.privacy.dlp.v2.DlpService/DeidentifyContent over plaintext gRPC
+so main_service can be pointed at it with DLP_EMULATOR_HOST. It replaces a
+handful of common PII shapes with [INFO_TYPE] tokens, supports both string and
+table items, adds a configurable latency and counts RPCs and items. With a
+quota (requests per second, bursting up to one second's worth) it answers
+RESOURCE_EXHAUSTED beyond it, like DLP past the project's request quota.
+
+Usage:
+    python benchmarks/fake_dlp_server.py --port 9090 --latency-ms 150 --quota-rps 10
+"""
+import argparse
+import re
+import threading
+import time
+from concurrent import futures
+
+import grpc
+from google.cloud.dlp_v2.types import DeidentifyContentRequest, DeidentifyContentResponse
+
+FAKE_PATTERNS = [
+    ("EMAIL_ADDRESS", re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.]+\b")),
+    ("CREDIT_CARD_NUMBER", re.compile(r"\b(?:\d[ -]?){13,16}\b")),
+    ("US_SOCIAL_SECURITY_NUMBER", re.compile(r"\b\d{3}-\d{2}-\d{4}\b")),
+    ("PHONE_NUMBER", re.compile(r"\(?\b\d{3}\)?[ .-]?\d{3}[ .-]?\d{4}\b")),
+    ("SOCIAL_HANDLE", re.compile(r"@[a-zA-Z][a-zA-Z0-9_.-]{1,14}\b")),
+    ("ALIEN_REGISTRATION_NUMBER", re.compile(r"\b[Aa]\d{7,9}\b")),
+]
+
+
+def fake_redact(text: str) -> str:
+    for info_type, pattern in FAKE_PATTERNS:
+        text = pattern.sub(f"[{info_type}]", text)
+    return text
+
+
+class FakeDlpServer:
+    def __init__(self, port: int = 0, latency_ms: float = 0, max_workers: int = 64, quota_rps: float = 0):
+        self.latency = latency_ms / 1000.0
+        self.quota_rps = quota_rps
+        self._quota_tokens = quota_rps
+        self._quota_refilled = time.monotonic()
+        self.rpcs = 0
+        self.items = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+        handler = grpc.method_handlers_generic_handler("google.privacy.dlp.v2.DlpService", {
+            "DeidentifyContent": grpc.unary_unary_rpc_method_handler(
+                self._deidentify_content,
+                request_deserializer=DeidentifyContentRequest.deserialize,
+                response_serializer=DeidentifyContentResponse.serialize,
+            ),
+        })
+        self._server.add_generic_rpc_handlers((handler,))
+        self.port = self._server.add_insecure_port(f"127.0.0.1:{port}")
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def _within_quota(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._quota_tokens = min(self.quota_rps, self._quota_tokens + (now - self._quota_refilled) * self.quota_rps)
+            self._quota_refilled = now
+            if self._quota_tokens >= 1:
+                self._quota_tokens -= 1
+                return True
+            self.rejected += 1
+            return False
+
+    def _deidentify_content(self, request, context):
+        if self.quota_rps and not self._within_quota():
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                          "Quota exceeded for quota metric 'Number of requests' of service 'dlp.googleapis.com'")
+        if self.latency:
+            time.sleep(self.latency)
+        item = request.item
+        if "table" in item:
+            rows = [{"values": [{"string_value": fake_redact(v.string_value)} for v in row.values]}
+                    for row in item.table.rows]
+            count = len(rows)
+            response = DeidentifyContentResponse(item={"table": {"headers": list(item.table.headers), "rows": rows}})
+        else:
+            count = 1
+            response = DeidentifyContentResponse(item={"value": fake_redact(item.value)})
+        with self._lock:
+            self.rpcs += 1
+            self.items += count
+        return response
+
+    def start(self):
+        self._server.start()
+        return self
+
+    def stop(self):
+        self._server.stop(grace=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--quota-rps", type=float, default=0, help="Requests per second before RESOURCE_EXHAUSTED; 0 is unlimited")
+    args = parser.parse_args()
+    server = FakeDlpServer(args.port, args.latency_ms, quota_rps=args.quota_rps).start()
+    print(f"Fake DLP listening on {server.address}")
+    server._server.wait_for_termination()
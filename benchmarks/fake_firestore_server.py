@@ -0,0 +1,107 @@
+"""
+In-process fake of the Firestore API for benchmarks.
+
+Serves google.firestore.v1.Firestore/Commit and RunQuery over plaintext gRPC,
+so firestore.Client() can be pointed at it with FIRESTORE_EMULATOR_HOST.
+This covers what transcript_aggregator_service does: document set() with
+SERVER_TIMESTAMP transforms, and a collection query with order_by(). Other
+writes, filters and RPCs are not implemented. Counts RPCs by method.
+
+Usage:
+    python benchmarks/fake_firestore_server.py --port 8086
+"""
+import argparse
+import threading
+from collections import Counter
+from concurrent import futures
+from datetime import datetime, timezone
+
+import grpc
+from google.cloud.firestore_v1.types import (CommitRequest, CommitResponse, Document, RunQueryRequest,
+                                             RunQueryResponse, StructuredQuery, Value, WriteResult)
+
+
+def _sort_value(value: Value):
+    kind = value._pb.WhichOneof("value_type")
+    return (kind or "", getattr(value._pb, kind) if kind in ("integer_value", "double_value", "string_value") else 0)
+
+
+class FakeFirestoreServer:
+    def __init__(self, port: int = 0, max_workers: int = 32):
+        self.rpcs = Counter()
+        self._documents = {}  # full document name -> Document
+        self._lock = threading.Lock()
+        self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+        handler = grpc.method_handlers_generic_handler("google.firestore.v1.Firestore", {
+            "Commit": grpc.unary_unary_rpc_method_handler(
+                self._commit,
+                request_deserializer=CommitRequest.deserialize,
+                response_serializer=CommitResponse.serialize,
+            ),
+            "RunQuery": grpc.unary_stream_rpc_method_handler(
+                self._run_query,
+                request_deserializer=RunQueryRequest.deserialize,
+                response_serializer=RunQueryResponse.serialize,
+            ),
+        })
+        self._server.add_generic_rpc_handlers((handler,))
+        self.port = self._server.add_insecure_port(f"127.0.0.1:{port}")
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def count(self, collection_suffix: str) -> int:
+        """Number of stored documents whose parent collection path ends with collection_suffix."""
+        with self._lock:
+            return sum(1 for name in self._documents if name.rsplit("/", 1)[0].endswith(collection_suffix))
+
+    def _commit(self, request, context):
+        self.rpcs["Commit"] += 1
+        now = datetime.now(timezone.utc)
+        results = []
+        with self._lock:
+            for write in request.writes:
+                if "update" not in write:
+                    context.abort(grpc.StatusCode.UNIMPLEMENTED, "Only document updates are supported")
+                document = Document(name=write.update.name, fields=dict(write.update.fields),
+                                    create_time=now, update_time=now)
+                for transform in write.update_transforms:
+                    if transform.set_to_server_value:
+                        document.fields[transform.field_path] = Value(timestamp_value=now)
+                self._documents[document.name] = document
+                results.append(WriteResult(update_time=now))
+        return CommitResponse(write_results=results, commit_time=now)
+
+    def _run_query(self, request, context):
+        self.rpcs["RunQuery"] += 1
+        now = datetime.now(timezone.utc)
+        query = request.structured_query
+        if len(query.from_) != 1 or query.where:
+            context.abort(grpc.StatusCode.UNIMPLEMENTED, "Only unfiltered single-collection queries are supported")
+        prefix = f"{request.parent}/{query.from_[0].collection_id}/"
+        with self._lock:
+            documents = [d for name, d in self._documents.items() if name.startswith(prefix) and "/" not in name[len(prefix):]]
+        for order in reversed(query.order_by):
+            documents.sort(key=lambda d: _sort_value(d.fields.get(order.field.field_path, Value())),
+                           reverse=order.direction == StructuredQuery.Direction.DESCENDING)
+        if not documents:
+            yield RunQueryResponse(read_time=now)
+        for document in documents:
+            yield RunQueryResponse(document=document, read_time=now)
+
+    def start(self):
+        self._server.start()
+        return self
+
+    def stop(self):
+        self._server.stop(grace=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8086)
+    args = parser.parse_args()
+    server = FakeFirestoreServer(args.port).start()
+    print(f"Fake Firestore listening on {server.address}")
+    server._server.wait_for_termination()
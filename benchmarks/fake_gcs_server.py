@@ -0,0 +1,125 @@
+"""
+In-process fake of the Cloud Storage JSON API for benchmarks.
+
+Accepts media and multipart object uploads (what blob.upload_from_string()
+sends for small objects), object metadata reads and media downloads, so
+storage.Client() can be pointed at it with STORAGE_EMULATOR_HOST. Objects are
+kept in memory and upload times are recorded per object name.
+
+Usage:
+    python benchmarks/fake_gcs_server.py --port 8087
+"""
+import argparse
+import email.parser
+import email.policy
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict | None = None):
+        payload = json.dumps(body or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        parts = url.path.split("/")
+        # /upload/storage/v1/b/<bucket>/o
+        if len(parts) != 7 or parts[1:4] != ["upload", "storage", "v1"] or parts[6] != "o":
+            return self._reply(404, {"error": {"code": 404, "message": "Not found"}})
+        query = parse_qs(url.query)
+        upload_type = query.get("uploadType", ["media"])[0]
+        if upload_type == "multipart":
+            message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + body)
+            metadata_part, data_part = list(message.iter_parts())[:2]
+            metadata = json.loads(metadata_part.get_content())
+            data = data_part.get_payload(decode=True)
+            name = metadata.get("name") or query.get("name", [""])[0]
+            content_type = data_part.get_content_type()
+        elif upload_type == "media":
+            name, data, content_type = query.get("name", [""])[0], body, self.headers.get("Content-Type")
+        else:
+            return self._reply(501, {"error": {"code": 501, "message": f"uploadType={upload_type} is not supported"}})
+        self._reply(200, self.server.fake.store(parts[5], name, data, content_type))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.split("/")
+        if parts[1:2] == ["download"]:  # /download/storage/v1/b/<bucket>/o/<name>?alt=media
+            parts = parts[1:]
+        # /storage/v1/b/<bucket>/o/<name>
+        if len(parts) == 7 and parts[1:3] == ["storage", "v1"] and parts[5] == "o":
+            bucket, name = parts[4], unquote(parts[6])
+            if parse_qs(url.query).get("alt") == ["media"]:
+                stored = self.server.fake.objects.get((bucket, name))
+                if stored:
+                    self.send_response(200)
+                    self.send_header("Content-Type", stored[1] or "application/octet-stream")
+                    self.send_header("Content-Length", str(len(stored[0])))
+                    self.end_headers()
+                    return self.wfile.write(stored[0])
+            else:
+                resource = self.server.fake.resource(bucket, name)
+                if resource:
+                    return self._reply(200, resource)
+        self._reply(404, {"error": {"code": 404, "message": "Not found"}})
+
+
+class FakeGcsServer:
+    def __init__(self, port: int = 0):
+        self.objects = {}  # (bucket, name) -> (data, content_type)
+        self.uploaded_at = {}  # (bucket, name) -> time.time() of the last upload
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def store(self, bucket: str, name: str, data: bytes, content_type: str | None) -> dict:
+        with self._lock:
+            self.objects[(bucket, name)] = (data, content_type)
+            self.uploaded_at[(bucket, name)] = time.time()
+        return self.resource(bucket, name)
+
+    def resource(self, bucket: str, name: str) -> dict | None:
+        with self._lock:
+            stored = self.objects.get((bucket, name))
+        if stored is None:
+            return None
+        return {"kind": "storage#object", "bucket": bucket, "name": name, "id": f"{bucket}/{name}/1",
+                "generation": "1", "size": str(len(stored[0])), "contentType": stored[1]}
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="fake-gcs", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8087)
+    args = parser.parse_args()
+    server = FakeGcsServer(args.port)
+    print(f"Fake Cloud Storage listening on {server.url}")
+    server._server.serve_forever()
@@ -0,0 +1,292 @@
+"""
+In-process fake of Cloud Pub/Sub with push subscriptions.
+
+Serves google.pubsub.v1.Publisher/Publish over plaintext gRPC, so the services'
+PublisherClient can be pointed at it with PUBSUB_EMULATOR_HOST. Every published
+message is delivered to the push endpoints registered for its topic as the
+same JSON envelope Cloud Run receives from a push subscription
+({"message": {"data", "attributes", "messageId", ...}, "subscription"}).
+Each endpoint gets its own delivery thread pool, so a slow handler does not
+hold up other subscriptions. Deliveries are attempted once, and their latency
+and status are recorded per endpoint.
+
+Pull subscriptions are served through google.pubsub.v1.Subscriber StreamingPull,
+Acknowledge and ModifyAckDeadline, so a SubscriberClient can consume them. A
+leased message is redelivered when it is nacked or its ack deadline passes,
+and counts as in flight until acknowledged. Topics without push endpoints or
+pull subscriptions just count their messages.
+
+Usage:
+    python benchmarks/fake_pubsub_server.py --port 8085 \
+        --push raw-transcripts=http://127.0.0.1:8081/ --pull raw-transcripts=raw-transcripts-pull
+"""
+import argparse
+import base64
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from concurrent import futures
+from datetime import datetime, timezone
+
+import grpc
+import requests
+from google.protobuf import empty_pb2
+from google.pubsub_v1.types import (AcknowledgeRequest, ModifyAckDeadlineRequest, PublishRequest, PublishResponse,
+                                    PubsubMessage, ReceivedMessage, StreamingPullRequest, StreamingPullResponse)
+
+
+class _PullSubscription:
+    """Queued and leased messages of one pull subscription."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queue = deque()  # (message_id, PubsubMessage, delivery_attempt)
+        self.leased = {}  # ack_id -> ((message_id, PubsubMessage, delivery_attempt), deadline)
+        self.ack_ids = itertools.count(1)
+        self.stats = Counter()  # delivered, acked, nacked, expired
+        self.cond = threading.Condition()
+
+    def put(self, entry, front: bool = False):
+        with self.cond:
+            (self.queue.appendleft if front else self.queue.append)(entry)
+            self.cond.notify_all()
+
+    def lease(self, max_messages: int, ack_deadline: float, timeout: float) -> list:
+        with self.cond:
+            self._expire_leases()
+            if not self.queue:
+                self.cond.wait(timeout)
+                self._expire_leases()
+            received = []
+            while self.queue and len(received) < max_messages:
+                message_id, message, attempt = self.queue.popleft()
+                ack_id = f"{self.name}-{next(self.ack_ids)}"
+                self.leased[ack_id] = ((message_id, message, attempt + 1), time.monotonic() + ack_deadline)
+                received.append(ReceivedMessage(ack_id=ack_id, message=message, delivery_attempt=attempt + 1))
+            self.stats["delivered"] += len(received)
+            return received
+
+    def _expire_leases(self):
+        now = time.monotonic()
+        for ack_id in [ack_id for ack_id, (_, deadline) in self.leased.items() if deadline <= now]:
+            entry, _ = self.leased.pop(ack_id)
+            self.queue.appendleft(entry)
+            self.stats["expired"] += 1
+
+    def ack(self, ack_ids) -> int:
+        with self.cond:
+            acked = sum(1 for ack_id in ack_ids if self.leased.pop(ack_id, None) is not None)
+            self.stats["acked"] += acked
+            return acked
+
+    def modify_deadline(self, ack_ids, seconds: int):
+        with self.cond:
+            for ack_id in ack_ids:
+                lease = self.leased.get(ack_id)
+                if lease is None:
+                    continue
+                if seconds == 0:  # nack
+                    del self.leased[ack_id]
+                    self.queue.appendleft(lease[0])
+                    self.stats["nacked"] += 1
+                    self.cond.notify_all()
+                else:
+                    self.leased[ack_id] = (lease[0], time.monotonic() + seconds)
+
+
+class FakePubSubServer:
+    def __init__(self, port: int = 0, push_workers: int = 64, push_timeout: float = 60):
+        self.push_timeout = push_timeout
+        self.published = Counter()  # topic name -> messages
+        self.push_latencies = {}  # endpoint -> [seconds]
+        self.push_statuses = {}  # endpoint -> Counter of HTTP status (0 for connection errors)
+        self._push_endpoints = {}  # topic name -> [url]
+        self._push_pools = {}  # url -> ThreadPoolExecutor
+        self._pull_subscriptions = {}  # topic name -> [_PullSubscription]
+        self.subscriptions = {}  # subscription name -> _PullSubscription
+        self._push_workers = push_workers
+        self._message_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._idle = threading.Condition(self._lock)
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=push_workers, pool_maxsize=push_workers)
+        self._session.mount("http://", adapter)
+        self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=32))
+        handler = grpc.method_handlers_generic_handler("google.pubsub.v1.Publisher", {
+            "Publish": grpc.unary_unary_rpc_method_handler(
+                self._publish,
+                request_deserializer=PublishRequest.deserialize,
+                response_serializer=PublishResponse.serialize,
+            ),
+        })
+        subscriber = grpc.method_handlers_generic_handler("google.pubsub.v1.Subscriber", {
+            "StreamingPull": grpc.stream_stream_rpc_method_handler(
+                self._streaming_pull,
+                request_deserializer=StreamingPullRequest.deserialize,
+                response_serializer=StreamingPullResponse.serialize,
+            ),
+            "Acknowledge": grpc.unary_unary_rpc_method_handler(
+                self._acknowledge,
+                request_deserializer=AcknowledgeRequest.deserialize,
+                response_serializer=empty_pb2.Empty.SerializeToString,
+            ),
+            "ModifyAckDeadline": grpc.unary_unary_rpc_method_handler(
+                self._modify_ack_deadline,
+                request_deserializer=ModifyAckDeadlineRequest.deserialize,
+                response_serializer=empty_pb2.Empty.SerializeToString,
+            ),
+        })
+        self._server.add_generic_rpc_handlers((handler, subscriber))
+        self.port = self._server.add_insecure_port(f"127.0.0.1:{port}")
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def add_push_endpoint(self, topic: str, url: str):
+        """topic is the short name (e.g. 'raw-transcripts'), matched in any project."""
+        self._push_endpoints.setdefault(topic, []).append(url)
+        self.push_latencies.setdefault(url, [])
+        self.push_statuses.setdefault(url, Counter())
+        if url not in self._push_pools:
+            self._push_pools[url] = futures.ThreadPoolExecutor(max_workers=self._push_workers,
+                                                               thread_name_prefix="fake-pubsub-push")
+
+    def add_pull_subscription(self, topic: str, subscription: str):
+        """Messages published to topic (short name) are queued for `subscription`, matched in any project."""
+        pull_subscription = _PullSubscription(subscription)
+        self._pull_subscriptions.setdefault(topic, []).append(pull_subscription)
+        self.subscriptions[subscription] = pull_subscription
+
+    def _publish(self, request, context):
+        topic = request.topic.split("/")[-1]
+        message_ids = []
+        publish_time = datetime.now(timezone.utc).isoformat()
+        for message in request.messages:
+            message_id = str(next(self._message_ids))
+            message_ids.append(message_id)
+            envelope = {
+                "message": {
+                    "data": base64.b64encode(message.data).decode("ascii"),
+                    "attributes": dict(message.attributes),
+                    "messageId": message_id,
+                    "message_id": message_id,
+                    "publishTime": publish_time,
+                    "orderingKey": message.ordering_key,
+                },
+                "subscription": f"projects/benchmark/subscriptions/{topic}-push",
+            }
+            for url in self._push_endpoints.get(topic, ()):
+                with self._lock:
+                    self._in_flight += 1
+                self._push_pools[url].submit(self._push, url, envelope)
+            for pull_subscription in self._pull_subscriptions.get(topic, ()):
+                with self._lock:
+                    self._in_flight += 1
+                pull_subscription.put((message_id, PubsubMessage(
+                    data=message.data, attributes=dict(message.attributes), message_id=message_id,
+                    publish_time=datetime.now(timezone.utc), ordering_key=message.ordering_key), 0))
+        with self._lock:
+            self.published[topic] += len(message_ids)
+        return PublishResponse(message_ids=message_ids)
+
+    def _push(self, url, envelope):
+        start = time.perf_counter()
+        try:
+            status = self._session.post(url, json=envelope, timeout=self.push_timeout).status_code
+        except requests.RequestException:
+            status = 0
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.push_latencies[url].append(elapsed)
+            self.push_statuses[url][status] += 1
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.notify_all()
+
+    def _subscription(self, name: str, context) -> _PullSubscription:
+        subscription = self.subscriptions.get(name.split("/")[-1])
+        if subscription is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Subscription does not exist: {name}")
+        return subscription
+
+    def _streaming_pull(self, request_iterator, context):
+        first = next(request_iterator)
+        subscription = self._subscription(first.subscription, context)
+        ack_deadline = first.stream_ack_deadline_seconds or 10
+        max_outstanding = first.max_outstanding_messages or 1000
+
+        def read_requests():
+            # Heartbeats and in-stream acks/deadline changes until the client closes the stream.
+            try:
+                for stream_request in request_iterator:
+                    self._settle(subscription, stream_request.ack_ids)
+                    for ack_id, seconds in zip(stream_request.modify_deadline_ack_ids,
+                                               stream_request.modify_deadline_seconds):
+                        subscription.modify_deadline([ack_id], seconds)
+            except grpc.RpcError:
+                pass
+
+        threading.Thread(target=read_requests, name="fake-pubsub-stream", daemon=True).start()
+        while context.is_active():
+            received = subscription.lease(max_outstanding, ack_deadline, timeout=0.2)
+            if received:
+                yield StreamingPullResponse(received_messages=received)
+
+    def _settle(self, subscription: _PullSubscription, ack_ids):
+        acked = subscription.ack(ack_ids)
+        if acked:
+            with self._lock:
+                self._in_flight -= acked
+                if not self._in_flight:
+                    self._idle.notify_all()
+
+    def _acknowledge(self, request, context):
+        self._settle(self._subscription(request.subscription, context), request.ack_ids)
+        return empty_pb2.Empty()
+
+    def _modify_ack_deadline(self, request, context):
+        self._subscription(request.subscription, context).modify_deadline(request.ack_ids,
+                                                                          request.ack_deadline_seconds)
+        return empty_pb2.Empty()
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Waits until every queued push has been delivered and every pulled message acked; False on timeout."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout=timeout)
+
+    def reset_stats(self):
+        with self._lock:
+            self.published.clear()
+            for url in self.push_latencies:
+                self.push_latencies[url] = []
+                self.push_statuses[url] = Counter()
+
+    def start(self):
+        self._server.start()
+        return self
+
+    def stop(self):
+        self._server.stop(grace=None)
+        for pool in self._push_pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--push", action="append", default=[], metavar="TOPIC=URL")
+    parser.add_argument("--pull", action="append", default=[], metavar="TOPIC=SUBSCRIPTION")
+    args = parser.parse_args()
+    server = FakePubSubServer(args.port)
+    for push in args.push:
+        topic, url = push.split("=", 1)
+        server.add_push_endpoint(topic, url)
+    for pull in args.pull:
+        topic, subscription = pull.split("=", 1)
+        server.add_pull_subscription(topic, subscription)
+    server.start()
+    print(f"Fake Pub/Sub listening on {server.address}")
+    server._server.wait_for_termination()
@@ -0,0 +1,328 @@
+"""
+In-process fake of a Redis server for benchmarks.
+
+Speaks RESP2 and RESP3 (redis-py negotiates HELLO 3) over TCP, so the
+services connect to it with their normal redis-py clients through
+CONTEXT_MANAGER_REDIS_HOST/PORT and REDIS_HOST/PORT.
+Only the commands the services use are implemented: strings with expiry
+(GET, SET, SETEX, MGET, MSET, INCR, INCRBY, EXPIRE, PTTL, TTL, EXISTS, DEL), lists
+(RPUSH, LRANGE, LLEN), PUBLISH/SUBSCRIBE and connection housekeeping. There is
+no Lua: EVAL and EVALSHA run only scripts registered with register_script(),
+each with a Python equivalent. Anything else returns an error. CLIENT TRACKING is not supported, so the context
+near-cache stays disconnected against this server. Counts commands by name.
+
+Usage:
+    python benchmarks/fake_redis_server.py --port 6390
+"""
+import argparse
+import hashlib
+import socketserver
+import threading
+import time
+from collections import Counter
+
+
+class RespError(Exception):
+    def __init__(self, message: str, code: str = "ERR"):
+        super().__init__(message)
+        self.code = code
+
+
+class Push(list):
+    """A pub/sub message: a RESP3 push, or a plain array on RESP2 connections."""
+
+
+class _Store:
+    def __init__(self):
+        self.data = {}  # key -> value (bytes or list of bytes)
+        self.expires = {}  # key -> monotonic deadline
+        self.subscribers = {}  # channel -> set of handlers
+        self.lock = threading.Lock()
+
+    def alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+        self.channels = set()
+        self.resp3 = False
+
+    def handle(self):
+        try:
+            while True:
+                command = self._read_command()
+                if command is None:
+                    return
+                try:
+                    reply = self.server.fake.execute(self, command)
+                except RespError as e:
+                    reply = e
+                self.send(reply)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.server.fake.unsubscribe(self, list(self.channels))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # Inline command
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def send(self, reply):
+        with self.write_lock:
+            self.wfile.write(_encode(reply, self.resp3))
+
+
+def _encode(reply, resp3: bool) -> bytes:
+    if reply is None:
+        return b"_\r\n" if resp3 else b"$-1\r\n"
+    if isinstance(reply, RespError):
+        return f"-{reply.code} {reply}\r\n".encode()
+    if isinstance(reply, bool):
+        return b":1\r\n" if reply else b":0\r\n"
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, str):
+        return f"+{reply}\r\n".encode()
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    if isinstance(reply, dict):
+        prefix = b"%" if resp3 else b"*"
+        count = len(reply) if resp3 else 2 * len(reply)
+        return prefix + b"%d\r\n" % count + b"".join(_encode(k, resp3) + _encode(v, resp3) for k, v in reply.items())
+    prefix = b">" if resp3 and isinstance(reply, Push) else b"*"
+    return prefix + b"%d\r\n" % len(reply) + b"".join(_encode(item, resp3) for item in reply)
+
+
+class FakeRedisServer:
+    def __init__(self, port: int = 0):
+        self._store = _Store()
+        self.commands = Counter()
+        self._scripts = {}  # sha1 hex (bytes) -> handler
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", port), _Handler, bind_and_activate=False)
+        self._server.daemon_threads = True
+        self._server.allow_reuse_address = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return "127.0.0.1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-redis", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def register_script(self, source: str, handler):
+        """
+        Serves EVAL/EVALSHA of the Lua `source` with handler(store, keys, args) -> reply,
+        a Python equivalent run under the store lock like any other command.
+        """
+        self._scripts[hashlib.sha1(source.encode("utf-8")).hexdigest().encode()] = handler
+
+    # --- Commands ---
+    def execute(self, handler, command):
+        name = command[0].decode().upper()
+        args = command[1:]
+        self.commands[name] += 1
+        method = getattr(self, f"_cmd_{name.lower()}", None)
+        if method is None:
+            raise RespError(f"unknown command '{name}'")
+        if name in ("SUBSCRIBE", "UNSUBSCRIBE", "HELLO") or (name == "PING" and handler.channels):
+            return method(handler, args)
+        with self._store.lock:
+            return method(args)
+
+    def _cmd_ping(self, *args):
+        if len(args) == 2:  # Subscribed connection
+            return Push([b"pong", b""])
+        return "PONG"
+
+    def _cmd_client(self, args):
+        if args and args[0].upper() == b"TRACKING":
+            raise RespError("CLIENT TRACKING is not supported by the fake server")
+        return "OK"  # SETNAME, SETINFO, ...
+
+    def _cmd_hello(self, handler, args):
+        protocol = int(args[0]) if args else 2
+        if protocol not in (2, 3):
+            raise RespError("NOPROTO unsupported protocol version")
+        handler.resp3 = protocol == 3
+        return {b"server": b"redis", b"version": b"7.0.0", b"proto": protocol, b"id": id(handler),
+                b"mode": b"standalone", b"role": b"master", b"modules": []}
+
+    def _cmd_select(self, args):
+        return "OK"
+
+    def _cmd_get(self, args):
+        store = self._store
+        if not store.alive(args[0]):
+            return None
+        value = store.data[args[0]]
+        if isinstance(value, list):
+            raise RespError("WRONGTYPE")
+        return value
+
+    def _cmd_mget(self, args):
+        return [self._cmd_get([key]) if not isinstance(self._store.data.get(key), list) else None for key in args]
+
+    def _cmd_set(self, args):
+        key, value, options = args[0], args[1], [a.decode().upper() for a in args[2:]]
+        ttl_ms = None
+        if "NX" in options and self._store.alive(key):
+            return None
+        if "EX" in options:
+            ttl_ms = int(options[options.index("EX") + 1]) * 1000
+        if "PX" in options:
+            ttl_ms = int(options[options.index("PX") + 1])
+        self._set(key, value, ttl_ms)
+        return "OK"
+
+    def _cmd_setex(self, args):
+        self._set(args[0], args[2], int(args[1]) * 1000)
+        return "OK"
+
+    def _cmd_mset(self, args):
+        for i in range(0, len(args), 2):
+            self._set(args[i], args[i + 1], None)
+        return "OK"
+
+    def _set(self, key, value, ttl_ms):
+        self._store.data[key] = value
+        if ttl_ms is None:
+            self._store.expires.pop(key, None)
+        else:
+            self._store.expires[key] = time.monotonic() + ttl_ms / 1000
+
+    def _cmd_incr(self, args):
+        return self._cmd_incrby([args[0], b"1"])
+
+    def _cmd_incrby(self, args):
+        value = int(self._cmd_get(args[:1]) or 0) + int(args[1])
+        self._store.data[args[0]] = str(value).encode()
+        return value
+
+    def _cmd_del(self, args):
+        removed = 0
+        for key in args:
+            if self._store.alive(key):
+                del self._store.data[key]
+                self._store.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def _cmd_exists(self, args):
+        return sum(1 for key in args if self._store.alive(key))
+
+    def _cmd_expire(self, args):
+        if not self._store.alive(args[0]):
+            return 0
+        self._store.expires[args[0]] = time.monotonic() + int(args[1])
+        return 1
+
+    def _cmd_pttl(self, args):
+        if not self._store.alive(args[0]):
+            return -2
+        deadline = self._store.expires.get(args[0])
+        return -1 if deadline is None else int((deadline - time.monotonic()) * 1000)
+
+    def _cmd_ttl(self, args):
+        pttl = self._cmd_pttl(args)
+        return pttl if pttl < 0 else pttl // 1000
+
+    def _cmd_rpush(self, args):
+        store = self._store
+        if not store.alive(args[0]):
+            store.data[args[0]] = []
+        values = store.data[args[0]]
+        if not isinstance(values, list):
+            raise RespError("WRONGTYPE")
+        values.extend(args[1:])
+        return len(values)
+
+    def _cmd_lrange(self, args):
+        if not self._store.alive(args[0]):
+            return []
+        values = self._store.data[args[0]]
+        start, stop = int(args[1]), int(args[2])
+        stop = len(values) if stop == -1 else stop + 1
+        return values[start:stop]
+
+    def _cmd_llen(self, args):
+        return len(self._store.data[args[0]]) if self._store.alive(args[0]) else 0
+
+    # --- Pub/Sub ---
+    def _cmd_evalsha(self, args):
+        handler = self._scripts.get(args[0].lower())
+        if handler is None:
+            raise RespError("No matching script. Please use EVAL.", code="NOSCRIPT")
+        numkeys = int(args[1])
+        return handler(self._store, args[2:2 + numkeys], args[2 + numkeys:])
+
+    def _cmd_eval(self, args):
+        sha = hashlib.sha1(args[0]).hexdigest().encode()
+        if sha not in self._scripts:
+            raise RespError("the fake server has no Lua; only registered scripts can be evaluated")
+        return self._cmd_evalsha([sha] + args[1:])
+
+    def _cmd_publish(self, args):
+        handlers = list(self._store.subscribers.get(args[0], ()))
+        for handler in handlers:
+            try:
+                handler.send(Push([b"message", args[0], args[1]]))
+            except OSError:
+                pass
+        return len(handlers)
+
+    def _cmd_subscribe(self, handler, args):
+        with self._store.lock:
+            for channel in args:
+                self._store.subscribers.setdefault(channel, set()).add(handler)
+                handler.channels.add(channel)
+        for channel in args[:-1]:
+            handler.send(Push([b"subscribe", channel, len(handler.channels)]))
+        return Push([b"subscribe", args[-1], len(handler.channels)])
+
+    def _cmd_unsubscribe(self, handler, args):
+        channels = args or list(handler.channels)
+        self.unsubscribe(handler, channels)
+        for channel in channels[:-1]:
+            handler.send(Push([b"unsubscribe", channel, len(handler.channels)]))
+        return Push([b"unsubscribe", channels[-1] if channels else None, len(handler.channels)])
+
+    def unsubscribe(self, handler, channels):
+        with self._store.lock:
+            for channel in channels:
+                self._store.subscribers.get(channel, set()).discard(handler)
+                handler.channels.discard(channel)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    server = FakeRedisServer(args.port).start()
+    print(f"Fake Redis listening on {server.host}:{server.port}")
+    server._thread.join()
@@ -0,0 +1,403 @@
+"""
+Synthetic transcript generator for load tests.
+
+Produces any number of conversations in the final_transcript/ schema
+(conversation_info plus entries with start_timestamp_usec, text, role, user_id
+and original_entry_index). Conversations open with a customer turn, alternate
+roles and close with the agent's wrap-up. In between:
+  --prompt-ratio   share of agent turns that ask the customer for a PII value
+  --trigger-ratio  share of those prompts phrased with a context_keywords entry,
+                   so main_service stores context for the next customer turn;
+                   the rest ask indirectly ("When were you born?")
+  --pii-density    share of customer turns that contain PII: the requested value
+                   after a prompt (otherwise a deflection), unsolicited contact
+                   details elsewhere
+  --context-types  PII types agents ask for (default: every type with prompts)
+  --languages      language mix, e.g. en=0.8,es=0.1,fr=0.1
+Every agent line is checked against main_service's KeywordMatcher and the
+context_keywords in dlp_config.yaml, so only prompts meant to set context do.
+The keywords are English; prompts in other languages never set context, as in
+production. Generation is deterministic for a given --seed.
+
+Output is one JSON file per conversation in a directory (like
+final_transcript/) or, for large runs, one conversation per line in a .jsonl
+file. A summary is printed to stderr.
+
+Usage (from the project root):
+    python benchmarks/generate_transcripts.py --count 1000 --output /tmp/synthetic.jsonl
+    python benchmarks/generate_transcripts.py --count 50 --output /tmp/synthetic --languages en=0.7,es=0.3 \\
+        --pii-density 0.8 --context-types EMAIL_ADDRESS PHONE_NUMBER CREDIT_CARD_NUMBER
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import string
+import sys
+from collections import Counter
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "main_service"))
+
+from keyword_matcher import KeywordMatcher  # noqa: E402
+
+FIRST_NAMES = ["Jane", "John", "Maria", "Wei", "Aisha", "Carlos", "Emma", "Liam", "Sofia", "Noah", "Priya", "Lucas"]
+LAST_NAMES = ["Doe", "Smith", "Garcia", "Chen", "Khan", "Martin", "Rossi", "Nguyen", "Silva", "Brown", "Patel"]
+STREETS = ["Oak", "Maple", "Pine", "Cedar", "Elm", "Washington", "Lake", "Hill", "Park", "Main"]
+STREET_SUFFIXES = ["Street", "Avenue", "Road", "Lane", "Drive", "Boulevard"]
+CITIES = [("Springfield", "IL", "62704"), ("Austin", "TX", "78701"), ("Portland", "OR", "97205"),
+          ("Denver", "CO", "80202"), ("Columbus", "OH", "43215"), ("Raleigh", "NC", "27601")]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+EMAIL_DOMAINS = ["example.com", "example.org", "mail.example.net"]
+
+
+# --- PII values ---
+def _digits(rng, n):
+    return "".join(rng.choice(string.digits) for _ in range(n))
+
+
+def _with_luhn(rng, prefix, length):
+    body = prefix + _digits(rng, length - len(prefix) - 1)
+    total = 0
+    for i, digit in enumerate(reversed(body)):
+        value = int(digit) * (2 if i % 2 == 0 else 1)
+        total += value - 9 if value > 9 else value
+    return body + str((10 - total % 10) % 10)
+
+
+def _credit_card(rng, language):
+    number = _with_luhn(rng, rng.choice(["4", "51", "37"]), 16)
+    separator = rng.choice(["-", " ", ""])
+    return separator.join(number[i:i + 4] for i in range(0, 16, 4))
+
+
+def _date_of_birth(rng, language):
+    year, month, day = rng.randint(1945, 2004), rng.randint(1, 12), rng.randint(1, 28)
+    return f"{MONTHS[month - 1]} {day}, {year}" if language == "en" else f"{day:02d}/{month:02d}/{year}"
+
+
+def _street_address(rng, language):
+    city, state, zip_code = rng.choice(CITIES)
+    return (f"{rng.randint(10, 9999)} {rng.choice(STREETS)} {rng.choice(STREET_SUFFIXES)}, "
+            f"{city}, {state} {zip_code}")
+
+
+def _iban(rng, language):
+    bban = "37040044" + _digits(rng, 10)
+    check = 98 - int(bban + "131400") % 97  # "DE00" moved to the end, letters as numbers
+    return f"DE{check:02d}{bban}"
+
+
+def _medicare_id(rng, language):
+    letters = "ACDEFGHJKMNPQRTUVWXY"
+    alnum = letters + string.digits
+    return (f"{rng.randint(1, 9)}{rng.choice(letters)}{rng.choice(alnum)}{rng.randint(0, 9)}-"
+            f"{rng.choice(letters)}{rng.choice(alnum)}{rng.randint(0, 9)}-"
+            f"{rng.choice(letters)}{rng.choice(letters)}{rng.randint(0, 9)}{rng.randint(0, 9)}")
+
+
+VALUE_GENERATORS = {
+    "EMAIL_ADDRESS": lambda rng, lang: (f"{rng.choice(FIRST_NAMES).lower()}.{rng.choice(LAST_NAMES).lower()}"
+                                        f"{rng.randint(1, 99)}@{rng.choice(EMAIL_DOMAINS)}"),
+    "PHONE_NUMBER": lambda rng, lang: f"({rng.randint(201, 989)}) 555-{_digits(rng, 4)}",
+    "CREDIT_CARD_NUMBER": _credit_card,
+    "US_SOCIAL_SECURITY_NUMBER": lambda rng, lang: f"{rng.randint(100, 665)}-{rng.randint(10, 99)}-{_digits(rng, 4)}",
+    "DATE_OF_BIRTH": _date_of_birth,
+    "STREET_ADDRESS": _street_address,
+    "FINANCIAL_ACCOUNT_NUMBER": lambda rng, lang: _digits(rng, 10),
+    "US_PASSPORT": lambda rng, lang: rng.choice(string.ascii_uppercase) + _digits(rng, 8),
+    "CVV_NUMBER": lambda rng, lang: _digits(rng, 3),
+    "IMEI_HARDWARE_ID": lambda rng, lang: _with_luhn(rng, "35", 15),
+    "US_DRIVERS_LICENSE_NUMBER": lambda rng, lang: rng.choice(string.ascii_uppercase) + _digits(rng, 8),
+    "US_EMPLOYER_IDENTIFICATION_NUMBER": lambda rng, lang: f"{rng.randint(10, 98)}-{_digits(rng, 7)}",
+    "US_MEDICARE_BENEFICIARY_ID_NUMBER": _medicare_id,
+    "DOD_ID_NUMBER": lambda rng, lang: _digits(rng, 10),
+    "MAC_ADDRESS": lambda rng, lang: "-".join(f"{rng.randint(0, 255):02X}" for _ in range(6)),
+    "IP_ADDRESS": lambda rng, lang: f"198.51.100.{rng.randint(1, 254)}",
+    "SWIFT_CODE": lambda rng, lang: "".join(rng.choice(string.ascii_uppercase) for _ in range(4)) + "US33XXX",
+    "IBAN_CODE": _iban,
+    "SOCIAL_HANDLE": lambda rng, lang: f"@{rng.choice(FIRST_NAMES).lower()}_{rng.randint(1, 999)}",
+    "ALIEN_REGISTRATION_NUMBER": lambda rng, lang: "A" + _digits(rng, 9),
+    "BORDER_CROSSING_CARD": lambda rng, lang: rng.choice(string.ascii_uppercase) + _digits(rng, 7),
+    "US_INDIVIDUAL_TAXPAYER_IDENTIFICATION_NUMBER": lambda rng, lang: f"9{_digits(rng, 2)}-7{_digits(rng, 1)}-{_digits(rng, 4)}",
+}
+
+# --- Phrasing ---
+# Prompts phrased with a context keyword, per PII type (English only; the keywords are English).
+TRIGGER_PROMPTS = {
+    "US_SOCIAL_SECURITY_NUMBER": ["For tax purposes, I need your social security number.", "Can you confirm your SSN?"],
+    "CREDIT_CARD_NUMBER": ["Could you read me the credit card number you used?", "What's the card number on file?"],
+    "PHONE_NUMBER": ["What's the best phone number to reach you?", "Can I get a contact number for you?"],
+    "EMAIL_ADDRESS": ["Can you please verify your email address?", "And your email, please?"],
+    "DATE_OF_BIRTH": ["Can you confirm your date of birth?", "I'll also need your DOB."],
+    "STREET_ADDRESS": ["Could you confirm your home address?", "What's the mailing address on the order?"],
+    "FINANCIAL_ACCOUNT_NUMBER": ["Could you provide your bank account number?", "What's your member ID?"],
+    "US_PASSPORT": ["Can you provide your passport number?"],
+    "CVV_NUMBER": ["And the CVV on the back of the card?"],
+    "IMEI_HARDWARE_ID": ["Could you read me the IMEI of the phone?", "What's the hardware ID of the device?"],
+    "US_DRIVERS_LICENSE_NUMBER": ["Can I have your driver's license number?"],
+    "US_EMPLOYER_IDENTIFICATION_NUMBER": ["What's your employer identification number?"],
+    "US_MEDICARE_BENEFICIARY_ID_NUMBER": ["Can you provide your Medicare Beneficiary ID?"],
+    "DOD_ID_NUMBER": ["Do you have a Department of Defense ID number?"],
+    "MAC_ADDRESS": ["Can you give me the MAC address of the router?"],
+    "IP_ADDRESS": ["What's the IP address shown in your settings?"],
+    "SWIFT_CODE": ["And the SWIFT code for your bank?"],
+    "IBAN_CODE": ["Could you read me your IBAN?"],
+    "SOCIAL_HANDLE": ["What's your username in our app?"],
+    "ALIEN_REGISTRATION_NUMBER": ["Do you have an alien registration number?"],
+    "BORDER_CROSSING_CARD": ["Do you have a border crossing card?"],
+    "US_INDIVIDUAL_TAXPAYER_IDENTIFICATION_NUMBER": ["Can you provide your individual taxpayer identification number?"],
+}
+# Prompts that ask for the value without any context keyword, per language.
+INDIRECT_PROMPTS = {
+    "en": {
+        "EMAIL_ADDRESS": ["Where should we send the confirmation?"],
+        "PHONE_NUMBER": ["How can we reach you if we get disconnected?"],
+        "CREDIT_CARD_NUMBER": ["Which payment method did you use? Please read me the digits."],
+        "DATE_OF_BIRTH": ["When were you born?"],
+        "STREET_ADDRESS": ["Where should we ship the replacement?"],
+        "FINANCIAL_ACCOUNT_NUMBER": ["Which bank account should the refund go to?"],
+    },
+    "es": {
+        "EMAIL_ADDRESS": ["¿Me puede confirmar su correo electrónico?"],
+        "PHONE_NUMBER": ["¿Cuál es su número de teléfono?"],
+        "CREDIT_CARD_NUMBER": ["¿Me puede dar el número de su tarjeta de crédito?"],
+        "US_SOCIAL_SECURITY_NUMBER": ["¿Cuál es su número de seguro social?"],
+        "DATE_OF_BIRTH": ["¿Cuál es su fecha de nacimiento?"],
+        "STREET_ADDRESS": ["¿Cuál es su dirección de envío?"],
+        "FINANCIAL_ACCOUNT_NUMBER": ["¿Cuál es su número de cuenta bancaria?"],
+        "US_PASSPORT": ["¿Me puede dar su número de pasaporte?"],
+    },
+    "fr": {
+        "EMAIL_ADDRESS": ["Pouvez-vous confirmer votre adresse e-mail ?"],
+        "PHONE_NUMBER": ["Quel est votre numéro de téléphone ?"],
+        "CREDIT_CARD_NUMBER": ["Pouvez-vous me donner le numéro de votre carte bancaire ?"],
+        "US_SOCIAL_SECURITY_NUMBER": ["Quel est votre numéro de sécurité sociale ?"],
+        "DATE_OF_BIRTH": ["Quelle est votre date de naissance ?"],
+        "STREET_ADDRESS": ["Quelle est votre adresse de livraison ?"],
+        "FINANCIAL_ACCOUNT_NUMBER": ["Quel est votre numéro de compte bancaire ?"],
+        "US_PASSPORT": ["Quel est votre numéro de passeport ?"],
+    },
+}
+OPENERS = {
+    "en": {
+        "Order Inquiry": ["Hello, I'm calling about my recent order. It hasn't arrived yet.",
+                          "Hi, I'd like to check the status of an order I placed last week."],
+        "Billing": ["Hello, I think I was charged twice for the same purchase.",
+                    "Hi, there's a charge on my statement I don't recognize."],
+        "Account Security": ["Hello, I got an alert about a login I didn't make.",
+                             "Hi, I think someone has been using my account."],
+        "Returns": ["Hi, I'd like to return a jacket that doesn't fit.", "Hello, the blender I received is broken."],
+    },
+    "es": {
+        "Order Inquiry": ["Hola, llamo por mi pedido reciente. Todavía no ha llegado."],
+        "Billing": ["Hola, creo que me cobraron dos veces la misma compra."],
+        "Account Security": ["Hola, recibí una alerta de un inicio de sesión que no hice."],
+        "Returns": ["Hola, quiero devolver una chaqueta que no me queda bien."],
+    },
+    "fr": {
+        "Order Inquiry": ["Bonjour, j'appelle au sujet de ma commande récente. Elle n'est pas encore arrivée."],
+        "Billing": ["Bonjour, je crois que j'ai été débité deux fois pour le même achat."],
+        "Account Security": ["Bonjour, j'ai reçu une alerte pour une connexion que je n'ai pas faite."],
+        "Returns": ["Bonjour, je voudrais retourner une veste qui ne me va pas."],
+    },
+}
+AGENT_FILLER = {
+    "en": ["Let me look into that for you.", "Thank you for your patience.", "I understand, thanks for explaining.",
+           "One moment while I pull that up.", "I see the issue now.", "I've made a note of that."],
+    "es": ["Permítame revisarlo.", "Gracias por su paciencia.", "Entiendo, gracias por explicarlo.",
+           "Un momento mientras lo busco."],
+    "fr": ["Je vais vérifier cela pour vous.", "Merci de votre patience.", "Je comprends, merci pour l'explication.",
+           "Un instant, je regarde."],
+}
+CUSTOMER_FILLER = {
+    "en": ["Okay.", "Thank you.", "Sure, go ahead.", "That sounds good.", "How long will that take?", "I appreciate it."],
+    "es": ["De acuerdo.", "Gracias.", "Claro, adelante.", "¿Cuánto tiempo tardará?"],
+    "fr": ["D'accord.", "Merci.", "Bien sûr, allez-y.", "Combien de temps cela prendra-t-il ?"],
+}
+UNSOLICITED_PII = {
+    "en": ["By the way, you can email me at {EMAIL_ADDRESS}.", "If we get cut off, call me back at {PHONE_NUMBER}."],
+    "es": ["Por cierto, mi correo es {EMAIL_ADDRESS}.", "Si se corta, llámeme al {PHONE_NUMBER}."],
+    "fr": ["Au fait, mon e-mail est {EMAIL_ADDRESS}.", "Si on est coupés, rappelez-moi au {PHONE_NUMBER}."],
+}
+ANSWERS = {
+    "en": ["It's {value}.", "Sure, it's {value}.", "Yes, it's {value}.", "Okay, {value}."],
+    "es": ["Es {value}.", "Claro, es {value}.", "Sí, es {value}."],
+    "fr": ["C'est {value}.", "Bien sûr, c'est {value}.", "Oui, c'est {value}."],
+}
+DEFLECTIONS = {
+    "en": ["Hold on, let me find it.", "I'd rather not give that out over the phone.", "I don't have it with me."],
+    "es": ["Un momento, lo estoy buscando.", "Prefiero no darlo por teléfono."],
+    "fr": ["Un instant, je le cherche.", "Je préfère ne pas le donner par téléphone."],
+}
+CLOSINGS = {
+    "en": ("Is there anything else I can help you with today?", "No, that's everything. Thanks!"),
+    "es": ("¿Hay algo más en lo que pueda ayudarle?", "No, eso es todo. ¡Gracias!"),
+    "fr": ("Puis-je vous aider avec autre chose ?", "Non, ce sera tout. Merci !"),
+}
+LANGUAGES = tuple(OPENERS)
+
+
+def parse_languages(spec: str) -> dict:
+    """'en=0.8,es=0.2' -> {'en': 0.8, 'es': 0.2}; a bare code has weight 1."""
+    weights = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        code, _, weight = part.partition("=")
+        if code not in LANGUAGES:
+            raise ValueError(f"Unsupported language '{code}'; choose from {', '.join(LANGUAGES)}")
+        weights[code] = float(weight or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError("The language mix needs at least one positive weight")
+    return weights
+
+
+def load_context_keywords() -> dict:
+    with open(os.path.join(ROOT, "main_service", "dlp_config.yaml")) as f:
+        return yaml.safe_load(f).get("context_keywords", {}) or {}
+
+
+class TranscriptGenerator:
+    def __init__(self, seed=None, min_turns=8, max_turns=24, pii_density=0.5, prompt_ratio=0.5,
+                 trigger_ratio=1.0, context_types=None, languages=None, context_keywords=None):
+        if min_turns < 4 or max_turns < min_turns:
+            raise ValueError("Turn counts need 4 <= min_turns <= max_turns")
+        self.rng = random.Random(seed)
+        self.min_turns, self.max_turns = min_turns, max_turns
+        self.pii_density, self.prompt_ratio, self.trigger_ratio = pii_density, prompt_ratio, trigger_ratio
+        self.languages = languages or {"en": 1.0}
+        matcher = KeywordMatcher(load_context_keywords() if context_keywords is None else context_keywords)
+
+        def sets_context(text):
+            best = matcher.best_match(text)
+            return best.pii_types[0] if best else None
+
+        # Keep only phrasings that behave as intended against the configured keywords.
+        self.trigger_prompts = {t: [p for p in prompts if sets_context(p) == t] for t, prompts in TRIGGER_PROMPTS.items()}
+        self.indirect_prompts = {lang: {t: [p for p in prompts if sets_context(p) is None] for t, prompts in by_type.items()}
+                                 for lang, by_type in INDIRECT_PROMPTS.items()}
+        self.agent_filler = {lang: [p for p in lines if sets_context(p) is None] for lang, lines in AGENT_FILLER.items()}
+        self.closings = {lang: closing for lang, closing in CLOSINGS.items() if sets_context(closing[0]) is None}
+        known = set(self.trigger_prompts) | {t for by_type in self.indirect_prompts.values() for t in by_type}
+        self.context_types = list(context_types or sorted(known))
+        unknown = set(self.context_types) - known
+        if unknown:
+            raise ValueError(f"No prompts for PII type(s): {', '.join(sorted(unknown))}")
+        self.stats = Counter()
+
+    def _prompt(self, language):
+        """An agent line asking for PII, or None when nothing can be asked in this language."""
+        rng = self.rng
+        triggering = language == "en" and rng.random() < self.trigger_ratio
+        candidates = [(t, p) for t in self.context_types
+                      for p in (self.trigger_prompts.get(t, []) if triggering
+                                else self.indirect_prompts[language].get(t, []))]
+        if not candidates and triggering:
+            candidates = [(t, p) for t in self.context_types for p in self.indirect_prompts[language].get(t, [])]
+            triggering = False
+        if not candidates:
+            return None
+        pii_type, prompt = rng.choice(candidates)
+        self.stats["context_prompts" if triggering else "indirect_prompts"] += 1
+        return pii_type, prompt
+
+    def _customer_turn(self, language, requested):
+        """The requested value, or unsolicited contact details, with probability pii_density."""
+        rng = self.rng
+        if rng.random() >= self.pii_density:
+            return rng.choice((DEFLECTIONS if requested else CUSTOMER_FILLER)[language])
+        self.stats["pii_turns"] += 1
+        if requested:
+            return rng.choice(ANSWERS[language]).format(value=VALUE_GENERATORS[requested](rng, language))
+        return rng.choice(UNSOLICITED_PII[language]).format(
+            **{t: VALUE_GENERATORS[t](rng, language) for t in ("EMAIL_ADDRESS", "PHONE_NUMBER")})
+
+    def conversation(self, conversation_id: str, start_timestamp_usec: int = 1760000000000000) -> dict:
+        rng = self.rng
+        language = rng.choices(list(self.languages), weights=list(self.languages.values()))[0]
+        category = rng.choice(list(OPENERS[language]))
+        turns = rng.randint(self.min_turns, self.max_turns)
+        texts = [("END_USER", rng.choice(OPENERS[language][category]))]
+        requested = None
+        while len(texts) < turns - 2:
+            if texts[-1][0] == "END_USER":
+                prompt = self._prompt(language) if rng.random() < self.prompt_ratio else None
+                requested = prompt[0] if prompt else None
+                texts.append(("AGENT", prompt[1] if prompt else rng.choice(self.agent_filler[language])))
+                continue
+            texts.append(("END_USER", self._customer_turn(language, requested)))
+        if texts[-1][0] == "AGENT":
+            texts.append(("END_USER", self._customer_turn(language, requested)))
+        closing = self.closings.get(language)
+        if closing:
+            texts.extend([("AGENT", closing[0]), ("END_USER", closing[1])])
+
+        entries, timestamp = [], start_timestamp_usec
+        for index, (role, text) in enumerate(texts):
+            entries.append({"start_timestamp_usec": timestamp, "text": text, "role": role,
+                            "user_id": 1 if role == "END_USER" else 2, "original_entry_index": index})
+            timestamp += rng.randint(2, 9) * 1_000_000
+        self.stats["conversations"] += 1
+        self.stats["utterances"] += len(entries)
+        self.stats[f"language_{language}"] += 1
+        return {"conversation_info": {"conversation_id": conversation_id, "categories": [{"display_name": category}],
+                                      "language_code": language},
+                "entries": entries}
+
+    def conversations(self, count: int, prefix: str = "synthetic"):
+        width = len(str(max(count - 1, 0)))
+        for i in range(count):
+            yield self.conversation(f"{prefix}_{i:0{width}d}")
+
+
+def load_conversations(path: str) -> list:
+    """Reads conversations from a .jsonl file, a single .json file or a directory of .json files."""
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    paths = sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+    conversations = []
+    for file_path in paths:
+        with open(file_path) as f:
+            conversations.append(json.load(f))
+    return conversations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--output", required=True, help="A .jsonl file, or a directory for one .json per conversation")
+    parser.add_argument("--prefix", default="synthetic", help="Conversation id and file name prefix")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-turns", type=int, default=8)
+    parser.add_argument("--max-turns", type=int, default=24)
+    parser.add_argument("--pii-density", type=float, default=0.5)
+    parser.add_argument("--prompt-ratio", type=float, default=0.5)
+    parser.add_argument("--trigger-ratio", type=float, default=1.0)
+    parser.add_argument("--context-types", nargs="+")
+    parser.add_argument("--languages", default="en", help="Language mix, e.g. en=0.8,es=0.1,fr=0.1")
+    args = parser.parse_args()
+
+    generator = TranscriptGenerator(seed=args.seed, min_turns=args.min_turns, max_turns=args.max_turns,
+                                    pii_density=args.pii_density, prompt_ratio=args.prompt_ratio,
+                                    trigger_ratio=args.trigger_ratio, context_types=args.context_types,
+                                    languages=parse_languages(args.languages))
+    if args.output.endswith(".jsonl"):
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            for conversation in generator.conversations(args.count, args.prefix):
+                f.write(json.dumps(conversation, ensure_ascii=False) + "\n")
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        for conversation in generator.conversations(args.count, args.prefix):
+            name = conversation["conversation_info"]["conversation_id"]
+            with open(os.path.join(args.output, f"{name}.json"), "w") as f:
+                json.dump(conversation, f, indent=4, ensure_ascii=False)
+    print(json.dumps(dict(sorted(generator.stats.items())), indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
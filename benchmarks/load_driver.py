@@ -0,0 +1,321 @@
+"""
+Open-loop load driver for the redaction pipeline.
+
+Replays conversations at target utterance rates and measures end-to-end
+completion, from the first utterance sent until the conversation's aggregate
+transcript (<conversation_id>_transcript.json) is in the GCS bucket. Two entry
+paths are supported:
+  initiate  POST /initiate-redaction on main_service, one request per
+            conversation, spaced so the utterances arrive at the target rate
+  push      publish to raw-transcripts the way live ingestion does: up to
+            --active-conversations calls are in progress at once, their
+            utterances interleaved at the target rate, and each call ends with a
+            conversation_ended event on the lifecycle topic
+Sending is paced by the clock and does not wait for responses, so queues build
+up when the pipeline falls behind. Each rate in --rates starts conversations
+for --duration seconds (calls in progress on the push path are then finished
+at the same pace), then the driver waits up to --drain-timeout for the
+aggregates. A step is saturated when conversations are missing or incomplete
+in GCS, requests fail, or p95 time from the last utterance to the aggregate
+exceeds --slo-ms (the aggregator waits 10 s before aggregating, so allow for
+that). Later steps are skipped after the first saturated one unless
+--keep-going is set. The report gives the highest sustained rate and is
+written as JSON.
+
+Conversations come from --transcripts (a .jsonl file or a directory written by
+generate_transcripts.py, or final_transcript/) or are generated on the fly.
+
+With --local the three services are started against the in-process fakes from
+bench_suite.py. Otherwise point it at a deployment: --main-url, --project and
+--bucket, with an ID token in --id-token or LOAD_DRIVER_ID_TOKEN for the
+initiate path and application default credentials for Pub/Sub and GCS.
+
+Usage (from the project root):
+    python benchmarks/load_driver.py --local --path initiate --rates 5 10 20 --duration 30
+    python benchmarks/load_driver.py --local --path push --rates 10 20 40 --transcripts /tmp/synthetic.jsonl
+    python benchmarks/load_driver.py --path push --project my-project --bucket my-aggregates --rates 50 100
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import BUCKET, LIFECYCLE_TOPIC, PROJECT, LocalStack, emulator_id_token, git_revision, percentile  # noqa: E402
+from generate_transcripts import TranscriptGenerator, load_conversations  # noqa: E402
+
+RAW_TOPIC = "raw-transcripts"
+
+
+def latency_summary(values_s: list) -> dict | None:
+    if not values_s:
+        return None
+    return {f"p{p}": round(percentile(values_s, p) * 1000, 1) for p in (50, 95, 99)}
+
+
+def conversation_source(args):
+    """An endless iterator of entry lists."""
+    if args.transcripts:
+        conversations = [c["entries"] for c in load_conversations(args.transcripts) if c.get("entries")]
+        if not conversations:
+            raise SystemExit(f"No conversations in {args.transcripts}")
+        return itertools.cycle(conversations)
+    generator = TranscriptGenerator(seed=args.seed)
+    return (generator.conversation(f"load_{i}")["entries"] for i in itertools.count())
+
+
+class CompletionTracker:
+    """Polls the bucket for each conversation's aggregate and counts the entries it holds."""
+
+    def __init__(self, bucket, poll_interval: float, workers: int = 16):
+        self.bucket = bucket
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self.expected = {}  # conversation_id -> (first_sent, utterance_count)
+        self.last_sent = {}  # conversation_id -> time the last utterance (or end event) was sent
+        self.completed = {}  # conversation_id -> (found_at, entries in the aggregate)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, name="completion-tracker", daemon=True)
+        self._thread.start()
+
+    def expect(self, conversation_id: str, first_sent: float, utterance_count: int):
+        with self._lock:
+            self.expected[conversation_id] = (first_sent, utterance_count)
+
+    def sent_all(self, conversation_id: str, at: float):
+        with self._lock:
+            self.last_sent[conversation_id] = at
+
+    def pending(self) -> list:
+        with self._lock:
+            return [cid for cid in self.last_sent if cid not in self.completed]
+
+    def _check(self, conversation_id):
+        blob = self.bucket.get_blob(f"{conversation_id}_transcript.json")
+        if blob is None:
+            return
+        found_at = time.time()
+        entries = len(json.loads(blob.download_as_bytes()).get("entries", []))
+        with self._lock:
+            self.completed[conversation_id] = (found_at, entries)
+
+    def _poll(self):
+        while not self._stop.is_set():
+            list(self._pool.map(self._check, self.pending()))
+            self._stop.wait(self.poll_interval)
+
+    def wait(self, timeout: float):
+        deadline = time.time() + timeout
+        while self.pending() and time.time() < deadline:
+            time.sleep(self.poll_interval)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._pool.shutdown()
+
+
+class Driver:
+    def __init__(self, args, main_url, project, bucket, id_token):
+        from google.cloud import pubsub_v1, storage
+
+        self.args = args
+        self.main_url = main_url
+        self.headers = {"Authorization": f"Bearer {id_token}"} if id_token else {}
+        self.publisher = pubsub_v1.PublisherClient()
+        self.raw_topic = self.publisher.topic_path(project, RAW_TOPIC)
+        self.lifecycle_topic = self.publisher.topic_path(project, LIFECYCLE_TOPIC)
+        self.bucket = storage.Client(project=project).bucket(bucket)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=args.max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.conversations = conversation_source(args)
+        self.run_id = uuid.uuid4().hex[:8]
+
+    def _publish(self, topic, payload: dict, errors: list):
+        future = self.publisher.publish(topic, json.dumps(payload).encode("utf-8"))
+        future.add_done_callback(lambda f: f.exception() and errors.append(str(f.exception())))
+
+    def _initiate(self, entries, tracker, errors, request_latencies):
+        segments = [{"speaker": "customer" if e["role"] == "END_USER" else "agent", "text": e["text"]} for e in entries]
+        started = time.time()
+        try:
+            response = self.session.post(f"{self.main_url}/initiate-redaction", headers=self.headers, timeout=60,
+                                         json={"transcript": {"transcript_segments": segments}})
+        except requests.RequestException as e:
+            errors.append(str(e))
+            return
+        finished = time.time()
+        request_latencies.append(finished - started)
+        if response.status_code != 202:
+            errors.append(f"HTTP {response.status_code}")
+            return
+        job_id = response.json()["jobId"]
+        tracker.expect(job_id, started, len(entries))
+        tracker.sent_all(job_id, finished)
+
+    def run_step(self, rate: float) -> dict:
+        args = self.args
+        tracker = CompletionTracker(self.bucket, args.poll_interval)
+        errors, request_latencies, lags = [], [], []
+        sent = conversations = 0
+        active = []  # push path: [conversation_id, entries, next index]
+        pool = ThreadPoolExecutor(max_workers=args.max_in_flight)
+        start = time.monotonic()
+        while time.monotonic() - start < args.duration or active:
+            due = start + sent / rate
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            lags.append(max(0.0, -delay))
+            if args.path == "initiate":
+                entries = next(self.conversations)
+                pool.submit(self._initiate, entries, tracker, errors, request_latencies)
+                sent += len(entries)
+                conversations += 1
+                continue
+            while len(active) < args.active_conversations and time.monotonic() - start < args.duration:
+                conversation_id = f"load-{self.run_id}-{rate:g}-{conversations}"
+                active.append([conversation_id, next(self.conversations), 0])
+                self._publish(self.lifecycle_topic, {"conversation_id": conversation_id, "event_type": "conversation_started",
+                                                     "start_time": datetime.now(timezone.utc).isoformat()}, errors)
+                conversations += 1
+            conversation = active[sent % len(active)]
+            conversation_id, entries, index = conversation
+            entry = entries[index]
+            if index == 0:
+                tracker.expect(conversation_id, time.time(), len(entries))
+            self._publish(self.raw_topic, {"conversation_id": conversation_id, "original_entry_index": index,
+                                           "participant_role": entry["role"], "text": entry["text"],
+                                           "user_id": entry.get("user_id", 1 if entry["role"] == "END_USER" else 2),
+                                           "start_timestamp_usec": int(time.time() * 1_000_000)}, errors)
+            sent += 1
+            conversation[2] += 1
+            if conversation[2] == len(entries):
+                active.remove(conversation)
+                self._publish(self.lifecycle_topic, {"conversation_id": conversation_id, "event_type": "conversation_ended",
+                                                     "end_time": datetime.now(timezone.utc).isoformat(),
+                                                     "total_utterance_count": len(entries)}, errors)
+                tracker.sent_all(conversation_id, time.time())
+        elapsed = time.monotonic() - start
+        pool.shutdown(wait=True)
+        tracker.wait(args.drain_timeout)
+        tracker.stop()
+
+        finished = [cid for cid in tracker.last_sent if cid in tracker.completed]
+        partial = [cid for cid in finished if tracker.completed[cid][1] < tracker.expected[cid][1]]
+        completion = [tracker.completed[cid][0] - tracker.expected[cid][0] for cid in finished]
+        after_last_send = [tracker.completed[cid][0] - tracker.last_sent[cid] for cid in finished]
+        tracked = len(tracker.last_sent)
+        step = {
+            "target_utterances_per_second": rate,
+            "offered_utterances_per_second": round(sent / elapsed, 1),
+            "utterances": sent,
+            "conversations_started": conversations,
+            "conversations_tracked": tracked,
+            "completed": len(finished) - len(partial),
+            "partial": len(partial),
+            "missing": tracked - len(finished),
+            "errors": len(errors),
+            "completion_ms": latency_summary(completion),
+            "after_last_send_ms": latency_summary(after_last_send),
+            "initiate_request_ms": latency_summary(request_latencies),
+            "send_lag_ms": latency_summary(lags),
+        }
+        if errors:
+            step["first_error"] = errors[0]
+        step["saturated"] = bool(
+            not tracked or partial or step["missing"] or errors
+            or percentile(after_last_send, 95) * 1000 > args.slo_ms
+        )
+        if step["offered_utterances_per_second"] < 0.95 * rate:
+            step["driver_limited"] = True  # The driver itself could not send at the target rate
+        return step
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", choices=("initiate", "push"), default="initiate")
+    parser.add_argument("--rates", type=float, nargs="+", default=[5, 10, 20], help="Target utterances per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of sending per rate")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="Seconds to wait for aggregates after a step")
+    parser.add_argument("--slo-ms", type=float, default=30000, help="p95 limit on last utterance -> aggregate")
+    parser.add_argument("--keep-going", action="store_true", help="Run every rate even after one saturates")
+    parser.add_argument("--active-conversations", type=int, default=20, help="Concurrent calls on the push path")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Concurrent /initiate-redaction requests")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between GCS checks")
+    parser.add_argument("--transcripts", help="A .jsonl file or directory of conversations (default: generated)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated conversations")
+    parser.add_argument("--local", action="store_true", help="Start the services against in-process fakes")
+    parser.add_argument("--dlp-latency-ms", type=float, default=50, help="Simulated DLP latency with --local")
+    parser.add_argument("--base-port", type=int, default=18080)
+    parser.add_argument("--service-logs", help="Directory for the services' stdout/stderr with --local")
+    parser.add_argument("--main-url")
+    parser.add_argument("--project")
+    parser.add_argument("--bucket")
+    parser.add_argument("--id-token", default=os.getenv("LOAD_DRIVER_ID_TOKEN"))
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/load-<path>-<commit>.json)")
+    args = parser.parse_args()
+
+    stack = None
+    if args.local:
+        stack = LocalStack(args.base_port, args.dlp_latency_ms, dlp_workers=256, push_workers=256,
+                           conversation_ended=True, log_dir=args.service_logs)
+        os.environ["PUBSUB_EMULATOR_HOST"] = stack.fakes["pubsub"].address
+        os.environ["STORAGE_EMULATOR_HOST"] = stack.fakes["gcs"].url
+        main_url, project, bucket, id_token = stack.urls["main_service"], PROJECT, BUCKET, emulator_id_token(PROJECT)
+    else:
+        main_url, project, bucket, id_token = args.main_url, args.project, args.bucket, args.id_token
+        missing = [flag for flag, value in (("--project", project), ("--bucket", bucket)) if not value]
+        if args.path == "initiate":
+            missing += [flag for flag, value in (("--main-url", main_url), ("--id-token", id_token)) if not value]
+        if missing:
+            parser.error(f"{', '.join(missing)} required without --local")
+
+    report = {
+        **git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: getattr(args, key) for key in ("path", "rates", "duration", "drain_timeout", "slo_ms",
+                                                        "active_conversations", "transcripts", "local", "dlp_latency_ms")},
+        "steps": [],
+    }
+    try:
+        if stack:
+            stack.start()
+        driver = Driver(args, main_url, project, bucket, id_token)
+        for rate in args.rates:
+            print(f"Driving {rate:g} utterances/s through the {args.path} path for {args.duration:g}s", file=sys.stderr)
+            step = driver.run_step(rate)
+            report["steps"].append(step)
+            print(json.dumps(step), file=sys.stderr)
+            if step["saturated"] and not args.keep_going:
+                break
+    finally:
+        if stack:
+            stack.stop()
+
+    sustained = [s["target_utterances_per_second"] for s in report["steps"] if not s["saturated"]]
+    report["max_sustained_utterances_per_second"] = max(sustained, default=None)
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"load-{args.path}-{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
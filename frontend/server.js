@@ -18,9 +18,11 @@ app.use((req, res, next) => {
 app.use(express.static(path.join(__dirname, 'build')));
 
 // Proxy API requests to the backend service
-app.use('/api', createProxyMiddleware({
+// ws: true also forwards WebSocket upgrades (/api/realtime-session/<conversationId>).
+const apiProxy = createProxyMiddleware({
     target: BACKEND_SERVICE_URL,
     changeOrigin: true,
+    ws: true,
     pathRewrite: {
         '^/api': '', // remove /api prefix when forwarding to backend
     },
@@ -31,16 +33,23 @@ app.use('/api', createProxyMiddleware({
     },
     onError: (err, req, res) => {
         console.error('Proxy error:', err);
-        res.status(500).send('Proxy error');
+        if (typeof res.status === 'function') {
+            res.status(500).send('Proxy error');
+        } else {
+            res.destroy(); // WebSocket upgrade: res is the client socket
+        }
     }
-}));
+});
+app.use('/api', apiProxy);
 
 // All other requests are served by the React app
 app.get('*', (req, res) => {
     res.sendFile(path.join(__dirname, 'build', 'index.html'));
 });
 
-app.listen(PORT, () => {
+const server = app.listen(PORT, () => {
     console.log(`Frontend proxy server listening on port ${PORT}`);
     console.log(`Proxying backend requests to: ${BACKEND_SERVICE_URL}`);
-});
\ No newline at end of file
+});
+// Upgrades bypass express routing, so hand them to the proxy directly.
+server.on('upgrade', apiProxy.upgrade);
\ No newline at end of file
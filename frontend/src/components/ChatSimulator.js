@@ -18,14 +18,85 @@ const ChatSimulator = ({ setView, setJobId }) => {
     const [customerInput, setCustomerInput] = useState('');
     const [agentInput, setAgentInput] = useState('');
     const conversationIdRef = useRef(null);
+    // Realtime session: one authenticated WebSocket per conversation (backend in SERVER_MODE=asgi).
+    // While it is not ready, utterances fall back to one HTTP request each.
+    const sessionRef = useRef(null);
+    const sessionReadyRef = useRef(false);
+    const pendingRef = useRef({});
+    const nextMessageIdRef = useRef(0);
 
     useEffect(() => {
         // Generate a unique conversation ID when the component mounts
         if (!conversationIdRef.current) {
             conversationIdRef.current = uuidv4();
         }
+
+        const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${protocol}://${window.location.host}/api/realtime-session/${conversationIdRef.current}`);
+        sessionRef.current = socket;
+
+        const settlePending = () => {
+            Object.values(pendingRef.current).forEach(resolve => resolve(null));
+            pendingRef.current = {};
+        };
+
+        socket.onopen = async () => {
+            try {
+                const auth = getAuth();
+                if (!auth.currentUser) {
+                    throw new Error("User not authenticated.");
+                }
+                const idToken = await auth.currentUser.getIdToken();
+                socket.send(JSON.stringify({ type: 'auth', id_token: idToken }));
+            } catch (error) {
+                console.error('Could not authenticate realtime session:', error);
+                socket.close();
+            }
+        };
+        socket.onmessage = (event) => {
+            const data = JSON.parse(event.data);
+            if (data.type === 'ready') {
+                sessionReadyRef.current = true;
+            } else if (data.id !== undefined && pendingRef.current[data.id]) {
+                pendingRef.current[data.id](data.type === 'redacted' ? data.redacted_utterance : null);
+                delete pendingRef.current[data.id];
+            } else if (data.type === 'error') {
+                console.error('Realtime session error:', data.error);
+            }
+        };
+        socket.onclose = () => {
+            sessionReadyRef.current = false;
+            settlePending();
+        };
+
+        return () => {
+            sessionReadyRef.current = false;
+            socket.close();
+            settlePending();
+        };
     }, []);
 
+    // Resolves with the redacted utterance, or null if the session cannot handle it.
+    const redactOverSession = (type, text) => {
+        const socket = sessionRef.current;
+        if (!sessionReadyRef.current || !socket || socket.readyState !== WebSocket.OPEN) {
+            return Promise.resolve(null);
+        }
+        const id = nextMessageIdRef.current++;
+        return new Promise(resolve => {
+            pendingRef.current[id] = resolve;
+            socket.send(JSON.stringify({ type, id, utterance: text }));
+        });
+    };
+
+    const getIdToken = async () => {
+        const auth = getAuth();
+        if (!auth.currentUser) {
+            throw new Error("User not authenticated.");
+        }
+        return auth.currentUser.getIdToken(true);
+    };
+
     const handleSendMessage = async (speaker, text) => {
         if (text.trim() === '') return;
         const role = speaker === 'Customer' ? 'END_USER' : 'AGENT';
@@ -41,14 +112,10 @@ const ChatSimulator = ({ setView, setJobId }) => {
         }
 
         try {
-            const auth = getAuth();
-            if (!auth.currentUser) {
-                throw new Error("User not authenticated.");
-            }
-            const idToken = await auth.currentUser.getIdToken(true);
-
-            let redactedContent = '';
-            if (role === 'AGENT') {
+            // Realtime session first; null means it is unavailable and HTTP is used instead.
+            let redactedContent = await redactOverSession(role === 'AGENT' ? 'agent' : 'customer', text);
+            if (redactedContent === null && role === 'AGENT') {
+                const idToken = await getIdToken();
                 // Agent utterance: call handle-agent-utterance and get redacted text
                 const response = await fetch(`/api/handle-agent-utterance`, {
                     method: 'POST',
@@ -68,8 +135,9 @@ const ChatSimulator = ({ setView, setJobId }) => {
 
                 const data = await response.json();
                 redactedContent = data.redacted_transcript;
-            } else {
+            } else if (redactedContent === null) {
                 // Customer utterance: call real-time redaction
+                const idToken = await getIdToken();
                 const response = await fetch(`/api/redact-utterance-realtime`, {
                     method: 'POST',
                     headers: {
@@ -27,8 +27,12 @@ const ResultsView = ({ jobId, setView, idToken }) => {
     useEffect(() => {
         if (!jobId) return;
 
-        // Fast polling for real-time results from transcript aggregator
-        const fastPoll = setInterval(async () => {
+        let poll = null;
+        let fastPoll = null;
+        const abortController = new AbortController();
+
+        // Partial results from the transcript aggregator
+        const fetchPartialResults = async () => {
             try {
                 const aggregatorUrl = process.env.REACT_APP_TRANSCRIPT_AGGREGATOR_URL ||
                     process.env.REACT_APP_BACKEND_URL.replace('/main-service', '/transcript-aggregator');
@@ -51,59 +55,157 @@ const ResultsView = ({ jobId, setView, idToken }) => {
                     }
 
                     // If we have partial data, update status to show progress
-                    if (data.status === 'PARTIAL' && status === 'PROCESSING') {
-                        setStatus('PARTIAL');
+                    if (data.status === 'PARTIAL') {
+                        setStatus(prev => (prev === 'PROCESSING' ? 'PARTIAL' : prev));
                     }
                 }
             } catch (err) {
                 // Silently fail fast polling - main polling will handle errors
                 console.log('Fast polling failed, falling back to main service:', err.message);
             }
-        }, 3000); // Poll every 3 seconds for fast updates
+        };
 
-        // Standard polling for final status from main service
-        const poll = setInterval(async () => {
-            try {
-                const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/redaction-status/${jobId}`, {
-                    headers: {
-                        'Authorization': `Bearer ${idToken}`,
-                    },
-                });
-                if (!response.ok) {
-                    throw new Error(`HTTP error! status: ${response.status}`);
-                }
-                const data = await response.json();
+        // Polls /redaction-status. When the backend advertises /redaction-events (and
+        // streaming has not already failed), switches to the event stream instead.
+        const startPolling = (allowEvents) => {
+            // Fast polling for real-time results from transcript aggregator
+            fastPoll = setInterval(fetchPartialResults, 3000); // Poll every 3 seconds for fast updates
 
-                if (data.original_conversation) {
-                    setOriginalConversation(data.original_conversation);
-                }
-                if (data.redacted_conversation) {
-                    setRedactedConversation(data.redacted_conversation);
-                }
+            // Standard polling for final status from main service
+            let statusEtag = null; // Unchanged jobs answer 304 with no body
+            const pollStatus = async () => {
+                try {
+                    const headers = { 'Authorization': `Bearer ${idToken}` };
+                    if (statusEtag) headers['If-None-Match'] = statusEtag;
+                    const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/redaction-status/${jobId}`, {
+                        headers,
+                    });
+                    if (response.status === 304) return;
+                    statusEtag = response.headers.get('ETag');
+                    if (!response.ok) {
+                        throw new Error(`HTTP error! status: ${response.status}`);
+                    }
+                    const data = await response.json();
 
-                if (data.status === 'DONE') {
-                    setStatus('DONE');
-                    clearInterval(poll);
-                    clearInterval(fastPoll); // Stop fast polling when done
-                } else if (data.status === 'FAILED') {
+                    if (data.original_conversation) {
+                        setOriginalConversation(data.original_conversation);
+                    }
+                    if (data.redacted_conversation) {
+                        setRedactedConversation(data.redacted_conversation);
+                    }
+
+                    if (data.status === 'DONE') {
+                        setStatus('DONE');
+                        clearInterval(poll);
+                        clearInterval(fastPoll); // Stop fast polling when done
+                    } else if (data.status === 'FAILED') {
+                        setStatus('FAILED');
+                        setError('Processing failed. Please try again.');
+                        clearInterval(poll);
+                        clearInterval(fastPoll); // Stop fast polling on failure
+                    } else if (allowEvents && response.headers.get('X-Redaction-Events') === 'available') {
+                        allowEvents = false; // A poll still in flight must not open a second stream
+                        clearInterval(poll);
+                        clearInterval(fastPoll);
+                        followEvents();
+                    }
+                } catch (err) {
                     setStatus('FAILED');
-                    setError('Processing failed. Please try again.');
+                    setError('An error occurred while fetching the results.');
                     clearInterval(poll);
-                    clearInterval(fastPoll); // Stop fast polling on failure
+                    clearInterval(fastPoll); // Stop fast polling on error
+                }
+            };
+            poll = setInterval(pollStatus, 3000); // Poll every 3 seconds for final status
+            pollStatus();
+        };
+
+        // Push updates from /redaction-events (server-sent events over fetch so the
+        // Authorization header can be sent). Only used when the backend advertises it;
+        // falls back to polling if the stream fails or is refused (503).
+        const streamEvents = async () => {
+            const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/redaction-events/${jobId}`, {
+                headers: {
+                    'Authorization': `Bearer ${idToken}`,
+                    'Accept': 'text/event-stream',
+                },
+                signal: abortController.signal,
+            });
+            if (!response.ok || !response.body) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+                    const frame = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    let eventType = 'message';
+                    let data = '';
+                    for (const line of frame.split('\n')) {
+                        if (line.startsWith('event: ')) eventType = line.slice(7);
+                        else if (line.startsWith('data: ')) data += line.slice(6);
+                    }
+                    if (!data) continue; // keepalive comment
+                    const event = JSON.parse(data);
+
+                    if (eventType === 'snapshot') {
+                        setOriginalConversation(event.original_conversation);
+                        fetchPartialResults(); // Segments redacted before the stream opened
+                    } else if (eventType === 'segment') {
+                        setRedactedConversation(prev => {
+                            const segments = prev ? [...prev.transcript.transcript_segments] : [];
+                            segments[event.original_entry_index] = { speaker: event.speaker, text: event.text };
+                            return { transcript: { transcript_segments: segments } };
+                        });
+                        setStatus(prev => (prev === 'PROCESSING' ? 'PARTIAL' : prev));
+                    } else if (eventType === 'status') {
+                        if (event.redacted_conversation) {
+                            setRedactedConversation(event.redacted_conversation);
+                        }
+                        if (event.status === 'DONE') {
+                            setStatus('DONE');
+                            if (!event.redacted_conversation) {
+                                await fetchPartialResults(); // Complete, ordered transcript
+                            }
+                        } else if (event.status === 'FAILED') {
+                            setStatus('FAILED');
+                            setError('Processing failed. Please try again.');
+                        }
+                        return true;
+                    }
                 }
-            } catch (err) {
-                setStatus('FAILED');
-                setError('An error occurred while fetching the results.');
-                clearInterval(poll);
-                clearInterval(fastPoll); // Stop fast polling on error
             }
-        }, 3000); // Poll every 3 seconds for final status
+            return false; // Stream ended without a final status (server-side time limit)
+        };
+
+        const followEvents = async () => {
+            while (!abortController.signal.aborted) {
+                try {
+                    if (await streamEvents()) return;
+                } catch (err) {
+                    if (abortController.signal.aborted) return;
+                    console.log('Event stream unavailable, falling back to polling:', err.message);
+                    startPolling(false);
+                    return;
+                }
+            }
+        };
+
+        startPolling(true);
 
         return () => {
+            abortController.abort();
             clearInterval(poll);
             clearInterval(fastPoll);
         };
-    }, [jobId, idToken, status]);
+    }, [jobId, idToken]);
 
     const handleScroll = (scrolledPanel) => {
         if (isScrolling.current) return;
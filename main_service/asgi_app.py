@@ -0,0 +1,772 @@
+"""
+ASGI variant of the main_service redaction endpoints.
+
+Serves /handle-agent-utterance, /handle-customer-utterance,
+/redact-utterance-realtime, /redaction-status/<job_id> and
+/initiate-redaction-stream with the same JSON contracts as main.py, but on asyncio: DLP and CCAI calls go through the async
+gRPC clients, Redis through redis.asyncio, and Firebase token verification runs
+in a worker thread. One instance can keep hundreds of redactions in flight
+instead of one per gunicorn thread. It also serves the WebSocket
+/realtime-session/<conversation_id>, which has no Flask equivalent.
+
+Configuration, DLP request templates, the keyword matcher, the PII
+pre-filter, the redaction cache and the DLP micro-batcher are shared with main.py. Every other route (e.g. /initiate-redaction)
+is passed through to the Flask app in main.py. Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8080
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import CancelledError
+from contextlib import nullcontext
+from functools import wraps
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.wsgi import WsgiToAsgi
+from firebase_admin import auth
+from google.api_core.exceptions import NotFound, PermissionDenied, GoogleAPICallError
+from google.cloud import contact_center_insights_v1
+from google.cloud import dlp_v2
+from quart import Quart, Response, after_this_request, request, jsonify, websocket
+from quart.asgi import ASGIHTTPConnection
+from quart.wrappers import Body, Request
+from quart_cors import cors
+from werkzeug.exceptions import ClientDisconnected
+
+import job_events
+import main as sync_main
+from dlp_rate_limiter import DlpOverloaded
+from redis_store import decode_chunks
+import structured_logging  # shared/, on the path once main is imported
+
+logger = logging.getLogger(__name__)
+events = structured_logging.get_logger(__name__)
+
+quart_app = cors(Quart(__name__), allow_origin=sync_main.frontend_url, expose_headers=["ETag", sync_main.REDACTION_EVENTS_HEADER])
+
+
+# Quart reads every request body into memory as fast as the client sends it. These
+# paths instead read it from the ASGI receive channel only as the handler consumes it,
+# so the server stops reading the socket while the upload is being processed.
+RECEIVE_ON_DEMAND_PATHS = ("/initiate-redaction-stream",)
+
+
+class ReceiveOnDemandBody(Body):
+    """A request body that can only be iterated; each chunk is received when it is asked for."""
+
+    def __init__(self):
+        super().__init__(None, None)
+        self._receive = None
+        self._attached = asyncio.Event()
+        self.consumed = asyncio.Event()  # Set once the last chunk was received or the client left
+
+    def attach(self, receive):
+        self._receive = receive
+        self._attached.set()
+
+    async def __anext__(self) -> bytes:
+        await self._attached.wait()
+        while not self.consumed.is_set():
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                self.consumed.set()
+                raise ClientDisconnected()
+            if not message.get("more_body", False):
+                self.consumed.set()
+            if message.get("body"):
+                return message["body"]
+        raise StopAsyncIteration()
+
+    def __await__(self):
+        raise RuntimeError("This request body can only be consumed with 'async for'")
+
+
+class OnDemandBodyRequest(Request):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.method == "POST" and self.path in RECEIVE_ON_DEMAND_PATHS:
+            self.body = ReceiveOnDemandBody()
+
+
+class OnDemandBodyConnection(ASGIHTTPConnection):
+    async def handle_messages(self, request, receive):
+        if isinstance(request.body, ReceiveOnDemandBody):
+            # The handler owns the receive channel until the body is consumed; then only the disconnect is left.
+            request.body.attach(receive)
+            await request.body.consumed.wait()
+        await super().handle_messages(request, receive)
+
+
+quart_app.request_class = OnDemandBodyRequest
+quart_app.asgi_http_class = OnDemandBodyConnection
+
+dlp_async_client = None
+redis_async_client = None
+# Only the /redaction-status fallback needs CCAI; created on first use, inside the serving loop.
+get_ccai_async_client = sync_main.startup.lazy("ccai_async_client", contact_center_insights_v1.ContactCenterInsightsAsyncClient)
+
+
+@quart_app.before_serving
+async def initialize_async_clients():
+    """Async gRPC and Redis clients must be created inside the serving event loop."""
+    global dlp_async_client
+
+    try:
+        dlp_emulator_host = os.getenv("DLP_EMULATOR_HOST")
+        if dlp_emulator_host:
+            import grpc
+            from google.cloud.dlp_v2.services.dlp_service.transports import DlpServiceGrpcAsyncIOTransport
+            channel = grpc.aio.insecure_channel(dlp_emulator_host)
+            dlp_async_client = dlp_v2.DlpServiceAsyncClient(transport=DlpServiceGrpcAsyncIOTransport(channel=channel))
+        else:
+            dlp_async_client = dlp_v2.DlpServiceAsyncClient()
+        logger.info("Successfully initialized async DLP client.")
+    except Exception as e:
+        logger.error(f"Could not initialize async DLP client. Error: {str(e)}")
+
+    await reconnect_async_redis()
+
+    # A rotated Redis endpoint is applied by sync_main.init_redis in the secret refresh
+    # thread; rebuild the async client on this loop once the sync clients have switched.
+    loop = asyncio.get_running_loop()
+    sync_main.redis_reconnect_callbacks.append(
+        lambda: asyncio.run_coroutine_threadsafe(reconnect_async_redis(), loop))
+
+
+async def reconnect_async_redis():
+    """Connects to sync_main's current Redis endpoint and swaps the client in once it answers a ping."""
+    global redis_async_client
+    try:
+        client = aioredis.Redis(host=sync_main.REDIS_HOST, port=sync_main.REDIS_PORT, db=0,
+                                decode_responses=True, socket_connect_timeout=10,
+                                socket_timeout=sync_main.REDIS_OP_TIMEOUT_SECONDS,
+                                max_connections=int(os.getenv('ASYNC_REDIS_MAX_CONNECTIONS', 256)))
+        await client.ping()
+    except Exception as e:
+        logger.error(f"Async Redis client initialization or ping failed. Error: {str(e)}")
+        return
+    old_client, redis_async_client = redis_async_client, client
+    logger.info("Successfully connected async Redis client.")
+    if old_client:
+        # Requests still holding a connection finish on it; idle ones are closed now.
+        await old_client.connection_pool.disconnect(inuse_connections=False)
+
+
+@quart_app.after_serving
+async def close_async_clients():
+    if redis_async_client:
+        await redis_async_client.aclose()
+
+
+# --- Authentication Decorator ---
+async def verify_id_token(id_token: str) -> dict:
+    """Cached claims when available; otherwise verify_id_token, which is blocking, in a worker thread."""
+    token_cache = sync_main.token_cache
+    decoded_token = token_cache.lookup(id_token) if token_cache else None
+    if decoded_token is None:
+        # verify_id_token is blocking (signature check, occasional key fetch).
+        if token_cache:
+            decoded_token = await asyncio.to_thread(token_cache.verify, id_token)
+        else:
+            decoded_token = await asyncio.to_thread(auth.verify_id_token, id_token,
+                                                    check_revoked=sync_main.AUTH_CHECK_REVOKED)
+    return decoded_token
+
+
+def firebase_auth_required(f):
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            logger.warning("Authentication: Missing Authorization header.")
+            return jsonify({"error": "Authorization header missing"}), 401
+
+        try:
+            id_token = auth_header.split('Bearer ')[1]
+            with sync_main.metrics.stage("firebase_auth"):
+                decoded_token = await verify_id_token(id_token)
+            request.firebase_user = decoded_token
+            events.info("auth_token_verified", uid=decoded_token['uid'])
+        except IndexError:
+            logger.warning("Authentication: Invalid Authorization header format.")
+            return jsonify({"error": "Invalid Authorization header format"}), 401
+        except auth.InvalidIdTokenError as e:
+            logger.warning(f"Authentication: Invalid ID token. Error: {e}")
+            return jsonify({"error": "Invalid authentication token"}), 403
+        except Exception as e:
+            logger.error(f"Authentication: An unexpected error occurred during token verification: {e}")
+            return jsonify({"error": "Authentication failed"}), 500
+        return await f(*args, **kwargs)
+    return decorated_function
+
+
+@quart_app.errorhandler(DlpOverloaded)
+async def handle_dlp_overloaded(e):
+    body, headers = sync_main.dlp_overloaded_response(e)
+    return jsonify(body), 503, headers
+
+
+async def call_dlp_for_redaction(transcript: str, context: dict | None, config=None) -> str:
+    """Async counterpart of main.call_dlp_for_redaction, with the same results and error markers."""
+    config = config or sync_main.dlp_config.current
+    local_result = sync_main.local_dlp_result(transcript, context, config)
+    if local_result is not None:
+        return local_result
+
+    if not dlp_async_client:
+        logger.warning("Async DLP client not available. Returning original transcript.")
+        return transcript
+
+    templates = config.request_templates
+    if not templates:
+        logger.warning("GOOGLE_CLOUD_PROJECT environment variable not configured correctly. Returning original transcript.")
+        return transcript
+
+    if config.pii_prefilter and config.pii_prefilter.should_skip_dlp(transcript, context):
+        events.info("dlp_skipped", reason="prefilter_no_candidates")
+        return transcript
+
+    with sync_main.metrics.stage("context_config"):
+        template = templates.for_context(context)
+    redaction_cache = sync_main.redaction_cache
+    if redaction_cache:
+        expected_pii_type = context.get("expected_pii_type") if context else None
+        redacted = await redaction_cache.get_or_compute_async(
+            transcript, expected_pii_type, config.version,
+            compute=lambda: _deidentify_with_dlp(templates, template, transcript),
+            is_cacheable=lambda result: not result.startswith(sync_main.DLP_ERROR_MARKERS))
+    else:
+        redacted = await _deidentify_with_dlp(templates, template, transcript)
+    sync_main.shadow_compare_dlp_result(transcript, context, redacted, config)
+    return redacted
+
+
+def dlp_slot():
+    """Admission through main.dlp_limiter, reserving tokens with the async Redis client."""
+    limiter = sync_main.dlp_limiter
+    return limiter.async_slot(redis_async_client) if limiter else nullcontext()
+
+
+async def submit_to_batcher(batcher, template, transcript: str) -> str:
+    """Joins main.dlp_batcher's micro-batches; the batch RPC runs on the batcher's threads."""
+    future = asyncio.wrap_future(batcher.submit_async(template, transcript))
+    # Shielded: a timed-out caller must not cancel the Future the batcher will still resolve.
+    return await asyncio.wait_for(asyncio.shield(future), timeout=batcher.request_timeout)
+
+
+async def _deidentify_with_dlp(templates, template, transcript: str) -> str:
+    try:
+        batcher = sync_main.dlp_batcher
+        if batcher:
+            # The batcher admits each batch RPC through the rate limiter itself.
+            with sync_main.metrics.stage("dlp_rpc"):
+                return await submit_to_batcher(batcher, template, transcript)
+        async with dlp_slot():
+            with sync_main.metrics.stage("dlp_rpc"):
+                response = await dlp_async_client.deidentify_content(request=template.build(transcript))
+        return response.item.value
+    except DlpOverloaded:
+        raise
+    except NotFound as e:
+        events.warning("dlp_template_not_found", error=str(e))
+        try:
+            fallback_request = template.build(transcript, fallback=True)
+            async with dlp_slot():
+                with sync_main.metrics.stage("dlp_rpc"):
+                    response = await dlp_async_client.deidentify_content(request=fallback_request)
+            return response.item.value
+        except DlpOverloaded:
+            raise
+        except Exception as fallback_e:
+            events.error("dlp_fallback_failed", error=str(fallback_e))
+            return f"[DLP_FALLBACK_PROCESSING_ERROR] {transcript}"
+    except Exception as e:
+        return sync_main._dlp_error_result(e, transcript, templates)
+
+
+async def get_context(conversation_id: str) -> dict | None:
+    """Same near-cache protocol as RedisStore.get_context; hits never touch the event loop's Redis client."""
+    context_cache = sync_main.context_cache
+    if context_cache:
+        found, context = context_cache.lookup(conversation_id)
+        if found:
+            return context
+    if not redis_async_client:
+        logger.warning("Redis client not available for context retrieval.")
+        return None
+    if context_cache:
+        context_cache.begin_fetch(conversation_id)
+    try:
+        with sync_main.metrics.stage("redis_get_context"):
+            async with redis_async_client.pipeline(transaction=False) as pipe:
+                pipe.get(f"context:{conversation_id}")
+                pipe.pttl(f"context:{conversation_id}")
+                context_data_str, pttl_ms = await pipe.execute()
+        context = json.loads(context_data_str) if context_data_str else None
+        if context_cache:
+            context_cache.finish_fetch(conversation_id, context, pttl_ms)
+        return context
+    except redis.exceptions.RedisError as e:
+        events.error("context_retrieve_failed", conversation_id=conversation_id, error=str(e))
+    except json.JSONDecodeError as e:
+        events.error("context_decode_failed", conversation_id=conversation_id, error=str(e))
+    if context_cache:
+        context_cache.cancel_fetch(conversation_id)
+    return None
+
+
+async def store_context(conversation_id: str, context_value: dict) -> bool:
+    if not redis_async_client:
+        logger.warning(f"Redis client not available, cannot store context for conversation_id: {conversation_id}")
+        return False
+    context_cache = sync_main.context_cache
+    if context_cache:
+        context_cache.begin_write(conversation_id)
+    ok = False
+    try:
+        with sync_main.metrics.stage("redis_setex_context"):
+            await redis_async_client.setex(f"context:{conversation_id}", sync_main.CONTEXT_TTL_SECONDS,
+                                           json.dumps(context_value))
+        ok = True
+    except redis.exceptions.RedisError as e:
+        events.error("context_store_failed", conversation_id=conversation_id, error=str(e))
+    finally:
+        if context_cache:
+            context_cache.finish_write(conversation_id, context_value, sync_main.CONTEXT_TTL_SECONDS, ok)
+    return ok
+
+
+@quart_app.route('/handle-agent-utterance', methods=['POST'])
+async def handle_agent_utterance():
+    data = await request.get_json()
+    if not data or 'conversation_id' not in data or 'transcript' not in data:
+        return jsonify({"error": "Missing conversation_id or transcript"}), 400
+
+    conversation_id = data['conversation_id']
+    transcript = data['transcript']
+    config = sync_main.dlp_config.current
+
+    redacted_transcript = await call_dlp_for_redaction(transcript, context=None, config=config)
+    expected_pii_type = sync_main.extract_expected_pii(transcript, config)
+
+    if expected_pii_type:
+        context_value = {
+            "expected_pii_type": expected_pii_type,
+            "agent_transcript": transcript,
+            "timestamp": time.time()
+        }
+        if await store_context(conversation_id, context_value):
+            events.info("context_stored", conversation_id=conversation_id, expected_pii_type=expected_pii_type,
+                        ttl_seconds=sync_main.CONTEXT_TTL_SECONDS, payload=context_value)
+
+    return jsonify({"redacted_transcript": redacted_transcript, "context_stored": expected_pii_type is not None,
+                    "dlp_config_version": config.version}), 200
+
+
+@quart_app.route('/handle-customer-utterance', methods=['POST'])
+async def handle_customer_utterance():
+    data = await request.get_json()
+    if not data or 'conversation_id' not in data or 'transcript' not in data:
+        return jsonify({"error": "Missing conversation_id or transcript"}), 400
+
+    retrieved_context = await get_context(data['conversation_id'])
+    config = sync_main.dlp_config.current
+    redacted_transcript = await call_dlp_for_redaction(data['transcript'], retrieved_context, config)
+    return jsonify({"redacted_transcript": redacted_transcript, "context_used": retrieved_context is not None,
+                    "dlp_config_version": config.version}), 200
+
+
+@quart_app.route('/redact-utterance-realtime', methods=['POST'])
+@firebase_auth_required
+async def redact_utterance_realtime():
+    data = await request.get_json()
+    if not data or 'conversation_id' not in data or 'utterance' not in data:
+        return jsonify({"error": "Missing conversation_id or utterance"}), 400
+
+    utterance = data['utterance']
+    retrieved_context = await get_context(data['conversation_id'])
+    config = sync_main.dlp_config.current
+
+    if retrieved_context and "agent_transcript" in retrieved_context:
+        # Combine agent and customer utterances for context, then keep the customer's line.
+        combined_text = f"{retrieved_context['agent_transcript']}\n{utterance}"
+        full_redacted_text = await call_dlp_for_redaction(combined_text, retrieved_context, config)
+        redacted_utterance = full_redacted_text.splitlines()[-1]
+    else:
+        redacted_utterance = await call_dlp_for_redaction(utterance, retrieved_context, config)
+
+    return jsonify({"redacted_utterance": redacted_utterance, "dlp_config_version": config.version}), 200
+
+
+# --- Realtime session (WebSocket) ---
+REALTIME_SESSION_IDLE_SECONDS = float(os.getenv('REALTIME_SESSION_IDLE_SECONDS', 300))
+REALTIME_AUTH_TIMEOUT_SECONDS = float(os.getenv('REALTIME_AUTH_TIMEOUT_SECONDS', 10))
+
+
+def context_is_live(context: dict | None) -> bool:
+    """Session context expires like its Redis copy, CONTEXT_TTL_SECONDS after the agent's question."""
+    return bool(context) and time.time() - context.get("timestamp", 0) < sync_main.CONTEXT_TTL_SECONDS
+
+
+async def authenticate_websocket() -> dict | None:
+    """
+    Browsers cannot set headers on a WebSocket, so the ID token arrives in a first
+    {"type": "auth", "id_token": ...} message; other clients may send an Authorization header.
+    """
+    try:
+        auth_header = websocket.headers.get('Authorization')
+        if auth_header:
+            id_token = auth_header.split('Bearer ')[1]
+        else:
+            message = json.loads(await asyncio.wait_for(websocket.receive(), REALTIME_AUTH_TIMEOUT_SECONDS))
+            if message.get("type") != "auth" or not message.get("id_token"):
+                return None
+            id_token = message["id_token"]
+        return await verify_id_token(id_token)
+    except asyncio.TimeoutError:
+        logger.warning("Authentication: No auth message on realtime session.")
+    except (IndexError, ValueError, AttributeError):
+        logger.warning("Authentication: Invalid realtime session auth message.")
+    except Exception as e:
+        logger.warning(f"Authentication: Realtime session token rejected. Error: {e}")
+    return None
+
+
+async def send_json(body: dict):
+    await websocket.send(json.dumps(body))
+
+
+@quart_app.websocket('/realtime-session/<conversation_id>')
+async def realtime_session(conversation_id):
+    """
+    One WebSocket per live conversation, replacing a /redact-utterance-realtime
+    request per utterance. The caller authenticates once; the agent's pending PII
+    question is kept in memory and written through to Redis, so a reconnect to
+    another instance resumes it. Messages are JSON:
+        -> {"type": "agent" | "customer", "id": ..., "utterance": "..."}
+        <- {"type": "redacted", "id": ..., "role": ..., "redacted_utterance": "...", ...}
+    Customer utterances are sent to DLP alone, with the request template of the
+    expected PII type, instead of concatenated with the agent's text.
+    """
+    # quart_cors has already rejected handshakes whose Origin is not the frontend.
+    await websocket.accept()
+
+    decoded_token = await authenticate_websocket()
+    if decoded_token is None:
+        await send_json({"type": "error", "error": "Authentication failed"})
+        await websocket.close(4401)
+        return
+    token_exp = decoded_token.get("exp")
+    logger.info(f"Realtime session opened for conversation_id: {conversation_id}, user UID: {decoded_token.get('uid')}")
+
+    # The only context read of the session; afterwards the in-memory copy is authoritative.
+    context = await get_context(conversation_id)
+    await send_json({"type": "ready", "conversation_id": conversation_id, "context": context_is_live(context)})
+
+    while True:
+        try:
+            raw_message = await asyncio.wait_for(websocket.receive(), REALTIME_SESSION_IDLE_SECONDS)
+        except asyncio.TimeoutError:
+            logger.info(f"Realtime session for conversation_id: {conversation_id} idle; closing.")
+            await websocket.close(1000)
+            return
+        if token_exp and time.time() >= token_exp:
+            await send_json({"type": "error", "error": "Authentication token expired"})
+            await websocket.close(4401)
+            return
+
+        try:
+            message = json.loads(raw_message)
+            message_type, message_id, utterance = message.get("type"), message.get("id"), message.get("utterance")
+        except (ValueError, AttributeError):
+            await send_json({"type": "error", "error": "Invalid JSON message"})
+            continue
+        if message_type not in ("agent", "customer") or not isinstance(utterance, str):
+            await send_json({"type": "error", "id": message_id, "error": "Expected an 'agent' or 'customer' message with an utterance"})
+            continue
+
+        config = sync_main.dlp_config.current
+        try:
+            if message_type == "agent":
+                expected_pii_type = sync_main.extract_expected_pii(utterance, config)
+                write_through = None
+                if expected_pii_type:
+                    context = {"expected_pii_type": expected_pii_type, "agent_transcript": utterance, "timestamp": time.time()}
+                    write_through = asyncio.create_task(store_context(conversation_id, context))
+                redacted_utterance = await call_dlp_for_redaction(utterance, context=None, config=config)
+                if write_through:
+                    await write_through
+                await send_json({"type": "redacted", "id": message_id, "role": "agent",
+                                 "redacted_utterance": redacted_utterance, "context_stored": expected_pii_type is not None,
+                                 "dlp_config_version": config.version})
+            else:
+                live_context = context if context_is_live(context) else None
+                redacted_utterance = await call_dlp_for_redaction(utterance, live_context, config)
+                await send_json({"type": "redacted", "id": message_id, "role": "customer",
+                                 "redacted_utterance": redacted_utterance, "context_used": live_context is not None,
+                                 "dlp_config_version": config.version})
+        except DlpOverloaded as e:
+            # Not redacted; the client may send the utterance again after retry_after_seconds.
+            body, _ = sync_main.dlp_overloaded_response(e)
+            await send_json({"type": "error", "id": message_id, **body})
+
+
+async def get_job_snapshot(job_id: str) -> tuple[dict | None, list]:
+    """Async counterpart of RedisStore.get_job_snapshot: one round trip for both keys and the chunks."""
+    async with redis_async_client.pipeline(transaction=False) as pipe:
+        pipe.mget(f"final_transcript:{job_id}", f"original_conversation:{job_id}")
+        pipe.lrange(f"original_conversation_chunks:{job_id}", 0, -1)
+        (final_transcript_str, original_conversation_str), original_chunks = await pipe.execute()
+    final_transcript = json.loads(final_transcript_str) if final_transcript_str else None
+    if original_conversation_str:
+        return final_transcript, json.loads(original_conversation_str)
+    return final_transcript, decode_chunks(original_chunks)
+
+
+async def get_job_state(job_id: str) -> tuple[int, str | None, bool]:
+    """Async counterpart of RedisStore.get_job_state."""
+    async with redis_async_client.pipeline(transaction=False) as pipe:
+        pipe.mget(f"job_version:{job_id}", f"job_status:{job_id}")
+        pipe.exists(f"final_transcript:{job_id}")
+        (version, status), has_final = await pipe.execute()
+    return int(version or 0), status, bool(has_final)
+
+
+def not_modified(etag: str):
+    response = Response(b"", status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def with_etag(body: dict, etag: str):
+    response = jsonify(body)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+async def advertise_redaction_events(response):
+    """Open streams cost no thread here, so /redaction-events is always offered."""
+    response.headers[sync_main.REDACTION_EVENTS_HEADER] = "available"
+    return response
+
+
+@quart_app.route('/redaction-status/<job_id>', methods=['GET'])
+@firebase_auth_required
+async def get_redaction_status(job_id):
+    if not redis_async_client:
+        logger.error("Redis client not available for /redaction-status.")
+        return jsonify({"error": "Redis client not available"}), 503
+    after_this_request(advertise_redaction_events)
+
+    since_segment = request.args.get('since_segment', type=int)
+    if_none_match = request.if_none_match
+    segments_since = sync_main.segments_since
+
+    try:
+        # Transcripts are only read when the version-based ETag does not match.
+        version, job_status, has_final = await get_job_state(job_id)
+
+        if has_final or job_status == "FAILED":
+            etag = sync_main.status_etag(job_id, version, "done" if has_final else "failed", since_segment)
+            if if_none_match.contains_weak(etag):
+                return not_modified(etag)
+            final_transcript, original_transcript_segments = await get_job_snapshot(job_id)
+            if not final_transcript:
+                return with_etag({"status": "FAILED", "version": version, "error": "Transcript upload failed"}, etag), 200
+            return with_etag({
+                "status": "DONE",
+                "version": version,
+                "original_conversation": {"transcript": {"transcript_segments": segments_since(original_transcript_segments, since_segment)}},
+                "redacted_conversation": {"transcript": {"transcript_segments": segments_since(final_transcript.get("transcript_segments", []), since_segment)}}
+            }, etag), 200
+
+        # Cached per job version, so an unchanged job costs no CCAI RPC (see main.ccai_status_cache).
+        ccai_status_cache = sync_main.ccai_status_cache
+        transcript_segments = ccai_status_cache.get(job_id, version) if ccai_status_cache else sync_main.NOT_CACHED
+        if transcript_segments is sync_main.NOT_CACHED:
+            ccai_async_client = get_ccai_async_client()
+            if not ccai_async_client:
+                logger.error("CCAI Conversation Insights client not available for /redaction-status.")
+                return jsonify({"error": "CCAI Insights client not available"}), 503
+
+            conversation_name = f"projects/{sync_main.GCP_PROJECT_ID_FOR_SECRETS}/locations/us-central1/conversations/{job_id}"
+            ccai_request = contact_center_insights_v1.GetConversationRequest(
+                name=conversation_name,
+                view=contact_center_insights_v1.types.ConversationView.FULL
+            )
+            try:
+                conversation = await ccai_async_client.get_conversation(request=ccai_request)
+                transcript_segments = sync_main.ccai_transcript_segments(conversation)
+            except NotFound:
+                logger.info(f"Conversation {job_id} not yet found in Redis or CCAI Insights. Still processing.")
+                transcript_segments = None
+            if ccai_status_cache:
+                ccai_status_cache.put(job_id, version, transcript_segments)
+
+        if transcript_segments is None:
+            etag = sync_main.status_etag(job_id, version, "pending", since_segment)
+            if if_none_match.contains_weak(etag):
+                return not_modified(etag)
+            _, original_transcript_segments = await get_job_snapshot(job_id)
+            return with_etag({
+                "status": "PROCESSING",
+                "version": version,
+                "message": "Conversation not yet available",
+                "original_conversation": {"transcript": {"transcript_segments": segments_since(original_transcript_segments, since_segment)}},
+                "redacted_conversation": {"transcript": {"transcript_segments": []}}
+            }, etag), 200
+
+        etag = sync_main.status_etag(job_id, version, f"ccai{len(transcript_segments)}", since_segment)
+        if if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        _, original_transcript_segments = await get_job_snapshot(job_id)
+        return with_etag({
+            "status": "DONE" if transcript_segments else "PROCESSING",
+            "version": version,
+            "original_conversation": {"transcript": {"transcript_segments": segments_since(original_transcript_segments, since_segment)}},
+            "redacted_conversation": {"transcript": {"transcript_segments": segments_since(transcript_segments, since_segment)}}
+        }, etag), 200
+
+    except PermissionDenied as e:
+        logger.error(f"Permission denied to access conversation {job_id} in CCAI Insights: {str(e)}")
+        return jsonify({"status": "FAILED", "error": "Permission denied to access conversation"}), 403
+    except GoogleAPICallError as e:
+        logger.error(f"Google API Call Error when fetching conversation {job_id} from CCAI Insights: {str(e)}")
+        return jsonify({"status": "FAILED", "error": f"CCAI Insights API error: {e.message}"}), 500
+    except Exception as e:
+        logger.error(f"An unexpected error occurred in get_redaction_status for job {job_id}: {str(e)}")
+        return jsonify({"error": "An internal server error occurred"}), 500
+
+
+@quart_app.route('/redaction-events/<job_id>', methods=['GET'])
+@firebase_auth_required
+async def stream_redaction_events(job_id):
+    """Async version of main.stream_redaction_events; an open stream costs no thread here."""
+    if not redis_async_client:
+        logger.error("Redis client not available for /redaction-events.")
+        return jsonify({"error": "Redis client not available"}), 503
+
+    pubsub = redis_async_client.pubsub(ignore_subscribe_messages=True)
+    channels = [job_events.channel(job_id)]
+    if sync_main.JOB_EVENTS_KEYSPACE_NOTIFICATIONS:
+        channels.append(job_events.keyspace_channel(job_id))
+    try:
+        await pubsub.subscribe(*channels)
+        final_transcript, original_transcript_segments = await get_job_snapshot(job_id)
+    except redis.exceptions.RedisError as e:
+        await pubsub.aclose()
+        logger.error(f"Redis error while opening event stream for job {job_id}: {str(e)}")
+        return jsonify({"error": "Redis client not available"}), 503
+
+    async def generate():
+        try:
+            for frame in job_events.snapshot_events(final_transcript, original_transcript_segments):
+                yield frame.encode("utf-8")
+            if final_transcript:
+                return
+            deadline = time.monotonic() + sync_main.SSE_MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                message = await pubsub.get_message(timeout=sync_main.SSE_HEARTBEAT_SECONDS)
+                if message is None:
+                    yield b": keepalive\n\n"
+                    continue
+                if message["channel"].startswith(job_events.FINAL_TRANSCRIPT_KEYSPACE_PREFIX):
+                    final_transcript_now, _ = await get_job_snapshot(job_id)
+                    if final_transcript_now:
+                        yield job_events.final_transcript_event(final_transcript_now).encode("utf-8")
+                        return
+                    continue
+                frame, terminal = job_events.message_to_sse(message["data"])
+                yield frame.encode("utf-8")
+                if terminal:
+                    return
+        except redis.exceptions.RedisError as e:
+            logger.error(f"Redis error in event stream for job {job_id}: {str(e)}")
+        finally:
+            await pubsub.aclose()
+
+    response = Response(generate(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.timeout = None  # Streams outlive Quart's default response timeout
+    return response
+
+
+class BodyLineReader:
+    """
+    Blocking iterator over the lines of a request body, for main.ingest_segment_stream in a
+    worker thread. Each chunk is awaited on the event loop only when the previous one is
+    used up; with a ReceiveOnDemandBody that is also when it is read from the client.
+    """
+
+    def __init__(self, body: Body, loop: asyncio.AbstractEventLoop):
+        self._body = body
+        self._loop = loop
+        self._pending = None
+        self._closed = threading.Event()
+
+    def close(self):
+        """Called on the event loop when the request is cancelled (client disconnected)."""
+        self._closed.set()
+        if self._pending is not None:
+            self._pending.cancel()
+
+    async def _next_chunk(self) -> bytes | None:
+        try:
+            return await self._body.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def _read(self) -> bytes | None:
+        if self._closed.is_set():
+            raise sync_main.StreamedUploadError("client disconnected before the upload completed")
+        self._pending = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop)
+        try:
+            return self._pending.result()
+        except (CancelledError, ClientDisconnected):
+            raise sync_main.StreamedUploadError("client disconnected before the upload completed")
+
+    def __iter__(self):
+        buffer = b""
+        while (chunk := self._read()) is not None:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            yield from lines
+        if buffer:
+            yield buffer
+
+
+@quart_app.route('/initiate-redaction-stream', methods=['POST', 'OPTIONS'])
+@firebase_auth_required
+async def initiate_redaction_stream():
+    """
+    main.initiate_redaction_stream on the request body as it arrives. Publishing and the
+    Redis chunk writes are blocking, so the shared implementation runs in a worker thread
+    that pulls body chunks from the event loop.
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'}), 200
+
+    reader = BodyLineReader(request.body, asyncio.get_running_loop())
+    try:
+        body, status = await asyncio.to_thread(sync_main.ingest_segment_stream, reader)
+    except asyncio.CancelledError:
+        reader.close()  # The worker marks the job FAILED instead of waiting for more body forever
+        raise
+    return jsonify(body), status
+
+
+ASYNC_PATHS = ("/handle-agent-utterance", "/handle-customer-utterance", "/redact-utterance-realtime", "/redaction-status/",
+               "/redaction-events/", "/initiate-redaction-stream")
+_flask_fallback = WsgiToAsgi(sync_main.app)
+
+
+async def app(scope, receive, send):
+    """Routes the async endpoints to Quart and everything else to the Flask app."""
+    if scope["type"] == "http" and not scope["path"].startswith(ASYNC_PATHS):
+        await _flask_fallback(scope, receive, send)
+        return
+    await quart_app(scope, receive, send)
@@ -0,0 +1,44 @@
+import threading
+import time
+from collections import OrderedDict
+
+# get() result when nothing usable is cached; None means "CCAI returned NotFound".
+NOT_CACHED = object()
+
+
+class CcaiStatusCache:
+    """
+    Short-lived, bounded cache of what CCAI Insights returned for a job.
+
+    Entries are keyed by job ID and tagged with the job's Redis version, so any
+    write to the job makes its entry stale. Within ttl_seconds, repeated
+    /redaction-status polls of an unchanged job reuse the transcript segments
+    (or the NotFound) and can answer 304 without calling get_conversation.
+    Errors are never cached.
+    """
+
+    def __init__(self, ttl_seconds: int = 30, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # job_id -> (version, expires_at, segments or None)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, job_id: str, version: int):
+        """The cached segments (None for NotFound) for this version, or NOT_CACHED."""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None or entry[0] != version or entry[1] < time.monotonic():
+                self.stats["misses"] += 1
+                return NOT_CACHED
+            self._entries.move_to_end(job_id)
+            self.stats["hits"] += 1
+            return entry[2]
+
+    def put(self, job_id: str, version: int, segments: list | None):
+        with self._lock:
+            self._entries[job_id] = (version, time.monotonic() + self.ttl_seconds, segments)
+            self._entries.move_to_end(job_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class ContextNearCache:
+    """
+    In-process copy of the context:<conversation_id> keys, kept coherent with Redis
+    through server-assisted client-side caching.
+
+    A background thread holds one RESP3 connection with
+    CLIENT TRACKING ON BCAST PREFIX context:, so Redis pushes an invalidation
+    whenever any instance writes, deletes or expires a context key, and the local
+    copy is dropped. Entries also expire locally with the key's own TTL, read with
+    PTTL in the same round trip as the GET. Missing keys are cached briefly too,
+    so customer utterances without a pending question skip Redis as well.
+
+    A successful write made by this process is stored locally, so the customer
+    utterance that follows an agent question is served without a round trip.
+    Redis pushes invalidations in write order, which makes the pod's own write
+    safe to keep by counting the key's invalidations between begin_write and
+    finish_write:
+      0 - ours is still on its way; the next one is skipped. It is ours or one
+          from a write that landed before ours, so skipping it is harmless.
+      1 - either ours, or an earlier write's with ours still to come (which then
+          drops the entry); either way nothing has overwritten ours yet.
+      2+ - a later write may have replaced ours, so nothing is stored.
+    Failed writes, overlapping writes of one key by this process, and writes
+    spanning a reconnect are not stored either. While the tracking
+    connection is down, every lookup misses and nothing is stored; on reconnect
+    the cache starts empty, since invalidations may have been lost meanwhile.
+
+    Callers (RedisStore and the ASGI app) follow this protocol:
+        found, value = cache.lookup(id)        # hit: no round trip
+        cache.begin_fetch(id); GET + PTTL; cache.finish_fetch(id, value, pttl_ms)
+        cache.begin_write(id); SETEX;      cache.finish_write(id, value, ttl, ok)
+    """
+
+    def __init__(self, host: str, port: int, max_entries: int = 10000, negative_ttl_seconds: float = 30,
+                 key_prefix: str = "context:", reconnect_seconds: float = 1.0, ping_seconds: float = 30):
+        self.host = host
+        self.port = port
+        self.max_entries = max_entries
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.key_prefix = key_prefix
+        self.reconnect_seconds = reconnect_seconds
+        self.ping_seconds = ping_seconds
+        self._entries = OrderedDict()  # conversation_id -> (context or None, expires_at or None)
+        self._fetching = {}  # conversation_id -> invalidated while the GET was in flight
+        self._writes = {}  # conversation_id -> [own writes in flight, invalidations seen, unsafe to store]
+        self._expect_own = set()  # conversation_ids whose next invalidation is our stored write's
+        self._lock = threading.Lock()
+        self._connected = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "bypassed": 0, "invalidations": 0,
+                      "own_writes_stored": 0, "own_write_invalidations": 0, "stale_fetches": 0, "flushes": 0, "evictions": 0, "connection_errors": 0}
+
+    # --- Lookups and fills ---
+    def lookup(self, conversation_id: str) -> tuple[bool, dict | None]:
+        """(True, context) on a hit, where context None means the key does not exist; (False, None) on a miss."""
+        now = time.time()
+        with self._lock:
+            if not self._connected:
+                self.stats["bypassed"] += 1
+                return False, None
+            entry = self._entries.get(conversation_id, _MISSING)
+            if entry is not _MISSING and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(conversation_id)
+                self.stats["hits" if entry[0] is not None else "negative_hits"] += 1
+                return True, entry[0]
+            if entry is not _MISSING:
+                del self._entries[conversation_id]
+            self.stats["misses"] += 1
+            return False, None
+
+    def begin_fetch(self, conversation_id: str):
+        with self._lock:
+            self._fetching[conversation_id] = False
+
+    def finish_fetch(self, conversation_id: str, context: dict | None, pttl_ms: int):
+        """Stores a GET result unless the key was invalidated while it was being read."""
+        with self._lock:
+            invalidated = self._fetching.pop(conversation_id, True)
+            if invalidated:
+                self.stats["stale_fetches"] += 1
+                return
+            if not self._connected:
+                return
+            if context is None:
+                expires_at = time.time() + self.negative_ttl_seconds
+            else:
+                expires_at = time.time() + pttl_ms / 1000 if pttl_ms and pttl_ms > 0 else None
+            self._store(conversation_id, context, expires_at)
+
+    def cancel_fetch(self, conversation_id: str):
+        with self._lock:
+            self._fetching.pop(conversation_id, None)
+
+    def begin_write(self, conversation_id: str):
+        with self._lock:
+            write = self._writes.get(conversation_id)
+            if write is None:
+                self._writes[conversation_id] = [1, 0, False]
+            else:
+                write[0] += 1
+                write[2] = True
+            self._drop_for_write(conversation_id)
+
+    def finish_write(self, conversation_id: str, context: dict, ttl_seconds: int, ok: bool):
+        """Called whether or not the SETEX succeeded; stores the value only when it is provably current."""
+        with self._lock:
+            self._drop_for_write(conversation_id)
+            write = self._writes.get(conversation_id)
+            if write is None:  # Flushed meanwhile
+                return
+            write[0] -= 1
+            if write[0] == 0:
+                del self._writes[conversation_id]
+            in_flight, seen, unsafe = write
+            if not ok or unsafe or in_flight or seen > 1 or not self._connected:
+                return
+            if seen == 0:
+                self._expect_own.add(conversation_id)
+            self._store(conversation_id, context, time.time() + ttl_seconds)
+            self.stats["own_writes_stored"] += 1
+
+    def _drop_for_write(self, conversation_id):
+        # A GET in flight across our write may return the old value; it must not be stored.
+        if conversation_id in self._fetching:
+            self._fetching[conversation_id] = True
+        self._entries.pop(conversation_id, None)
+
+    def _store(self, conversation_id, context, expires_at):
+        self._entries[conversation_id] = (context, expires_at)
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # --- Invalidation ---
+    def _on_invalidate(self, response):
+        keys = response[1] if len(response) > 1 else None
+        with self._lock:
+            if keys is None:  # FLUSHDB/FLUSHALL
+                self._flush()
+                return
+            for key in keys:
+                if isinstance(key, bytes):
+                    key = key.decode("utf-8")
+                conversation_id = key[len(self.key_prefix):]
+                if conversation_id in self._fetching:
+                    self._fetching[conversation_id] = True
+                if conversation_id in self._expect_own:
+                    self._expect_own.discard(conversation_id)
+                    self.stats["own_write_invalidations"] += 1
+                    continue
+                write = self._writes.get(conversation_id)
+                if write is not None:
+                    write[1] += 1
+                self._entries.pop(conversation_id, None)
+                self.stats["invalidations"] += 1
+
+    def _flush(self):
+        self._entries.clear()
+        self._expect_own.clear()
+        for conversation_id in self._fetching:
+            self._fetching[conversation_id] = True
+        for write in self._writes.values():
+            write[2] = True
+        self.stats["flushes"] += 1
+
+    def _set_connected(self, connected: bool):
+        with self._lock:
+            self._flush()
+            self._connected = connected
+
+    # --- Tracking connection ---
+    def start(self):
+        self._thread = threading.Thread(target=self._listen, name="context-near-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _listen(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = redis.Connection(host=self.host, port=self.port, protocol=3,
+                                        socket_connect_timeout=10, socket_keepalive=True)
+                conn.connect()
+                # Same hook redis-py's own client-side cache uses for RESP3 invalidation pushes.
+                conn._parser.set_invalidation_push_handler(self._on_invalidate)
+                conn.send_command("CLIENT", "TRACKING", "ON", "BCAST", "PREFIX", self.key_prefix)
+                reply = conn.read_response()
+                if reply not in (b"OK", "OK"):
+                    raise redis.exceptions.ResponseError(f"CLIENT TRACKING returned {reply!r}")
+                self._set_connected(True)
+                logger.info(f"Context near-cache tracking '{self.key_prefix}*' keys on {self.host}:{self.port}.")
+                last_ping = time.monotonic()
+                while not self._stop.is_set():
+                    if conn.can_read(timeout=1.0):
+                        conn.read_response(push_request=True)
+                    if time.monotonic() - last_ping >= self.ping_seconds:
+                        conn.send_command("PING")
+                        conn.read_response()  # Pushes queued before the PONG go to the handler first
+                        last_ping = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Context near-cache tracking connection lost; serving from Redis until it reconnects. Error: {str(e)}")
+                with self._lock:
+                    self.stats["connection_errors"] += 1
+            finally:
+                self._set_connected(False)
+                if conn is not None:
+                    conn.disconnect()
+            self._stop.wait(self.reconnect_seconds)
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["connected"] = self._connected
+        hits = stats["hits"] + stats["negative_hits"]
+        lookups = hits + stats["misses"] + stats["bypassed"]
+        stats["hit_ratio"] = round(hits / lookups, 4) if lookups else None
+        return stats
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    __slots__ = ("template", "texts", "futures", "size_bytes", "deadline")
+
+    def __init__(self, template, deadline):
+        self.template = template
+        self.texts = []
+        self.futures = []
+        self.size_bytes = 0
+        self.deadline = deadline
+
+
+class DlpMicroBatcher:
+    """
+    Collects concurrent redaction requests for a short window and sends them to
+    DLP as a single table item, one row per utterance.
+
+    Requests are grouped by their RequestTemplate (see dlp_requests.py), so
+    utterances with different context-driven inspect configs never share a
+    batch. A batch is flushed when its window elapses or when it reaches
+    max_items or max_bytes, whichever comes first. With a limiter (see
+    dlp_rate_limiter.py) each batch RPC is admitted through it; a DlpOverloaded
+    rejection fails every utterance of the batch.
+    """
+
+    def __init__(self, dlp_client, window_ms: int = 10, max_items: int = 50,
+                 max_bytes: int = 400_000, max_in_flight: int = 8, request_timeout: float = 30, limiter=None):
+        self._dlp_client = dlp_client
+        self._limiter = limiter
+        self.window = window_ms / 1000.0
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.request_timeout = request_timeout
+
+        self._lock = threading.Condition()
+        self._open = {}  # id(template) -> _Batch
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="dlp-batch")
+        self._closed = False
+
+        self.stats = {"requests": 0, "batches": 0, "rpcs": 0, "max_batch_size": 0}
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="dlp-batch-flusher", daemon=True)
+        self._flusher.start()
+
+    def submit(self, template, transcript: str) -> str:
+        """Queues one utterance and blocks until its redacted value is available."""
+        return self.submit_async(template, transcript).result(timeout=self.request_timeout)
+
+    def submit_async(self, template, transcript: str) -> Future:
+        future = Future()
+        size = len(transcript.encode("utf-8"))
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("DlpMicroBatcher is shut down")
+            key = id(template)
+            batch = self._open.get(key)
+            if batch is not None and (batch.size_bytes + size > self.max_bytes):
+                # Adding this utterance would overflow the byte cap: send what we have first.
+                self._dispatch(self._open.pop(key))
+                batch = None
+            if batch is None:
+                batch = self._open[key] = _Batch(template, time.monotonic() + self.window)
+                self._lock.notify()
+            batch.texts.append(transcript)
+            batch.futures.append(future)
+            batch.size_bytes += size
+            self.stats["requests"] += 1
+            if len(batch.texts) >= self.max_items or batch.size_bytes >= self.max_bytes:
+                self._open.pop(key, None)
+                self._dispatch(batch)
+        return future
+
+    def _flush_loop(self):
+        with self._lock:
+            while not self._closed:
+                now = time.monotonic()
+                due = [key for key, batch in self._open.items() if batch.deadline <= now]
+                for key in due:
+                    self._dispatch(self._open.pop(key))
+                if self._open:
+                    next_deadline = min(batch.deadline for batch in self._open.values())
+                    self._lock.wait(timeout=max(0.0, next_deadline - now))
+                else:
+                    self._lock.wait()
+
+    def _dispatch(self, batch: _Batch):
+        """Hands a closed batch to the executor. Callers hold self._lock, which guards the stats."""
+        self.stats["batches"] += 1
+        self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch.texts))
+        self._executor.submit(self._send, batch)
+
+    def _send(self, batch: _Batch):
+        with self._lock:
+            self.stats["rpcs"] += 1
+        try:
+            if len(batch.texts) == 1:
+                request = batch.template.build(batch.texts[0])
+            else:
+                request = batch.template.build_table(batch.texts)
+            with self._limiter.slot() if self._limiter else nullcontext():
+                response = self._dlp_client.deidentify_content(request=request)
+            if len(batch.texts) == 1:
+                results = [response.item.value]
+            else:
+                results = [row.values[0].string_value for row in response.item.table.rows]
+            if len(results) != len(batch.futures):
+                raise RuntimeError(f"DLP returned {len(results)} rows for a batch of {len(batch.futures)} utterances")
+            logger.info(f"DLP batch of {len(batch.texts)} utterance(s) de-identified in one request.")
+        except Exception as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        for future, value in zip(batch.futures, results):
+            future.set_result(value)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            for batch in self._open.values():
+                self._dispatch(batch)
+            self._open.clear()
+            self._lock.notify()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+
+def config_version(config: dict) -> str:
+    """Identifies a config; redaction results cached under one version are never served under another."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def validate_dlp_config(config) -> list[str]:
+    """Structural problems in a parsed dlp_config.yaml; an empty list means it can be compiled."""
+    if not isinstance(config, dict):
+        return ["top level must be a mapping"]
+    problems = []
+    for section in ("dlp_templates", "inspect_config", "deidentify_config"):
+        if section in config and not isinstance(config[section], dict):
+            problems.append(f"{section} must be a mapping")
+    context_keywords = config.get("context_keywords", {})
+    if not isinstance(context_keywords, dict):
+        problems.append("context_keywords must be a mapping of PII type to keyword list")
+    else:
+        for pii_type, keywords in context_keywords.items():
+            if not isinstance(keywords, list) or not all(isinstance(k, str) and k.strip() for k in keywords):
+                problems.append(f"context_keywords.{pii_type} must be a list of non-empty strings")
+    inspect_config = config.get("inspect_config", {})
+    if isinstance(inspect_config, dict):
+        for key in ("info_types", "custom_info_types", "rule_set"):
+            if key in inspect_config and not isinstance(inspect_config[key], list):
+                problems.append(f"inspect_config.{key} must be a list")
+        for custom in inspect_config.get("custom_info_types", []) or []:
+            if not isinstance(custom, dict) or not custom.get("info_type", {}).get("name"):
+                problems.append("every inspect_config.custom_info_types entry needs info_type.name")
+    return problems
+
+
+class DlpConfigSnapshot:
+    """
+    One version of dlp_config.yaml and everything compiled from it. Snapshots are
+    never mutated: a request reads DlpConfigManager.current once and uses that
+    snapshot throughout, so it never mixes artifacts of two versions.
+    """
+
+    def __init__(self, config: dict, version: str, keyword_matcher, request_templates=None,
+                 pii_prefilter=None, local_dlp_engine=None, known_pii_types=frozenset()):
+        self.config = config
+        self.version = version
+        self.keyword_matcher = keyword_matcher
+        self.request_templates = request_templates
+        self.pii_prefilter = pii_prefilter
+        self.local_dlp_engine = local_dlp_engine
+        self.known_pii_types = known_pii_types
+        self.loaded_at = time.time()
+
+
+class DlpConfigManager:
+    """
+    Loads dlp_config.yaml and swaps in new versions without a restart.
+
+    compile(config, version) builds a DlpConfigSnapshot (keyword matcher, DLP
+    request bodies, pre-filter, local engine). start_watching() polls the file's
+    stat every poll_seconds; when it changes, the file is re-read, validated and
+    compiled in the background, then published by replacing `current`. A file
+    that does not parse, validate or compile is rejected and the running version
+    is kept. Mounted ConfigMaps and secret volumes replace the file through a
+    symlink swap, which changes the stat of the resolved path, so they are
+    picked up the same way.
+    """
+
+    def __init__(self, path: str, compile, poll_seconds: float = 30):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._compile = compile
+        self.current = None
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._callbacks = []
+        self._stop = threading.Event()
+        self.last_error = None
+        self.stats = {"reloads": 0, "rejected": 0, "unchanged": 0}
+
+    def load(self) -> DlpConfigSnapshot:
+        """
+        Initial load at startup. A file that is missing or does not parse, validate
+        or compile is logged and an empty config is used, so `current` is always set.
+        """
+        self._signature = self._file_signature()
+        try:
+            config = self._read()
+            problems = validate_dlp_config(config)
+            if problems:
+                raise ValueError("; ".join(problems))
+            self.current = self._compile(config, config_version(config))
+            logger.info(f"Successfully loaded {self.path}.")
+        except FileNotFoundError:
+            logger.error(f"{self.path} not found. DLP functionality might be impaired.")
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Could not load {self.path}: {str(e)}. DLP functionality might be impaired.")
+        if self.current is None:
+            self.current = self._compile({}, config_version({}))
+        logger.info(f"DLP config version: {self.current.version}")
+        return self.current
+
+    def reload(self) -> bool:
+        """Re-reads the file and publishes it if it changed and compiles. Returns True when swapped."""
+        with self._reload_lock:
+            try:
+                config = self._read()
+                version = config_version(config)
+                if self.current and version == self.current.version:
+                    self.stats["unchanged"] += 1
+                    return False
+                problems = validate_dlp_config(config)
+                if problems:
+                    raise ValueError("; ".join(problems))
+                started = time.perf_counter()
+                snapshot = self._compile(config, version)
+            except Exception as e:
+                self.stats["rejected"] += 1
+                self.last_error = str(e)
+                logger.error(f"Rejected new {self.path}; keeping version "
+                             f"{self.current.version if self.current else None}. Error: {str(e)}")
+                return False
+            previous, self.current = self.current, snapshot
+            self.stats["reloads"] += 1
+            self.last_error = None
+        logger.info(f"DLP config version {previous.version if previous else None} -> {snapshot.version}, "
+                    f"compiled in {(time.perf_counter() - started) * 1000:.1f} ms.")
+        for callback in self._callbacks:
+            try:
+                callback(previous, snapshot)
+            except Exception as e:
+                logger.error(f"DLP config change handler failed. Error: {str(e)}")
+        return True
+
+    def on_change(self, callback):
+        """Registers callback(previous, current), called after a new version is published."""
+        self._callbacks.append(callback)
+
+    def start_watching(self):
+        if self.poll_seconds <= 0:
+            return
+
+        def watch_loop():
+            while not self._stop.wait(self.poll_seconds):
+                signature = self._file_signature()
+                if signature != self._signature:
+                    self._signature = signature
+                    self.reload()
+
+        threading.Thread(target=watch_loop, name="dlp-config-watch", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _read(self) -> dict:
+        with open(self.path, "r") as f:
+            return yaml.safe_load(f) or {}
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def report(self) -> dict:
+        return {"version": self.current.version if self.current else None, "path": self.path,
+                "loaded_at": self.current.loaded_at if self.current else None,
+                "last_error": self.last_error, **self.stats}
+
+
+def from_env(compile) -> DlpConfigManager:
+    return DlpConfigManager(os.getenv('DLP_CONFIG_PATH', 'dlp_config.yaml'), compile,
+                            poll_seconds=float(os.getenv('DLP_CONFIG_RELOAD_SECONDS', 30)))
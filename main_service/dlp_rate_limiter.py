@@ -0,0 +1,327 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from google.api_core.exceptions import ResourceExhausted
+from redis.exceptions import NoScriptError
+
+logger = logging.getLogger(__name__)
+
+# Refills the bucket from the Redis clock, so every instance sees the same time.
+# Reserves `cost` tokens when they are available within max_wait seconds; the
+# balance may go negative, and the caller sleeps the returned wait before calling
+# DLP. Returns {granted, wait}; wait is a string because Lua numbers become
+# integers in replies.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = math.max(0, (cost - tokens) / rate)
+local granted = 0
+if wait <= max_wait then
+    tokens = tokens - cost
+    granted = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst / rate + max_wait) * 1000) + 1000)
+return {granted, tostring(wait)}
+"""
+TOKEN_BUCKET_SHA = hashlib.sha1(TOKEN_BUCKET_SCRIPT.encode("utf-8")).hexdigest()
+
+# Returns tokens reserved for a request that was never sent. A bucket that has
+# expired meanwhile is already full, so it is left alone.
+TOKEN_REFUND_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBYFLOAT', KEYS[1], 'tokens', ARGV[1])
+end
+return 1
+"""
+TOKEN_REFUND_SHA = hashlib.sha1(TOKEN_REFUND_SCRIPT.encode("utf-8")).hexdigest()
+
+
+class DlpOverloaded(Exception):
+    """
+    Raised instead of sending a DLP request when it cannot be admitted within the
+    wait bound, or when DLP itself answered RESOURCE_EXHAUSTED. Handlers turn it
+    into 503 with Retry-After, so callers retry later instead of receiving the
+    unredacted text behind an error marker.
+    """
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"DLP overloaded ({reason}); retry after {retry_after:.2f}s")
+        self.reason = reason  # "rate", "concurrency" or "quota_exhausted"
+        self.retry_after = retry_after
+
+
+class RedisTokenBucket:
+    """
+    Token bucket shared by every instance through one Redis hash, refilled at
+    `rate` requests per second up to `burst`. One EVALSHA per reservation.
+    """
+
+    def __init__(self, key: str, rate: float, burst: float):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+
+    def _args(self, cost: float, max_wait: float) -> tuple:
+        return TOKEN_BUCKET_SHA, 1, self.key, self.rate, self.burst, cost, max_wait
+
+    @staticmethod
+    def _parse(reply) -> tuple[bool, float]:
+        granted, wait = reply
+        return int(granted) == 1, float(wait)
+
+    def reserve(self, redis_client, cost: float, max_wait: float) -> tuple[bool, float]:
+        """(granted, seconds to wait before sending); nothing is reserved when not granted."""
+        args = self._args(cost, max_wait)
+        try:
+            reply = redis_client.evalsha(*args)
+        except NoScriptError:
+            reply = redis_client.eval(TOKEN_BUCKET_SCRIPT, *args[1:])
+        return self._parse(reply)
+
+    async def reserve_async(self, redis_client, cost: float, max_wait: float) -> tuple[bool, float]:
+        args = self._args(cost, max_wait)
+        try:
+            reply = await redis_client.evalsha(*args)
+        except NoScriptError:
+            reply = await redis_client.eval(TOKEN_BUCKET_SCRIPT, *args[1:])
+        return self._parse(reply)
+
+    def refund(self, redis_client, cost: float):
+        """Gives back a granted reservation; the refill cap applies on the next reserve."""
+        try:
+            redis_client.evalsha(TOKEN_REFUND_SHA, 1, self.key, cost)
+        except NoScriptError:
+            redis_client.eval(TOKEN_REFUND_SCRIPT, 1, self.key, cost)
+
+    async def refund_async(self, redis_client, cost: float):
+        try:
+            await redis_client.evalsha(TOKEN_REFUND_SHA, 1, self.key, cost)
+        except NoScriptError:
+            await redis_client.eval(TOKEN_REFUND_SCRIPT, 1, self.key, cost)
+
+
+class AimdConcurrencyLimit:
+    """
+    Per-instance cap on concurrent DLP requests, adjusted by additive increase,
+    multiplicative decrease. A request slower than latency_target, or one DLP
+    rejected for quota, multiplies the limit by `backoff` (at most once per
+    latency_target, so a burst of failures counts once). Each other completion
+    adds 1/limit while the limit is at least half used, about +1 per round.
+    """
+
+    def __init__(self, initial: int = 16, min_limit: int = 1, max_limit: int = 128,
+                 latency_target: float = 1.0, backoff: float = 0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.stats = {"increases": 0, "decreases": 0}
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    async def acquire_async(self, timeout: float) -> bool:
+        """acquire() for the event loop: polls with a short, growing sleep instead of blocking."""
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while not self.try_acquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.02)
+        return True
+
+    def release(self, latency: float, overloaded: bool = False):
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded or latency > self.latency_target:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.latency_target:
+                    self._last_decrease = now
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.stats["decreases"] += 1
+            elif self.in_flight + 1 >= self.limit / 2 and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.stats["increases"] += 1
+            self._cond.notify(max(1, int(self.limit) - self.in_flight))
+
+
+class DlpRateLimiter:
+    """
+    Admission control for DLP requests: a token from the shared RedisTokenBucket
+    (the project's DLP quota, across all instances), then a slot of this
+    instance's AimdConcurrencyLimit. Both waits together are bounded by max_wait;
+    past it the request fails fast with DlpOverloaded. A token reserved for a
+    request that then times out on the concurrency limit is refunded, so local
+    congestion does not spend the shared quota.
+
+    When Redis is unavailable the bucket is skipped (fail open) and only the
+    concurrency limit applies, which still backs off on RESOURCE_EXHAUSTED.
+    """
+
+    def __init__(self, bucket: RedisTokenBucket | None, concurrency: AimdConcurrencyLimit,
+                 max_wait: float = 2.0, redis_client=None):
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self._redis_client = redis_client  # Callable returning the current client, which may be replaced
+        self._bucket_failing = False
+        self._stats_lock = threading.Lock()
+        self.stats = {"admitted": 0, "rate_waits": 0, "overloaded_rate": 0, "overloaded_concurrency": 0,
+                      "resource_exhausted": 0, "bucket_errors": 0, "refunds": 0}
+
+    @contextmanager
+    def slot(self, cost: float = 1):
+        """Blocks until the request may be sent; raises DlpOverloaded instead of exceeding max_wait."""
+        deadline = time.monotonic() + self.max_wait
+        client = self._redis_client() if self._redis_client else None
+        reserved = False
+        if self.bucket and client:
+            try:
+                wait = self._admit(*self.bucket.reserve(client, cost, self.max_wait))
+                reserved = True
+            except DlpOverloaded:
+                raise
+            except Exception as e:
+                wait = self._bucket_error(e)
+            if wait:
+                time.sleep(wait)
+        if not self.concurrency.acquire(deadline - time.monotonic()):
+            if reserved:
+                try:
+                    self.bucket.refund(client, cost)
+                    self._count("refunds")
+                except Exception as e:
+                    self._bucket_error(e)
+            raise self._overloaded("concurrency", self.concurrency.latency_target)
+        with self._outcome():
+            yield
+
+    @asynccontextmanager
+    async def async_slot(self, redis_client, cost: float = 1):
+        """slot() for the ASGI app, reserving through its redis.asyncio client."""
+        deadline = time.monotonic() + self.max_wait
+        reserved = False
+        if self.bucket and redis_client:
+            try:
+                wait = self._admit(*await self.bucket.reserve_async(redis_client, cost, self.max_wait))
+                reserved = True
+            except DlpOverloaded:
+                raise
+            except Exception as e:
+                wait = self._bucket_error(e)
+            if wait:
+                await asyncio.sleep(wait)
+        if not await self.concurrency.acquire_async(deadline - time.monotonic()):
+            if reserved:
+                try:
+                    await self.bucket.refund_async(redis_client, cost)
+                    self._count("refunds")
+                except Exception as e:
+                    self._bucket_error(e)
+            raise self._overloaded("concurrency", self.concurrency.latency_target)
+        with self._outcome():
+            yield
+
+    def _admit(self, granted: bool, wait: float) -> float:
+        if self._bucket_failing:
+            self._bucket_failing = False
+            logger.info("DLP rate limiter: Redis token bucket reachable again.")
+        if not granted:
+            raise self._overloaded("rate", wait)
+        if wait:
+            self._count("rate_waits")
+        return wait
+
+    def _bucket_error(self, e: Exception) -> float:
+        self._count("bucket_errors")
+        if not self._bucket_failing:
+            self._bucket_failing = True
+            logger.warning(f"DLP rate limiter: Redis token bucket unavailable, admitting on the concurrency limit only. Error: {str(e)}")
+        return 0
+
+    @contextmanager
+    def _outcome(self):
+        """Feeds the request's latency, or its RESOURCE_EXHAUSTED rejection, to the AIMD limit."""
+        self._count("admitted")
+        started = time.perf_counter()
+        try:
+            yield
+        except ResourceExhausted as e:
+            self.concurrency.release(time.perf_counter() - started, overloaded=True)
+            self._count("resource_exhausted")
+            raise DlpOverloaded("quota_exhausted", self.concurrency.latency_target) from e
+        except BaseException:
+            self.concurrency.release(time.perf_counter() - started)
+            raise
+        self.concurrency.release(time.perf_counter() - started)
+
+    def _overloaded(self, reason: str, retry_after: float) -> DlpOverloaded:
+        self._count(f"overloaded_{reason}")
+        return DlpOverloaded(reason, retry_after)
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def report(self) -> dict:
+        bucket = {"rate_per_second": self.bucket.rate, "burst": self.bucket.burst} if self.bucket else None
+        return {"bucket": bucket, "concurrency_limit": round(self.concurrency.limit, 2),
+                "in_flight": self.concurrency.in_flight, "max_wait_seconds": self.max_wait,
+                **self.concurrency.stats, **self.stats}
+
+
+def from_env(redis_client=None) -> DlpRateLimiter | None:
+    """
+    DlpRateLimiter configured from DLP_RATE_LIMIT_*, or None when DLP_RATE_LIMIT_ENABLED
+    is not 'true'. redis_client is a callable returning the current sync Redis client.
+    """
+    if os.getenv('DLP_RATE_LIMIT_ENABLED', 'false').lower() != 'true':
+        return None
+    rate = float(os.getenv('DLP_RATE_LIMIT_RPS', 0))
+    bucket = None
+    if rate > 0:
+        bucket = RedisTokenBucket(os.getenv('DLP_RATE_LIMIT_KEY', 'dlp_rate_limit:deidentify'), rate,
+                                  float(os.getenv('DLP_RATE_LIMIT_BURST', rate)))
+    concurrency = AimdConcurrencyLimit(
+        initial=int(os.getenv('DLP_CONCURRENCY_INITIAL', 16)),
+        min_limit=int(os.getenv('DLP_CONCURRENCY_MIN', 1)),
+        max_limit=int(os.getenv('DLP_CONCURRENCY_MAX', 128)),
+        latency_target=float(os.getenv('DLP_LATENCY_TARGET_MS', 1000)) / 1000,
+    )
+    return DlpRateLimiter(bucket, concurrency, max_wait=float(os.getenv('DLP_RATE_LIMIT_MAX_WAIT_MS', 2000)) / 1000,
+                          redis_client=redis_client)
@@ -0,0 +1,171 @@
+import copy
+import logging
+from types import MappingProxyType
+from typing import NamedTuple
+
+from google.cloud import dlp_v2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEIDENTIFY_CONFIG = {
+    "info_type_transformations": {
+        "transformations": [
+            {
+                "primitive_transformation": {
+                    "replace_with_info_type_config": {}
+                }
+            }
+        ]
+    }
+}
+
+
+class RequestTemplate(NamedTuple):
+    """
+    Ready-to-send DLP deidentify_content request bodies, minus the 'item'.
+    'primary' uses the DLP templates where allowed; 'fallback' is fully inline
+    and is used when a template is missing.
+    """
+    primary: MappingProxyType
+    fallback: MappingProxyType
+    dynamic_context_applied: bool
+
+    def build(self, transcript: str, fallback: bool = False) -> dict:
+        body = self.fallback if fallback else self.primary
+        return {**body, "item": {"value": transcript}}
+
+    def build_table(self, transcripts: list[str], fallback: bool = False) -> dict:
+        """Builds one request that carries several utterances as rows of a single-column table."""
+        body = self.fallback if fallback else self.primary
+        table = {
+            "headers": [{"name": "utterance"}],
+            "rows": [{"values": [{"string_value": t}]} for t in transcripts],
+        }
+        return {**body, "item": {"table": table}}
+
+
+def build_inline_inspect_config(dlp_config: dict, expected_type: str | None) -> dict:
+    """
+    Returns a private deep copy of inspect_config from dlp_config.yaml, adjusted
+    for an expected PII type. The shared DLP_CONFIG is never mutated.
+    """
+    inspect_config = copy.deepcopy(dlp_config.get("inspect_config", {}))
+    if not expected_type:
+        return inspect_config
+
+    # Step 1: Ensure the expected infoType is explicitly included for inspection.
+    # This is critical because likelihood boosting only works on infoTypes that are being inspected.
+    custom_info_types_config = dlp_config.get("inspect_config", {}).get("custom_info_types", [])
+    custom_type_definition = next((cit for cit in custom_info_types_config if cit.get("info_type", {}).get("name") == expected_type), None)
+
+    if custom_type_definition:
+        # It's a custom type. Add its full definition if not already present.
+        # For custom info types, we do NOT add a rule_set with info_types, as it causes "Invalid built-in info type" error.
+        custom_info_types = inspect_config.setdefault("custom_info_types", [])
+        existing_custom_types = {cit.get("info_type", {}).get("name") for cit in custom_info_types}
+        if expected_type not in existing_custom_types:
+            custom_info_types.append(copy.deepcopy(custom_type_definition))
+        return inspect_config
+
+    # It's a built-in type. Add it to the info_types list if not already present.
+    info_types = inspect_config.setdefault("info_types", [])
+    if expected_type not in {it.get("name") for it in info_types}:
+        info_types.append({"name": expected_type})
+
+    # Boost the likelihood on an existing rule set for this info type, or create one.
+    rule_set = inspect_config.setdefault("rule_set", [])
+    for rule_set_entry in rule_set:
+        if expected_type not in {it.get("name") for it in rule_set_entry.get("info_types", [])}:
+            continue
+        for rule in rule_set_entry.get("rules", []):
+            if "hotword_rule" in rule and "likelihood_adjustment" in rule["hotword_rule"]:
+                rule["hotword_rule"]["likelihood_adjustment"]["fixed_likelihood"] = dlp_v2.Likelihood.VERY_LIKELY
+                return inspect_config
+
+    rule_set.append({
+        "info_types": [{"name": expected_type}],
+        "rules": [{
+            "hotword_rule": {
+                "hotword_regex": {"pattern": ".+"},
+                "proximity": {"window_before": 100, "window_after": 100},
+                "likelihood_adjustment": {"fixed_likelihood": dlp_v2.Likelihood.VERY_LIKELY}
+            }
+        }]
+    })
+    return inspect_config
+
+
+def known_pii_types(dlp_config: dict) -> frozenset:
+    """Every expected_pii_type dlp_config.yaml defines: context keywords, info types and custom types."""
+    inspect_config = dlp_config.get("inspect_config", {})
+    types = set(dlp_config.get("context_keywords", {}) or {})
+    types.update(it.get("name") for it in inspect_config.get("info_types", []))
+    types.update(cit.get("info_type", {}).get("name") for cit in inspect_config.get("custom_info_types", []))
+    types.discard(None)
+    return frozenset(types)
+
+
+class DlpRequestTemplates:
+    """
+    Precomputed DLP request bodies for call_dlp_for_redaction.
+
+    Built once at startup: template names are resolved and ${PROJECT_ID} is
+    substituted once, and inspect/deidentify configs are converted to DLP
+    protos up front. One template is held for the no-context case and one per
+    known expected_pii_type. Other types, e.g. from a context stored under an
+    earlier config version, are built per call and never kept.
+    """
+
+    def __init__(self, dlp_config: dict, project_id: str):
+        self.project_id = project_id
+        self.dlp_location = dlp_config.get("dlp_location", "us-central1")
+        self.parent = f"projects/{project_id}/locations/{self.dlp_location}"
+
+        dlp_templates = dlp_config.get("dlp_templates", {})
+        self.inspect_template_name = dlp_templates.get("inspect_template_name", "").replace("${PROJECT_ID}", project_id)
+        self.deidentify_template_name = dlp_templates.get("deidentify_template_name", "").replace("${PROJECT_ID}", project_id)
+        if not self.inspect_template_name:
+            logger.warning("DLP Inspect Template name not found in dlp_config.yaml. DLP inspection might be impaired.")
+        if not self.deidentify_template_name:
+            logger.warning("DLP De-identify Template name not found in dlp_config.yaml. DLP de-identification might be impaired.")
+
+        self._dlp_config = dlp_config
+        self._deidentify_config = dlp_v2.DeidentifyConfig(
+            copy.deepcopy(dlp_config.get("deidentify_config", DEFAULT_DEIDENTIFY_CONFIG)))
+
+        self.default = self._build(None)
+        self._by_type = {pii_type: self._build(pii_type) for pii_type in known_pii_types(dlp_config)}
+        logger.info(f"Precomputed DLP request templates for {len(self._by_type)} expected PII types.")
+
+    def _build(self, expected_type: str | None) -> RequestTemplate:
+        inline_inspect_config = dlp_v2.InspectConfig(build_inline_inspect_config(self._dlp_config, expected_type))
+        dynamic_context_applied = expected_type is not None
+
+        primary = {"parent": self.parent}
+        # If dynamic context was applied OR no template is specified, use the inline config.
+        # Otherwise, use the template. This ensures context-based changes are always applied.
+        if dynamic_context_applied or not self.inspect_template_name:
+            primary["inspect_config"] = inline_inspect_config
+        else:
+            primary["inspect_template_name"] = self.inspect_template_name
+        if self.deidentify_template_name:
+            primary["deidentify_template_name"] = self.deidentify_template_name
+        else:
+            primary["deidentify_config"] = self._deidentify_config
+
+        fallback = {
+            "parent": self.parent,
+            "inspect_config": inline_inspect_config,
+            "deidentify_config": self._deidentify_config,
+        }
+        return RequestTemplate(MappingProxyType(primary), MappingProxyType(fallback), dynamic_context_applied)
+
+    def for_context(self, context: dict | None) -> RequestTemplate:
+        expected_type = context.get("expected_pii_type") if context else None
+        if not expected_type:
+            return self.default
+        template = self._by_type.get(expected_type)
+        if template is None:
+            logger.info(f"Building an uncached DLP request template for unknown expected PII type '{expected_type}'.")
+            template = self._build(expected_type)
+        return template
@@ -0,0 +1,59 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel per job. transcript_aggregator_service publishes a 'segment'
+# event for every stored redacted utterance and 'status' DONE after final aggregation;
+# main_service publishes 'status' FAILED for aborted uploads.
+CHANNEL_PREFIX = "job_events:"
+# Optional keyspace notifications (notify-keyspace-events must include 'K$') for
+# final_transcript keys written outside this repository.
+FINAL_TRANSCRIPT_KEYSPACE_PREFIX = "__keyspace@0__:final_transcript:"
+
+TERMINAL_STATUSES = ("DONE", "FAILED")
+
+
+def channel(job_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{job_id}"
+
+
+def keyspace_channel(job_id: str) -> str:
+    return f"{FINAL_TRANSCRIPT_KEYSPACE_PREFIX}{job_id}"
+
+
+def publish(redis_client, job_id: str, event_type: str, data: dict):
+    """Fire-and-forget; a lost event only delays the client until its next reconnect or poll."""
+    try:
+        redis_client.publish(channel(job_id), json.dumps({"type": event_type, **data}))
+    except Exception as e:
+        logger.warning(f"Could not publish '{event_type}' job event for {job_id}. Error: {str(e)}")
+
+
+def format_sse(event_type: str, data: dict) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+def snapshot_events(final_transcript: dict | None, original_transcript_segments: list) -> list[str]:
+    """Initial events for a new stream: the original transcript, then DONE if already finished."""
+    events = [format_sse("snapshot", {
+        "status": "DONE" if final_transcript else "PROCESSING",
+        "original_conversation": {"transcript": {"transcript_segments": original_transcript_segments}},
+    })]
+    if final_transcript:
+        events.append(final_transcript_event(final_transcript))
+    return events
+
+
+def final_transcript_event(final_transcript: dict) -> str:
+    return format_sse("status", {
+        "status": "DONE",
+        "redacted_conversation": {"transcript": {"transcript_segments": final_transcript.get("transcript_segments", [])}},
+    })
+
+
+def message_to_sse(data: str) -> tuple[str, bool]:
+    """Converts a job_events pub/sub payload to an SSE frame; the flag marks a terminal status."""
+    event = json.loads(data)
+    event_type = event.pop("type", "message")
+    return format_sse(event_type, event), event_type == "status" and event.get("status") in TERMINAL_STATUSES
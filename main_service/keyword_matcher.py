@@ -0,0 +1,133 @@
+import re
+from typing import NamedTuple
+
+
+class KeywordMatch(NamedTuple):
+    """A single context keyword hit inside an agent utterance."""
+    keyword: str
+    pii_types: tuple
+    start: int
+    end: int
+
+
+def _build_trie(keywords):
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True  # Terminal marker
+    return trie
+
+
+def _trie_to_pattern(node) -> str:
+    """
+    Renders a character trie as a regex with shared prefixes factored out,
+    e.g. ["card number", "cvv", "credit card"] -> "c(?:ard\\ number|redit\\ card|vv)".
+    Longer continuations are tried before the terminal so that the regex engine
+    always prefers the longest keyword starting at a given position.
+    """
+    terminal = "" in node
+    branches = [re.escape(char) + _trie_to_pattern(child)
+                for char, child in sorted(node.items()) if char != ""]
+
+    if not branches:
+        return ""
+    if len(branches) == 1:
+        body = branches[0]
+        if terminal:
+            return f"(?:{body})?"
+        return body
+    body = "(?:" + "|".join(branches) + ")"
+    if terminal:
+        return body + "?"
+    return body
+
+
+def _is_word_char(char: str) -> bool:
+    r"""Whether the regex \w matches char, i.e. a keyword may not end right before it."""
+    return char.isalnum() or char == "_"
+
+
+class KeywordMatcher:
+    """
+    Precompiled matcher for the 'context_keywords' section of dlp_config.yaml.
+
+    All keywords are compiled once into a single prefix-factored, word-bounded
+    regex, so scanning an utterance is one pass over the text regardless of how
+    many keywords are configured. The regex sits in a lookahead, so a match is
+    attempted at every word start and overlapping keywords are all found.
+    Offsets always index the transcript as given: it is scanned lowercased when
+    str.lower() keeps its length (each character then maps to exactly one), and
+    otherwise case-insensitively as is, which is slower.
+    """
+
+    def __init__(self, context_keywords: dict):
+        self._keyword_types = {}
+        for pii_type, keywords in (context_keywords or {}).items():
+            for keyword in keywords or []:
+                normalized = str(keyword).strip().lower()
+                if not normalized:
+                    continue
+                types = self._keyword_types.setdefault(normalized, [])
+                if pii_type not in types:
+                    types.append(pii_type)
+        self._keyword_types = {k: tuple(v) for k, v in self._keyword_types.items()}
+
+        # The regex reports the longest keyword at each start; shorter keywords that
+        # end on a word boundary inside it (e.g. "card" in "card number") are added from here.
+        self._nested = {}
+        for keyword in self._keyword_types:
+            nested = [keyword[:i] for i in range(len(keyword) - 1, 0, -1)
+                      if not _is_word_char(keyword[i]) and keyword[:i] in self._keyword_types]
+            if nested:
+                self._nested[keyword] = tuple(nested)
+
+        self._pattern = self._pattern_ignorecase = None
+        if self._keyword_types:
+            trie_pattern = _trie_to_pattern(_build_trie(self._keyword_types))
+            # Lookarounds rather than \b so keywords that start or end with
+            # punctuation (e.g. "driver's license") still bound correctly.
+            pattern = rf"(?<!\w)(?=((?:{trie_pattern}))(?!\w))"
+            self._pattern = re.compile(pattern)
+            self._pattern_ignorecase = re.compile(pattern, re.IGNORECASE)
+
+    def __len__(self):
+        return len(self._keyword_types)
+
+    def find_all(self, transcript: str) -> list[KeywordMatch]:
+        """
+        Returns every keyword hit in the transcript, overlapping ones included, ordered
+        by start offset and, at one start, longest first. Offsets index the transcript.
+        """
+        if not self._pattern or not transcript:
+            return []
+        lowered = transcript.lower()
+        if len(lowered) == len(transcript):
+            scan = self._pattern.finditer(lowered)
+        else:
+            scan = self._pattern_ignorecase.finditer(transcript)
+        matches = []
+        for m in scan:
+            keyword = m.group(1).lower()
+            pii_types = self._keyword_types.get(keyword)
+            if not pii_types:  # Case-insensitive match whose lower() differs from the keyword
+                continue
+            start = m.start(1)
+            matches.append(KeywordMatch(keyword, pii_types, start, m.end(1)))
+            for nested in self._nested.get(keyword, ()):
+                matches.append(KeywordMatch(nested, self._keyword_types[nested], start, start + len(nested)))
+        return matches
+
+    def best_match(self, transcript: str) -> KeywordMatch | None:
+        """
+        Returns the most specific hit: the longest keyword, then the one mapping to
+        the fewest PII types, then the earliest in the utterance.
+        """
+        return select_best_match(self.find_all(transcript))
+
+
+def select_best_match(matches: list[KeywordMatch]) -> KeywordMatch | None:
+    if not matches:
+        return None
+    return min(matches, key=lambda m: (-len(m.keyword), len(m.pii_types), m.start))
@@ -0,0 +1,445 @@
+import logging
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from typing import NamedTuple
+
+from dlp_requests import build_inline_inspect_config, known_pii_types
+from pii_prefilter import PiiPrefilter
+
+logger = logging.getLogger(__name__)
+
+# DLP likelihood scale, lowest to highest.
+LIKELIHOODS = ("LIKELIHOOD_UNSPECIFIED", "VERY_UNLIKELY", "UNLIKELY", "POSSIBLE", "LIKELY", "VERY_LIKELY")
+DEFAULT_CUSTOM_LIKELIHOOD = "VERY_LIKELY"
+DEFAULT_MIN_LIKELIHOOD = "POSSIBLE"
+
+# Built-in info types the engine can detect well enough to evaluate exclusion rules
+# against them (e.g. SOCIAL_HANDLE excluded inside EMAIL_ADDRESS). They are never
+# reported as findings; built-in detection stays with DLP.
+EXCLUSION_DETECTORS = {
+    "EMAIL_ADDRESS": re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
+}
+
+MATCHING_TYPES = ("MATCHING_TYPE_FULL_MATCH", "MATCHING_TYPE_PARTIAL_MATCH", "MATCHING_TYPE_INVERSE_MATCH")
+
+_INFO_TYPE_TOKEN_RE = re.compile(r"\[([A-Z0-9_]+)\]")
+
+# Joins the utterances of a batch into one scan buffer. A non-word character, so \b
+# behaves at utterance edges as it does on the utterance alone.
+BATCH_SEPARATOR = "\x00"
+# Anchors and backreferences change meaning inside a combined buffer or alternation.
+_NOT_COMBINABLE_RE = re.compile(r"(?<![\\\[])[$^]|\\[AZ1-9]|\(\?P=")
+_LEADING_FLAGS_RE = re.compile(r"\(\?([imsx]+)\)")
+
+
+def likelihood_rank(value) -> int:
+    """Accepts a likelihood name, its number or a dlp_v2.Likelihood member."""
+    if isinstance(value, str):
+        return LIKELIHOODS.index(value)
+    return int(value)
+
+
+class Finding(NamedTuple):
+    info_type: str
+    start: int
+    end: int
+    likelihood: int
+
+
+class UnsupportedConfig(ValueError):
+    """Part of an inspect_config that cannot be evaluated in process."""
+
+
+class _Rule:
+    def __init__(self, rule: dict):
+        if "hotword_rule" in rule:
+            hotword_rule = rule["hotword_rule"]
+            self.kind = "hotword"
+            self.hotword = re.compile(hotword_rule["hotword_regex"]["pattern"])
+            proximity = hotword_rule.get("proximity", {})
+            self.window_before = int(proximity.get("window_before", 0))
+            self.window_after = int(proximity.get("window_after", 0))
+            adjustment = hotword_rule.get("likelihood_adjustment", {})
+            self.fixed_likelihood = (likelihood_rank(adjustment["fixed_likelihood"])
+                                     if "fixed_likelihood" in adjustment else None)
+            self.relative_likelihood = int(adjustment.get("relative_likelihood", 0))
+        elif "exclusion_rule" in rule:
+            exclusion_rule = rule["exclusion_rule"]
+            self.kind = "exclusion"
+            self.matching_type = exclusion_rule.get("matching_type", "MATCHING_TYPE_FULL_MATCH")
+            if self.matching_type not in MATCHING_TYPES:
+                raise UnsupportedConfig(f"exclusion matching type {self.matching_type}")
+            self.exclude_types = self.exclude_regex = self.exclude_words = None
+            if "exclude_info_types" in exclusion_rule:
+                self.exclude_types = [it["name"] for it in exclusion_rule["exclude_info_types"].get("info_types", [])]
+            elif "regex" in exclusion_rule:
+                self.exclude_regex = re.compile(exclusion_rule["regex"]["pattern"])
+            elif "dictionary" in exclusion_rule:
+                words = exclusion_rule["dictionary"].get("word_list", {}).get("words", [])
+                self.exclude_words = frozenset(w.lower() for w in words)
+            else:
+                raise UnsupportedConfig(f"exclusion rule {sorted(exclusion_rule)}")
+        else:
+            raise UnsupportedConfig(f"rule {sorted(rule)}")
+
+    def adjust(self, text: str, finding: Finding) -> int:
+        before = text[max(0, finding.start - self.window_before):finding.start] if self.window_before else ""
+        after = text[finding.end:finding.end + self.window_after] if self.window_after else ""
+        if not (before and self.hotword.search(before)) and not (after and self.hotword.search(after)):
+            return finding.likelihood
+        if self.fixed_likelihood is not None:
+            return self.fixed_likelihood
+        return max(1, min(len(LIKELIHOODS) - 1, finding.likelihood + self.relative_likelihood))
+
+    def excludes(self, text: str, finding: Finding, spans_by_type: dict) -> bool:
+        if self.exclude_types is not None:
+            spans = [span for t in self.exclude_types for span in spans_by_type.get(t, ())]
+            if self.matching_type == "MATCHING_TYPE_FULL_MATCH":
+                return any(s <= finding.start and finding.end <= e for s, e in spans)
+            overlaps = any(s < finding.end and finding.start < e for s, e in spans)
+            return overlaps if self.matching_type == "MATCHING_TYPE_PARTIAL_MATCH" else not overlaps
+        quote = text[finding.start:finding.end]
+        if self.exclude_regex is not None:
+            if self.matching_type == "MATCHING_TYPE_FULL_MATCH":
+                return self.exclude_regex.fullmatch(quote) is not None
+            found = self.exclude_regex.search(quote) is not None
+        else:
+            if self.matching_type == "MATCHING_TYPE_FULL_MATCH":
+                return quote.lower() in self.exclude_words
+            found = any(word in quote.lower() for word in self.exclude_words)
+        return found if self.matching_type == "MATCHING_TYPE_PARTIAL_MATCH" else not found
+
+
+class LocalInspector:
+    """
+    One inspect_config compiled for in-process evaluation: custom regex info types,
+    hotword_rule proximity and likelihood adjustments, exclusion rules and
+    min_likelihood. Built-in info types are recorded in builtin_types and not
+    detected; custom types that cannot be evaluated are listed in unsupported.
+    """
+
+    def __init__(self, inspect_config: dict):
+        self.min_likelihood = likelihood_rank(inspect_config.get("min_likelihood", DEFAULT_MIN_LIKELIHOOD))
+        self.builtin_types = {it.get("name") for it in inspect_config.get("info_types", [])}
+        self.unsupported = {}
+        self._custom = []  # (info_type, compiled regex, group index, likelihood)
+        for custom in inspect_config.get("custom_info_types", []):
+            name = custom.get("info_type", {}).get("name")
+            try:
+                self._custom.append(self._compile_custom(name, custom))
+            except (UnsupportedConfig, re.error, KeyError) as e:
+                self.unsupported[name] = str(e)
+        custom_names = {c[0] for c in self._custom}
+
+        self._rules = {}  # info_type -> [_Rule] in config order
+        for rule_set in inspect_config.get("rule_set", []):
+            names = [it.get("name") for it in rule_set.get("info_types", [])]
+            try:
+                rules = [_Rule(rule) for rule in rule_set.get("rules", [])]
+            except (UnsupportedConfig, re.error, KeyError) as e:
+                for name in names:
+                    if name in custom_names:
+                        self.unsupported[name] = str(e)
+                continue
+            for rule in rules:
+                if rule.kind == "exclusion" and rule.exclude_types:
+                    missing = [t for t in rule.exclude_types if t not in custom_names and t not in EXCLUSION_DETECTORS]
+                    if missing:
+                        for name in names:
+                            self.unsupported.setdefault(name, f"exclusion against {missing} needs DLP")
+            for name in names:
+                self._rules.setdefault(name, []).extend(rules)
+        self._custom = [c for c in self._custom if c[0] not in self.unsupported]
+        self.info_types = tuple(c[0] for c in self._custom)
+        self._gates, self._gate_all = self._compile_gates([c[1].pattern for c in self._custom])
+
+    @staticmethod
+    def _compile_custom(name: str, custom: dict):
+        if custom.get("exclusion_type") == "EXCLUSION_TYPE_EXCLUDE":
+            raise UnsupportedConfig("EXCLUSION_TYPE_EXCLUDE custom types")
+        regex = custom.get("regex")
+        if not regex or "pattern" not in regex:
+            raise UnsupportedConfig(f"custom info type '{name}' is not regex-based")
+        group_indexes = regex.get("group_indexes") or [0]
+        if len(group_indexes) != 1:
+            raise UnsupportedConfig(f"custom info type '{name}' uses several group_indexes")
+        likelihood = likelihood_rank(custom.get("likelihood", DEFAULT_CUSTOM_LIKELIHOOD))
+        return name, re.compile(regex["pattern"]), int(group_indexes[0]), likelihood
+
+    @staticmethod
+    def _compile_gates(patterns: list[str]):
+        """
+        Patterns scan_batch runs over a whole batch buffer: one alternation of every
+        custom pattern, or one pass per pattern if they cannot be combined. gate_all
+        is set when some pattern is anchored, so every utterance needs its own scan.
+        """
+        if any(_NOT_COMBINABLE_RE.search(p) for p in patterns):
+            return [], True
+        if not patterns:
+            return [], False
+        scoped = []
+        for pattern in patterns:
+            flags = _LEADING_FLAGS_RE.match(pattern)
+            scoped.append(f"(?{flags.group(1)}:{pattern[flags.end():]})" if flags else f"(?:{pattern})")
+        try:
+            return [re.compile("|".join(scoped))], False
+        except re.error:
+            return [re.compile(p) for p in patterns], False
+
+    def scan_batch(self, texts: list[str]) -> list[array]:
+        """
+        Findings for many utterances at once, as one array('i') per utterance of
+        flattened (info_types index, start, end, likelihood) quadruples.
+
+        The gates run once over all utterances joined by BATCH_SEPARATOR; only the
+        utterances a gate match touches are then scanned by findings(), so the
+        result is identical to calling findings() on each utterance.
+        """
+        results = [array("i") for _ in texts]
+        if not self._custom or not texts:
+            return results
+        if self._gate_all:
+            candidates = range(len(texts))
+        else:
+            starts, position = [], 0
+            for text in texts:
+                starts.append(position)
+                position += len(text) + len(BATCH_SEPARATOR)
+            buffer = BATCH_SEPARATOR.join(texts)
+            candidates = set()
+            for gate in self._gates:
+                for match in gate.finditer(buffer):
+                    first = bisect_right(starts, match.start()) - 1
+                    last = bisect_right(starts, max(match.start(), match.end() - 1)) - 1
+                    candidates.update(range(first, last + 1))
+            candidates = sorted(candidates)
+        type_indexes = {name: i for i, name in enumerate(self.info_types)}
+        for i in candidates:
+            offsets = results[i]
+            for finding in self.findings(texts[i]):
+                offsets.extend((type_indexes[finding.info_type], finding.start, finding.end, finding.likelihood))
+        return results
+
+    def findings(self, text: str) -> list[Finding]:
+        candidates = []
+        for name, pattern, group, likelihood in self._custom:
+            for match in pattern.finditer(text):
+                start, end = match.span(group)
+                if start < end:
+                    candidates.append(Finding(name, start, end, likelihood))
+
+        spans_by_type = {}
+        for finding in candidates:
+            spans_by_type.setdefault(finding.info_type, []).append((finding.start, finding.end))
+        for name, detector in EXCLUSION_DETECTORS.items():
+            spans_by_type.setdefault(name, []).extend(m.span() for m in detector.finditer(text))
+
+        results = []
+        for finding in candidates:
+            likelihood = finding.likelihood
+            excluded = False
+            for rule in self._rules.get(finding.info_type, ()):
+                if rule.kind == "hotword":
+                    likelihood = rule.adjust(text, finding._replace(likelihood=likelihood))
+                elif rule.excludes(text, finding, spans_by_type):
+                    excluded = True
+                    break
+            if not excluded and likelihood >= self.min_likelihood:
+                results.append(finding._replace(likelihood=likelihood))
+        return resolve_overlaps(results)
+
+
+def resolve_overlaps(findings: list[Finding]) -> list[Finding]:
+    """Keeps one finding per overlapping region: highest likelihood, then longest, then earliest."""
+    ordered = sorted(findings, key=lambda f: (-f.likelihood, -(f.end - f.start), f.start))
+    kept = []
+    for finding in ordered:
+        if all(finding.end <= k.start or k.end <= finding.start for k in kept):
+            kept.append(finding)
+    return sorted(kept, key=lambda f: f.start)
+
+
+def replace_with_info_type(text: str, findings: list[Finding]) -> str:
+    """DLP's replace_with_info_type_config: each finding becomes [INFO_TYPE]."""
+    parts, position = [], 0
+    for finding in findings:
+        parts.append(text[position:finding.start])
+        parts.append(f"[{finding.info_type}]")
+        position = finding.end
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def replace_offsets(text: str, offsets: array, info_types: tuple) -> str:
+    """replace_with_info_type for one utterance's scan_batch result."""
+    if not offsets:
+        return text
+    parts, position = [], 0
+    for i in range(0, len(offsets), 4):
+        parts.append(text[position:offsets[i + 1]])
+        parts.append(f"[{info_types[offsets[i]]}]")
+        position = offsets[i + 2]
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+class LocalDlpEngine:
+    """
+    Evaluates dlp_config.yaml in process, for call_dlp_for_redaction's local backends.
+
+    For each expected PII type the effective inspect_config is the one DLP would get
+    (dlp_requests.build_inline_inspect_config), compiled once into a LocalInspector.
+    Custom regex info types are evaluated exactly; built-in info types are DLP's own
+    detectors and are not reproduced. covers() tells whether a local result is
+    complete: every custom type is supported and the built-in types' candidate
+    signals (see pii_prefilter) are absent, so DLP could not have found more.
+
+    The engine only knows the YAML. When DLP requests use a de-identify template
+    the engine is disabled; when requests without context use an inspect template,
+    covers() is False for them and they are not shadow-compared.
+    """
+
+    def __init__(self, dlp_config: dict, inspect_template_name: str | None = None,
+                 deidentify_template_name: str | None = None):
+        self._dlp_config = dlp_config
+        self.enabled = False
+        self.disabled_reason = None
+        self._no_context_template = inspect_template_name
+        self._inspectors = {}
+        self._known_types = known_pii_types(dlp_config)
+        self._builtin_prefilters = {}
+        self._lock = threading.Lock()
+        self.stats = {"local_redactions": 0, "covered": 0, "not_covered": 0,
+                      "shadow_compared": 0, "shadow_matched": 0, "shadow_mismatched_covered": 0,
+                      "shadow_mismatched_uncovered": 0, "shadow_skipped_template": 0}
+        self.shadow_mismatch_types = Counter()
+
+        if deidentify_template_name:
+            self._disable(f"DLP requests de-identify with template '{deidentify_template_name}', "
+                          f"whose transformations are not known locally")
+            return
+
+        transformations = (dlp_config.get("deidentify_config", {})
+                           .get("info_type_transformations", {}).get("transformations", []))
+        if any("replace_with_info_type_config" not in t.get("primitive_transformation", {})
+               or t.get("info_types") for t in transformations):
+            self._disable("deidentify_config uses transformations other than replace_with_info_type_config")
+            return
+
+        default = self._inspector(None)
+        builtin_prefilter = self._builtin_prefilter(default)
+        if builtin_prefilter is not None and not builtin_prefilter.enabled:
+            logger.warning(f"Local DLP engine cannot rule out built-in info types ({builtin_prefilter.disabled_reason}); "
+                           "local-first mode will always fall back to DLP.")
+        if default.unsupported:
+            logger.warning(f"Local DLP engine cannot evaluate custom info types: {default.unsupported}")
+        if inspect_template_name:
+            self.disabled_reason = (f"disabled for requests without context: they inspect with template "
+                                    f"'{inspect_template_name}', whose info types may differ from inspect_config")
+            logger.warning(f"Local DLP engine {self.disabled_reason}.")
+        self.enabled = True
+        logger.info(f"Local DLP engine compiled {len(default._custom)} custom info types; "
+                    f"{len(default.builtin_types)} built-in types stay with DLP.")
+
+    def _disable(self, reason: str):
+        self.enabled = False
+        self.disabled_reason = reason
+        logger.warning(f"Local DLP engine disabled: {reason}.")
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _uses_remote_template(self, context: dict | None) -> bool:
+        """True when DLP inspects this request with a template the engine cannot evaluate."""
+        return bool(self._no_context_template) and not (context and context.get("expected_pii_type"))
+
+    def _inspector(self, expected_type: str | None) -> LocalInspector:
+        inspector = self._inspectors.get(expected_type)
+        if inspector is None:
+            inspector = LocalInspector(build_inline_inspect_config(self._dlp_config, expected_type))
+            if expected_type is None or expected_type in self._known_types:  # Keeps the cache bounded
+                self._inspectors[expected_type] = inspector
+        return inspector
+
+    def _builtin_prefilter(self, inspector: LocalInspector) -> PiiPrefilter | None:
+        """A PiiPrefilter over only the built-in info types, telling whether DLP could find any of them."""
+        key = frozenset(inspector.builtin_types)
+        if not key:
+            return None
+        prefilter = self._builtin_prefilters.get(key)
+        if prefilter is None:
+            prefilter = PiiPrefilter({"info_types": [{"name": name} for name in sorted(key)]})
+            self._builtin_prefilters[key] = prefilter
+        return prefilter
+
+    def inspect(self, transcript: str, context: dict | None = None) -> list[Finding]:
+        expected_type = context.get("expected_pii_type") if context else None
+        return self._inspector(expected_type).findings(transcript)
+
+    def redact(self, transcript: str, context: dict | None = None) -> str:
+        self._count("local_redactions")
+        return replace_with_info_type(transcript, self.inspect(transcript, context))
+
+    def scan_batch(self, transcripts: list[str], context: dict | None = None) -> tuple[tuple, list[array]]:
+        """(info_types, offsets per utterance); see LocalInspector.scan_batch."""
+        expected_type = context.get("expected_pii_type") if context else None
+        inspector = self._inspector(expected_type)
+        return inspector.info_types, inspector.scan_batch(transcripts)
+
+    def redact_batch(self, transcripts: list[str], context: dict | None = None) -> list[str]:
+        """redact() for many utterances sharing one context, in a single pass over the batch."""
+        info_types, offsets = self.scan_batch(transcripts, context)
+        with self._lock:
+            self.stats["local_redactions"] += len(transcripts)
+        return [replace_offsets(text, text_offsets, info_types) for text, text_offsets in zip(transcripts, offsets)]
+
+    def covers(self, transcript: str, context: dict | None = None) -> bool:
+        """True when the local result is complete, i.e. DLP cannot find anything the engine missed."""
+        expected_type = context.get("expected_pii_type") if context else None
+        inspector = self._inspector(expected_type)
+        builtin_prefilter = self._builtin_prefilter(inspector)
+        covered = (
+            not self._uses_remote_template(context)
+            and not inspector.unsupported
+            and expected_type not in inspector.builtin_types
+            and (builtin_prefilter is None
+                 or (builtin_prefilter.enabled and not builtin_prefilter.may_contain_pii(transcript)))
+        )
+        self._count("covered" if covered else "not_covered")
+        return covered
+
+    def shadow_compare(self, transcript: str, context: dict | None, dlp_result: str) -> bool:
+        """Compares the local result with DLP's; mismatches are logged by info type, never with the text."""
+        if self._uses_remote_template(context):
+            self._count("shadow_skipped_template")
+            return False
+        local_result = replace_with_info_type(transcript, self.inspect(transcript, context))
+        if local_result == dlp_result:
+            with self._lock:
+                self.stats["shadow_compared"] += 1
+                self.stats["shadow_matched"] += 1
+            return True
+        covered = self.covers(transcript, context)
+        local_types = Counter(_INFO_TYPE_TOKEN_RE.findall(local_result))
+        dlp_types = Counter(_INFO_TYPE_TOKEN_RE.findall(dlp_result))
+        differing = (local_types - dlp_types) + (dlp_types - local_types)
+        with self._lock:
+            self.stats["shadow_compared"] += 1
+            self.stats["shadow_mismatched_covered" if covered else "shadow_mismatched_uncovered"] += 1
+            self.shadow_mismatch_types.update(differing.keys())
+        if covered:
+            logger.warning(f"Local DLP shadow mismatch on a covered utterance: local={dict(local_types)}, dlp={dict(dlp_types)}")
+        return False
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["shadow_mismatch_types"] = dict(self.shadow_mismatch_types)
+        stats["enabled"] = self.enabled
+        if self.disabled_reason:
+            stats["disabled_reason"] = self.disabled_reason
+        return stats
@@ -1,71 +1,63 @@
 import os
 import logging
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, after_this_request, stream_with_context
 from flask_cors import CORS
 from google.oauth2 import id_token
 from google.auth.transport import requests
 import redis
 import json
 import time
-import yaml
 import uuid # New import for generating job IDs
+import sys
+import math
+import threading
 from google.cloud import dlp_v2
 from google.cloud import pubsub_v1 # New import for Pub/Sub publishing
 from google.cloud import contact_center_insights_v1 # New import for CCAI Insights API
-from google.cloud.secretmanager import SecretManagerServiceClient
 from google.api_core.exceptions import NotFound, PermissionDenied, GoogleAPICallError, MethodNotImplemented
+from contextlib import nullcontext
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 import firebase_admin  # Added import for firebase_admin
 from firebase_admin import auth  # Import auth for token verification
-
-# Configure standard logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(name)s %(module)s %(funcName)s %(lineno)d : %(message)s')
+# shared/ holds modules common to all services; Cloud Build copies them next to main.py.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "shared"))
+import secret_config
+import stage_metrics
+import structured_logging
+from keyword_matcher import KeywordMatcher, select_best_match
+from dlp_requests import DlpRequestTemplates, known_pii_types
+import dlp_config_manager
+from dlp_config_manager import DlpConfigSnapshot
+from dlp_batcher import DlpMicroBatcher
+import dlp_rate_limiter
+from dlp_rate_limiter import DlpOverloaded
+from pii_prefilter import PiiPrefilter
+from local_dlp import LocalDlpEngine
+from redaction_cache import RedactionCache
+from redis_store import ChunkedTranscriptWriter, RedisStore, create_pool
+from context_cache import ContextNearCache
+from pubsub_envelopes import pack_utterances
+from token_cache import VerifiedTokenCache
+from ccai_status_cache import CcaiStatusCache, NOT_CACHED
+import job_events
+from startup import StartupOrchestrator
+
+# Structured JSON logging (LOG_FORMAT=text for the plain format); hot paths log sampled
+# events without payloads through `events` (shared/structured_logging.py).
+structured_logging.configure("main-service")
 logger = logging.getLogger(__name__)
+events = structured_logging.get_logger(__name__)
 
 # --- Google Cloud Secret Manager Helper ---
 GCP_PROJECT_ID_FOR_SECRETS = os.getenv("GOOGLE_CLOUD_PROJECT")
 
-def get_secret(secret_id, version_id="latest", project_id=None):
-    """
-    Fetches a secret from Google Cloud Secret Manager.
-    Args:
-        secret_id (str): The ID of the secret.
-        version_id (str): The version of the secret (default is "latest").
-        project_id (str): The GCP project ID. If None, uses GCP_PROJECT_ID_FOR_SECRETS.
-    Returns:
-        str: The secret value, or None if an error occurs.
-    """
-    if not project_id:
-        project_id = GCP_PROJECT_ID_FOR_SECRETS
-
-    if not project_id:
-        logger.error("GCP_PROJECT_ID_FOR_SECRETS is not set. Cannot fetch secrets.")
-        return None
-    if not secret_id:
-        logger.error("secret_id not provided to get_secret function.")
-        return None
+# One Secret Manager client, concurrent bulk reads and a TTL cache refreshed in the
+# background; shared with the other services (shared/secret_config.py).
+secret_cache = secret_config.from_env(GCP_PROJECT_ID_FOR_SECRETS)
 
-    try:
-        client = SecretManagerServiceClient()
-        name = f"projects/{project_id}/secrets/{secret_id}/versions/{version_id}"
-        response = client.access_secret_version(name=name)
-        payload = response.payload.data.decode("UTF-8")
-        # Strip whitespace/newlines from the fetched secret
-        cleaned_payload = payload.strip()
-        logger.info(f"Successfully fetched secret: {secret_id} (version: {version_id}). Raw length: {len(payload)}, Cleaned length: {len(cleaned_payload)}")
-        if payload != cleaned_payload:
-            logger.warning(f"Secret '{secret_id}' had leading/trailing whitespace removed. Original: '{repr(payload)}', Cleaned: '{repr(cleaned_payload)}'")
-        return cleaned_payload
-    except NotFound:
-        logger.error(f"Secret {secret_id} (version: {version_id}) not found in project {project_id}.")
-        return None
-    except PermissionDenied:
-        logger.error(f"Permission denied when trying to access secret {secret_id} (version: {version_id}) in project {project_id}.")
-        return None
-    except Exception as e:
-        logger.error(f"An unexpected error occurred while fetching secret {secret_id} (version: {version_id}): {str(e)}")
-        return None
+# Per-stage latency histograms served at /metrics when METRICS_ENABLED=true (shared/stage_metrics.py).
+metrics = stage_metrics.from_env("main_service")
 
 # Get the frontend URL from an environment variable, with a fallback for local dev
 app = Flask(__name__)
@@ -75,20 +67,35 @@ app = Flask(__name__)
 # It's best practice to make this configurable via an environment variable.
 frontend_url = os.environ.get('FRONTEND_URL', 'https://frontend-app-315895523022.us-central1.run.app')
 
-CORS(app, resources={r"/*": {"origins": frontend_url}})
+CORS(app, resources={r"/*": {"origins": frontend_url}}, expose_headers=["ETag", "X-Redaction-Events"])
 
 # --- Firebase Admin SDK Initialization ---
-try:
-    # Initialize Firebase Admin SDK.
-    # On Cloud Run, this will automatically pick up credentials from the service account.
-    # For local development, ensure GOOGLE_APPLICATION_CREDENTIALS is set or use a service account key file.
-    firebase_admin.initialize_app()
-    logger.info("Firebase Admin SDK initialized successfully.")
-except ValueError as e:
-    logger.error(f"Firebase Admin SDK initialization failed: {e}. This might happen if it's already initialized or credentials are missing.")
-except Exception as e:
-    logger.critical(f"An unexpected error occurred during Firebase Admin SDK initialization: {e}. Exiting.")
-    exit(1)
+# The init_* / load_* functions below are cold-start steps; they run concurrently
+# through the StartupOrchestrator further down and assign the module globals.
+def init_firebase():
+    try:
+        # Initialize Firebase Admin SDK.
+        # On Cloud Run, this will automatically pick up credentials from the service account.
+        # For local development, ensure GOOGLE_APPLICATION_CREDENTIALS is set or use a service account key file.
+        firebase_admin.initialize_app()
+        logger.info("Firebase Admin SDK initialized successfully.")
+    except ValueError as e:
+        logger.error(f"Firebase Admin SDK initialization failed: {e}. This might happen if it's already initialized or credentials are missing.")
+    except Exception as e:
+        logger.critical(f"An unexpected error occurred during Firebase Admin SDK initialization: {e}. Exiting.")
+        raise
+
+# Verified ID tokens are cached until their 'exp' claim so repeated status polls and
+# realtime calls skip signature verification. Revocation checks are opt-in.
+AUTH_TOKEN_CACHE_ENABLED = os.getenv('AUTH_TOKEN_CACHE_ENABLED', 'true').lower() == 'true'
+AUTH_CHECK_REVOKED = os.getenv('AUTH_CHECK_REVOKED', 'false').lower() == 'true'
+token_cache = None
+if AUTH_TOKEN_CACHE_ENABLED:
+    token_cache = VerifiedTokenCache(
+        max_entries=int(os.getenv('AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000)),
+        check_revoked=AUTH_CHECK_REVOKED,
+        revocation_check_seconds=int(os.getenv('AUTH_REVOCATION_CHECK_SECONDS', 300)),
+    )
 
 # --- Authentication Decorator ---
 def firebase_auth_required(f):
@@ -101,9 +108,13 @@ def firebase_auth_required(f):
 
         try:
             id_token = auth_header.split('Bearer ')[1]
-            decoded_token = auth.verify_id_token(id_token)
+            with metrics.stage("firebase_auth"):
+                if token_cache:
+                    decoded_token = token_cache.verify(id_token)
+                else:
+                    decoded_token = auth.verify_id_token(id_token, check_revoked=AUTH_CHECK_REVOKED)
             request.firebase_user = decoded_token # Attach decoded token to request object
-            logger.info(f"Authentication: Token verified for user UID: {decoded_token['uid']}")
+            events.info("auth_token_verified", uid=decoded_token['uid'])
         except IndexError:
             logger.warning("Authentication: Invalid Authorization header format.")
             return jsonify({"error": "Invalid Authorization header format"}), 401
@@ -136,116 +147,389 @@ REDIS_HOST_SECRET_ID = "CONTEXT_MANAGER_REDIS_HOST"
 REDIS_PORT_SECRET_ID = "CONTEXT_MANAGER_REDIS_PORT"
 DLP_PROJECT_ID_SECRET_ID = "CONTEXT_MANAGER_DLP_PROJECT_ID" # This is already fetched via get_secret below
 
-REDIS_HOST = get_secret(REDIS_HOST_SECRET_ID)
-if not REDIS_HOST:
-    logger.critical(f"Critical: REDIS_HOST secret ('{REDIS_HOST_SECRET_ID}') could not be fetched. Exiting.")
-    exit(1)
+REDIS_HOST = None
+REDIS_PORT = 6379
+DLP_PROJECT_ID = None
+
+def load_secrets():
+    """Fetches the three secrets concurrently; raises on the ones that were fatal at import time."""
+    global REDIS_HOST, REDIS_PORT, DLP_PROJECT_ID
+    secret_ids = (REDIS_HOST_SECRET_ID, REDIS_PORT_SECRET_ID, DLP_PROJECT_ID_SECRET_ID)
+    values = secret_cache.get_many(secret_ids)
+    redis_host, redis_port_str, dlp_project_id = (values[secret_id] for secret_id in secret_ids)
+
+    if not redis_host:
+        logger.critical(f"Critical: REDIS_HOST secret ('{REDIS_HOST_SECRET_ID}') could not be fetched. Exiting.")
+        raise RuntimeError(f"REDIS_HOST secret ('{REDIS_HOST_SECRET_ID}') could not be fetched")
+    REDIS_HOST = redis_host
+
+    if not redis_port_str:
+        logger.warning(f"REDIS_PORT secret ('{REDIS_PORT_SECRET_ID}') not found. Using default port 6379.")
+        REDIS_PORT = 6379
+    else:
+        try:
+            REDIS_PORT = int(redis_port_str)
+        except ValueError:
+            logger.critical(f"Critical: REDIS_PORT secret ('{REDIS_PORT_SECRET_ID}') is not a valid integer: '{redis_port_str}'. Exiting.")
+            raise RuntimeError(f"REDIS_PORT secret ('{REDIS_PORT_SECRET_ID}') is not a valid integer")
 
-REDIS_PORT_STR = get_secret(REDIS_PORT_SECRET_ID)
-if not REDIS_PORT_STR:
-    logger.warning(f"REDIS_PORT secret ('{REDIS_PORT_SECRET_ID}') not found. Using default port 6379.")
-    REDIS_PORT = 6379
-else:
-    try:
-        REDIS_PORT = int(REDIS_PORT_STR)
-    except ValueError:
-        logger.critical(f"Critical: REDIS_PORT secret ('{REDIS_PORT_SECRET_ID}') is not a valid integer: '{REDIS_PORT_STR}'. Exiting.")
-        exit(1)
-
-DLP_PROJECT_ID = get_secret(DLP_PROJECT_ID_SECRET_ID)
-if not DLP_PROJECT_ID:
-    # Depending on strictness, you might exit or allow fallback if DLP is optional at startup
-    logger.warning(f"DLP_PROJECT_ID secret ('{DLP_PROJECT_ID_SECRET_ID}') could not be fetched. DLP functionality might be impaired.")
-    # If DLP_PROJECT_ID is absolutely critical for any operation before a request, consider exiting:
-    # logger.critical(f"Critical: DLP_PROJECT_ID secret ('{DLP_PROJECT_ID_SECRET_ID}') could not be fetched. Exiting.")
-    # exit(1)
+    DLP_PROJECT_ID = dlp_project_id
+    if not DLP_PROJECT_ID:
+        # Depending on strictness, you might exit or allow fallback if DLP is optional at startup
+        logger.warning(f"DLP_PROJECT_ID secret ('{DLP_PROJECT_ID_SECRET_ID}') could not be fetched. DLP functionality might be impaired.")
 
 CONTEXT_TTL_SECONDS = int(os.getenv('CONTEXT_TTL_SECONDS', 90)) # Non-sensitive, from environment variable
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 32))
+REDIS_OP_TIMEOUT_SECONDS = float(os.getenv('REDIS_OP_TIMEOUT_SECONDS', 2))
+JOB_KEYS_TTL_SECONDS = int(os.getenv('JOB_KEYS_TTL_SECONDS', 0)) # 0 keeps job keys without expiry
+# Optional in-process copy of context:<id> keys, invalidated by Redis (CLIENT TRACKING, Redis >= 6).
+CONTEXT_NEAR_CACHE_ENABLED = os.getenv('CONTEXT_NEAR_CACHE_ENABLED', 'false').lower() == 'true'
+CONTEXT_NEAR_CACHE_MAX_ENTRIES = int(os.getenv('CONTEXT_NEAR_CACHE_MAX_ENTRIES', 10000))
+CONTEXT_NEAR_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv('CONTEXT_NEAR_CACHE_NEGATIVE_TTL_SECONDS', 30))
 
 # Initialize Redis client
 redis_client = None
-try:
-    logger.info(f"Attempting to connect to Redis host:{REDIS_HOST} port:{REDIS_PORT} ssl:True")
-    # Ensure your managed Redis instance is configured to accept SSL connections on this port.
-    # For IAM auth, no username/password needed here.
-    redis_client = redis.StrictRedis(
-        host=REDIS_HOST,
-        port=REDIS_PORT,
-        db=0,
-        decode_responses=True,
-        ssl=False,  # Updated to False based on Memorystore config
-        ssl_cert_reqs=None,
-        socket_connect_timeout=10 # Added connection timeout (10 seconds)
-        # username=None # Try removing username parameter entirely for IAM auth with redis-py
-    )
-    logger.info("Redis client configured. Attempting ping...") # Added log
-    redis_client.ping()
-    logger.info("Redis ping successful.") # Added log
-    logger.info("Successfully connected to Redis.")
-except redis.exceptions.AuthenticationError as auth_err: # More specific
-    logger.error(f"Redis AuthenticationError during client initialization. Error: {str(auth_err)}")
-    # redis_client remains None
-except redis.exceptions.TimeoutError as timeout_err: # Added specific TimeoutError handling
-    logger.error(f"Redis TimeoutError during client initialization or ping. Error: {str(timeout_err)}")
-    # redis_client remains None
-except redis.exceptions.ConnectionError as conn_err: # For other connection issues
-    logger.error(f"Redis ConnectionError during client initialization or ping. Error: {str(conn_err)}")
-    # redis_client remains None
-except Exception as e: # Catch any other unexpected errors during initialization
-    logger.error(f"An UNEXPECTED error occurred during Redis client initialization or ping. Error: {str(e)}")
-    # redis_client remains None
-    # Consider if the app should exit(1) here if Redis is absolutely critical for startup
+redis_store = None
+context_cache = None
+# Called with no arguments after init_redis swapped in a new endpoint (see apply_rotated_secret).
+redis_reconnect_callbacks = []
+
+def init_redis():
+    """
+    Connects to REDIS_HOST:REDIS_PORT and, once the new client answers a ping, swaps
+    redis_client, redis_store and context_cache together. When the connection fails
+    the previous clients stay in place and RuntimeError is raised.
+    """
+    global redis_client, redis_store, context_cache
+    try:
+        logger.info(f"Attempting to connect to Redis host:{REDIS_HOST} port:{REDIS_PORT} ssl:False")
+        # For IAM auth, no username/password needed here.
+        # All Redis users share one explicit pool; socket_timeout bounds every operation.
+        client = redis.StrictRedis(connection_pool=create_pool(
+            REDIS_HOST, REDIS_PORT,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            op_timeout=REDIS_OP_TIMEOUT_SECONDS,
+            connect_timeout=10 # Added connection timeout (10 seconds)
+        ))
+        logger.info("Redis client configured. Attempting ping...") # Added log
+        client.ping()
+        logger.info("Redis ping successful.") # Added log
+        logger.info("Successfully connected to Redis.")
+    except redis.exceptions.AuthenticationError as auth_err: # More specific
+        logger.error(f"Redis AuthenticationError during client initialization. Error: {str(auth_err)}")
+        raise RuntimeError("Redis is unavailable") from auth_err
+    except redis.exceptions.TimeoutError as timeout_err: # Added specific TimeoutError handling
+        logger.error(f"Redis TimeoutError during client initialization or ping. Error: {str(timeout_err)}")
+        raise RuntimeError("Redis is unavailable") from timeout_err
+    except redis.exceptions.ConnectionError as conn_err: # For other connection issues
+        logger.error(f"Redis ConnectionError during client initialization or ping. Error: {str(conn_err)}")
+        raise RuntimeError("Redis is unavailable") from conn_err
+    except Exception as e: # Catch any other unexpected errors during initialization
+        logger.error(f"An UNEXPECTED error occurred during Redis client initialization or ping. Error: {str(e)}")
+        raise RuntimeError("Redis is unavailable") from e
+
+    cache = None
+    if CONTEXT_NEAR_CACHE_ENABLED:
+        cache = ContextNearCache(REDIS_HOST, REDIS_PORT, max_entries=CONTEXT_NEAR_CACHE_MAX_ENTRIES,
+                                 negative_ttl_seconds=CONTEXT_NEAR_CACHE_NEGATIVE_TTL_SECONDS)
+        cache.start()
+    old_client, old_cache = redis_client, context_cache
+    redis_client, context_cache = client, cache
+    redis_store = RedisStore(client, job_ttl_seconds=JOB_KEYS_TTL_SECONDS, context_cache=cache)
+    if old_cache:
+        old_cache.stop() # Endpoint rotated; the new cache tracks the new one
+    if old_client:
+        # Requests still holding a connection finish on it; idle ones are closed now.
+        old_client.connection_pool.disconnect(inuse_connections=False)
+
+# Raw transcript publishing. In 'envelope' mode many utterances are packed into one
+# gzip-compressed message; subscriber_service unpacks both formats.
+RAW_TRANSCRIPT_PUBLISH_MODE = os.getenv('RAW_TRANSCRIPT_PUBLISH_MODE', 'per_utterance').lower() # 'per_utterance' or 'envelope'
+ENVELOPE_MAX_UTTERANCES = int(os.getenv('ENVELOPE_MAX_UTTERANCES', 100))
+ENVELOPE_MAX_BYTES = int(os.getenv('ENVELOPE_MAX_BYTES', 256 * 1024))
+# Ordering keys need a subscription created with message ordering enabled.
+PUBSUB_ORDERING_KEYS_ENABLED = os.getenv('PUBSUB_ORDERING_KEYS_ENABLED', 'false').lower() == 'true'
 
 # Initialize Pub/Sub publisher client
-publisher_client = pubsub_v1.PublisherClient()
+publisher_client = None
+
+def init_publisher():
+    global publisher_client
+    publisher_client = pubsub_v1.PublisherClient(
+        batch_settings=pubsub_v1.types.BatchSettings(
+            max_messages=int(os.getenv('PUBSUB_BATCH_MAX_MESSAGES', 500)),
+            max_bytes=int(os.getenv('PUBSUB_BATCH_MAX_BYTES', 5 * 1024 * 1024)),
+            max_latency=float(os.getenv('PUBSUB_BATCH_MAX_LATENCY_SECONDS', 0.05)),
+        ),
+        publisher_options=pubsub_v1.types.PublisherOptions(
+            enable_message_ordering=PUBSUB_ORDERING_KEYS_ENABLED,
+            # Block publish() instead of buffering without bound when uploads outpace Pub/Sub.
+            flow_control=pubsub_v1.types.PublishFlowControl(
+                message_limit=int(os.getenv('PUBSUB_FLOW_CONTROL_MAX_MESSAGES', 5000)),
+                byte_limit=int(os.getenv('PUBSUB_FLOW_CONTROL_MAX_BYTES', 32 * 1024 * 1024)),
+                limit_exceeded_behavior=pubsub_v1.types.LimitExceededBehavior.BLOCK,
+            ),
+        ),
+    )
 RAW_TRANSCRIPTS_TOPIC = 'raw-transcripts'
 AA_LIFECYCLE_TOPIC = 'aa-lifecycle-event-notification'
 
-# Load DLP configuration from dlp_config.yaml
-DLP_CONFIG = {}
-try:
-    with open('dlp_config.yaml', 'r') as f:
-        DLP_CONFIG = yaml.safe_load(f)
-    logger.info("Successfully loaded dlp_config.yaml.")
-except FileNotFoundError:
-    logger.error("dlp_config.yaml not found. DLP functionality might be impaired.")
-    DLP_CONFIG = {} # Ensure it's a dict
-except yaml.YAMLError as e:
-    logger.error(f"Error decoding dlp_config.yaml: {str(e)}. DLP functionality might be impaired.")
-    DLP_CONFIG = {} # Ensure it's a dict
-except Exception as e:
-    logger.error(f"An unexpected error occurred while loading dlp_config.yaml: {str(e)}")
-    DLP_CONFIG = {} # Ensure it's a dict
-
+# Optional local pre-filter that returns utterances unchanged when nothing in
+# inspect_config could possibly match (no digits, '@', custom regex hits, ...).
+PII_PREFILTER_ENABLED = os.getenv('PII_PREFILTER_ENABLED', 'false').lower() == 'true'
+
+# Optional in-process evaluation of dlp_config.yaml (custom regex info types and their
+# rules). 'local' never calls DLP, 'local_first' calls it only when the utterance could
+# hold a built-in info type, 'shadow' calls DLP as usual and compares the local result.
+DLP_ENGINE_MODES = ("dlp", "local", "local_first", "shadow")
+DLP_ENGINE_MODE = os.getenv('DLP_ENGINE_MODE', 'dlp').lower()
+if DLP_ENGINE_MODE not in DLP_ENGINE_MODES:
+    logger.error(f"Unknown DLP_ENGINE_MODE '{DLP_ENGINE_MODE}'; expected one of {DLP_ENGINE_MODES}. Using 'dlp'.")
+    DLP_ENGINE_MODE = "dlp"
+
+def compile_dlp_config(config: dict, version: str) -> DlpConfigSnapshot:
+    """Builds everything derived from one version of dlp_config.yaml."""
+    # Compile the context keywords once so extract_expected_pii is a single pass per utterance.
+    keyword_matcher = KeywordMatcher(config.get("context_keywords", {}))
+    logger.info(f"Compiled context keyword matcher with {len(keyword_matcher)} keywords.")
+
+    # Precompute DLP request bodies. ${PROJECT_ID} is substituted and per-type
+    # inspect configs are built here instead of on every call_dlp_for_redaction call.
+    request_templates = None
+    if GCP_PROJECT_ID_FOR_SECRETS and GCP_PROJECT_ID_FOR_SECRETS != 'your-gcp-project-id': # Basic check for placeholder
+        request_templates = DlpRequestTemplates(config, GCP_PROJECT_ID_FOR_SECRETS)
+    else:
+        logger.warning("GOOGLE_CLOUD_PROJECT environment variable not configured correctly. DLP redaction will be skipped.")
+
+    prefilter = None
+    if PII_PREFILTER_ENABLED:
+        # Requests without context (the only ones the pre-filter skips) use the inspect
+        # template when one is configured; the filter only mirrors the inline inspect_config.
+        prefilter = PiiPrefilter(config.get("inspect_config", {}),
+                                 inspect_template_name=request_templates.inspect_template_name if request_templates else None)
+        if not prefilter.enabled:
+            logger.warning(f"PII_PREFILTER_ENABLED is set but the pre-filter is inactive: {prefilter.disabled_reason}")
+
+    engine = None
+    if DLP_ENGINE_MODE != "dlp":
+        # local_first and shadow must match what DLP actually runs, which the YAML cannot
+        # tell when templates are configured; 'local' never claims to match DLP.
+        remote_templates = {}
+        if request_templates and DLP_ENGINE_MODE != "local":
+            remote_templates = {"inspect_template_name": request_templates.inspect_template_name,
+                                "deidentify_template_name": request_templates.deidentify_template_name}
+        engine = LocalDlpEngine(config, **remote_templates)
+        if not engine.enabled:
+            logger.warning(f"DLP_ENGINE_MODE={DLP_ENGINE_MODE} is set but the local engine is inactive: {engine.disabled_reason}")
+            engine = None
+        elif DLP_ENGINE_MODE == "local":
+            logger.warning("DLP_ENGINE_MODE=local: only custom info types are redacted; built-in info types are left in the text.")
+
+    return DlpConfigSnapshot(config, version, keyword_matcher, request_templates, prefilter, engine,
+                             known_pii_types(config))
+
+# dlp_config.yaml and everything compiled from it, as one immutable snapshot in
+# dlp_config.current. A changed file is compiled in the background and swapped in
+# without a restart (main_service/dlp_config_manager.py). Each request reads
+# dlp_config.current once and passes that snapshot down.
+dlp_config = dlp_config_manager.from_env(compile_dlp_config)
 
 # Initialize DLP client to use the global endpoint
 # For Cloud Run, it's generally okay to initialize clients globally as the container instance
 # stays warm between requests.
 dlp_client = None
-try:
-    logger.info("Initializing global DLP client.")
-    dlp_client = dlp_v2.DlpServiceClient()
-    logger.info("Successfully initialized DLP client.")
-except Exception as e:
-    logger.error(f"Could not initialize DLP client. Error: {str(e)}")
-    # dlp_client remains None
-
-# Initialize CCAI Conversation Insights client
-ccai_insights_client = None
-try:
-    logger.info("Initializing global CCAI Conversation Insights client.")
-    ccai_insights_client = contact_center_insights_v1.ContactCenterInsightsClient()
-    logger.info("Successfully initialized CCAI Conversation Insights client.")
-except Exception as e:
-    logger.error(f"Could not initialize CCAI Conversation Insights client. Error: {str(e)}")
-    # ccai_insights_client remains None
 
+def init_dlp_client():
+    global dlp_client
+    try:
+        logger.info("Initializing global DLP client.")
+        dlp_emulator_host = os.getenv("DLP_EMULATOR_HOST")
+        if dlp_emulator_host:
+            # Local/fake DLP server (e.g. benchmarks/fake_dlp_server.py); plaintext gRPC, no credentials.
+            import grpc
+            from google.cloud.dlp_v2.services.dlp_service.transports import DlpServiceGrpcTransport
+            dlp_client = dlp_v2.DlpServiceClient(transport=DlpServiceGrpcTransport(channel=grpc.insecure_channel(dlp_emulator_host)))
+            logger.info(f"Successfully initialized DLP client against emulator at {dlp_emulator_host}.")
+        else:
+            dlp_client = dlp_v2.DlpServiceClient()
+            logger.info("Successfully initialized DLP client.")
+    except Exception as e:
+        logger.error(f"Could not initialize DLP client. Error: {str(e)}")
+        raise # dlp_client remains None
+
+# --- Cold start ---
+# Independent steps run concurrently, so startup takes as long as the slowest
+# dependency chain (secrets -> Redis ping) instead of the sum of all steps.
+STARTUP_TIMEOUT_SECONDS = float(os.getenv('STARTUP_TIMEOUT_SECONDS', 30))
+startup = StartupOrchestrator()
+startup.add("firebase", init_firebase)
+startup.add("secrets", load_secrets)
+startup.add("redis", init_redis, after=("secrets",))
+startup.add("pubsub_publisher", init_publisher)
+startup.add("dlp_config", dlp_config.load)
+startup.add("dlp_client", init_dlp_client)
+startup.run(timeout=STARTUP_TIMEOUT_SECONDS)
+if not startup.succeeded("secrets") or not startup.succeeded("firebase"):
+    logger.critical("Critical: a required startup step failed (see above). Exiting.")
+    exit(1)
+
+if token_cache:
+    token_cache.start_key_refresh(int(os.getenv('AUTH_KEY_REFRESH_SECONDS', 300)))
+
+def apply_rotated_secret(secret_id, old_value, new_value):
+    """Applies a rotated secret without a redeploy."""
+    if secret_id == DLP_PROJECT_ID_SECRET_ID:
+        load_secrets()
+    elif secret_id in (REDIS_HOST_SECRET_ID, REDIS_PORT_SECRET_ID):
+        # New requests use the new endpoint; the previous pool is dropped once its requests finish.
+        logger.warning(f"Redis endpoint secret {secret_id} changed. Reconnecting.")
+        load_secrets()
+        try:
+            init_redis()
+        except RuntimeError:
+            # Host and port may rotate one at a time; the other secret's change retries.
+            logger.error("Could not connect to the rotated Redis endpoint; keeping the previous connection.")
+            return
+        for callback in redis_reconnect_callbacks:
+            callback()
+
+secret_cache.on_change(apply_rotated_secret)
+secret_cache.start_refresh()
+dlp_config.start_watching()
+
+# Optional admission control for DLP requests: a token bucket in Redis sized to the
+# project's DLP quota, shared by every instance, plus an AIMD concurrency limit per
+# instance. Requests that cannot be admitted within DLP_RATE_LIMIT_MAX_WAIT_MS get 503.
+dlp_limiter = dlp_rate_limiter.from_env(redis_client=lambda: redis_client)
+if dlp_limiter:
+    logger.info(f"DLP rate limiter enabled: {dlp_limiter.report()}.")
+
+def dlp_slot():
+    """Admission for one DLP request through the rate limiter, when enabled."""
+    return dlp_limiter.slot() if dlp_limiter else nullcontext()
+
+# Optional micro-batching of DLP calls. Concurrent utterances that share a request
+# template are sent to DLP as one table item. Disabled when DLP_BATCH_WINDOW_MS is 0.
+DLP_BATCH_WINDOW_MS = int(os.getenv('DLP_BATCH_WINDOW_MS', 0))
+DLP_BATCH_MAX_ITEMS = int(os.getenv('DLP_BATCH_MAX_ITEMS', 50))
+DLP_BATCH_MAX_BYTES = int(os.getenv('DLP_BATCH_MAX_BYTES', 400_000)) # DLP caps requests at 0.5 MB
+dlp_batcher = None
+if dlp_client and DLP_BATCH_WINDOW_MS > 0:
+    dlp_batcher = DlpMicroBatcher(dlp_client, window_ms=DLP_BATCH_WINDOW_MS,
+                                  max_items=DLP_BATCH_MAX_ITEMS, max_bytes=DLP_BATCH_MAX_BYTES, limiter=dlp_limiter)
+    logger.info(f"DLP micro-batching enabled: window={DLP_BATCH_WINDOW_MS}ms, max_items={DLP_BATCH_MAX_ITEMS}, max_bytes={DLP_BATCH_MAX_BYTES}.")
+
+def local_dlp_result(transcript: str, context: dict | None, config: DlpConfigSnapshot) -> str | None:
+    """The local engine's redaction when DLP_ENGINE_MODE lets it replace the DLP call, else None."""
+    engine = config.local_dlp_engine
+    if not engine:
+        return None
+    if DLP_ENGINE_MODE == "local" or (DLP_ENGINE_MODE == "local_first" and engine.covers(transcript, context)):
+        return engine.redact(transcript, context)
+    return None
+
+def shadow_compare_dlp_result(transcript: str, context: dict | None, dlp_result: str, config: DlpConfigSnapshot):
+    if config.local_dlp_engine and DLP_ENGINE_MODE == "shadow" and not dlp_result.startswith(DLP_ERROR_MARKERS):
+        try:
+            config.local_dlp_engine.shadow_compare(transcript, context, dlp_result)
+        except Exception as e:
+            logger.error(f"Local DLP shadow comparison failed. Error: {str(e)}")
+
+# Optional two-tier cache of redaction results (in-process LRU, then Redis), keyed
+# by a hash of the text, expected PII type and DLP config version.
+REDACTION_CACHE_ENABLED = os.getenv('REDACTION_CACHE_ENABLED', 'false').lower() == 'true'
+REDACTION_CACHE_MAX_ENTRIES = int(os.getenv('REDACTION_CACHE_MAX_ENTRIES', 10000))
+REDACTION_CACHE_TTL_SECONDS = int(os.getenv('REDACTION_CACHE_TTL_SECONDS', 3600))
+REDACTION_CACHE_USE_REDIS = os.getenv('REDACTION_CACHE_USE_REDIS', 'true').lower() == 'true'
+redaction_cache = None
+if REDACTION_CACHE_ENABLED:
+    # A callable, so the shared tier follows init_redis when the Redis endpoint rotates.
+    redaction_cache = RedactionCache(max_entries=REDACTION_CACHE_MAX_ENTRIES, ttl_seconds=REDACTION_CACHE_TTL_SECONDS,
+                                     redis_client=(lambda: redis_client) if REDACTION_CACHE_USE_REDIS else None)
+    logger.info(f"Redaction cache enabled: max_entries={REDACTION_CACHE_MAX_ENTRIES}, ttl={REDACTION_CACHE_TTL_SECONDS}s, shared_tier={REDACTION_CACHE_USE_REDIS}.")
+
+# CCAI Conversation Insights client. Only the /redaction-status fallback uses it, so it
+# is created on first use instead of on every cold start.
+get_ccai_insights_client = startup.lazy("ccai_insights_client", contact_center_insights_v1.ContactCenterInsightsClient)
+
+# What CCAI returned per job version, so unchanged /redaction-status polls skip get_conversation.
+CCAI_STATUS_CACHE_SECONDS = int(os.getenv('CCAI_STATUS_CACHE_SECONDS', 30))
+ccai_status_cache = CcaiStatusCache(ttl_seconds=CCAI_STATUS_CACHE_SECONDS) if CCAI_STATUS_CACHE_SECONDS > 0 else None
+
+
+@app.before_request
+def reset_redis_round_trips():
+    RedisStore.reset_round_trips()
+
+@app.after_request
+def report_redis_round_trips(response):
+    """Exposes the Redis round trips made while handling this request."""
+    response.headers["X-Redis-Round-Trips"] = str(RedisStore.round_trips())
+    return response
+
+def dlp_overloaded_response(e: DlpOverloaded):
+    """Body and Retry-After header for a request the DLP rate limiter did not admit."""
+    events.warning("dlp_overloaded", reason=e.reason, retry_after_seconds=round(e.retry_after, 3))
+    body = {"error": "DLP is overloaded; retry later", "reason": e.reason,
+            "retry_after_seconds": round(e.retry_after, 3)}
+    return body, {"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+
+@app.errorhandler(DlpOverloaded)
+def handle_dlp_overloaded(e):
+    """503 instead of the unredacted text, so callers (and Pub/Sub redelivery) back off and retry."""
+    body, headers = dlp_overloaded_response(e)
+    return jsonify(body), 503, headers
 
 @app.route('/')
 def hello_world():
     """A simple hello world endpoint."""
     return "Hello, World! This is the Context Manager Service."
 
+READINESS_REQUIRED_STEPS = ("secrets", "redis", "pubsub_publisher", "dlp_config", "dlp_client")
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once every required startup step succeeded, with per-step timings."""
+    ready = all(startup.succeeded(step) for step in READINESS_REQUIRED_STEPS)
+    return jsonify({"ready": ready, "startup": startup.report()}), 200 if ready else 503
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """Returns in-process counters for the optional redaction fast paths."""
+    config = dlp_config.current
+    stats = {"dlp_config": dlp_config.report()}
+    # Pre-filter and local engine counters start over with each config version.
+    if config.pii_prefilter:
+        stats["pii_prefilter"] = {"enabled": config.pii_prefilter.enabled,
+                                  "disabled_reason": config.pii_prefilter.disabled_reason, **config.pii_prefilter.stats}
+    if config.local_dlp_engine:
+        stats["local_dlp"] = {"mode": DLP_ENGINE_MODE, **config.local_dlp_engine.report()}
+    if dlp_batcher:
+        stats["dlp_batcher"] = dict(dlp_batcher.stats)
+    if ccai_status_cache:
+        stats["ccai_status_cache"] = dict(ccai_status_cache.stats)
+    if dlp_limiter:
+        stats["dlp_rate_limiter"] = dlp_limiter.report()
+    if redaction_cache:
+        stats["redaction_cache"] = redaction_cache.report()
+    if redis_store:
+        stats["redis"] = {"round_trips": redis_store.total_round_trips}
+    if token_cache:
+        stats["auth_token_cache"] = token_cache.report()
+    if context_cache:
+        stats["context_near_cache"] = context_cache.report()
+    if metrics.enabled:
+        stats["stages"] = metrics.report()
+    stats["secrets"] = secret_cache.report()
+    return jsonify(stats), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-stage latency histograms in the Prometheus text format."""
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled; set METRICS_ENABLED=true"}), 404
+    return Response(metrics.render(), content_type=stage_metrics.CONTENT_TYPE)
+
 @app.route('/initiate-redaction', methods=['POST', 'OPTIONS'])
 @firebase_auth_required
 def initiate_redaction():
@@ -280,34 +564,20 @@ def initiate_redaction():
         "start_time": current_time
     })
     try:
-        future = publisher_client.publish(lifecycle_topic_path, start_message_payload.encode("utf-8"))
+        future = publish_message(lifecycle_topic_path, start_message_payload.encode("utf-8"))
         # No future.result() here to make it asynchronous
         logger.info(f"Published 'conversation_started' for {conversation_id} asynchronously.")
     except Exception as e:
         logger.error(f"Failed to publish 'conversation_started' message for {conversation_id}: {str(e)}")
         return jsonify({"error": "Failed to initiate redaction process"}), 500
 
-    # 2. Publish individual raw transcript messages to raw-transcripts topic
+    # 2. Publish raw transcript messages to raw-transcripts topic
     raw_topic_path = publisher_client.topic_path(GCP_PROJECT_ID_FOR_SECRETS, RAW_TRANSCRIPTS_TOPIC)
-    publish_futures = []
-    for i, segment in enumerate(transcript_segments):
-        participant_role = "END_USER" if segment.get('speaker', '').lower() == 'customer' else segment.get('speaker', 'UNKNOWN').upper()
-        entry_payload = {
-            "conversation_id": conversation_id,
-            "original_entry_index": i,
-            "participant_role": participant_role,
-            "text": segment.get('text', ''),
-            "user_id": 1 if participant_role == "END_USER" else 2, # Assign numeric user_id based on participant_role
-            "start_timestamp_usec": int(time.time() * 1_000_000) # Generate timestamp
-        }
-        message_payload = json.dumps(entry_payload)
-        future = publisher_client.publish(raw_topic_path, message_payload.encode("utf-8"))
-        publish_futures.append(future)
-    
-    # Do not wait for all utterances to publish to make it asynchronous
-    for i, future in enumerate(publish_futures):
-        # We are not calling future.result() here to make it asynchronous
-        logger.info(f"Queued utterance {i+1}/{len(transcript_segments)} for '{conversation_id}' asynchronously.")
+    entry_payloads = [raw_entry_payload(conversation_id, i, segment) for i, segment in enumerate(transcript_segments)]
+
+    # Do not wait for the utterances to publish to make it asynchronous
+    message_count = publish_raw_utterances(raw_topic_path, conversation_id, entry_payloads)
+    logger.info(f"Queued {len(entry_payloads)} utterances in {message_count} message(s) for '{conversation_id}' asynchronously.")
     # Error handling for asynchronous publishes would typically involve Pub/Sub dead-letter queues
     # and separate monitoring, not blocking the main request.
 
@@ -319,7 +589,7 @@ def initiate_redaction():
         "total_utterance_count": len(transcript_segments)
     })
     try:
-        future = publisher_client.publish(lifecycle_topic_path, end_message_payload.encode("utf-8"))
+        future = publish_message(lifecycle_topic_path, end_message_payload.encode("utf-8"))
         # No future.result() here to make it asynchronous
         logger.info(f"Published 'conversation_ended' for {conversation_id} asynchronously.")
     except Exception as e:
@@ -327,11 +597,10 @@ def initiate_redaction():
         return jsonify({"error": "Failed to finalize redaction process initiation"}), 500
 
     # Store initial job status in Redis
-    if redis_client:
+    if redis_store:
         try:
-            redis_client.set(f"job_status:{conversation_id}", "PROCESSING")
-            redis_client.set(f"original_conversation:{conversation_id}", json.dumps(transcript_segments)) # Store original transcript
-            redis_client.set(f"job_conversation:{conversation_id}", json.dumps({"transcript": {"transcript_segments": []}})) # Initialize empty conversation for redacted
+            # Job status, original transcript and an empty redacted conversation in one round trip
+            redis_store.init_job(conversation_id, transcript_segments)
             logger.info(f"Initialized job status and stored original transcript for {conversation_id} in Redis.")
         except redis.exceptions.RedisError as e:
             logger.error(f"Redis error during job status initialization for {conversation_id}: {str(e)}")
@@ -341,6 +610,174 @@ def initiate_redaction():
 
     return jsonify({"jobId": conversation_id}), 202 # 202 Accepted for asynchronous processing
 
+STREAM_CHUNK_MAX_SEGMENTS = int(os.getenv('STREAM_CHUNK_MAX_SEGMENTS', 200))
+STREAM_CHUNK_MAX_BYTES = int(os.getenv('STREAM_CHUNK_MAX_BYTES', 64 * 1024))
+
+class StreamedUploadError(ValueError):
+    """A streamed upload that cannot be completed; the job is marked FAILED."""
+
+class InvalidSegmentLine(StreamedUploadError):
+    def __init__(self, line_number: int, reason: str):
+        super().__init__(f"Invalid segment on line {line_number}: {reason}")
+        self.line_number = line_number
+
+@app.route('/initiate-redaction-stream', methods=['POST', 'OPTIONS'])
+@firebase_auth_required
+def initiate_redaction_stream():
+    """
+    Streaming variant of /initiate-redaction for very large uploads. The body is
+    newline-delimited JSON with one transcript segment ({"speaker": ..., "text": ...})
+    per line. Segments are parsed and published as they arrive and the original
+    transcript is stored in compressed Redis chunks, so memory use does not grow
+    with the size of the upload.
+    Requires Firebase authentication.
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'}), 200
+
+    body, status = ingest_segment_stream(request.stream)
+    return jsonify(body), status
+
+def ingest_segment_stream(lines) -> tuple[dict, int]:
+    """
+    The work of /initiate-redaction-stream for an iterable of NDJSON lines (bytes),
+    shared by the Flask route and asgi_app. Blocking; returns the response body and status.
+    """
+    conversation_id = str(uuid.uuid4())
+    from datetime import datetime, timezone
+    current_time = datetime.now(timezone.utc).isoformat(timespec='seconds') + 'Z'
+
+    # 1. Job status first so the frontend can start polling while the upload streams in
+    chunk_writer = None
+    if redis_store:
+        try:
+            redis_store.init_streaming_job(conversation_id)
+            chunk_writer = ChunkedTranscriptWriter(redis_store, conversation_id,
+                                                   max_segments=STREAM_CHUNK_MAX_SEGMENTS,
+                                                   max_bytes=STREAM_CHUNK_MAX_BYTES)
+        except redis.exceptions.RedisError as e:
+            logger.error(f"Redis error during job status initialization for {conversation_id}: {str(e)}")
+    else:
+        logger.warning("Redis client not available, job status will not be tracked.")
+
+    # 2. 'conversation_started'
+    lifecycle_topic_path = publisher_client.topic_path(GCP_PROJECT_ID_FOR_SECRETS, AA_LIFECYCLE_TOPIC)
+    try:
+        publish_message(lifecycle_topic_path, json.dumps({
+            "conversation_id": conversation_id,
+            "event_type": "conversation_started",
+            "start_time": current_time
+        }).encode("utf-8"))
+    except Exception as e:
+        logger.error(f"Failed to publish 'conversation_started' message for {conversation_id}: {str(e)}")
+        return {"error": "Failed to initiate redaction process"}, 500
+
+    # 3. Parse, store and publish segments as they arrive
+    segment_count = 0
+
+    def stream_entry_payloads():
+        nonlocal segment_count
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                segment = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise InvalidSegmentLine(line_number, str(e))
+            if not isinstance(segment, dict) or 'text' not in segment:
+                raise InvalidSegmentLine(line_number, "expected an object with 'speaker' and 'text'")
+            if chunk_writer:
+                chunk_writer.add(segment)
+            yield raw_entry_payload(conversation_id, segment_count, segment)
+            segment_count += 1
+
+    raw_topic_path = publisher_client.topic_path(GCP_PROJECT_ID_FOR_SECRETS, RAW_TRANSCRIPTS_TOPIC)
+    try:
+        message_count = publish_raw_utterances(raw_topic_path, conversation_id, stream_entry_payloads())
+        if segment_count == 0:
+            raise InvalidSegmentLine(0, "no transcript segments in upload")
+        if chunk_writer:
+            chunk_writer.flush()
+    except StreamedUploadError as e:
+        # Earlier segments are already published; mark the job failed rather than finalizing a partial transcript.
+        logger.error(f"Streamed upload for {conversation_id} aborted after {segment_count} segments: {str(e)}")
+        if redis_store:
+            try:
+                redis_store.set_job_status(conversation_id, "FAILED")
+            except redis.exceptions.RedisError as redis_e:
+                logger.error(f"Redis error while marking {conversation_id} as failed: {str(redis_e)}")
+            job_events.publish(redis_client, conversation_id, "status", {"status": "FAILED", "error": str(e)})
+        return {"error": str(e), "jobId": conversation_id, "segments_published": segment_count}, 400
+    except redis.exceptions.RedisError as e:
+        logger.error(f"Redis error while storing original transcript chunks for {conversation_id}: {str(e)}")
+        return {"error": "Failed to store original transcript", "jobId": conversation_id}, 500
+    except Exception as e:
+        logger.error(f"Failed to publish streamed utterances for {conversation_id}: {str(e)}")
+        return {"error": "Failed to publish transcript"}, 500
+
+    logger.info(f"Queued {segment_count} streamed utterances in {message_count} message(s) and "
+                f"{chunk_writer.chunks_written if chunk_writer else 0} Redis chunk(s) for '{conversation_id}'.")
+
+    # 4. 'conversation_ended' once the total is known
+    try:
+        publish_message(lifecycle_topic_path, json.dumps({
+            "conversation_id": conversation_id,
+            "event_type": "conversation_ended",
+            "end_time": current_time,
+            "total_utterance_count": segment_count
+        }).encode("utf-8"))
+    except Exception as e:
+        logger.error(f"Failed to publish 'conversation_ended' message for {conversation_id}: {str(e)}")
+        return {"error": "Failed to finalize redaction process initiation"}, 500
+
+    return {"jobId": conversation_id, "segments": segment_count}, 202
+
+def raw_entry_payload(conversation_id: str, index: int, segment: dict) -> dict:
+    """The raw-transcripts message body for one uploaded transcript segment."""
+    participant_role = "END_USER" if segment.get('speaker', '').lower() == 'customer' else segment.get('speaker', 'UNKNOWN').upper()
+    return {
+        "conversation_id": conversation_id,
+        "original_entry_index": index,
+        "participant_role": participant_role,
+        "text": segment.get('text', ''),
+        "user_id": 1 if participant_role == "END_USER" else 2, # Assign numeric user_id based on participant_role
+        "start_timestamp_usec": int(time.time() * 1_000_000) # Generate timestamp
+    }
+
+def publish_message(topic_path: str, data: bytes, **kwargs):
+    """publisher_client.publish(), timed as the pubsub_publish stage; returns its future."""
+    with metrics.stage("pubsub_publish"):
+        return publisher_client.publish(topic_path, data, **kwargs)
+
+def publish_raw_utterances(topic_path: str, conversation_id: str, entry_payloads) -> int:
+    """
+    Publishes utterance payloads to the raw-transcripts topic, one message per
+    utterance or packed into envelopes depending on RAW_TRANSCRIPT_PUBLISH_MODE.
+    entry_payloads may be a lazy iterator. Returns the number of messages published
+    without waiting on them.
+    """
+    ordering_key = conversation_id if PUBSUB_ORDERING_KEYS_ENABLED else ""
+    if RAW_TRANSCRIPT_PUBLISH_MODE == 'envelope':
+        messages = pack_utterances(conversation_id, entry_payloads,
+                                   max_utterances=ENVELOPE_MAX_UTTERANCES, max_bytes=ENVELOPE_MAX_BYTES)
+    else:
+        messages = ((json.dumps(entry_payload).encode("utf-8"), {}) for entry_payload in entry_payloads)
+
+    message_count = 0
+    for data, attributes in messages:
+        future = publish_message(topic_path, data, ordering_key=ordering_key, **attributes)
+        if ordering_key:
+            future.add_done_callback(lambda f: _resume_on_publish_error(f, topic_path, ordering_key))
+        message_count += 1
+    return message_count
+
+def _resume_on_publish_error(future, topic_path: str, ordering_key: str):
+    """A failed publish pauses its ordering key; resume it so later jobs are not blocked."""
+    if future.exception() is not None:
+        logger.error(f"Publish failed for ordering key '{ordering_key}': {str(future.exception())}")
+        publisher_client.resume_publish(topic_path, ordering_key)
+
 @app.route('/handle-agent-utterance', methods=['POST'])
 def handle_agent_utterance():
     """
@@ -353,35 +790,36 @@ def handle_agent_utterance():
 
     conversation_id = data['conversation_id']
     transcript = data['transcript']
+    config = dlp_config.current
 
     # Redact the agent's utterance. Context is None as it's the agent speaking.
-    redacted_transcript = call_dlp_for_redaction(transcript, context=None)
+    redacted_transcript = call_dlp_for_redaction(transcript, context=None, config=config)
 
     # Check for expected PII to store context for the next customer utterance.
-    expected_pii_type = extract_expected_pii(transcript)
+    expected_pii_type = extract_expected_pii(transcript, config)
 
     if expected_pii_type:
-        if redis_client:
+        if redis_store:
             try:
-                context_key = f"context:{conversation_id}"
                 context_value = {
                     "expected_pii_type": expected_pii_type,
                     "agent_transcript": transcript,
                     "timestamp": time.time()
                 }
-                context_value_json = json.dumps(context_value)
-                logger.info(f"Attempting to store context in Redis. Key: {context_key}, Value: {context_value_json}, TTL: {CONTEXT_TTL_SECONDS}")
-                redis_client.setex(context_key, CONTEXT_TTL_SECONDS, context_value_json)
-                logger.info(f"Successfully stored context in Redis for conversation_id: {conversation_id}")
+                with metrics.stage("redis_setex_context"):
+                    redis_store.set_context(conversation_id, context_value, CONTEXT_TTL_SECONDS)
+                events.info("context_stored", conversation_id=conversation_id, expected_pii_type=expected_pii_type,
+                            ttl_seconds=CONTEXT_TTL_SECONDS, payload=context_value)
             except redis.exceptions.RedisError as e:
-                logger.error(f"Redis error during context storage for conversation_id: {conversation_id}. Error: {str(e)}")
+                events.error("context_store_failed", conversation_id=conversation_id, error=str(e))
                 # Don't block the response if Redis fails, but log it.
         else:
-            logger.warning(f"Redis client not available, cannot store context for conversation_id: {conversation_id}")
+            events.warning("context_store_skipped", conversation_id=conversation_id, reason="redis_unavailable")
     else:
-        logger.info(f"No expected PII type found for conversation_id: {conversation_id}")
+        events.info("context_not_expected", conversation_id=conversation_id)
 
-    return jsonify({"redacted_transcript": redacted_transcript, "context_stored": expected_pii_type is not None}), 200
+    return jsonify({"redacted_transcript": redacted_transcript, "context_stored": expected_pii_type is not None,
+                    "dlp_config_version": config.version}), 200
 
 @app.route('/handle-customer-utterance', methods=['POST'])
 def handle_customer_utterance():
@@ -397,32 +835,34 @@ def handle_customer_utterance():
     transcript = data['transcript']
     retrieved_context = None
 
-    if redis_client:
+    if redis_store:
         try:
-            context_key = f"context:{conversation_id}"
-            context_data_str = redis_client.get(context_key)
-            if context_data_str:
-                retrieved_context = json.loads(context_data_str) # Use json.loads
-                logger.info(f"Retrieved context from Redis for conversation_id: {conversation_id}, retrieved_context: {retrieved_context}")
+            with metrics.stage("redis_get_context"):
+                retrieved_context = redis_store.get_context(conversation_id)
+            if retrieved_context:
+                events.info("context_retrieved", conversation_id=conversation_id,
+                            expected_pii_type=retrieved_context.get("expected_pii_type"), payload=retrieved_context)
         except redis.exceptions.RedisError as e: # redis-py library still raises redis.exceptions
-            logger.error(f"Redis error while retrieving context for conversation_id: {conversation_id}. Error: {str(e)}")
+            events.error("context_retrieve_failed", conversation_id=conversation_id, error=str(e))
             retrieved_context = None # Ensure context is None if Redis fails
         except json.JSONDecodeError as e:
-            logger.error(f"Error decoding JSON from Redis for conversation_id: {conversation_id}, context_data_str: {context_data_str}. Error: {str(e)}")
+            events.error("context_decode_failed", conversation_id=conversation_id, error=str(e))
             retrieved_context = None # Ensure context is None if JSON is malformed
         except Exception as e: # Catch other potential errors
-            logger.error(f"Error processing retrieved context from Redis for conversation_id: {conversation_id}. Error: {str(e)}")
+            events.error("context_retrieve_failed", conversation_id=conversation_id, error=str(e))
             retrieved_context = None # Ensure context is None for any other error
-    elif not redis_client:
-        logger.warning("Redis client not available for customer utterance.")
+    else:
+        events.warning("context_retrieve_skipped", conversation_id=conversation_id, reason="redis_unavailable")
 
 
     # Placeholder for DLP invocation logic
     # This function would take the transcript and optional context
     # to call Google DLP and return the redacted transcript.
-    redacted_transcript = call_dlp_for_redaction(transcript, retrieved_context)
+    config = dlp_config.current
+    redacted_transcript = call_dlp_for_redaction(transcript, retrieved_context, config)
 
-    return jsonify({"redacted_transcript": redacted_transcript, "context_used": retrieved_context is not None}), 200
+    return jsonify({"redacted_transcript": redacted_transcript, "context_used": retrieved_context is not None,
+                    "dlp_config_version": config.version}), 200
 
 @app.route('/redact-utterance-realtime', methods=['POST'])
 @firebase_auth_required
@@ -438,32 +878,80 @@ def redact_utterance_realtime():
     utterance = data['utterance']
     retrieved_context = None
 
-    if redis_client:
+    if redis_store:
         try:
-            context_key = f"context:{conversation_id}"
-            context_data_str = redis_client.get(context_key)
-            if context_data_str:
-                retrieved_context = json.loads(context_data_str)
-                logger.info(f"Retrieved context for real-time redaction for conversation_id: {conversation_id}, context: {retrieved_context}")
+            with metrics.stage("redis_get_context"):
+                retrieved_context = redis_store.get_context(conversation_id)
+            if retrieved_context:
+                events.info("context_retrieved", conversation_id=conversation_id,
+                            expected_pii_type=retrieved_context.get("expected_pii_type"), payload=retrieved_context)
             else:
-                logger.info(f"No context found in Redis for real-time redaction for conversation_id: {conversation_id}")
+                events.info("context_not_found", conversation_id=conversation_id)
         except redis.exceptions.RedisError as e:
-            logger.error(f"Redis error during real-time context retrieval for {conversation_id}: {str(e)}")
+            events.error("context_retrieve_failed", conversation_id=conversation_id, error=str(e))
         except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error for real-time context from Redis for {conversation_id}: {str(e)}")
+            events.error("context_decode_failed", conversation_id=conversation_id, error=str(e))
 
+    config = dlp_config.current
     if retrieved_context and "agent_transcript" in retrieved_context:
         # Combine agent and customer utterances for context
         combined_text = f"{retrieved_context['agent_transcript']}\n{utterance}"
-        full_redacted_text = call_dlp_for_redaction(combined_text, retrieved_context)
+        full_redacted_text = call_dlp_for_redaction(combined_text, retrieved_context, config)
         # Extract the customer's redacted part
         # The redacted text will have the same number of lines, so we can split and take the last part
         redacted_utterance = full_redacted_text.splitlines()[-1]
     else:
         # Fallback to old behavior if context is missing agent_transcript
-        redacted_utterance = call_dlp_for_redaction(utterance, retrieved_context)
+        redacted_utterance = call_dlp_for_redaction(utterance, retrieved_context, config)
 
-    return jsonify({"redacted_utterance": redacted_utterance}), 200
+    return jsonify({"redacted_utterance": redacted_utterance, "dlp_config_version": config.version}), 200
+
+REDACT_BATCH_MAX_UTTERANCES = int(os.getenv('REDACT_BATCH_MAX_UTTERANCES', 5000))
+
+@app.route('/redact-batch', methods=['POST'])
+@firebase_auth_required
+def redact_batch():
+    """
+    Redacts a list of utterances in one request, for offline reprocessing and batch jobs.
+    An optional expected_pii_type applies to every utterance; it must be a type
+    dlp_config.yaml defines.
+    """
+    data = request.get_json()
+    if not data or not isinstance(data.get('utterances'), list):
+        return jsonify({"error": "Missing utterances"}), 400
+    utterances = data['utterances']
+    if not all(isinstance(utterance, str) for utterance in utterances):
+        return jsonify({"error": "utterances must be a list of strings"}), 400
+    if len(utterances) > REDACT_BATCH_MAX_UTTERANCES:
+        return jsonify({"error": f"At most {REDACT_BATCH_MAX_UTTERANCES} utterances per request"}), 413
+
+    config = dlp_config.current
+    expected_pii_type = data.get('expected_pii_type')
+    if expected_pii_type is not None and (not isinstance(expected_pii_type, str)
+                                          or expected_pii_type not in config.known_pii_types):
+        return jsonify({"error": "Unknown expected_pii_type",
+                        "known_pii_types": sorted(config.known_pii_types)}), 400
+    context = {"expected_pii_type": expected_pii_type} if expected_pii_type else None
+    return jsonify({"redacted_utterances": call_dlp_for_redaction_batch(utterances, context, config),
+                    "dlp_config_version": config.version}), 200
+
+def status_etag(job_id: str, version: int, state: str, since_segment: int | None = None) -> str:
+    """Weak validator for a /redaction-status representation; see RedisStore.get_job_state."""
+    etag = f"{job_id}-v{version}-{state}"
+    return etag if since_segment is None else f"{etag}-s{since_segment}"
+
+def ccai_transcript_segments(conversation) -> list:
+    return [{"speaker": "END_USER" if segment.channel_tag == 1 else "AGENT", "text": segment.text}
+            for segment in conversation.transcript.transcript_segments]
+
+def segments_since(segments: list, since_segment: int | None) -> list:
+    """Segments after index since_segment (all of them when it is not given)."""
+    return segments if since_segment is None else segments[since_segment + 1:]
+
+def not_modified(etag: str):
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    return response
 
 @app.route('/redaction-status/<job_id>', methods=['GET'])
 @firebase_auth_required
@@ -471,306 +959,377 @@ def get_redaction_status(job_id):
     """
     Retrieves the status and (if available) the redacted conversation
     for a given job ID from CCAI Conversation Insights.
+    Responses carry a weak ETag built from the job version; a matching
+    If-None-Match returns 304 without reading the transcripts. With
+    ?since_segment=N only segments after index N are returned.
     Requires Firebase authentication.
     """
-    if not redis_client:
+    if not redis_store:
         logger.error("Redis client not available for /redaction-status.")
         return jsonify({"error": "Redis client not available"}), 503
+    if sse_stream_slots is not None:
+        after_this_request(advertise_redaction_events)
+
+    since_segment = request.args.get('since_segment', type=int)
+    if_none_match = request.if_none_match
 
     try:
-        # 1. Check Redis for the final aggregated transcript first for a fast response
-        final_transcript_str = redis_client.get(f"final_transcript:{job_id}")
-        if final_transcript_str:
-            logger.info(f"Found final aggregated transcript in Redis for job {job_id}.")
-            final_transcript = json.loads(final_transcript_str)
-            original_conversation_str = redis_client.get(f"original_conversation:{job_id}")
-            original_transcript_segments = json.loads(original_conversation_str) if original_conversation_str else []
-            
-            return jsonify({
-                "status": "DONE",
-                "original_conversation": {
-                    "transcript": {
-                        "transcript_segments": original_transcript_segments
-                    }
-                },
-                "redacted_conversation": {
-                    "transcript": {
-                        "transcript_segments": final_transcript.get("transcript_segments", [])
+        # 1. Version, job status and presence of the final aggregated transcript in one small round trip.
+        version, job_status, has_final = redis_store.get_job_state(job_id)
+
+        if has_final or job_status == "FAILED":
+            etag = status_etag(job_id, version, "done" if has_final else "failed", since_segment)
+            if if_none_match.contains_weak(etag):
+                return not_modified(etag)
+            final_transcript, original_transcript_segments = redis_store.get_job_snapshot(job_id)
+            if final_transcript:
+                logger.info(f"Found final aggregated transcript in Redis for job {job_id}.")
+                response = jsonify({
+                    "status": "DONE",
+                    "version": version,
+                    "original_conversation": {
+                        "transcript": {
+                            "transcript_segments": segments_since(original_transcript_segments, since_segment)
+                        }
+                    },
+                    "redacted_conversation": {
+                        "transcript": {
+                            "transcript_segments": segments_since(final_transcript.get("transcript_segments", []), since_segment)
+                        }
                     }
-                }
-            }), 200
-
-        # 2. If not in Redis, check CCAI Insights as the fallback/final source of truth
-        if not ccai_insights_client:
-            logger.error("CCAI Conversation Insights client not available for /redaction-status.")
-            return jsonify({"error": "CCAI Insights client not available"}), 503
-
-        conversation_name = f"projects/{GCP_PROJECT_ID_FOR_SECRETS}/locations/us-central1/conversations/{job_id}"
-        request = contact_center_insights_v1.GetConversationRequest(
-            name=conversation_name,
-            view=contact_center_insights_v1.types.ConversationView.FULL
-        )
-
-        try:
-            response = ccai_insights_client.get_conversation(request=request)
-            logger.info(f"Successfully retrieved conversation {job_id} from CCAI Insights.")
-            transcript_segments = []
-            for segment in response.transcript.transcript_segments:
-                speaker = "END_USER" if segment.channel_tag == 1 else "AGENT"
-                transcript_segments.append({"speaker": speaker, "text": segment.text})
-
-            status = "DONE" if transcript_segments else "PROCESSING"
-            original_conversation_str = redis_client.get(f"original_conversation:{job_id}")
-            original_transcript_segments = json.loads(original_conversation_str) if original_conversation_str else []
-
-            return jsonify({
-                "status": status,
-                "original_conversation": {"transcript": {"transcript_segments": original_transcript_segments}},
-                "redacted_conversation": {"transcript": {"transcript_segments": transcript_segments}}
-            }), 200
-
-        except NotFound:
-            logger.info(f"Conversation {job_id} not yet found in Redis or CCAI Insights. Still processing.")
-            original_conversation_str = redis_client.get(f"original_conversation:{job_id}")
-            original_transcript_segments = json.loads(original_conversation_str) if original_conversation_str else []
-            
-            return jsonify({
+                })
+            else:
+                response = jsonify({"status": "FAILED", "version": version, "error": "Transcript upload failed"})
+            response.set_etag(etag, weak=True)
+            return response, 200
+
+        # 2. If not in Redis, check CCAI Insights as the fallback/final source of truth.
+        # Its answer is cached per job version, so an unchanged job costs no RPC.
+        transcript_segments = ccai_status_cache.get(job_id, version) if ccai_status_cache else NOT_CACHED
+        if transcript_segments is NOT_CACHED:
+            ccai_insights_client = get_ccai_insights_client()
+            if not ccai_insights_client:
+                logger.error("CCAI Conversation Insights client not available for /redaction-status.")
+                return jsonify({"error": "CCAI Insights client not available"}), 503
+
+            conversation_name = f"projects/{GCP_PROJECT_ID_FOR_SECRETS}/locations/us-central1/conversations/{job_id}"
+            ccai_request = contact_center_insights_v1.GetConversationRequest(
+                name=conversation_name,
+                view=contact_center_insights_v1.types.ConversationView.FULL
+            )
+            try:
+                conversation = ccai_insights_client.get_conversation(request=ccai_request)
+                logger.info(f"Successfully retrieved conversation {job_id} from CCAI Insights.")
+                transcript_segments = ccai_transcript_segments(conversation)
+            except NotFound:
+                logger.info(f"Conversation {job_id} not yet found in Redis or CCAI Insights. Still processing.")
+                transcript_segments = None
+            if ccai_status_cache:
+                ccai_status_cache.put(job_id, version, transcript_segments)
+
+        if transcript_segments is None:
+            etag = status_etag(job_id, version, "pending", since_segment)
+            if if_none_match.contains_weak(etag):
+                return not_modified(etag)
+            _, original_transcript_segments = redis_store.get_job_snapshot(job_id)
+
+            response = jsonify({
                 "status": "PROCESSING",
+                "version": version,
                 "message": "Conversation not yet available",
-                "original_conversation": {"transcript": {"transcript_segments": original_transcript_segments}},
+                "original_conversation": {"transcript": {"transcript_segments": segments_since(original_transcript_segments, since_segment)}},
                 "redacted_conversation": {"transcript": {"transcript_segments": []}}
-            }), 200
-        except PermissionDenied as e:
-            logger.error(f"Permission denied to access conversation {job_id} in CCAI Insights: {str(e)}")
-            return jsonify({"status": "FAILED", "error": "Permission denied to access conversation"}), 403
-        except GoogleAPICallError as e:
-            logger.error(f"Google API Call Error when fetching conversation {job_id} from CCAI Insights: {str(e)}")
-            return jsonify({"status": "FAILED", "error": f"CCAI Insights API error: {e.message}"}), 500
-        except Exception as e:
-            logger.error(f"An unexpected error occurred while fetching conversation {job_id} from CCAI Insights: {str(e)}")
-            return jsonify({"status": "FAILED", "error": "An internal server error occurred"}), 500
+            })
+            response.set_etag(etag, weak=True)
+            return response, 200
+
+        status = "DONE" if transcript_segments else "PROCESSING"
+        etag = status_etag(job_id, version, f"ccai{len(transcript_segments)}", since_segment)
+        if if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        _, original_transcript_segments = redis_store.get_job_snapshot(job_id)
+
+        response = jsonify({
+            "status": status,
+            "version": version,
+            "original_conversation": {"transcript": {"transcript_segments": segments_since(original_transcript_segments, since_segment)}},
+            "redacted_conversation": {"transcript": {"transcript_segments": segments_since(transcript_segments, since_segment)}}
+        })
+        response.set_etag(etag, weak=True)
+        return response, 200
 
+    except PermissionDenied as e:
+        logger.error(f"Permission denied to access conversation {job_id} in CCAI Insights: {str(e)}")
+        return jsonify({"status": "FAILED", "error": "Permission denied to access conversation"}), 403
+    except GoogleAPICallError as e:
+        logger.error(f"Google API Call Error when fetching conversation {job_id} from CCAI Insights: {str(e)}")
+        return jsonify({"status": "FAILED", "error": f"CCAI Insights API error: {e.message}"}), 500
     except Exception as e:
         logger.error(f"An unexpected error occurred in get_redaction_status for job {job_id}: {str(e)}")
         return jsonify({"error": "An internal server error occurred"}), 500
 
+SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+SSE_MAX_STREAM_SECONDS = int(os.getenv('SSE_MAX_STREAM_SECONDS', 600)) # Clients reconnect after this
+JOB_EVENTS_KEYSPACE_NOTIFICATIONS = os.getenv('JOB_EVENTS_KEYSPACE_NOTIFICATIONS', 'false').lower() == 'true'
+# Each Flask stream holds one of gunicorn's 8 request threads for up to SSE_MAX_STREAM_SECONDS,
+# so streams are refused (503, clients poll instead) unless a small cap is configured here.
+SSE_WSGI_MAX_STREAMS = int(os.getenv('SSE_WSGI_MAX_STREAMS', 0))
+sse_stream_slots = threading.BoundedSemaphore(SSE_WSGI_MAX_STREAMS) if SSE_WSGI_MAX_STREAMS > 0 else None
+REDACTION_EVENTS_HEADER = "X-Redaction-Events"
+
+def advertise_redaction_events(response):
+    """Tells the frontend that /redaction-events is served, so it streams instead of polling."""
+    response.headers[REDACTION_EVENTS_HEADER] = "available"
+    return response
+
+@app.route('/redaction-events/<job_id>', methods=['GET'])
+@firebase_auth_required
+def stream_redaction_events(job_id):
+    """
+    Server-sent events for a redaction job: a 'snapshot' with the original transcript,
+    a 'segment' per newly redacted utterance and a final 'status' (DONE or FAILED).
+    Driven by the job's Redis pub/sub channel instead of polling. Each open stream
+    holds a request thread, so at most SSE_WSGI_MAX_STREAMS are served (none by
+    default); past that the request gets 503 and the client polls /redaction-status.
+    Requires Firebase authentication.
+    """
+    if not redis_store:
+        logger.error("Redis client not available for /redaction-events.")
+        return jsonify({"error": "Redis client not available"}), 503
+    if sse_stream_slots is None or not sse_stream_slots.acquire(blocking=False):
+        return jsonify({"error": "Event streams are not available; poll /redaction-status instead"}), 503
+    try:
+        response = open_redaction_event_stream(job_id)
+    except Exception:
+        sse_stream_slots.release()
+        raise
+    if response is None:
+        sse_stream_slots.release()
+        return jsonify({"error": "Redis client not available"}), 503
+    response.call_on_close(sse_stream_slots.release)  # Runs when the stream ends or the client leaves
+    return response
+
+def open_redaction_event_stream(job_id):
+    """The event stream Response for a job, or None if Redis could not be read."""
+    # Subscribe before reading the snapshot so no event published in between is lost.
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    channels = [job_events.channel(job_id)]
+    if JOB_EVENTS_KEYSPACE_NOTIFICATIONS:
+        channels.append(job_events.keyspace_channel(job_id))
+    try:
+        pubsub.subscribe(*channels)
+        final_transcript, original_transcript_segments = redis_store.get_job_snapshot(job_id)
+    except redis.exceptions.RedisError as e:
+        pubsub.close()
+        logger.error(f"Redis error while opening event stream for job {job_id}: {str(e)}")
+        return None
+
+    def generate():
+        try:
+            for frame in job_events.snapshot_events(final_transcript, original_transcript_segments):
+                yield frame
+            if final_transcript:
+                return
+            deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                message = pubsub.get_message(timeout=SSE_HEARTBEAT_SECONDS)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                if message["channel"].startswith(job_events.FINAL_TRANSCRIPT_KEYSPACE_PREFIX):
+                    final_transcript_now, _ = redis_store.get_job_snapshot(job_id)
+                    if final_transcript_now:
+                        yield job_events.final_transcript_event(final_transcript_now)
+                        return
+                    continue
+                frame, terminal = job_events.message_to_sse(message["data"])
+                yield frame
+                if terminal:
+                    return
+        except redis.exceptions.RedisError as e:
+            logger.error(f"Redis error in event stream for job {job_id}: {str(e)}")
+        finally:
+            pubsub.close()
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # Placeholder functions - to be implemented
-def extract_expected_pii(transcript: str) -> str | None:
+def extract_expected_pii(transcript: str, config: DlpConfigSnapshot | None = None) -> str | None:
     """
     Analyzes the agent's transcript to identify if it's asking for a specific PII
-    by matching keywords from the 'context_keywords' section of DLP_CONFIG.
+    by matching keywords from the 'context_keywords' section of dlp_config.yaml.
+    Every hit is logged with its offset; the most specific one (longest keyword) wins.
     Returns the PII type (e.g., "PHONE_NUMBER") or None.
     """
-    transcript_lower = transcript.lower()
+    keyword_matcher = (config or dlp_config.current).keyword_matcher
+    if not len(keyword_matcher):
+        logger.warning("No 'context_keywords' found in dlp_config.yaml. Cannot extract expected PII.")
+        return None
 
-    context_keywords = DLP_CONFIG.get("context_keywords", {})
-    if not context_keywords:
-        logger.warning("No 'context_keywords' found in DLP_CONFIG. Cannot extract expected PII.")
+    matches = keyword_matcher.find_all(transcript)
+    if not matches:
         return None
 
-    # Iterate through the configured PII types and their associated keywords
-    for pii_type, keywords in context_keywords.items():
-        for keyword in keywords:
-            if keyword in transcript_lower:
-                logger.info(f"Detected keyword '{keyword}' for PII type '{pii_type}'.")
-                return pii_type
+    for match in matches:
+        events.debug("context_keyword_detected", keyword=match.keyword, start=match.start, end=match.end,
+                     pii_types=list(match.pii_types))
 
-    return None
+    best = select_best_match(matches)
+    events.info("context_keyword_selected", keyword=best.keyword, pii_type=best.pii_types[0])
+    return best.pii_types[0]
 
-def call_dlp_for_redaction(transcript: str, context: dict | None) -> str:
+def call_dlp_for_redaction(transcript: str, context: dict | None, config: DlpConfigSnapshot | None = None) -> str:
     """
     Calls Google DLP to de-identify PII in the transcript.
-    Uses context if available to tailor the DLP request.
+    Uses context if available to pick the precomputed request for the expected PII type.
+    config is the DLP config snapshot to redact with (default: the current one).
+    """
+    config = config or dlp_config.current
+    local_result = local_dlp_result(transcript, context, config)
+    if local_result is not None:
+        return local_result
+    return _redact_via_dlp(transcript, context, config)
+
+def call_dlp_for_redaction_batch(transcripts: list[str], context: dict | None = None,
+                                 config: DlpConfigSnapshot | None = None) -> list[str]:
     """
+    call_dlp_for_redaction for many utterances sharing one context, for offline reprocessing.
+    The local engine scans the whole batch in one pass; utterances it does not cover take
+    the DLP path, concurrently when micro-batching is on so they share table requests.
+    """
+    config = config or dlp_config.current
+    engine = config.local_dlp_engine
+    if engine and DLP_ENGINE_MODE == "local":
+        return engine.redact_batch(transcripts, context)
+
+    results = [None] * len(transcripts)
+    remaining = range(len(transcripts))
+    if engine and DLP_ENGINE_MODE == "local_first":
+        covered = [i for i in remaining if engine.covers(transcripts[i], context)]
+        for i, redacted in zip(covered, engine.redact_batch([transcripts[i] for i in covered], context)):
+            results[i] = redacted
+        remaining = [i for i in remaining if results[i] is None]
+
+    if dlp_batcher and len(remaining) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(remaining), DLP_BATCH_MAX_ITEMS), thread_name_prefix="dlp-bulk") as pool:
+            redacted = list(pool.map(lambda i: _redact_via_dlp(transcripts[i], context, config), remaining))
+    else:
+        redacted = [_redact_via_dlp(transcripts[i], context, config) for i in remaining]
+    for i, value in zip(remaining, redacted):
+        results[i] = value
+    return results
+
+def _redact_via_dlp(transcript: str, context: dict | None, config: DlpConfigSnapshot) -> str:
+    """The DLP side of call_dlp_for_redaction: pre-filter, redaction cache, DLP call and shadow comparison."""
     if not dlp_client:
         logger.warning("DLP client not available. Returning original transcript.")
         return transcript
 
-    # Use the globally available GCP_PROJECT_ID_FOR_SECRETS for DLP operations
-    current_gcp_project_id = GCP_PROJECT_ID_FOR_SECRETS
-    if not current_gcp_project_id or current_gcp_project_id == 'your-gcp-project-id': # Basic check for placeholder
+    templates = config.request_templates
+    if not templates:
         logger.warning("GOOGLE_CLOUD_PROJECT environment variable not configured correctly. Returning original transcript.")
         return transcript
 
-    # Always use the regional parent path for templates, even with a global client
-    dlp_location = DLP_CONFIG.get("dlp_location", "us-central1") # Default to us-central1
-    parent = f"projects/{current_gcp_project_id}/locations/{dlp_location}"
-
-    # Get template names from DLP_CONFIG
-    dlp_templates = DLP_CONFIG.get("dlp_templates", {})
-    inspect_template_name = dlp_templates.get("inspect_template_name", "").replace("${PROJECT_ID}", current_gcp_project_id)
-    deidentify_template_name = dlp_templates.get("deidentify_template_name", "").replace("${PROJECT_ID}", current_gcp_project_id)
-
-    if not inspect_template_name:
-        logger.warning("DLP Inspect Template name not found in dlp_config.yaml. DLP inspection might be impaired.")
-    if not deidentify_template_name:
-        logger.warning("DLP De-identify Template name not found in dlp_config.yaml. DLP de-identification might be impaired.")
-
-    # Prepare the inspect_config. Start with the base config from the YAML file.
-    base_inspect_config_from_yaml = DLP_CONFIG.get("inspect_config", {})
-    final_inline_inspect_config = base_inspect_config_from_yaml.copy()
-    dynamic_context_applied = False
-
-    if context and context.get("expected_pii_type"):
-        dynamic_context_applied = True
-        expected_type = context.get("expected_pii_type")
-        logger.info(f"Contextual PII type received: {expected_type}. Adjusting DLP scan dynamically.")
-
-        # Step 1: Ensure the expected infoType is explicitly included for inspection.
-        # This is critical because likelihood boosting only works on infoTypes that are being inspected.
-        custom_info_types_config = DLP_CONFIG.get("inspect_config", {}).get("custom_info_types", [])
-        custom_type_definition = next((cit for cit in custom_info_types_config if cit.get("info_type", {}).get("name") == expected_type), None)
-
-        if custom_type_definition:
-            # It's a custom type. Add its full definition if not already present.
-            if "custom_info_types" not in final_inline_inspect_config:
-                final_inline_inspect_config["custom_info_types"] = []
-            existing_custom_types = {cit.get("info_type", {}).get("name") for cit in final_inline_inspect_config["custom_info_types"]}
-            if expected_type not in existing_custom_types:
-                final_inline_inspect_config["custom_info_types"].append(custom_type_definition)
-                logger.info(f"Added custom info type '{expected_type}' to final_inline_inspect_config.")
-            # For custom info types, we do NOT add a rule_set with info_types, as it causes "Invalid built-in info type" error.
-            # The custom info type definition itself is sufficient for detection.
-            logger.info(f"Skipping rule_set for custom info type '{expected_type}' to avoid 'Invalid built-in info type' error.")
-        else:
-            # It's a built-in type. Add it to the info_types list if not already present.
-            if "info_types" not in final_inline_inspect_config:
-                final_inline_inspect_config["info_types"] = []
-            existing_info_types = {it.get("name") for it in final_inline_inspect_config["info_types"]}
-            if expected_type not in existing_info_types:
-                final_inline_inspect_config["info_types"].append({"name": expected_type})
-                logger.info(f"Added built-in info type '{expected_type}' to final_inline_inspect_config.")
-
-            # For built-in info types, ensure it's included and boost likelihood.
-            if "info_types" not in final_inline_inspect_config:
-                final_inline_inspect_config["info_types"] = []
-            existing_info_types = {it.get("name") for it in final_inline_inspect_config["info_types"]}
-            if expected_type not in existing_info_types:
-                final_inline_inspect_config["info_types"].append({"name": expected_type})
-                logger.info(f"Added built-in info type '{expected_type}' to final_inline_inspect_config.")
-
-            # Check if a rule set for this info type already exists
-            rule_set_found = False
-            if "rule_set" not in final_inline_inspect_config:
-                final_inline_inspect_config["rule_set"] = []
-
-            for rule_set_entry in final_inline_inspect_config["rule_set"]:
-                if "info_types" in rule_set_entry:
-                    # Check if the expected_type is already in this rule set's info_types
-                    rule_set_info_types = {it.get("name") for it in rule_set_entry["info_types"]}
-                    if expected_type in rule_set_info_types:
-                        # Found an existing rule set that includes this info type.
-                        # Ensure the likelihood is boosted.
-                        for rule in rule_set_entry.get("rules", []):
-                            if "hotword_rule" in rule and "likelihood_adjustment" in rule["hotword_rule"]:
-                                rule["hotword_rule"]["likelihood_adjustment"]["fixed_likelihood"] = dlp_v2.Likelihood.VERY_LIKELY
-                                logger.info(f"Updated likelihood for existing rule set for built-in type '{expected_type}'.")
-                                rule_set_found = True
-                                break # Break from inner loop (rules)
-                    if rule_set_found:
-                        break # Break from outer loop (rule_set_entry)
-
-            if not rule_set_found:
-                # If no existing rule set was found for this info type, create a new one.
-                rule = {
-                    "hotword_rule": {
-                        "hotword_regex": {"pattern": ".+"},
-                        "proximity": {"window_before": 100, "window_after": 100},
-                        "likelihood_adjustment": {"fixed_likelihood": dlp_v2.Likelihood.VERY_LIKELY}
-                    }
-                }
-                final_inline_inspect_config["rule_set"].append({
-                    "info_types": [{"name": expected_type}],
-                    "rules": [rule]
-                })
-                logger.info(f"Created new rule set for built-in type '{expected_type}' with boosted likelihood.")
-
-    # Define the default deidentify_config for fallback
-    default_deidentify_config = DLP_CONFIG.get("deidentify_config", {
-        "info_type_transformations": {
-            "transformations": [
-                {
-                    "primitive_transformation": {
-                        "replace_with_info_type_config": {}
-                    }
-                }
-            ]
-        }
-    })
+    if config.pii_prefilter and config.pii_prefilter.should_skip_dlp(transcript, context):
+        events.info("dlp_skipped", reason="prefilter_no_candidates")
+        return transcript
+
+    if redaction_cache:
+        expected_pii_type = context.get("expected_pii_type") if context else None
+        redacted = redaction_cache.get_or_compute(
+            transcript, expected_pii_type, config.version,
+            compute=lambda: _deidentify_with_dlp(transcript, context, templates),
+            is_cacheable=lambda result: not result.startswith(DLP_ERROR_MARKERS))
+    else:
+        redacted = _deidentify_with_dlp(transcript, context, templates)
+    shadow_compare_dlp_result(transcript, context, redacted, config)
+    return redacted
+
+# Prefixes call_dlp_for_redaction puts in front of the original text when DLP fails.
+DLP_ERROR_MARKERS = (
+    "[DLP_FALLBACK_PROCESSING_ERROR]",
+    "[DLP_PERMISSION_DENIED_ERROR]",
+    "[DLP_METHOD_NOT_IMPLEMENTED_ERROR]",
+    "[DLP_TEMPLATE_NOT_FOUND_ERROR]",
+    "[DLP_API_CALL_ERROR]",
+    "[DLP_PROCESSING_ERROR]",
+)
+
+def _deidentify_with_dlp(transcript: str, context: dict | None, templates: DlpRequestTemplates) -> str:
+    """Sends the transcript to DLP with the precomputed request for its context."""
+    inspect_template_name = templates.inspect_template_name
+    deidentify_template_name = templates.deidentify_template_name
+
+    with metrics.stage("context_config"):
+        template = templates.for_context(context)
+        dlp_request = None if dlp_batcher else template.build(transcript)
+    expected_pii_type = context.get('expected_pii_type') if template.dynamic_context_applied else None
 
     try:
-        logger.info(f"Sending request to DLP API for parent: {parent}, inspect_template: {inspect_template_name}, deidentify_template: {deidentify_template_name}, transcript_preview: {transcript[:100]}")
-
-        request = {
-            "parent": parent,
-            "item": {"value": transcript},
-        }
-
-        # Configure inspection:
-        # If dynamic context was applied OR no template is specified, use the inline config.
-        # Otherwise, use the template. This ensures context-based changes are always applied.
-        if dynamic_context_applied or not inspect_template_name:
-            request["inspect_config"] = final_inline_inspect_config
-            logger.info("Using inline inspect_config (dynamic context applied or no template specified).")
-        elif inspect_template_name:
-            request["inspect_template_name"] = inspect_template_name
-            logger.info(f"Using inspect_template_name: {inspect_template_name}")
-        else:
-            request["inspect_config"] = final_inline_inspect_config
-            logger.info("Using base inline inspect_config (no dynamic context, no template).")        # Configure de-identification: Prioritize template or use default inline config.
-        if deidentify_template_name:
-            request["deidentify_template_name"] = deidentify_template_name
-            logger.info(f"Using deidentify_template_name: {deidentify_template_name}")
+        events.debug("dlp_request_sent", parent=templates.parent, expected_pii_type=expected_pii_type,
+                     chars=len(transcript), payload=transcript[:100])
+        if dlp_batcher:
+            # The batcher admits each batch RPC through the rate limiter itself.
+            with metrics.stage("dlp_rpc"):
+                redacted_value = dlp_batcher.submit(template, transcript)
         else:
-            request["deidentify_config"] = default_deidentify_config
-            logger.info("Using inline deidentify_config (no template name provided).")
-
-        response = dlp_client.deidentify_content(request=request)
-
-        redacted_value = response.item.value
-        logger.info(f"DLP De-identification successful. Redacted_transcript_preview: {redacted_value[:100]}")
+            with dlp_slot(), metrics.stage("dlp_rpc"):
+                redacted_value = dlp_client.deidentify_content(request=dlp_request).item.value
+        events.info("dlp_redacted", expected_pii_type=expected_pii_type, chars=len(transcript),
+                    changed=redacted_value != transcript, payload=redacted_value[:100])
         return redacted_value
 
+    except DlpOverloaded:
+        raise  # Answered with 503 by the handler; never passed through unredacted
     except NotFound as e:
-        logger.warning(f"DLP API Error: Requested inspect/deidentify template not found ({inspect_template_name}, {deidentify_template_name}). Falling back to inline configuration. Error: {str(e)}")
+        events.warning("dlp_template_not_found", inspect_template=inspect_template_name,
+                       deidentify_template=deidentify_template_name, error=str(e))
 
         # Fallback attempt: retry without templates, forcing inline config
         try:
-            fallback_request = {
-                "parent": parent,
-                "item": {"value": transcript}, # Redefine item here for safety
-                "inspect_config": final_inline_inspect_config, # Always use the prepared inline config for fallback
-                "deidentify_config": default_deidentify_config # Always use the prepared inline config for fallback
-            }
-            logger.info("Attempting DLP with inline inspect_config and deidentify_config (fallback).")
-            response = dlp_client.deidentify_content(request=fallback_request)
-            redacted_value = response.item.value
-            logger.info(f"DLP De-identification successful (fallback). Redacted_transcript_preview: {redacted_value[:100]}")
+            fallback_request = template.build(transcript, fallback=True)
+            with dlp_slot(), metrics.stage("dlp_rpc"):
+                redacted_value = dlp_client.deidentify_content(request=fallback_request).item.value
+            events.info("dlp_redacted", expected_pii_type=expected_pii_type, chars=len(transcript),
+                        changed=redacted_value != transcript, fallback=True, payload=redacted_value[:100])
             return redacted_value
+        except DlpOverloaded:
+            raise
         except Exception as fallback_e:
-            logger.error(f"An unexpected error occurred during DLP API fallback call: {str(fallback_e)}")
+            events.error("dlp_fallback_failed", error=str(fallback_e))
             return f"[DLP_FALLBACK_PROCESSING_ERROR] {transcript}"
 
-    except PermissionDenied as e:
+    except Exception as e:
+        return _dlp_error_result(e, transcript, templates)
+
+def _dlp_error_result(e: Exception, transcript: str, templates: DlpRequestTemplates) -> str:
+    """
+    Logs a failed DLP call and returns the original transcript prefixed with the
+    matching DLP error marker (see DLP_ERROR_MARKERS).
+    """
+    current_gcp_project_id = templates.project_id
+    dlp_location = templates.dlp_location
+    inspect_template_name = templates.inspect_template_name
+    deidentify_template_name = templates.deidentify_template_name
+
+    if isinstance(e, PermissionDenied):
         logger.error(f"DLP API Error: Permission denied for project '{current_gcp_project_id}'. Ensure the service account has 'DLP User' role. Error: {str(e)}")
         return f"[DLP_PERMISSION_DENIED_ERROR] {transcript}"
-
-    except MethodNotImplemented as e:
+    if isinstance(e, MethodNotImplemented):
         logger.error(f"DLP API Error: {str(e)}")
         return f"[DLP_METHOD_NOT_IMPLEMENTED_ERROR] {transcript}"
-    except GoogleAPICallError as e:
+    if isinstance(e, GoogleAPICallError):
         if hasattr(e, 'code') and e.code == 404:
             logger.error(f"DLP API Error (404 Not Found): The specified DLP inspect or de-identify templates were not found, or the project ID/location is incorrect. Please verify that templates '{inspect_template_name}' and '{deidentify_template_name}' exist in project '{current_gcp_project_id}' in region '{dlp_location}' and that the service account has 'DLP User' role. Error: {str(e)}")
             return f"[DLP_TEMPLATE_NOT_FOUND_ERROR] {transcript}"
-        else:
-            status_code = e.code if hasattr(e, 'code') else 'N/A'
-            message = e.message if hasattr(e, 'message') else 'N/A'
-            logger.error(f"A generic Google API Call Error occurred during DLP call: Status Code: {status_code}, Message: {message}. This can be caused by permission issues, invalid arguments, or network problems. Please check service account permissions and DLP template paths for project '{current_gcp_project_id}'. Original error: {str(e)}")
-            return f"[DLP_API_CALL_ERROR] {transcript}"
+        status_code = e.code if hasattr(e, 'code') else 'N/A'
+        message = e.message if hasattr(e, 'message') else 'N/A'
+        logger.error(f"A generic Google API Call Error occurred during DLP call: Status Code: {status_code}, Message: {message}. This can be caused by permission issues, invalid arguments, or network problems. Please check service account permissions and DLP template paths for project '{current_gcp_project_id}'. Original error: {str(e)}")
+        return f"[DLP_API_CALL_ERROR] {transcript}"
 
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during DLP API call: {str(e)}")
-        return f"[DLP_PROCESSING_ERROR] {transcript}"
+    logger.error(f"An unexpected error occurred during DLP API call: {str(e)}")
+    return f"[DLP_PROCESSING_ERROR] {transcript}"
 
 def verify_token(auth_header: str) -> dict:
     """Verifies the Google-signed ID token from the Authorization header."""
@@ -0,0 +1,169 @@
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Cheap local signals that must be present for DLP to be able to report a built-in
+# info type. Each entry lists the signal names (SIGNAL_PATTERNS, WORD_SIGNALS or
+# "number_words") that cover it.
+# An info type that is not listed here disables the pre-filter entirely.
+KNOWN_TYPE_SIGNALS = {
+    "EMAIL_ADDRESS": ["at_sign"],
+    "PHONE_NUMBER": ["digit", "number_words"],
+    "CREDIT_CARD_NUMBER": ["digit", "number_words"],
+    "US_PASSPORT": ["digit"],
+    "STREET_ADDRESS": ["digit", "number_words", "street_tokens"],
+    "US_SOCIAL_SECURITY_NUMBER": ["digit", "number_words"],
+    "FINANCIAL_ACCOUNT_NUMBER": ["digit", "number_words"],
+    "CVV_NUMBER": ["digit", "number_words"],
+    "IMEI_HARDWARE_ID": ["digit"],
+    "US_DRIVERS_LICENSE_NUMBER": ["digit"],
+    "US_EMPLOYER_IDENTIFICATION_NUMBER": ["digit"],
+    "US_MEDICARE_BENEFICIARY_ID_NUMBER": ["digit"],
+    "US_INDIVIDUAL_TAXPAYER_IDENTIFICATION_NUMBER": ["digit"],
+    "DOD_ID_NUMBER": ["digit"],
+    "MAC_ADDRESS": ["digit", "hex_pairs"],
+    "IP_ADDRESS": ["digit", "hex_groups"],
+    "SWIFT_CODE": ["swift_shape"],
+    "IBAN_CODE": ["digit"],
+    "DATE_OF_BIRTH": ["digit", "number_words", "month_names"],
+}
+
+SIGNAL_PATTERNS = {
+    "digit": r"\d",
+    "at_sign": r"@",
+    "hex_pairs": r"\b[0-9A-Fa-f]{2}[:-][0-9A-Fa-f]{2}\b",
+    "hex_groups": r"[0-9A-Fa-f]{1,4}::?[0-9A-Fa-f]{1,4}",
+    # SWIFT/BIC: 4-letter bank, 2-letter country, 2 location characters, optional branch.
+    "swift_shape": r"\b[A-Z]{6}[A-Z0-9]{2}(?:[A-Z0-9]{3})?\b",
+}
+
+# Word signals are matched against the lowercased word tokens of the utterance,
+# which is much cheaper than case-insensitive regex alternations.
+NUMBER_WORDS = frozenset("""
+    zero oh one two three four five six seven eight nine ten eleven twelve thirteen fourteen
+    fifteen sixteen seventeen eighteen nineteen twenty thirty forty fifty sixty seventy eighty
+    ninety hundred thousand first second third fourth fifth sixth seventh eighth ninth tenth
+    twelfth twentieth thirtieth
+""".split())
+
+WORD_SIGNALS = {
+    "street_tokens": frozenset("""
+        street st avenue ave road rd boulevard blvd lane ln drive dr court ct suite apt
+        apartment highway hwy po box
+    """.split()),
+    "month_names": frozenset("""
+        jan january feb february mar march apr april may jun june jul july aug august
+        sep sept september oct october nov november dec december
+    """.split()),
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _has_number_word_run(words: list[str]) -> bool:
+    """Two or more spelled-out numbers in a row, e.g. "five five five" or "twenty third"."""
+    previous = False
+    for word in words:
+        if word == "and" and previous:
+            continue
+        current = word in NUMBER_WORDS
+        if current and previous:
+            return True
+        previous = current
+    return False
+
+
+class PiiPrefilter:
+    """
+    Conservative local check that decides whether an utterance could contain any
+    finding for the configured inspect_config. Only utterances with no candidate
+    signal at all (no digits, no '@', no custom regex hit, ...) are skipped.
+
+    If inspect_config contains an info type without known signals, or a custom
+    info type that cannot be evaluated locally, the pre-filter disables itself
+    and every utterance goes to DLP. The same happens when the requests it would
+    skip inspect with a DLP inspect template (inspect_template_name) instead of
+    inspect_config: the template's info types are not known here.
+    """
+
+    def __init__(self, inspect_config: dict, inspect_template_name: str | None = None):
+        self.enabled = False
+        self.disabled_reason = None
+        self._pattern = None
+        self._lock = threading.Lock()
+        self.stats = {"checked": 0, "skipped": 0, "passed": 0, "bypassed_context": 0}
+
+        if inspect_template_name:
+            self._disable(f"requests without context inspect with template '{inspect_template_name}', "
+                          f"whose info types may differ from inspect_config")
+            return
+
+        signal_names = set()
+        for info_type in inspect_config.get("info_types", []):
+            name = info_type.get("name")
+            if name not in KNOWN_TYPE_SIGNALS:
+                self._disable(f"no local signals known for info type '{name}'")
+                return
+            signal_names.update(KNOWN_TYPE_SIGNALS[name])
+
+        patterns = [SIGNAL_PATTERNS[s] for s in sorted(signal_names) if s in SIGNAL_PATTERNS]
+        self._words = frozenset().union(*(WORD_SIGNALS[s] for s in signal_names if s in WORD_SIGNALS))
+        self._number_words = "number_words" in signal_names
+        for custom in inspect_config.get("custom_info_types", []):
+            name = custom.get("info_type", {}).get("name")
+            regex = (custom.get("regex") or {}).get("pattern")
+            if not regex:
+                self._disable(f"custom info type '{name}' is not regex-based")
+                return
+            try:
+                re.compile(regex)
+            except re.error as e:
+                self._disable(f"custom info type '{name}' regex is not Python-compatible: {e}")
+                return
+            patterns.append(regex)
+
+        if not patterns and not signal_names:
+            self._disable("inspect_config has no info types")
+            return
+
+        self._pattern = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        self.enabled = True
+        logger.info(f"PII pre-filter enabled with {len(patterns)} candidate patterns and {len(self._words)} signal words.")
+
+    def _disable(self, reason: str):
+        self.enabled = False
+        self.disabled_reason = reason
+        logger.warning(f"PII pre-filter disabled: {reason}.")
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _has_candidate(self, transcript: str) -> bool:
+        if self._pattern and self._pattern.search(transcript):
+            return True
+        if not self._words and not self._number_words:
+            return False
+        words = _WORD_RE.findall(transcript.lower())
+        if self._words and not self._words.isdisjoint(words):
+            return True
+        return self._number_words and _has_number_word_run(words)
+
+    def may_contain_pii(self, transcript: str) -> bool:
+        """Returns False only when no configured info type could possibly match."""
+        if not self.enabled:
+            return True
+        found = self._has_candidate(transcript)
+        with self._lock:
+            self.stats["checked"] += 1
+            self.stats["passed" if found else "skipped"] += 1
+        return found
+
+    def should_skip_dlp(self, transcript: str, context: dict | None) -> bool:
+        """An active expected_pii_type always overrides the pre-filter."""
+        if context and context.get("expected_pii_type"):
+            self._count("bypassed_context")
+            return False
+        return not self.may_contain_pii(transcript)
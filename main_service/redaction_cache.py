@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "redaction_cache:"
+
+
+def cache_key(transcript: str, expected_pii_type: str | None, config_version: str) -> str:
+    """Hash of everything that determines the redacted output. The text itself is never stored."""
+    digest = hashlib.sha256()
+    for part in (config_version, expected_pii_type or "", transcript):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RedactionCache:
+    """
+    Two-tier cache of DLP redaction results with request coalescing.
+
+    Tier 1 is an in-process LRU bounded by max_entries; tier 2 is an optional
+    shared Redis tier. redis_client is a callable returning the current Redis
+    client (it is replaced when the Redis endpoint rotates), or None for no tier 2. Both tiers expire entries after ttl_seconds. Entries hold
+    only the key hash and the redacted output; when DLP left the text unchanged
+    only an 'unchanged' marker is stored, so raw utterances never reach the cache.
+
+    Concurrent misses for the same key are coalesced: the first caller runs the
+    DLP call and every in-flight duplicate waits for its result. Threads use
+    get_or_compute and coroutines get_or_compute_async; both share one cache.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 3600, redis_client=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis_client
+        self._entries = OrderedDict()  # key -> (expires_at, redacted or None for unchanged)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "coalesced": 0, "stores": 0,
+                      "evictions": 0, "l2_errors": 0}
+
+    def get_or_compute(self, transcript: str, expected_pii_type: str | None, config_version: str, compute,
+                       is_cacheable) -> str:
+        """
+        Returns the cached redaction for this text under config_version (the DLP config
+        the caller redacts with), or calls compute() once for all concurrent callers.
+        Results rejected by is_cacheable (e.g. DLP error markers) are returned but not stored.
+        """
+        key = cache_key(transcript, expected_pii_type, config_version)
+        hit, waiter, owner = self._claim(key, transcript)
+        if hit is not None:
+            return hit
+        if waiter is not None:
+            return waiter.result()
+
+        try:
+            stored = self._get_shared(key)
+            if stored is not None:
+                result = self._shared_hit(key, stored, transcript)
+            else:
+                self._count_miss()
+                result = compute()
+                if is_cacheable(result):
+                    self._store(key, result, transcript)
+            owner.set_result(result)
+            return result
+        except Exception as e:
+            owner.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    async def get_or_compute_async(self, transcript: str, expected_pii_type: str | None, config_version: str,
+                                   compute, is_cacheable) -> str:
+        """
+        get_or_compute for the event loop: compute is a coroutine function, waiting for a
+        coalesced result does not block the loop, and the shared tier (a blocking Redis
+        client) is read and written in a worker thread.
+        """
+        key = cache_key(transcript, expected_pii_type, config_version)
+        hit, waiter, owner = self._claim(key, transcript)
+        if hit is not None:
+            return hit
+        if waiter is not None:
+            return await asyncio.wrap_future(waiter)
+
+        try:
+            stored = await asyncio.to_thread(self._get_shared, key) if self._redis else None
+            if stored is not None:
+                result = self._shared_hit(key, stored, transcript)
+            else:
+                self._count_miss()
+                result = await compute()
+                if is_cacheable(result):
+                    await asyncio.to_thread(self._store, key, result, transcript)
+            owner.set_result(result)
+            return result
+        except BaseException as e:  # Including cancellation, so coalesced waiters are released
+            owner.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _claim(self, key: str, transcript: str) -> tuple:
+        """(cached result, None, None) on an L1 hit, else (None, waiter, None) or (None, None, owner future)."""
+        with self._lock:
+            hit = self._get_local(key)
+            if hit is not None:
+                self.stats["l1_hits"] += 1
+                return self._expand(hit, transcript), None, None
+            waiter = self._in_flight.get(key)
+            if waiter is not None:
+                self.stats["coalesced"] += 1
+                return None, waiter, None
+            owner = self._in_flight[key] = Future()
+            return None, None, owner
+
+    def _shared_hit(self, key: str, stored: tuple, transcript: str) -> str:
+        with self._lock:
+            self.stats["l2_hits"] += 1
+            self._put_local(key, stored)
+        return self._expand(stored, transcript)
+
+    def _count_miss(self):
+        with self._lock:
+            self.stats["misses"] += 1
+
+    @staticmethod
+    def _expand(stored: tuple, transcript: str) -> str:
+        unchanged, redacted = stored
+        return transcript if unchanged else redacted
+
+    def _get_local(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, stored = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return stored
+
+    def _put_local(self, key, stored):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, stored)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _get_shared(self, key):
+        client = self._redis() if self._redis else None
+        if client is None:
+            return None
+        try:
+            value = client.get(REDIS_KEY_PREFIX + key)
+            if not value:
+                return None
+            entry = json.loads(value)
+            return (entry.get("unchanged", False), entry.get("redacted"))
+        except (redis.exceptions.RedisError, json.JSONDecodeError) as e:
+            logger.warning(f"Redaction cache: shared tier read failed, treating as miss. Error: {str(e)}")
+            with self._lock:
+                self.stats["l2_errors"] += 1
+            return None
+
+    def _store(self, key, result, transcript):
+        unchanged = result == transcript
+        stored = (unchanged, None if unchanged else result)
+        with self._lock:
+            self._put_local(key, stored)
+            self.stats["stores"] += 1
+        client = self._redis() if self._redis else None
+        if client is None:
+            return
+        entry = {"key": key, "unchanged": True} if unchanged else {"key": key, "redacted": result}
+        try:
+            client.setex(REDIS_KEY_PREFIX + key, self.ttl_seconds, json.dumps(entry))
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Redaction cache: shared tier write failed. Error: {str(e)}")
+            with self._lock:
+                self.stats["l2_errors"] += 1
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["l1_entries"] = len(self._entries)
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else None
+        stats["l1_hit_ratio"] = round(stats["l1_hits"] / lookups, 4) if lookups else None
+        return stats
@@ -0,0 +1,225 @@
+import base64
+import contextvars
+import gzip
+import json
+import logging
+import threading
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Round trips made on behalf of the current request (works for threads and asyncio tasks).
+_round_trips = contextvars.ContextVar("redis_round_trips", default=0)
+
+
+def encode_chunk(segments: list) -> str:
+    """gzip + base64 so chunks survive the decode_responses=True client."""
+    return base64.b64encode(gzip.compress(json.dumps(segments, separators=(",", ":")).encode("utf-8"))).decode("ascii")
+
+
+def decode_chunks(chunks: list) -> list:
+    segments = []
+    for chunk in chunks:
+        segments.extend(json.loads(gzip.decompress(base64.b64decode(chunk))))
+    return segments
+
+
+def create_pool(host: str, port: int, max_connections: int = 32, op_timeout: float = 2.0,
+                connect_timeout: float = 10.0) -> redis.BlockingConnectionPool:
+    """
+    Explicit connection pool shared by every Redis user in main_service. Callers
+    wait up to op_timeout for a free connection instead of failing when all
+    max_connections are checked out by other request threads.
+    """
+    return redis.BlockingConnectionPool(
+        host=host,
+        port=port,
+        db=0,
+        decode_responses=True,
+        max_connections=max_connections,
+        socket_connect_timeout=connect_timeout,
+        socket_timeout=op_timeout,  # Per-operation read/write timeout
+        health_check_interval=30,
+        timeout=op_timeout,  # Wait for a free pooled connection
+    )
+
+
+class RedisStore:
+    """
+    Data-access layer for the Redis keys main_service owns.
+
+    Related keys are read and written together (MGET, or a non-transactional
+    pipeline when TTLs differ) so each operation costs one round trip.
+    Round trips are counted per request via reset_round_trips()/round_trips().
+    With a ContextNearCache, context reads that hit it cost no round trip.
+    """
+
+    def __init__(self, client: redis.Redis, job_ttl_seconds: int = 0, context_cache=None):
+        self.client = client
+        self.job_ttl_seconds = job_ttl_seconds
+        self.context_cache = context_cache
+        self._lock = threading.Lock()
+        self.total_round_trips = 0
+
+    # --- Round-trip accounting ---
+    def _count(self, n: int = 1):
+        _round_trips.set(_round_trips.get() + n)
+        with self._lock:
+            self.total_round_trips += n
+
+    @staticmethod
+    def reset_round_trips():
+        _round_trips.set(0)
+
+    @staticmethod
+    def round_trips() -> int:
+        return _round_trips.get()
+
+    # --- Conversation context ---
+    def get_context(self, conversation_id: str) -> dict | None:
+        """Returns the stored context, or None. Malformed JSON is raised as json.JSONDecodeError."""
+        cache = self.context_cache
+        if cache is None:
+            self._count()
+            value = self.client.get(f"context:{conversation_id}")
+            return json.loads(value) if value else None
+
+        found, context = cache.lookup(conversation_id)
+        if found:
+            return context
+        cache.begin_fetch(conversation_id)
+        try:
+            self._count()
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(f"context:{conversation_id}")
+            pipe.pttl(f"context:{conversation_id}")
+            value, pttl_ms = pipe.execute()
+            context = json.loads(value) if value else None
+        except Exception:
+            cache.cancel_fetch(conversation_id)
+            raise
+        cache.finish_fetch(conversation_id, context, pttl_ms)
+        return context
+
+    def set_context(self, conversation_id: str, context_value: dict, ttl_seconds: int):
+        cache = self.context_cache
+        if cache:
+            cache.begin_write(conversation_id)
+        ok = False
+        try:
+            self._count()
+            self.client.setex(f"context:{conversation_id}", ttl_seconds, json.dumps(context_value))
+            ok = True
+        finally:
+            if cache:
+                cache.finish_write(conversation_id, context_value, ttl_seconds, ok)
+
+    # --- Redaction jobs ---
+    def init_job(self, conversation_id: str, transcript_segments: list):
+        """Stores job status, the original transcript and an empty redacted conversation in one round trip."""
+        values = {
+            f"job_status:{conversation_id}": "PROCESSING",
+            f"original_conversation:{conversation_id}": json.dumps(transcript_segments),
+            f"job_conversation:{conversation_id}": json.dumps({"transcript": {"transcript_segments": []}}),
+            f"job_version:{conversation_id}": 1,
+        }
+        self._count()
+        if not self.job_ttl_seconds:
+            self.client.mset(values)
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipe.set(key, value, ex=self.job_ttl_seconds)
+        pipe.execute()
+
+    def init_streaming_job(self, conversation_id: str):
+        """Like init_job, but the original transcript is appended later by ChunkedTranscriptWriter."""
+        self._count()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(f"job_status:{conversation_id}", "PROCESSING", ex=self.job_ttl_seconds or None)
+        pipe.set(f"job_conversation:{conversation_id}", json.dumps({"transcript": {"transcript_segments": []}}),
+                 ex=self.job_ttl_seconds or None)
+        pipe.set(f"job_version:{conversation_id}", 1, ex=self.job_ttl_seconds or None)
+        pipe.execute()
+
+    def append_original_chunk(self, conversation_id: str, segments: list):
+        key = f"original_conversation_chunks:{conversation_id}"
+        self._count()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.rpush(key, encode_chunk(segments))
+        pipe.incr(f"job_version:{conversation_id}")
+        if self.job_ttl_seconds:
+            pipe.expire(key, self.job_ttl_seconds)
+        pipe.execute()
+
+    def set_job_status(self, conversation_id: str, status: str):
+        self._count()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(f"job_status:{conversation_id}", status, ex=self.job_ttl_seconds or None)
+        pipe.incr(f"job_version:{conversation_id}")
+        pipe.execute()
+
+    def get_job_state(self, job_id: str) -> tuple[int, str | None, bool]:
+        """
+        Returns (version, job_status, has_final_transcript) in one small round trip.
+        job_version is bumped by every writer of the job's documents (chunk appends,
+        status changes, aggregated utterances), so an unchanged version means an
+        unchanged /redaction-status response.
+        """
+        self._count()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.mget(f"job_version:{job_id}", f"job_status:{job_id}")
+        pipe.exists(f"final_transcript:{job_id}")
+        (version, status), has_final = pipe.execute()
+        return int(version or 0), status, bool(has_final)
+
+    def get_job_snapshot(self, job_id: str) -> tuple[dict | None, list]:
+        """
+        Returns (final_transcript, original_transcript_segments) for a job in one
+        round trip. final_transcript is None while the job is still processing.
+        The original transcript is either one JSON string or, for streamed uploads,
+        a list of compressed chunks.
+        """
+        self._count()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.mget(f"final_transcript:{job_id}", f"original_conversation:{job_id}")
+        pipe.lrange(f"original_conversation_chunks:{job_id}", 0, -1)
+        (final_transcript_str, original_conversation_str), original_chunks = pipe.execute()
+        final_transcript = json.loads(final_transcript_str) if final_transcript_str else None
+        if original_conversation_str:
+            original_transcript_segments = json.loads(original_conversation_str)
+        else:
+            original_transcript_segments = decode_chunks(original_chunks)
+        return final_transcript, original_transcript_segments
+
+
+class ChunkedTranscriptWriter:
+    """
+    Buffers original transcript segments of a streamed upload and appends them to
+    Redis as compressed chunks of at most max_segments segments / max_bytes of JSON,
+    so only one chunk is ever held in memory.
+    """
+
+    def __init__(self, store: RedisStore, conversation_id: str, max_segments: int = 200, max_bytes: int = 64 * 1024):
+        self.store = store
+        self.conversation_id = conversation_id
+        self.max_segments = max_segments
+        self.max_bytes = max_bytes
+        self._segments = []
+        self._bytes = 0
+        self.chunks_written = 0
+
+    def add(self, segment: dict):
+        self._segments.append(segment)
+        self._bytes += len(segment.get("text", "")) + 32
+        if len(self._segments) >= self.max_segments or self._bytes >= self.max_bytes:
+            self.flush()
+
+    def flush(self):
+        if not self._segments:
+            return
+        self.store.append_original_chunk(self.conversation_id, self._segments)
+        self.chunks_written += 1
+        self._segments = []
+        self._bytes = 0
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class StartupStepError(RuntimeError):
+    """A step did not run because one of the steps it depends on failed."""
+
+
+class StartupOrchestrator:
+    """
+    Runs independent cold-start steps concurrently and records per-step timings.
+
+    Steps are registered with add(name, fn, after=(...)); a step starts as soon as
+    the steps it depends on have finished, receiving nothing and returning a value
+    that run() hands back by name. Failures are captured per step instead of
+    aborting the others; callers decide which failures are fatal.
+
+    lazy(name, factory) wraps clients that some deployments never use: they are
+    created on first call and their creation time is added to the same report.
+    """
+
+    def __init__(self):
+        self._steps = {}
+        self._results = {}
+        self._timings = {}
+        self._lazy_timings = {}
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._finished_at = None
+
+    def add(self, name: str, fn, after: tuple = ()):
+        self._steps[name] = (fn, tuple(after))
+
+    def run(self, timeout: float | None = None) -> dict:
+        """Runs every registered step and returns {name: result}; failed steps map to None."""
+        self._started_at = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        futures = {}
+        # One thread per step, so a step waiting on its dependencies never starves them.
+        pool = ThreadPoolExecutor(max_workers=max(1, len(self._steps)), thread_name_prefix="startup")
+        for name, (fn, after) in self._steps.items():
+            futures[name] = pool.submit(self._run_step, name, fn, [futures[d] for d in after], after)
+        for name, future in futures.items():
+            try:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                self._results[name] = future.result(timeout=remaining)
+            except FuturesTimeoutError:
+                self._record(name, self._started_at, "timed_out")
+                logger.error(f"Startup step '{name}' did not finish within {timeout}s; continuing without it.")
+                self._results[name] = None
+            except Exception:
+                self._results[name] = None
+        pool.shutdown(wait=False)  # Do not block startup on steps that timed out
+        self._finished_at = time.perf_counter()
+        logger.info(f"Startup finished in {self._elapsed_ms(self._finished_at):.0f} ms: "
+                    + ", ".join(f"{n}={t['duration_ms']}ms/{t['status']}" for n, t in self._timings.items()))
+        return dict(self._results)
+
+    def _run_step(self, name, fn, dependencies, dependency_names):
+        for dependency_name, dependency in zip(dependency_names, dependencies):
+            try:
+                dependency.result()
+            except Exception as e:
+                self._record(name, time.perf_counter(), "skipped", f"{dependency_name} failed")
+                raise StartupStepError(f"Startup step '{name}' skipped because '{dependency_name}' failed") from e
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self._record(name, start, "failed", str(e) or type(e).__name__)
+            logger.error(f"Startup step '{name}' failed. Error: {str(e)}")
+            raise
+        self._record(name, start, "ok")
+        return result
+
+    def _elapsed_ms(self, at: float) -> float:
+        return (at - self._started_at) * 1000
+
+    def _record(self, name, start, status, error=None):
+        entry = {
+            "start_ms": round(self._elapsed_ms(start), 1),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            "status": status,
+        }
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self._timings[name] = entry
+
+    def succeeded(self, name: str) -> bool:
+        return self._timings.get(name, {}).get("status") == "ok"
+
+    def lazy(self, name: str, factory):
+        """Returns a thread-safe getter that creates the client on first use (None if creation fails)."""
+        lock = threading.Lock()
+        holder = {}
+
+        def get():
+            if "value" in holder:
+                return holder["value"]
+            with lock:
+                if "value" not in holder:
+                    start = time.perf_counter()
+                    try:
+                        holder["value"] = factory()
+                        status, error = "ok", None
+                    except Exception as e:
+                        logger.error(f"Could not initialize {name}. Error: {str(e)}")
+                        holder["value"], status, error = None, "failed", str(e)
+                    entry = {"duration_ms": round((time.perf_counter() - start) * 1000, 1), "status": status}
+                    if error:
+                        entry["error"] = error
+                    with self._lock:
+                        self._lazy_timings[name] = entry
+            return holder["value"]
+
+        with self._lock:
+            self._lazy_timings[name] = {"status": "deferred"}
+        return get
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "total_ms": round(self._elapsed_ms(self._finished_at), 1) if self._finished_at else None,
+                "steps": dict(self._timings),
+                "lazy": dict(self._lazy_timings),
+            }
@@ -0,0 +1,80 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_cache import ContextNearCache  # noqa: E402
+
+CONTEXT = {"expected_pii_type": "PHONE_NUMBER"}
+
+
+def connected_cache() -> ContextNearCache:
+    cache = ContextNearCache("localhost", 6379)
+    cache._connected = True  # As after CLIENT TRACKING succeeded; no Redis is contacted
+    return cache
+
+
+def invalidate(cache: ContextNearCache, conversation_id: str):
+    cache._on_invalidate([b"invalidate", [f"context:{conversation_id}".encode("utf-8")]])
+
+
+def write(cache: ContextNearCache, conversation_id: str, context: dict, ok: bool = True, during=None):
+    cache.begin_write(conversation_id)
+    if during:
+        during()
+    cache.finish_write(conversation_id, context, 3600, ok)
+
+
+def test_own_write_is_served_locally_before_its_invalidation():
+    cache = connected_cache()
+    write(cache, "c1", CONTEXT)
+    assert cache.lookup("c1") == (True, CONTEXT)
+
+    invalidate(cache, "c1")  # Our own write's invalidation, arriving after the SETEX reply
+    assert cache.lookup("c1") == (True, CONTEXT)
+
+    invalidate(cache, "c1")  # Another instance's write
+    assert cache.lookup("c1") == (False, None)
+
+
+def test_own_write_is_served_locally_after_its_invalidation():
+    cache = connected_cache()
+    write(cache, "c1", CONTEXT, during=lambda: invalidate(cache, "c1"))
+    assert cache.lookup("c1") == (True, CONTEXT)
+
+    invalidate(cache, "c1")
+    assert cache.lookup("c1") == (False, None)
+
+
+def test_write_overtaken_by_another_instance_is_not_stored():
+    cache = connected_cache()
+
+    def own_then_foreign():
+        invalidate(cache, "c1")
+        invalidate(cache, "c1")
+
+    write(cache, "c1", CONTEXT, during=own_then_foreign)
+    assert cache.lookup("c1") == (False, None)
+
+
+def test_failed_and_overlapping_writes_are_not_stored():
+    cache = connected_cache()
+    write(cache, "c1", CONTEXT, ok=False)
+    assert cache.lookup("c1") == (False, None)
+
+    write(cache, "c2", CONTEXT, during=lambda: write(cache, "c2", {"expected_pii_type": "EMAIL_ADDRESS"}))
+    assert cache.lookup("c2") == (False, None)
+
+
+def test_fetch_in_flight_across_own_write_is_discarded():
+    cache = connected_cache()
+    cache.begin_fetch("c1")
+    write(cache, "c1", CONTEXT)
+    cache.finish_fetch("c1", None, -2)  # GET ran before the SETEX landed
+    assert cache.lookup("c1") == (True, CONTEXT)
+
+
+def test_write_spanning_a_reconnect_is_not_stored():
+    cache = connected_cache()
+    write(cache, "c1", CONTEXT, during=lambda: cache._set_connected(True))
+    assert cache.lookup("c1") == (False, None)
@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from firebase_admin import auth
+
+logger = logging.getLogger(__name__)
+
+
+def _token_hash(id_token: str) -> str:
+    return hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+
+
+class VerifiedTokenCache:
+    """
+    Bounded in-process cache of verified Firebase ID tokens.
+
+    Entries are keyed by a SHA-256 of the token (the token itself is never kept)
+    and live until the token's 'exp' claim. A miss runs auth.verify_id_token and
+    caches the decoded claims; failures are never cached, so invalid or expired
+    tokens raise the same firebase_admin errors as before.
+
+    With check_revoked, misses verify with check_revoked=True and cached entries
+    are re-checked every revocation_check_seconds; a revoked token is evicted.
+    Without it, a cached token stays accepted until its 'exp' (at most an hour
+    for Firebase ID tokens) even if the user's sessions are revoked or the
+    account is disabled, the same as verify_id_token without check_revoked.
+    """
+
+    def __init__(self, max_entries: int = 10000, check_revoked: bool = False,
+                 revocation_check_seconds: int = 300, app=None):
+        self.max_entries = max_entries
+        self.check_revoked = check_revoked
+        self.revocation_check_seconds = revocation_check_seconds
+        self._app = app
+        self._entries = OrderedDict()  # token hash -> [exp, decoded_token, last_verified]
+        self._lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=1000)
+        self._refresh_thread = None
+        self._stop = threading.Event()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "revalidations": 0, "revoked": 0,
+                      "failures": 0, "evictions": 0, "key_refreshes": 0, "key_refresh_errors": 0}
+
+    def lookup(self, id_token: str) -> dict | None:
+        """Returns the cached claims without any verification work, or None."""
+        key = _token_hash(id_token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            exp, decoded_token, last_verified = entry
+            if exp <= now:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                return None
+            if self.check_revoked and now - last_verified >= self.revocation_check_seconds:
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return dict(decoded_token)
+
+    def verify(self, id_token: str) -> dict:
+        """Cached equivalent of auth.verify_id_token(id_token, check_revoked=self.check_revoked)."""
+        cached = self.lookup(id_token)
+        if cached is not None:
+            return cached
+
+        key = _token_hash(id_token)
+        with self._lock:
+            revalidation = key in self._entries
+            self.stats["revalidations" if revalidation else "misses"] += 1
+        start = time.perf_counter()
+        try:
+            decoded_token = auth.verify_id_token(id_token, app=self._app, check_revoked=self.check_revoked)
+        except auth.RevokedIdTokenError:
+            with self._lock:
+                self._entries.pop(key, None)
+                self.stats["revoked"] += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._entries.pop(key, None)
+                self.stats["failures"] += 1
+            raise
+        finally:
+            self._latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        with self._lock:
+            self._entries[key] = [decoded_token.get("exp", 0), decoded_token, time.time()]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return dict(decoded_token)
+
+    # --- Public key refresh ---
+    def start_key_refresh(self, interval_seconds: int = 300):
+        """
+        Periodically fetches the ID token signing certificates through the Admin SDK's
+        own HTTP cache, so key rotation is picked up off the request path. The keys
+        are only re-downloaded once the cached copy has expired.
+        """
+        try:
+            verifier = auth._get_client(self._app)._token_verifier
+            from firebase_admin import _token_gen
+            fetch = lambda: verifier.request(url=_token_gen.ID_TOKEN_CERT_URI, method="GET")  # noqa: E731
+        except Exception as e:  # Admin SDK internals moved; fall back to on-demand key fetches.
+            logger.warning(f"Firebase key refresh unavailable, keys will be fetched on demand. Error: {str(e)}")
+            return
+
+        def refresh_loop():
+            while not self._stop.is_set():
+                try:
+                    fetch()
+                    with self._lock:
+                        self.stats["key_refreshes"] += 1
+                except Exception as e:
+                    logger.warning(f"Firebase public key refresh failed. Error: {str(e)}")
+                    with self._lock:
+                        self.stats["key_refresh_errors"] += 1
+                self._stop.wait(interval_seconds)
+
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="firebase-key-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        latencies = sorted(self._latencies_ms)
+        lookups = stats["hits"] + stats["misses"] + stats["revalidations"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        if latencies:
+            stats["verify_latency_ms"] = {
+                "p50": round(latencies[len(latencies) // 2], 2),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                "max": round(latencies[-1], 2),
+            }
+        return stats
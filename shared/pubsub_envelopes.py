@@ -0,0 +1,70 @@
+import gzip
+import json
+from typing import Iterable, Iterator
+
+# Wire format of the raw-transcripts topic: main_service publishes with pack_utterances,
+# subscriber_service reads with decode_envelope.
+# Message attributes that mark a multi-utterance envelope on the raw-transcripts topic.
+# Messages without ENVELOPE_ATTRIBUTE are single-utterance JSON payloads, as before.
+ENVELOPE_ATTRIBUTE = "envelope"
+ENVELOPE_TYPE = "utterance-batch"
+ENVELOPE_VERSION = "1"
+ENCODING_ATTRIBUTE = "content_encoding"
+GZIP_ENCODING = "gzip"
+
+# Pub/Sub rejects messages over 10 MB; stay well below it even before compression.
+MAX_ENVELOPE_BYTES = 8 * 1024 * 1024
+
+
+def encode_envelope(conversation_id: str, entries: list[dict], compress: bool = True) -> tuple[bytes, dict]:
+    """
+    Serializes utterance payloads (the same dicts published one per message in
+    per-utterance mode) into one message body and its attributes.
+    """
+    data = json.dumps({"conversation_id": conversation_id, "utterances": entries},
+                      separators=(",", ":")).encode("utf-8")
+    attributes = {
+        ENVELOPE_ATTRIBUTE: ENVELOPE_TYPE,
+        "envelope_version": ENVELOPE_VERSION,
+        "utterance_count": str(len(entries)),
+    }
+    if compress:
+        data = gzip.compress(data, compresslevel=6)
+        attributes[ENCODING_ATTRIBUTE] = GZIP_ENCODING
+    return data, attributes
+
+
+def pack_utterances(conversation_id: str, entries: Iterable[dict], max_utterances: int = 100,
+                    max_bytes: int = 256 * 1024, compress: bool = True) -> Iterator[tuple[bytes, dict]]:
+    """
+    Greedily groups consecutive utterances into envelopes of at most max_utterances
+    entries and max_bytes of uncompressed JSON. entries may be a lazy iterator;
+    only the envelope being filled is held in memory. Order is preserved, so envelopes
+    published with one ordering key reach the subscriber in transcript order.
+    An utterance larger than max_bytes on its own gets an envelope of its own.
+    """
+    max_bytes = min(max_bytes, MAX_ENVELOPE_BYTES)
+    batch, batch_bytes = [], 0
+    for entry in entries:
+        entry_bytes = len(json.dumps(entry, separators=(",", ":")).encode("utf-8")) + 1
+        if batch and (len(batch) >= max_utterances or batch_bytes + entry_bytes > max_bytes):
+            yield encode_envelope(conversation_id, batch, compress)
+            batch, batch_bytes = [], 0
+        batch.append(entry)
+        batch_bytes += entry_bytes
+    if batch:
+        yield encode_envelope(conversation_id, batch, compress)
+
+
+def decode_envelope(data: bytes, attributes: dict | None) -> list[dict]:
+    """
+    Returns the utterance payloads carried by a raw-transcripts message: the inverse
+    of encode_envelope, or a single JSON utterance for a message without envelope
+    attributes (RAW_TRANSCRIPT_PUBLISH_MODE other than envelope).
+    """
+    attributes = attributes or {}
+    if attributes.get(ENVELOPE_ATTRIBUTE) != ENVELOPE_TYPE:
+        return [json.loads(data.decode("utf-8"))]
+    if attributes.get(ENCODING_ATTRIBUTE) == GZIP_ENCODING:
+        data = gzip.decompress(data)
+    return json.loads(data.decode("utf-8"))["utterances"]
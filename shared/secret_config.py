@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.api_core.exceptions import NotFound, PermissionDenied
+from google.cloud.secretmanager import SecretManagerServiceClient
+
+logger = logging.getLogger(__name__)
+
+
+class SecretConfig:
+    """
+    Process-wide Secret Manager access shared by main_service, subscriber_service and
+    transcript_aggregator_service.
+
+    One SecretManagerServiceClient is reused for every call. get_many() fetches the
+    secrets that are not cached concurrently (Secret Manager has no batch read),
+    and values stay cached for ttl_seconds. A stale value is still returned while
+    it is re-fetched; a failed re-fetch keeps the last good value. start_refresh()
+    re-fetches every known secret in the background and calls on_change()
+    callbacks when one was rotated, so new versions apply without a redeploy.
+
+    With snapshot_path, the cached values are also written to a local file
+    (mode 0600) and read back on the next start, so a warm restart does not wait
+    on Secret Manager; the snapshot is refreshed in the background right away.
+    A secret can be overridden by an environment variable of the same name for
+    local development and benchmarks.
+    """
+
+    def __init__(self, project_id: str | None, ttl_seconds: int = 300, snapshot_path: str | None = None,
+                 snapshot_max_age_seconds: int = 86400, max_workers: int = 8):
+        self.project_id = project_id
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_path = snapshot_path
+        self.snapshot_max_age_seconds = snapshot_max_age_seconds
+        self.max_workers = max_workers
+        self._client = None
+        self._values = {}  # secret_id -> (value, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._refresh_thread = None
+        self._stop = threading.Event()
+        self.stats = {"hits": 0, "fetches": 0, "fetch_errors": 0, "snapshot_loads": 0, "rotations": 0}
+        if snapshot_path:
+            self._load_snapshot()
+
+    def _secret_manager_client(self) -> SecretManagerServiceClient:
+        with self._lock:
+            if self._client is None:
+                self._client = SecretManagerServiceClient()
+            return self._client
+
+    # --- Reads ---
+    def get(self, secret_id: str, default: str | None = None) -> str | None:
+        return self.get_many([secret_id]).get(secret_id) or default
+
+    def get_many(self, secret_ids) -> dict:
+        """Returns {secret_id: value or None}; only missing or expired secrets cost an RPC."""
+        now = time.time()
+        values, missing, stale = {}, [], []
+        with self._lock:
+            for secret_id in secret_ids:
+                cached = self._values.get(secret_id)
+                if cached is None:
+                    missing.append(secret_id)
+                    continue
+                values[secret_id] = cached[0]
+                self.stats["hits"] += 1
+                if now - cached[1] >= self.ttl_seconds and secret_id not in self._refreshing:
+                    self._refreshing.add(secret_id)
+                    stale.append(secret_id)
+        if stale:
+            threading.Thread(target=self._refresh_stale, args=(stale,), name="secret-refresh-stale", daemon=True).start()
+        if missing:
+            values.update(self._fetch_all(missing))
+        return values
+
+    def _refresh_stale(self, secret_ids: list):
+        try:
+            self._fetch_all(secret_ids)
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(secret_ids)
+
+    def env_or_secret(self, name: str, default: str | None = None) -> str | None:
+        """The value of environment variable `name`, or of the secret named by `<name>_SECRET_ID` when set."""
+        secret_id = os.getenv(f"{name}_SECRET_ID")
+        if secret_id:
+            return self.get(secret_id, default=os.getenv(name, default))
+        return os.getenv(name, default)
+
+    # --- Fetching ---
+    def _fetch_all(self, secret_ids: list) -> dict:
+        if len(secret_ids) == 1:
+            values = {secret_ids[0]: self._fetch(secret_ids[0])}
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(secret_ids)), thread_name_prefix="secrets") as pool:
+                values = dict(zip(secret_ids, pool.map(self._fetch, secret_ids)))
+        if self.snapshot_path:
+            self._write_snapshot()
+        return values
+
+    def _fetch(self, secret_id: str) -> str | None:
+        """Fetches the latest version and caches it; on failure returns the last good value, if any."""
+        value = self._access(secret_id)
+        with self._lock:
+            previous = self._values.get(secret_id)
+            if value is None:
+                self.stats["fetch_errors"] += 1
+                return previous[0] if previous else None
+            self.stats["fetches"] += 1
+            self._values[secret_id] = (value, time.time())
+        if previous is not None and previous[0] != value:
+            self._rotated(secret_id, previous[0], value)
+        return value
+
+    def _access(self, secret_id: str) -> str | None:
+        local_override = os.getenv(secret_id) if secret_id else None
+        if local_override:
+            logger.info(f"Using local environment override for secret: {secret_id}")
+            return local_override.strip()
+        if not self.project_id:
+            logger.error("No GCP project configured for Secret Manager. Cannot fetch secrets.")
+            return None
+        name = f"projects/{self.project_id}/secrets/{secret_id}/versions/latest"
+        try:
+            response = self._secret_manager_client().access_secret_version(name=name)
+            # Strip whitespace/newlines from the fetched secret
+            payload = response.payload.data.decode("UTF-8").strip()
+            logger.info(f"Successfully fetched secret: {secret_id}")
+            return payload
+        except NotFound:
+            logger.error(f"Secret {secret_id} not found in project {self.project_id}.")
+        except PermissionDenied:
+            logger.error(f"Permission denied when trying to access secret {secret_id} in project {self.project_id}.")
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while fetching secret {secret_id}: {str(e)}")
+        return None
+
+    # --- Rotation ---
+    def on_change(self, callback):
+        """Registers callback(secret_id, old_value, new_value), called when a re-fetch sees a new value."""
+        self._callbacks.append(callback)
+
+    def _rotated(self, secret_id, old_value, new_value):
+        with self._lock:
+            self.stats["rotations"] += 1
+        logger.info(f"Secret {secret_id} changed; applying the new value.")
+        for callback in self._callbacks:
+            try:
+                callback(secret_id, old_value, new_value)
+            except Exception as e:
+                logger.error(f"Secret change handler for {secret_id} failed. Error: {str(e)}")
+
+    def refresh(self) -> dict:
+        with self._lock:
+            secret_ids = list(self._values)
+        return self._fetch_all(secret_ids) if secret_ids else {}
+
+    def start_refresh(self, interval_seconds: int | None = None):
+        """Re-fetches every known secret every interval_seconds (default: the TTL) in a daemon thread."""
+        interval_seconds = interval_seconds or self.ttl_seconds
+
+        def refresh_loop():
+            while not self._stop.wait(interval_seconds):
+                self.refresh()
+
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="secret-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # --- Snapshot ---
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable secret snapshot {self.snapshot_path}. Error: {str(e)}")
+            return
+        if snapshot.get("project_id") != self.project_id:
+            return
+        if time.time() - snapshot.get("written_at", 0) > self.snapshot_max_age_seconds:
+            logger.info(f"Secret snapshot {self.snapshot_path} is too old; fetching from Secret Manager.")
+            return
+        with self._lock:
+            # fetched_at 0 marks the values stale: the first read returns them and re-fetches in the background.
+            self._values = {secret_id: (value, 0) for secret_id, value in snapshot.get("values", {}).items()}
+            self.stats["snapshot_loads"] += 1
+        logger.info(f"Loaded {len(self._values)} secrets from snapshot {self.snapshot_path}.")
+
+    def _write_snapshot(self):
+        with self._lock:
+            snapshot = {"project_id": self.project_id, "written_at": time.time(),
+                        "values": {secret_id: value for secret_id, (value, _) in self._values.items()}}
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not write secret snapshot {self.snapshot_path}. Error: {str(e)}")
+
+    def report(self) -> dict:
+        now = time.time()
+        with self._lock:
+            stats = dict(self.stats)
+            stats["cached"] = len(self._values)
+            stats["stale"] = sum(1 for _, fetched_at in self._values.values() if now - fetched_at >= self.ttl_seconds)
+        return stats
+
+
+def from_env(project_id: str | None) -> SecretConfig:
+    """SecretConfig configured from SECRETS_* environment variables, identically in every service."""
+    return SecretConfig(
+        project_id,
+        ttl_seconds=int(os.getenv('SECRETS_TTL_SECONDS', 300)),
+        snapshot_path=os.getenv('SECRETS_SNAPSHOT_PATH') or None,
+        snapshot_max_age_seconds=int(os.getenv('SECRETS_SNAPSHOT_MAX_AGE_SECONDS', 86400)),
+    )
@@ -0,0 +1,132 @@
+import bisect
+import os
+import threading
+import time
+
+# Seconds; spans a Redis round trip up to a slow DLP call or GCS upload.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "errors", "lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float, error: bool):
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            if error:
+                self.errors += 1
+
+
+class _StageTimer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._start, exc_type is not None)
+        return False
+
+
+class StageMetrics:
+    """
+    Per-stage latency histograms and error counters, rendered in the Prometheus
+    text format for a /metrics endpoint. Shared by main_service, subscriber_service
+    and transcript_aggregator_service.
+
+    Code wraps each stage in `with stage_metrics.stage("dlp_rpc"):`; the block's
+    wall time is observed, also across awaits, and an exception leaving it counts
+    as an error. Stage names are fixed in code, so series stay few. When disabled,
+    stage() returns a shared no-op context manager and nothing is recorded.
+    Metrics live in the process, so each gunicorn worker reports its own.
+    """
+
+    def __init__(self, service: str, enabled: bool = True, buckets: tuple = DEFAULT_BUCKETS):
+        self.service = service
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._histograms = {}  # stage -> _Histogram
+        self._lock = threading.Lock()
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._histogram(name))
+
+    def observe(self, name: str, seconds: float, error: bool = False):
+        """Records a duration measured elsewhere, e.g. across callbacks."""
+        if self.enabled:
+            self._histogram(name).observe(seconds, error)
+
+    def _histogram(self, name: str) -> _Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, _Histogram(self.buckets))
+        return histogram
+
+    def _snapshot(self) -> list:
+        # Copied under the lock: a first observation of a new stage can grow the dict mid-iteration.
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    def render(self) -> str:
+        durations = ["# HELP redaction_stage_duration_seconds Time spent in each processing stage.",
+                     "# TYPE redaction_stage_duration_seconds histogram"]
+        errors = ["# HELP redaction_stage_errors_total Stage executions that raised an exception.",
+                  "# TYPE redaction_stage_errors_total counter"]
+        for name, histogram in self._snapshot():
+            with histogram.lock:
+                counts, total, error_count = list(histogram.counts), histogram.sum, histogram.errors
+            labels = f'service="{self.service}",stage="{name}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                durations.append(f'redaction_stage_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            durations.append(f"redaction_stage_duration_seconds_sum{{{labels}}} {total}")
+            durations.append(f"redaction_stage_duration_seconds_count{{{labels}}} {cumulative}")
+            errors.append(f"redaction_stage_errors_total{{{labels}}} {error_count}")
+        return "\n".join(durations + errors) + "\n"
+
+    def report(self) -> dict:
+        """Count, error count and mean milliseconds per stage, for /stats."""
+        report = {}
+        for name, histogram in self._snapshot():
+            with histogram.lock:
+                count = sum(histogram.counts)
+                report[name] = {"count": count, "errors": histogram.errors,
+                                "mean_ms": round(histogram.sum / count * 1000, 3) if count else None}
+        return report
+
+
+def from_env(service: str) -> StageMetrics:
+    """StageMetrics configured from METRICS_ENABLED, identically in every service."""
+    return StageMetrics(service, enabled=os.getenv('METRICS_ENABLED', 'false').lower() == 'true')
@@ -0,0 +1,175 @@
+import itertools
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s %(module)s %(funcName)s %(lineno)d : %(message)s'
+LOG_FORMATS = ("json", "text")
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, which Cloud Logging turns into a structured entry.
+    Fields passed as extra={"json_fields": {...}} become top-level keys.
+    """
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service_context = {"service": service, "version": os.getenv("GAE_VERSION", "local")}
+
+    def format(self, record):
+        log_record = {
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "serviceContext": self.service_context,
+            "logger": record.name,
+        }
+        if hasattr(record, 'json_fields'):
+            log_record.update(record.json_fields)
+        if record.exc_info:
+            log_record["exception_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_record["exception_info"] = record.exc_text
+        return json.dumps(log_record, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The services' original line format, with json_fields appended as key=value pairs."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'json_fields', None)
+        if not fields:
+            return line
+        return line + " " + " ".join(f"{key}={json.dumps(value, default=str)}" for key, value in fields.items()
+                                     if key != "event")
+
+
+class EventSampler:
+    """
+    Keeps 1 in N records per event type, counting per event so rare events are not
+    crowded out by frequent ones. N comes from `rates` or `default_rate`; 1 keeps all.
+    """
+
+    def __init__(self, default_rate: int = 1, rates: dict | None = None):
+        self.default_rate = max(1, default_rate)
+        self.rates = {event: max(1, rate) for event, rate in (rates or {}).items()}
+        self._counters = {}  # event -> itertools.count
+        self._lock = threading.Lock()
+
+    def rate(self, event: str) -> int:
+        return self.rates.get(event, self.default_rate)
+
+    def keep(self, event: str, rate: int) -> bool:
+        if rate == 1:
+            return True
+        counter = self._counters.get(event)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(event, itertools.count())
+        return next(counter) % rate == 0
+
+
+class EventLogger:
+    """
+    Structured event logging for the redaction hot paths, on top of a standard logger.
+
+    Each call names an event and passes fields as keyword arguments; nothing is
+    formatted until a handler emits the record. `payload=` carries transcripts,
+    contexts and response bodies, and is dropped unless LOG_PAYLOADS=true, so PII
+    stays out of the logs by default. Debug and info events are sampled per event
+    type (a kept record carries sample_rate when it stands for N); warnings and
+    errors are always logged.
+    """
+
+    def __init__(self, logger: logging.Logger, settings: "LogSettings"):
+        self.logger = logger
+        self.settings = settings
+
+    def debug(self, event: str, payload=None, **fields):
+        self._log(logging.DEBUG, event, payload, fields)
+
+    def info(self, event: str, payload=None, **fields):
+        self._log(logging.INFO, event, payload, fields)
+
+    def warning(self, event: str, payload=None, exc_info=None, **fields):
+        self._log(logging.WARNING, event, payload, fields, exc_info)
+
+    def error(self, event: str, payload=None, exc_info=None, **fields):
+        self._log(logging.ERROR, event, payload, fields, exc_info)
+
+    def _log(self, level, event, payload, fields, exc_info=None):
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING:
+            rate = self.settings.sampler.rate(event)
+            if not self.settings.sampler.keep(event, rate):
+                return
+            if rate > 1:
+                fields["sample_rate"] = rate
+        if payload is not None and self.settings.include_payloads:
+            fields["payload"] = payload
+        fields["event"] = event
+        self.logger.log(level, event, exc_info=exc_info, extra={"json_fields": fields}, stacklevel=3)
+
+
+class LogSettings:
+    def __init__(self, log_format: str = "json", level: str = "INFO", include_payloads: bool = False,
+                 sampler: EventSampler | None = None):
+        self.log_format = log_format
+        self.level = level
+        self.include_payloads = include_payloads
+        self.sampler = sampler or EventSampler()
+
+    @classmethod
+    def from_env(cls) -> "LogSettings":
+        log_format = os.getenv('LOG_FORMAT', 'json').lower()
+        if log_format not in LOG_FORMATS:
+            log_format = "json"
+        return cls(log_format=log_format,
+                   level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+                   include_payloads=os.getenv('LOG_PAYLOADS', 'false').lower() == 'true',
+                   sampler=EventSampler(int(os.getenv('LOG_SAMPLE_RATE', 1)),
+                                        parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', ''))))
+
+
+def parse_sample_rates(spec: str) -> dict:
+    """'utterance_processed=100,dlp_redacted=20' -> {'utterance_processed': 100, 'dlp_redacted': 20}."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        event, _, rate = item.partition('=')
+        try:
+            rates[event.strip()] = int(rate)
+        except ValueError:
+            logger.warning(f"Ignoring invalid LOG_SAMPLE_RATES entry '{item}'")
+    return rates
+
+
+settings = LogSettings.from_env()
+
+
+def configure(service: str, stream=None):
+    """
+    Installs the LOG_FORMAT formatter on the root logger at LOG_LEVEL, replacing any
+    handlers, so plain logger calls and events share one format. Called once at import
+    by each service.
+    """
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter(service) if settings.log_format == "json" else TextFormatter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.level)
+
+
+def get_logger(name: str) -> EventLogger:
+    return EventLogger(logging.getLogger(name), settings)
@@ -1,62 +1,58 @@
 import base64
+import binascii
+import gzip
 import json
 import os
 import requests
 import logging
 import sys # Import sys for graceful exit
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from google.cloud import pubsub_v1
-from google.cloud.secretmanager import SecretManagerServiceClient
-from google.api_core.exceptions import NotFound, PermissionDenied
 from google.auth.transport import requests as google_requests # Renamed to avoid conflict with 'requests'
 from google.oauth2 import id_token
 
-# Configure standard logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(name)s %(module)s %(funcName)s %(lineno)d : %(message)s')
+# shared/ holds modules common to all services; Cloud Build copies them next to main.py.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "shared"))
+import secret_config
+import pubsub_envelopes
+import stage_metrics
+import structured_logging
+from pull_worker import StreamingPullWorker, subscription_path
+
+# Structured JSON logging (LOG_FORMAT=text for the plain format); the per-utterance path
+# logs sampled events without payloads through `events` (shared/structured_logging.py).
+structured_logging.configure("subscriber-service")
 logger = logging.getLogger(__name__)
+events = structured_logging.get_logger(__name__)
 
 app = Flask(__name__)
 
-# --- Google Cloud Secret Manager Helper ---
+# Per-stage latency histograms (shared/stage_metrics.py), served on /metrics when
+# METRICS_ENABLED=true.
+metrics = stage_metrics.from_env("subscriber_service")
 
-def get_secret(secret_id, version_id="latest", project_id=None):
-    """
-    Fetches a secret from Google Cloud Secret Manager.
-    Args:
-        secret_id (str): The ID of the secret.
-        version_id (str): The version of the secret (default is "latest").
-        project_id (str): The GCP project ID. If None, uses GCP_PROJECT_ID_FOR_SECRETS.
-    Returns:
-        str: The secret value, or None if an error occurs.
-    """
-    if not project_id:
-        project_id = GCP_PROJECT_ID_FOR_SECRETS
+# main_service answers 503 (with Retry-After) when DLP is overloaded; such messages are
+# nacked for redelivery instead of acknowledged without a redacted result.
+RETRYABLE_STATUS_CODES = (429, 503)
 
-    if not project_id:
-        logger.error("GCP_PROJECT_ID_FOR_SECRETS is not set. Cannot fetch secrets.")
-        return None
-    if not secret_id:
-        logger.error("secret_id not provided to get_secret function.")
-        return None
+# Alternative to push delivery: SUBSCRIBER_MODE=pull consumes raw-transcripts through a
+# StreamingPull subscriber (pull_worker.py) with SUBSCRIBER_PULL_CONCURRENCY messages
+# processed at a time, so throughput follows that setting instead of gunicorn threads.
+SUBSCRIBER_MODE = os.getenv('SUBSCRIBER_MODE', 'push').lower()
+SUBSCRIBER_PULL_SUBSCRIPTION = os.getenv('SUBSCRIBER_PULL_SUBSCRIPTION', 'raw-transcripts-pull')
+SUBSCRIBER_PULL_CONCURRENCY = int(os.getenv('SUBSCRIBER_PULL_CONCURRENCY', 16))
+SUBSCRIBER_PULL_MAX_MESSAGES = int(os.getenv('SUBSCRIBER_PULL_MAX_MESSAGES', 2 * SUBSCRIBER_PULL_CONCURRENCY))
+SUBSCRIBER_PULL_MAX_BYTES = int(os.getenv('SUBSCRIBER_PULL_MAX_BYTES', 10 * 1024 * 1024))
 
-    try:
-        client = SecretManagerServiceClient()
-        name = f"projects/{project_id}/secrets/{secret_id}/versions/{version_id}"
-        response = client.access_secret_version(name=name)
-        # Strip whitespace/newlines from the fetched secret
-        payload = response.payload.data.decode("UTF-8").strip()
-        logger.info(f"Successfully fetched secret: {secret_id}")
-        return payload
-    except NotFound:
-        logger.error(f"Secret {secret_id} (version: {version_id}) not found in project {project_id}.")
-        return None
-    except PermissionDenied:
-        logger.error(f"Permission denied when trying to access secret {secret_id} (version: {version_id}) in project {project_id}.")
-        return None
-    except Exception as e:
-        logger.error(f"An unexpected error occurred while fetching secret {secret_id} (version: {version_id}): {str(e)}")
-        return None
+# Pooled connections to main_service, shared by the push handler and the pull worker's threads.
+http_session = requests.Session()
+http_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=max(10, SUBSCRIBER_PULL_CONCURRENCY)))
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max(10, SUBSCRIBER_PULL_CONCURRENCY)))
+
+# --- Google Cloud Secret Manager Helper ---
+# Shared client and TTL cache (shared/secret_config.py); created in load_secrets() once
+# GCP_PROJECT_ID_FOR_SECRETS is read.
+secret_cache = None
 
 # Configuration from Secret Manager
 CONTEXT_MANAGER_URL_SECRET_ID = "SUBSCRIBER_CONTEXT_MANAGER_URL"
@@ -76,23 +72,45 @@ def load_secrets():
     GCP_PROJECT_ID_FOR_SECRETS = os.getenv("GCP_PROJECT_ID_FOR_SECRETS")
     logger.info(f"--- DEBUG: GCP_PROJECT_ID_FOR_SECRETS from environment: {GCP_PROJECT_ID_FOR_SECRETS}")
 
-    CONTEXT_MANAGER_URL = get_secret(CONTEXT_MANAGER_URL_SECRET_ID, project_id=GCP_PROJECT_ID_FOR_SECRETS)
+    global secret_cache
+    if secret_cache is None:
+        secret_cache = secret_config.from_env(GCP_PROJECT_ID_FOR_SECRETS)
+    # The three secrets are fetched concurrently through one client.
+    values = secret_cache.get_many((CONTEXT_MANAGER_URL_SECRET_ID, REDACTED_TOPIC_NAME_SECRET_ID,
+                                    SUBSCRIBER_GCP_PROJECT_ID_SECRET_ID))
+
+    CONTEXT_MANAGER_URL = values[CONTEXT_MANAGER_URL_SECRET_ID]
     if not CONTEXT_MANAGER_URL:
         logger.critical(f"Critical: CONTEXT_MANAGER_URL secret ('{CONTEXT_MANAGER_URL_SECRET_ID}') could not be fetched. Exiting.")
         raise RuntimeError("Critical secret CONTEXT_MANAGER_URL could not be fetched. Application startup aborted.")
 
-    REDACTED_TOPIC_NAME = get_secret(REDACTED_TOPIC_NAME_SECRET_ID, project_id=GCP_PROJECT_ID_FOR_SECRETS)
+    REDACTED_TOPIC_NAME = values[REDACTED_TOPIC_NAME_SECRET_ID]
     if not REDACTED_TOPIC_NAME:
         logger.critical(f"Critical: REDACTED_TOPIC_NAME secret ('{REDACTED_TOPIC_NAME_SECRET_ID}') could not be fetched. Exiting.")
         sys.exit(1) # Exit if critical secret is missing
 
-    SUBSCRIBER_GCP_PROJECT_ID = get_secret(SUBSCRIBER_GCP_PROJECT_ID_SECRET_ID, project_id=GCP_PROJECT_ID_FOR_SECRETS)
+    SUBSCRIBER_GCP_PROJECT_ID = values[SUBSCRIBER_GCP_PROJECT_ID_SECRET_ID]
     if not SUBSCRIBER_GCP_PROJECT_ID:
         logger.critical(f"Critical: SUBSCRIBER_GCP_PROJECT_ID secret ('{SUBSCRIBER_GCP_PROJECT_ID_SECRET_ID}') could not be fetched. Exiting.")
         sys.exit(1) # Exit if critical secret is missing
 
 load_secrets()
 
+def apply_rotated_secret(secret_id, old_value, new_value):
+    """Rotated secrets take effect on the next message without a redeploy."""
+    global CONTEXT_MANAGER_URL, REDACTED_TOPIC_NAME, SUBSCRIBER_GCP_PROJECT_ID
+    if not new_value:
+        return
+    if secret_id == CONTEXT_MANAGER_URL_SECRET_ID:
+        CONTEXT_MANAGER_URL = new_value
+    elif secret_id == REDACTED_TOPIC_NAME_SECRET_ID:
+        REDACTED_TOPIC_NAME = new_value
+    elif secret_id == SUBSCRIBER_GCP_PROJECT_ID_SECRET_ID:
+        SUBSCRIBER_GCP_PROJECT_ID = new_value
+
+secret_cache.on_change(apply_rotated_secret)
+secret_cache.start_refresh()
+
 
 def get_full_topic_path(topic_name, project_id):
     """Constructs the full Pub/Sub topic path if not already provided."""
@@ -125,9 +143,6 @@ def process_transcript_event():
     Cloud Run entry point. Triggered by a message on a Pub/Sub topic.
     Processes each entry in an Agent Assist transcript.
     """
-    global CONTEXT_MANAGER_URL, REDACTED_TOPIC_NAME, SUBSCRIBER_GCP_PROJECT_ID
-    global publisher
-
     envelope = request.get_json()
     if not envelope:
         msg = "no Pub/Sub message received"
@@ -140,9 +155,25 @@ def process_transcript_event():
         return f"Bad Request: {msg}", 400
 
     pubsub_message = envelope["message"]
-    
-    logger.info("ENTRY POINT ---")
-    
+    if 'data' not in pubsub_message:
+        events.error("message_reception_error", reason="no_data", message_id=pubsub_message.get('messageId'),
+                     payload=pubsub_message)
+        return "Bad Request", 400
+    try:
+        data = base64.b64decode(pubsub_message['data'])
+    except (binascii.Error, TypeError) as decode_err:
+        events.error("message_parsing_error", message_id=pubsub_message.get('messageId'), error=str(decode_err),
+                     payload=pubsub_message.get('data'))
+        return "Bad Request", 400
+    return handle_message(data, pubsub_message.get('attributes') or {}, pubsub_message.get('messageId'))
+
+
+def handle_message(data: bytes, attributes: dict, message_id: str | None):
+    """
+    Redacts every utterance of one raw-transcripts message and waits until their
+    redacted results are published. Shared by push delivery and the StreamingPull
+    worker; returns (body, status), and only status 200 may be acknowledged.
+    """
     if not CONTEXT_MANAGER_URL:
         logger.error(f"CONTEXT_MANAGER_URL secret ('{CONTEXT_MANAGER_URL_SECRET_ID}') was not loaded. Aborting function.")
         return "Internal Server Error", 500
@@ -156,132 +187,190 @@ def process_transcript_event():
     initialize_publisher()
 
     try:
-        if 'data' in pubsub_message:
-            pubsub_message_data = base64.b64decode(pubsub_message['data']).decode('utf-8')
-            message_payload = json.loads(pubsub_message_data)
-            logger.info(f"Decoded message payload: {json.dumps(message_payload)}")
-        else:
-            logger.error(f"--- DEBUG EARLY --- 'data' key missing in event or event is not a dict. Event: {pubsub_message}")
-            return "Bad Request", 400
-
-        # Extract fields directly from the message_payload (individual utterance)
-        conversation_id = message_payload.get('conversation_id')
-        original_entry_index = message_payload.get('original_entry_index')
-        participant_role_raw = message_payload.get('participant_role')
-        transcript = message_payload.get('text')
-        user_id = message_payload.get('user_id')
-        start_timestamp_usec = message_payload.get('start_timestamp_usec')
-
-        # Validate required fields for an individual utterance
-        required_fields = {
-            'conversation_id': conversation_id,
-            'original_entry_index': original_entry_index,
-            'participant_role': participant_role_raw,
-            'text': transcript,
-            'start_timestamp_usec': start_timestamp_usec
-        }
-
-        missing_fields = [field for field, value in required_fields.items() if value is None or (isinstance(value, str) and not value.strip())]
-        if missing_fields:
-            logger.error(f"Missing required fields in individual utterance payload: {', '.join(missing_fields)}. Aborting.", extra={"json_fields": {"event": "missing_fields_error", "missing_fields": missing_fields, "payload": message_payload}})
-            return "Bad Request", 400
-
-        participant_role = participant_role_raw.upper() if participant_role_raw else ''
-        if not participant_role:
-            logger.error(f"Participant role is empty after processing. Aborting.", extra={"json_fields": {"event": "empty_participant_role", "payload": message_payload}})
-            return "Bad Request", 400
-
-        headers = {'Content-Type': 'application/json'}
-        service_payload = {
-            "conversation_id": conversation_id,
-            "transcript": transcript
-        }
-
-        try:
-            if participant_role == 'AGENT':
-                endpoint = f"{CONTEXT_MANAGER_URL}/handle-agent-utterance"
-                response = requests.post(endpoint, json=service_payload, headers=headers, timeout=10)
-                response.raise_for_status()
-                response_data = response.json()
-                logger.info(f"Agent utterance (entry {original_entry_index}) processed. Response data: {response_data}")
- 
-                redacted_transcript = response_data.get('redacted_transcript', transcript) # Fallback to original if not found
- 
-                if publisher and REDACTED_TOPIC_NAME:
-                    full_redacted_topic_path = get_full_topic_path(REDACTED_TOPIC_NAME, SUBSCRIBER_GCP_PROJECT_ID)
- 
-                    publish_payload = {
-                        "conversation_id": conversation_id,
-                        "original_entry_index": original_entry_index,
-                        "text": redacted_transcript,
-                        "original_text": transcript,  # Include original text for comparison
-                        "participant_role": participant_role,
-                        "user_id": user_id,
-                        "start_timestamp_usec": start_timestamp_usec
-                    }
-                    message_bytes = json.dumps(publish_payload).encode('utf-8')
-                    
-                    try:
-                        publish_future = publisher.publish(full_redacted_topic_path, data=message_bytes)
-                        publish_future.result(timeout=10)
-                        logger.info(f"Published AGENT transcript for entry {original_entry_index} to topic: {full_redacted_topic_path}.")
-                    except Exception as pub_e:
-                        logger.error(f"Error publishing AGENT transcript for entry {original_entry_index}. Error: {str(pub_e)}")
-
-            elif participant_role == 'END_USER' or participant_role == 'CUSTOMER':
-                endpoint = f"{CONTEXT_MANAGER_URL}/handle-customer-utterance"
-                response = requests.post(endpoint, json=service_payload, headers=headers, timeout=10)
-                response.raise_for_status()
-                
-                response_data = response.json()
-                logger.info(f"Customer utterance (entry {original_entry_index}) processed. Response data: {response_data}")
-
-                redacted_transcript = response_data.get('redacted_transcript', transcript) # Fallback to original if not found
-                if redacted_transcript is not None:
-                    if publisher and REDACTED_TOPIC_NAME:
-                        full_redacted_topic_path = get_full_topic_path(REDACTED_TOPIC_NAME, SUBSCRIBER_GCP_PROJECT_ID)
- 
-                        publish_payload = {
-                            "conversation_id": conversation_id,
-                            "original_entry_index": original_entry_index,
-                            "text": redacted_transcript,
-                            "original_text": transcript,  # Include original text for comparison
-                            "participant_role": participant_role,
-                            "user_id": user_id,
-                            "start_timestamp_usec": start_timestamp_usec
-                        }
-                        message_bytes = json.dumps(publish_payload).encode('utf-8')
-                        
-                        try:
-                            publish_future = publisher.publish(full_redacted_topic_path, data=message_bytes)
-                            publish_future.result(timeout=10)
-                            logger.info(f"Published redacted transcript for entry {original_entry_index} to topic: {full_redacted_topic_path}.")
-                        except Exception as pub_e:
-                            logger.error(f"Error publishing for entry {original_entry_index}. Error: {str(pub_e)}")
-                    else:
-                        logger.warning(f"Publisher not init or topic name missing for entry {original_entry_index}.")
-                else:
-                    logger.info(f"No redacted_transcript in response for entry {original_entry_index}.")
-            else:
-                logger.warning(f"Unknown participant_role: '{participant_role}' in entry {original_entry_index}. Skipping.")
-
-        except requests.exceptions.HTTPError as http_err:
-            logger.error(f"HTTP error for entry {original_entry_index}: {str(http_err)}, response: {http_err.response.text if http_err.response else 'No response text'}")
-        except requests.exceptions.RequestException as req_err:
-            logger.error(f"Request error for entry {original_entry_index}: {str(req_err)}")
-        except json.JSONDecodeError as json_err_resp:
-             logger.error(f"Error decoding JSON response from Context Manager for entry {original_entry_index}: {str(json_err_resp)}")
-
-        logger.info(f"Entry {original_entry_index} processed successfully for conversation {conversation_id} ---")
+        # One JSON utterance, or a multi-utterance envelope from main_service (shared/pubsub_envelopes.py).
+        utterance_payloads = pubsub_envelopes.decode_envelope(data, attributes)
+        events.info("message_decoded", message_id=message_id, utterance_count=len(utterance_payloads))
+
+        if len(utterance_payloads) == 1:
+            body, status, publish_future = process_utterance(utterance_payloads[0])
+            if not wait_for_publish(publish_future, utterance_payloads[0].get('original_entry_index')):
+                return "Internal Server Error", 500
+            return body, status
+
+        # Multi-utterance envelope: process in transcript order so agent context is stored
+        # before the following customer utterance, then wait for all redacted publishes.
+        pending = []
+        for message_payload in utterance_payloads:
+            body, status, publish_future = process_utterance(message_payload)
+            if status >= 500:
+                # Stop here so the envelope is redelivered; utterances before this one are
+                # redacted again then, which is idempotent.
+                for publish_future, original_entry_index in pending:
+                    wait_for_publish(publish_future, original_entry_index)
+                return body, status
+            if status != 200:
+                events.error("envelope_utterance_skipped", status=status,
+                             original_entry_index=message_payload.get('original_entry_index'))
+            pending.append((publish_future, message_payload.get('original_entry_index')))
+        published = [wait_for_publish(publish_future, original_entry_index)
+                     for publish_future, original_entry_index in pending]
+        if not all(published):
+            return "Internal Server Error", 500
         return "OK", 200
 
-    except json.JSONDecodeError as json_err_msg:
-        logger.error(f"Error decoding initial JSON from Pub/Sub: {str(json_err_msg)}, data: {pubsub_message.get('data')}")
+    except (json.JSONDecodeError, gzip.BadGzipFile, UnicodeDecodeError, KeyError, TypeError) as json_err_msg:
+        events.error("message_parsing_error", message_id=message_id, error=str(json_err_msg), payload=data)
         return "Bad Request", 400
     except Exception as e:
-        logger.error(f"UNEXPECTED TOP LEVEL ERROR: {str(e)} ---", exc_info=True)
+        events.error("unhandled_exception", error=str(e), exc_info=True)
         return "Internal Server Error", 500
 
+
+def wait_for_publish(publish_future, original_entry_index) -> bool:
+    """Waits for a redacted publish; False when it failed, so the message is not acknowledged."""
+    if publish_future is None:
+        return True
+    try:
+        with metrics.stage("pubsub_publish_result"):
+            publish_future.result(timeout=10)
+        return True
+    except Exception as pub_e:
+        events.error("redacted_publish_failed", original_entry_index=original_entry_index, error=str(pub_e))
+        return False
+
+
+def process_utterance(message_payload: dict):
+    """
+    Redacts one utterance through the Context Manager and publishes the result to the
+    redacted topic. Returns (body, status, publish_future); publish_future is None
+    when nothing was published, otherwise the caller waits on it.
+    """
+    # Extract fields directly from the message_payload (individual utterance)
+    conversation_id = message_payload.get('conversation_id')
+    original_entry_index = message_payload.get('original_entry_index')
+    participant_role_raw = message_payload.get('participant_role')
+    transcript = message_payload.get('text')
+    user_id = message_payload.get('user_id')
+    start_timestamp_usec = message_payload.get('start_timestamp_usec')
+
+    # Validate required fields for an individual utterance
+    required_fields = {
+        'conversation_id': conversation_id,
+        'original_entry_index': original_entry_index,
+        'participant_role': participant_role_raw,
+        'text': transcript,
+        'start_timestamp_usec': start_timestamp_usec
+    }
+
+    missing_fields = [field for field, value in required_fields.items() if value is None or (isinstance(value, str) and not value.strip())]
+    if missing_fields:
+        events.error("missing_fields_error", missing_fields=missing_fields, payload=message_payload)
+        return "Bad Request", 400, None
+
+    participant_role = participant_role_raw.upper() if participant_role_raw else ''
+    if not participant_role:
+        events.error("empty_participant_role", payload=message_payload)
+        return "Bad Request", 400, None
+
+    headers = {'Content-Type': 'application/json'}
+    service_payload = {
+        "conversation_id": conversation_id,
+        "transcript": transcript
+    }
+    publish_future = None
+
+    try:
+        if participant_role == 'AGENT':
+            endpoint = f"{CONTEXT_MANAGER_URL}/handle-agent-utterance"
+        elif participant_role == 'END_USER' or participant_role == 'CUSTOMER':
+            endpoint = f"{CONTEXT_MANAGER_URL}/handle-customer-utterance"
+        else:
+            events.warning("unknown_participant_role", participant_role=participant_role,
+                           conversation_id=conversation_id, original_entry_index=original_entry_index)
+            endpoint = None
+
+        if endpoint:
+            with metrics.stage("main_service_request"):
+                response = http_session.post(endpoint, json=service_payload, headers=headers, timeout=10)
+            response.raise_for_status()
+            response_data = response.json()
+            events.info("utterance_redacted", participant_role=participant_role, conversation_id=conversation_id,
+                        original_entry_index=original_entry_index, payload=response_data)
+
+            redacted_transcript = response_data.get('redacted_transcript', transcript) # Fallback to original if not found
+            if redacted_transcript is None:
+                events.warning("redacted_transcript_missing", conversation_id=conversation_id,
+                               original_entry_index=original_entry_index)
+            elif publisher and REDACTED_TOPIC_NAME:
+                full_redacted_topic_path = get_full_topic_path(REDACTED_TOPIC_NAME, SUBSCRIBER_GCP_PROJECT_ID)
+
+                publish_payload = {
+                    "conversation_id": conversation_id,
+                    "original_entry_index": original_entry_index,
+                    "text": redacted_transcript,
+                    "original_text": transcript,  # Include original text for comparison
+                    "participant_role": participant_role,
+                    "user_id": user_id,
+                    "start_timestamp_usec": start_timestamp_usec
+                }
+                if response_data.get('dlp_config_version'):
+                    publish_payload["dlp_config_version"] = response_data['dlp_config_version']
+                message_bytes = json.dumps(publish_payload).encode('utf-8')
+
+                try:
+                    publish_future = publisher.publish(full_redacted_topic_path, data=message_bytes)
+                    events.debug("redacted_publish_queued", conversation_id=conversation_id,
+                                 original_entry_index=original_entry_index, topic=full_redacted_topic_path)
+                except Exception as pub_e:
+                    events.error("redacted_publish_failed", conversation_id=conversation_id,
+                                 original_entry_index=original_entry_index, error=str(pub_e))
+                    return "Internal Server Error", 500, None
+            else:
+                events.warning("redacted_publish_skipped", conversation_id=conversation_id,
+                               original_entry_index=original_entry_index, reason="publisher_unavailable")
+
+    except requests.exceptions.HTTPError as http_err:
+        if http_err.response is not None and http_err.response.status_code in RETRYABLE_STATUS_CODES:
+            # main_service is shedding load (e.g. DLP overloaded): nack so Pub/Sub redelivers with backoff.
+            events.warning("main_service_overloaded", conversation_id=conversation_id,
+                           original_entry_index=original_entry_index, status=http_err.response.status_code,
+                           retry_after=http_err.response.headers.get('Retry-After'))
+            return "Service Unavailable", 503, None
+        events.error("main_service_http_error", conversation_id=conversation_id,
+                     original_entry_index=original_entry_index, error=str(http_err),
+                     payload=http_err.response.text if http_err.response is not None else None)
+    except requests.exceptions.RequestException as req_err:
+        events.error("main_service_request_error", conversation_id=conversation_id,
+                     original_entry_index=original_entry_index, error=str(req_err))
+    except json.JSONDecodeError as json_err_resp:
+        events.error("main_service_response_error", conversation_id=conversation_id,
+                     original_entry_index=original_entry_index, error=str(json_err_resp))
+
+    return "OK", 200, publish_future
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-stage latency histograms in the Prometheus text format."""
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled; set METRICS_ENABLED=true"}), 404
+    return Response(metrics.render(), content_type=stage_metrics.CONTENT_TYPE)
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """Delivery mode and, in pull mode, the StreamingPull worker's counters."""
+    return jsonify({"mode": SUBSCRIBER_MODE, "pull_worker": pull_worker.report() if pull_worker else None})
+
+# In pull mode the HTTP server stays up for /metrics and /stats while messages arrive
+# over StreamingPull; each gunicorn worker process runs its own stream.
+pull_worker = None
+if SUBSCRIBER_MODE == 'pull':
+    pull_worker = StreamingPullWorker(
+        subscription_path(SUBSCRIBER_PULL_SUBSCRIPTION, SUBSCRIBER_GCP_PROJECT_ID),
+        handle=lambda data, attributes, message_id: handle_message(data, attributes, message_id)[1],
+        concurrency=SUBSCRIBER_PULL_CONCURRENCY, max_messages=SUBSCRIBER_PULL_MAX_MESSAGES,
+        max_bytes=SUBSCRIBER_PULL_MAX_BYTES, metrics=metrics).start()
+
 if __name__ == "__main__":
     # This block is for local development only.
     # For Cloud Run, Gunicorn (as specified in Dockerfile) will run the app.
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from google.cloud import pubsub_v1
+from google.cloud.pubsub_v1.subscriber.scheduler import ThreadScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingPullWorker:
+    """
+    Consumes a subscription through StreamingPull and hands each message to
+    handle(data, attributes, message_id) -> status, on a pool of `concurrency`
+    threads. A message is acknowledged only when handle returns 200, which for
+    the subscriber means its redacted utterances are published; anything else,
+    or an exception, nacks it for redelivery.
+
+    Flow control caps the messages and bytes leased but not yet acked, so the
+    client stops pulling while the pool is busy instead of letting leases
+    expire. Messages published with an ordering key are delivered one at a
+    time per key when the subscription has message ordering enabled. If the
+    stream fails it is reopened after a growing delay.
+    """
+
+    def __init__(self, subscription_path: str, handle, concurrency: int = 16, max_messages: int = 32,
+                 max_bytes: int = 10 * 1024 * 1024, subscriber_client=None, metrics=None):
+        self.subscription_path = subscription_path
+        self.concurrency = concurrency
+        self._handle = handle
+        self._flow_control = pubsub_v1.types.FlowControl(max_messages=max_messages, max_bytes=max_bytes)
+        self._client = subscriber_client
+        self._metrics = metrics
+        self._future = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {"received": 0, "acked": 0, "nacked": 0, "errors": 0, "stream_restarts": 0}
+
+    def start(self):
+        if self._client is None:
+            self._client = pubsub_v1.SubscriberClient()
+        threading.Thread(target=self._run, name="pull-worker", daemon=True).start()
+        logger.info(f"StreamingPull worker started on {self.subscription_path}: concurrency={self.concurrency}, "
+                    f"max_messages={self._flow_control.max_messages}, max_bytes={self._flow_control.max_bytes}.")
+        return self
+
+    def stop(self, timeout: float | None = 30):
+        """Stops pulling and waits for the messages being processed to finish."""
+        self._stop.set()
+        future = self._future
+        if future is not None:
+            future.cancel()
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+    def _run(self):
+        delay = 1
+        while not self._stop.is_set():
+            executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="pull-handler")
+            self._future = self._client.subscribe(self.subscription_path, self._callback,
+                                                  flow_control=self._flow_control,
+                                                  scheduler=ThreadScheduler(executor=executor),
+                                                  await_callbacks_on_shutdown=True)
+            started = time.monotonic()
+            try:
+                self._future.result()
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                if time.monotonic() - started > 60:
+                    delay = 1
+                self._count("stream_restarts")
+                logger.error(f"StreamingPull on {self.subscription_path} failed; reopening in {delay}s. Error: {str(e)}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, 60)
+
+    def _callback(self, message):
+        self._count("received")
+        try:
+            with self._metrics.stage("pull_message") if self._metrics else nullcontext():
+                status = self._handle(message.data, dict(message.attributes), message.message_id)
+        except Exception as e:
+            self._count("errors")
+            logger.error(f"Unhandled error processing message {message.message_id}; nacking. Error: {str(e)}")
+            status = 500
+        if status == 200:
+            message.ack()
+            self._count("acked")
+        else:
+            message.nack()
+            self._count("nacked")
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def report(self) -> dict:
+        return {"subscription": self.subscription_path, "concurrency": self.concurrency,
+                "max_messages": self._flow_control.max_messages, "max_bytes": self._flow_control.max_bytes,
+                **self.stats}
+
+
+def subscription_path(subscription: str, project_id: str) -> str:
+    """Full subscription path from a short name, or the path itself if already qualified."""
+    subscription = subscription.strip()
+    if subscription.startswith("projects/"):
+        return subscription
+    return f"projects/{project_id.strip()}/subscriptions/{subscription.split('/')[-1]}"
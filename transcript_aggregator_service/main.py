@@ -1,8 +1,10 @@
 import base64
+import gzip
 import json
 import logging
+import sys
 import time
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import os
 from datetime import datetime, timedelta, timezone
 from google.cloud import firestore, storage # Firestore is imported here
@@ -11,38 +13,21 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 from google.api_core.exceptions import InternalServerError, ServiceUnavailable, DeadlineExceeded, AlreadyExists, GoogleAPICallError
 import requests # New import for making HTTP requests
 import redis  # Added import for redis
+
+# shared/ holds modules common to all services; Cloud Build copies them next to main.py.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "shared"))
+import secret_config
+import stage_metrics
+import structured_logging
 # Removed redis and secretmanager imports as per user's request to revert to environment variables
 # from google.cloud.secretmanager import SecretManagerServiceClient
 # from google.api_core.exceptions import NotFound, PermissionDenied
 
-# Configure structured logging
-class JsonFormatter(logging.Formatter):
-    def format(self, record):
-        log_record = {
-            "severity": record.levelname,
-            "message": record.getMessage(),
-            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
-            "serviceContext": {
-                "service": "transcript-aggregator-service",
-                "version": os.getenv("GAE_VERSION", "local")
-            }
-        }
-        if hasattr(record, 'json_fields'):
-            log_record.update(record.json_fields)
-        
-        if record.exc_info:
-            # Format the exception information
-            log_record["exception_info"] = self.formatException(record.exc_info)
-        elif record.exc_text:
-            log_record["exception_info"] = record.exc_text
-            
-        return json.dumps(log_record)
-
-handler = logging.StreamHandler()
-handler.setFormatter(JsonFormatter())
+# Structured JSON logging (shared/structured_logging.py); the per-utterance path logs
+# sampled events without payloads through `events`.
+structured_logging.configure("transcript-aggregator-service")
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-logger.addHandler(handler)
+events = structured_logging.get_logger(__name__)
 
 # Initialize Firestore client
 db = firestore.Client(database="redacted-transcript-db")
@@ -51,9 +36,12 @@ db = firestore.Client(database="redacted-transcript-db")
 storage_client = storage.Client()
 AGGREGATED_TRANSCRIPTS_BUCKET = os.getenv('AGGREGATED_TRANSCRIPTS_BUCKET')
 
-# Reverted to reading directly from environment variables
-REDIS_HOST = os.getenv('REDIS_HOST')
-REDIS_PORT = int(os.getenv('REDIS_PORT', 6379)) # Default to 6379
+# Configuration is read from environment variables. Setting <NAME>_SECRET_ID instead
+# (e.g. REDIS_HOST_SECRET_ID) reads that value from Secret Manager through the
+# shared secret cache (shared/secret_config.py).
+secret_cache = secret_config.from_env(os.getenv("GOOGLE_CLOUD_PROJECT"))
+REDIS_HOST = secret_cache.env_or_secret('REDIS_HOST')
+REDIS_PORT = int(secret_cache.env_or_secret('REDIS_PORT', 6379)) # Default to 6379
 
 # --- Custom JSON Encoder ---
 class DateTimeEncoder(json.JSONEncoder):
@@ -83,13 +71,42 @@ else:
 CONTEXT_TTL_SECONDS = int(os.getenv('CONTEXT_TTL_SECONDS', 3600)) # Default to 1 hour
  
 # Main Service URL for sending aggregated transcripts
-MAIN_SERVICE_URL = os.getenv('MAIN_SERVICE_URL')
+MAIN_SERVICE_URL = secret_cache.env_or_secret('MAIN_SERVICE_URL')
 if not MAIN_SERVICE_URL:
     logger.critical("MAIN_SERVICE_URL environment variable not set. Cannot forward aggregated transcripts.")
     # Depending on deployment strategy, you might want to exit here.
     # For now, we'll just log a critical error.
+
+def apply_rotated_secret(secret_id, old_value, new_value):
+    """A rotated MAIN_SERVICE_URL secret applies to the next forwarded transcript."""
+    global MAIN_SERVICE_URL
+    if new_value and secret_id == os.getenv('MAIN_SERVICE_URL_SECRET_ID'):
+        MAIN_SERVICE_URL = new_value
+
+secret_cache.on_change(apply_rotated_secret)
+secret_cache.start_refresh() # Only secrets read through *_SECRET_ID are refreshed
  
 app = Flask(__name__)
+
+# Per-stage latency histograms (shared/stage_metrics.py), served on /metrics when
+# METRICS_ENABLED=true.
+metrics = stage_metrics.from_env("transcript_aggregator_service")
+
+def publish_job_event(conversation_id, event_type, data):
+    """
+    Bumps the job version used for main_service's /redaction-status ETags and notifies
+    its /redaction-events streams through the job's Redis channel, in one round trip
+    (see main_service/job_events.py). Best effort: stream clients fall back to polling.
+    """
+    if not redis_client:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.incr(f"job_version:{conversation_id}")
+        pipe.publish(f"job_events:{conversation_id}", json.dumps({"type": event_type, **data}))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not publish '{event_type}' job event for conversation {conversation_id}: {e}")
  
 @app.route('/redacted-transcripts', methods=['POST'])
 def receive_redacted_transcripts():
@@ -98,26 +115,26 @@ def receive_redacted_transcripts():
     """
     envelope = request.get_json()
     if not envelope:
-        logger.error("No Pub/Sub message received.", extra={"json_fields": {"event": "message_reception_error", "reason": "no_envelope"}})
+        events.error("message_reception_error", reason="no_envelope")
         return jsonify({'error': 'No Pub/Sub message received'}), 400
 
     if not isinstance(envelope, dict) or 'message' not in envelope:
-        logger.error("Invalid Pub/Sub message format.", extra={"json_fields": {"event": "message_reception_error", "reason": "invalid_format"}})
+        events.error("message_reception_error", reason="invalid_format")
         return jsonify({'error': 'Invalid Pub/Sub message format'}), 400
 
     pubsub_message = envelope['message']
 
     if 'data' not in pubsub_message:
-        logger.error("No data in Pub/Sub message.", extra={"json_fields": {"event": "message_reception_error", "reason": "no_data"}})
+        events.error("message_reception_error", reason="no_data")
         return jsonify({'error': 'No data in Pub/Sub message'}), 400
 
     try:
         # Pub/Sub message data is base64 encoded
         data = base64.b64decode(pubsub_message['data']).decode('utf-8')
         message_data = json.loads(data)
-        logger.info("Message received from 'redacted-transcripts' topic.", extra={"json_fields": {"event": "message_received", "topic": "redacted-transcripts", "message_id": pubsub_message.get('message_id')}})
+        events.debug("message_received", topic="redacted-transcripts", message_id=pubsub_message.get('message_id'))
     except (json.JSONDecodeError, ValueError) as e:
-        logger.error(f"Could not decode or parse message data: {e}", extra={"json_fields": {"event": "message_parsing_error", "error_details": str(e)}})
+        events.error("message_parsing_error", error_details=str(e))
         return jsonify({'error': f'Could not decode or parse message data: {e}'}), 400
 
     # Extract required fields
@@ -140,7 +157,7 @@ def receive_redacted_transcripts():
     missing_fields = [field for field, value in required_fields.items() if value is None or (isinstance(value, str) and not value.strip())]
 
     if missing_fields:
-        logger.error(f"Missing required fields: {', '.join(missing_fields)}", extra={"json_fields": {"event": "missing_fields_error", "missing_fields": missing_fields}})
+        events.error("missing_fields_error", missing_fields=missing_fields)
         return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
 
     try:
@@ -158,9 +175,19 @@ def receive_redacted_transcripts():
         # Store original text if available
         if original_text:
             utterance_data['original_text'] = original_text
+
+        # DLP config version that produced the redaction, for auditing after config changes
+        if message_data.get('dlp_config_version'):
+            utterance_data['dlp_config_version'] = message_data['dlp_config_version']
         
-        doc_ref.set(utterance_data)
-        logger.info(f"Firestore: Stored utterance {original_entry_index} for conversation {conversation_id}.", extra={"json_fields": {"event": "firestore_utterance_store", "conversation_id": conversation_id, "original_entry_index": original_entry_index}})
+        with metrics.stage("firestore_write"):
+            doc_ref.set(utterance_data)
+        events.info("firestore_utterance_store", conversation_id=conversation_id, original_entry_index=original_entry_index)
+        publish_job_event(conversation_id, "segment", {
+            "original_entry_index": original_entry_index,
+            "speaker": "END_USER" if participant_role == "END_USER" else "AGENT",
+            "text": redacted_transcript
+        })
         return jsonify({'status': 'success', 'message': 'Utterance stored in Firestore'}), 200
 
     except Exception as e:
@@ -215,9 +242,9 @@ def receive_conversation_ended_event():
 
         # Retrieve all utterances from Firestore for final aggregation
         utterances_ref = db.collection('conversations').document(conversation_id).collection('utterances')
-        utterances = utterances_ref.order_by('original_entry_index').stream()
-
-        entries_for_gcs = [utterance.to_dict() for utterance in utterances]
+        with metrics.stage("firestore_stream"):
+            utterances = utterances_ref.order_by('original_entry_index').stream()
+            entries_for_gcs = [utterance.to_dict() for utterance in utterances]
 
         if not entries_for_gcs:
             logger.warning(f"No utterances found in Firestore for conversation ID: {conversation_id} during final aggregation. Skipping GCS upload.", extra={"json_fields": {"event": "gcs_upload_skipped", "conversation_id": conversation_id, "reason": "no_utterances_in_firestore"}})
@@ -240,13 +267,16 @@ def receive_conversation_ended_event():
 
             # The GCS payload must be a JSON object with an "entries" key.
             gcs_payload_dict = {"entries": entries_for_gcs}
-            json_payload_for_gcs = json.dumps(gcs_payload_dict, indent=2, cls=DateTimeEncoder)
+            with metrics.stage("json_serialize"):
+                json_payload_for_gcs = json.dumps(gcs_payload_dict, indent=2, cls=DateTimeEncoder)
             
             gcs_transcript_filename = f"{conversation_id}_transcript.json"
             
-            _gcs_upload_with_retry(AGGREGATED_TRANSCRIPTS_BUCKET, gcs_transcript_filename, json_payload_for_gcs)
+            with metrics.stage("gcs_upload"):  # Includes retries
+                _gcs_upload_with_retry(AGGREGATED_TRANSCRIPTS_BUCKET, gcs_transcript_filename, json_payload_for_gcs)
             gcs_transcript_uri = f"gs://{AGGREGATED_TRANSCRIPTS_BUCKET}/{gcs_transcript_filename}"
             logger.info(f"Uploaded final aggregated transcript to GCS: {gcs_transcript_uri}", extra={"json_fields": {"event": "gcs_upload_success_final", "conversation_id": conversation_id, "gcs_uri": gcs_transcript_uri}})
+            publish_job_event(conversation_id, "status", {"status": "DONE", "utterance_count": len(entries_for_gcs)})
 
         except Exception as e:
             logger.error(f"Error during final GCS upload. Exception: {e}", exc_info=True, extra={"json_fields": {"event": "gcs_upload_error_final", "conversation_id": conversation_id, "error_message": str(e)}})
@@ -307,6 +337,10 @@ def get_conversation_realtime(conversation_id):
                     if original_conversation_str:
                         original_transcript_segments = json.loads(original_conversation_str)
                         logger.info(f"Retrieved original transcript from Redis for conversation {conversation_id}.")
+                    else:
+                        # Streamed uploads store the original as gzip+base64 chunks of segments
+                        for chunk in redis_client.lrange(f"original_conversation_chunks:{conversation_id}", 0, -1):
+                            original_transcript_segments.extend(json.loads(gzip.decompress(base64.b64decode(chunk))))
                 except Exception as e:
                     logger.warning(f"Could not retrieve original transcript from Redis for conversation {conversation_id}: {e}")
         
@@ -355,3 +389,10 @@ def get_conversation_realtime(conversation_id):
                     exc_info=True, 
                     extra={"json_fields": {"event": "firestore_conversation_error", "conversation_id": conversation_id, "error_details": str(e)}})
         return jsonify({'error': f'Failed to retrieve conversation: {e}'}), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-stage latency histograms in the Prometheus text format."""
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled; set METRICS_ENABLED=true"}), 404
+    return Response(metrics.render(), content_type=stage_metrics.CONTENT_TYPE)